@@ -0,0 +1,69 @@
+"""
+Measure batch search throughput across worker counts.
+
+Prepares one index over synthetic lines, then searches the same batch
+in-process, on a thread pool (GIL-bound, for comparison) and on
+``BatchSearchPool`` with an increasing number of workers. The first
+parallel batch includes the fork; later ones reuse the pool.
+
+Usage:
+    python benchmarks/bench_batch_search.py [mode] [lines] [queries]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from batch import BatchSearchPool, search_chunk  # noqa: E402
+from repositories import StorageRepository  # noqa: E402
+
+
+def _time(func: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    mode = sys.argv[1] if len(sys.argv) > 1 else "naive"
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 4_000
+
+    repo = StorageRepository()
+    repo.data = [f"6;0;1;26;0;{i};3;0;" for i in range(lines)]
+    snapshot = repo.prepare(mode=mode)
+    queries: List[str] = [
+        f"6;0;1;26;0;{(i * 7919) % (2 * lines)};3;0;" for i in range(count)
+    ]
+
+    print(f"{count} queries, mode '{mode}', {lines} lines")
+    inline = _time(lambda: search_chunk(snapshot, queries))
+    print(f"  {'inline':<12} {count / inline:>12,.0f} queries/s")
+
+    def threaded() -> None:
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(lambda q: repo.search(q, snapshot), queries))
+
+    print(f"  {'threads':<12} {count / _time(threaded):>12,.0f} queries/s")
+
+    workers = 2
+    while workers <= max(2, os.cpu_count() or 1):
+        pool = BatchSearchPool(processes=workers, min_parallel=1)
+        cold = _time(lambda: pool.search(snapshot, queries))
+        warm = _time(lambda: pool.search(snapshot, queries))
+        pool.close()
+        print(
+            f"  {f'{workers} workers':<12} {count / warm:>12,.0f} queries/s"
+            f"  (first batch incl. fork: {count / cold:,.0f}/s)"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare the size and speed of log record encodings.
+
+Builds synthetic log entries with a realistic amount of repetition in
+queries and IPs, then measures the pretty-printed JSON that LogRepository
+writes, JSON lines, and the binary ``log_codec`` format.
+
+Usage:
+    python benchmarks/bench_log_encoding.py [entries]
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from log_codec import from_binary, to_binary  # noqa: E402
+from models import Log  # noqa: E402
+
+
+def _make_entries(count: int) -> List[Dict[str, Any]]:
+    start = datetime(2024, 1, 1)
+    entries = []
+    for i in range(count):
+        log = Log(
+            id=str(uuid.uuid4()),
+            query=f"6;0;1;26;0;{i % 500};3;0;",
+            requesting_ip=f"192.168.1.{i % 20}",
+        )
+        log.create(found=i % 3 == 0, exec_time=0.00001 * (i % 97))
+        log.timestamp = start + timedelta(milliseconds=37 * i)
+        log.mode = "set"
+        log.phases = {"prepare": 800 + i % 50, "search": 300 + i % 30}
+        entries.append(log.to_dict())
+    return entries
+
+
+def _time(func: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    entries = _make_entries(count)
+
+    pretty = json.dumps(entries, indent=4).encode("utf-8")
+    lines = b"".join(
+        (json.dumps(entry) + "\n").encode("utf-8") for entry in entries
+    )
+    binary = to_binary(entries)
+
+    rows = [
+        (
+            "pretty json",
+            len(pretty),
+            _time(lambda: json.dumps(entries, indent=4)),
+            _time(lambda: json.loads(pretty)),
+        ),
+        (
+            "json lines",
+            len(lines),
+            _time(lambda: [json.dumps(entry) for entry in entries]),
+            _time(lambda: [json.loads(line) for line in lines.splitlines()]),
+        ),
+        (
+            "binary",
+            len(binary),
+            _time(lambda: to_binary(entries)),
+            _time(lambda: from_binary(binary)),
+        ),
+    ]
+
+    print(f"{count} entries")
+    print(f"{'format':<12} {'bytes':>12} {'B/entry':>8} "
+          f"{'encode s':>9} {'decode s':>9}")
+    for name, size, encode_s, decode_s in rows:
+        print(f"{name:<12} {size:>12} {size / count:>8.1f} "
+              f"{encode_s:>9.3f} {decode_s:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
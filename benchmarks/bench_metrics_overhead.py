@@ -0,0 +1,102 @@
+"""
+Benchmark the cost of metrics instrumentation on the client_handler path.
+
+Runs ``client_handler`` against an in-memory connection and a stub service
+with the metrics registry enabled and disabled, and reports the per-request
+difference. The stub keeps the search itself out of the measurement so the
+overhead is compared against the cheapest possible request.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py [iterations]
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from main import client_handler  # noqa: E402
+from metrics import REGISTRY  # noqa: E402
+
+
+class _Conn:
+    """Minimal socket stand-in returning a fixed request."""
+
+    def __init__(self, payload: bytes) -> None:
+        self.payload = payload
+
+    def recv(self, _size: int) -> bytes:
+        return self.payload
+
+    def sendall(self, _data: bytes) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _Service:
+    """AppService stand-in that answers instantly."""
+
+    def create_log(self, **kwargs: str) -> Dict[str, Any]:
+        return {
+            "id": "bench",
+            "query": kwargs["query_string"],
+            "requesting_ip": kwargs["requesting_ip"],
+            "execution_time": 1e-6,
+            "timestamp": "2025-01-01T00:00:00",
+            "status": "STRING_EXISTS",
+        }
+
+
+class _Config:
+    def get_server_config(self) -> Dict[str, Any]:
+        return {"max_payload_size": 4096}
+
+
+def run(iterations: int) -> float:
+    """Return mean seconds per handled request."""
+    payload = json.dumps(
+        {"action": "create_log", "query": "apple1", "algo": "set"}
+    ).encode()
+    service, config, addr = _Service(), _Config(), ("127.0.0.1", 5000)
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client_handler(_Conn(payload), addr, service, config)
+            sink.seek(0)
+            sink.truncate()
+        return (time.perf_counter() - start) / iterations
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    # Warm up both code paths before timing
+    run(1_000)
+
+    REGISTRY.enabled = False
+    baseline = min(run(iterations) for _ in range(3))
+    REGISTRY.enabled = True
+    instrumented = min(run(iterations) for _ in range(3))
+
+    overhead = instrumented - baseline
+    print(f"iterations per run:     {iterations}")
+    print(f"without metrics:        {baseline * 1e6:8.2f} us/request")
+    print(f"with metrics:           {instrumented * 1e6:8.2f} us/request")
+    print(
+        f"instrumentation cost:   {overhead * 1e6:8.2f} us/request "
+        f"({overhead / baseline * 100:.1f}% of a no-op request)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Compare the per-request CPU cost of the JSON/text and binary protocols.
+
+Measures the message handling each side does per query: the server
+decoding the request and encoding its reply, and the client encoding the
+request and extracting status and search time from the reply. A third
+run pushes requests through ``client_handler`` over a socket pair, on
+keep-alive connections, with a stub service so only protocol and
+handler overhead is counted.
+
+Usage:
+    python benchmarks/bench_wire_protocol.py [requests]
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from main import client_handler, format_tcp_response  # noqa: E402
+from protocol import (  # noqa: E402
+    STATUS_EXISTS, decode_query, decode_result, encode_frame, encode_query,
+    encode_result, read_frame
+)
+
+QUERY = "6;0;1;26;0;7;3;0;"
+RESULT: Dict[str, Any] = {
+    "id": str(uuid.uuid4()),
+    "query": QUERY,
+    "requesting_ip": "127.0.0.1",
+    "execution_time": 0.000012,
+    "timestamp": "2024-01-01T00:00:00",
+    "status": "STRING_EXISTS",
+    "phases": {"prepare": 900, "search": 12000, "persist": 40000},
+}
+
+
+def _cpu_us(func: Callable[[], Any], count: int) -> float:
+    """CPU microseconds per call of ``func``."""
+    started = time.process_time()
+    for _ in range(count):
+        func()
+    return (time.process_time() - started) / count * 1e6
+
+
+def _text_execution_ms(response: str) -> Optional[float]:
+    # The Flask client's extract_execution_time_ms
+    if "Execution Time:" in response:
+        parts = response.split("Execution Time:")
+        return float(parts[1].strip().split("s")[0]) * 1000
+    return None
+
+
+def _server_text() -> None:
+    request = json.loads(json_request.decode())
+    assert request["action"] == "create_log"
+    encode_frame(format_tcp_response(RESULT))
+
+
+def _server_binary() -> None:
+    decode_query(binary_request)
+    encode_frame(encode_result(
+        STATUS_EXISTS,
+        int(RESULT["execution_time"] * 1e9),
+        RESULT["id"],
+    ))
+
+
+def _client_text() -> None:
+    encode_frame(json.dumps({
+        "action": "create_log", "query": QUERY, "algo": "set",
+        "keep_alive": True,
+    }).encode())
+    response = text_reply.decode()
+    response.startswith("STRING EXISTS")
+    _text_execution_ms(response)
+
+
+def _client_binary() -> None:
+    encode_frame(encode_query(QUERY, "set"))
+    decode_result(binary_reply)
+
+
+json_request = json.dumps({
+    "action": "create_log", "query": QUERY, "algo": "set", "keep_alive": True
+}).encode()
+binary_request = encode_query(QUERY, "set")
+text_reply = format_tcp_response(RESULT)
+binary_reply = encode_result(STATUS_EXISTS, 12000, RESULT["id"])
+
+
+class _StubService:
+    def create_log(self, **kwargs: Any) -> Dict[str, Any]:
+        return RESULT
+
+
+class _StubConfig:
+    def get_server_config(self) -> Dict[str, Any]:
+        return {"max_payload_size": 4096}
+
+
+def _round_trips(binary: bool, count: int) -> float:
+    """CPU microseconds per request through client_handler."""
+    app_service = _StubService()
+    config = _StubConfig()
+    server, client = socket.socketpair()
+    handler = threading.Thread(
+        target=client_handler,
+        args=(server, ("127.0.0.1", 0), app_service, config),
+    )
+    handler.start()
+
+    if binary:
+        client.sendall(json.dumps(
+            {"action": "upgrade", "protocol": "binary"}
+        ).encode())
+        read_frame(client)
+        request = encode_frame(encode_query(QUERY, "set"))
+    else:
+        client.sendall(json_request)
+        read_frame(client)
+        request = encode_frame(json_request)
+
+    started = time.process_time()
+    for _ in range(count):
+        client.sendall(request)
+        reply = read_frame(client)
+        if binary:
+            decode_result(reply)
+        else:
+            _text_execution_ms(reply.decode())
+    elapsed = time.process_time() - started
+    client.close()
+    handler.join()
+    return elapsed / count * 1e6
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    print(f"CPU per request over {count} requests (microseconds)")
+    print(f"  {'':<22}{'text':>10}{'binary':>10}{'saved':>10}")
+    for name, text, binary in (
+        ("server encode/decode", _server_text, _server_binary),
+        ("client encode/decode", _client_text, _client_binary),
+    ):
+        text_us = _cpu_us(text, count)
+        binary_us = _cpu_us(binary, count)
+        print(
+            f"  {name:<22}{text_us:>10.2f}{binary_us:>10.2f}"
+            f"{text_us - binary_us:>10.2f}"
+        )
+
+    trips = max(1, count // 10)
+    text_us = _round_trips(False, trips)
+    binary_us = _round_trips(True, trips)
+    print(
+        f"  {'handler round trip':<22}{text_us:>10.2f}{binary_us:>10.2f}"
+        f"{text_us - binary_us:>10.2f}"
+    )
+    print(
+        f"  reply size: text {len(encode_frame(text_reply))} B, "
+        f"binary {len(encode_frame(binary_reply))} B"
+    )
+
+
+if __name__ == "__main__":
+    main()
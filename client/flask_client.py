@@ -2,11 +2,16 @@
 
 import os
 import sys
+import functools
 import json
+import math
+import queue
 import socket
 import ssl
+import threading
 import time
-from typing import Optional, List, Dict, Any, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Union
 
 from flask import (
     Flask, render_template, request,
@@ -21,6 +26,11 @@ sys.path.append(src_path)
 
 from config import Config  # noqa: E402
 from security import protect_buffer  # noqa: E402
+from protocol import (  # noqa: E402
+    BINARY_PROTOCOL, JSON_PROTOCOL, STATUS_BUSY, STATUS_ERROR,
+    STATUS_EXISTS, STATUS_NOT_FOUND, BinaryResult, decode_result, encode_frame,
+    encode_query, read_frame
+)
 
 app = Flask(__name__)
 
@@ -36,9 +46,16 @@ def load_config() -> Dict[str, Any]:
 
 
 def save_config(config_data: Dict[str, Any]) -> None:
-    """Save the updated configuration dictionary to the config file."""
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+    """
+    Save the updated configuration dictionary to the config file.
+
+    The file is replaced atomically so the server's config watcher never
+    reads a half-written file.
+    """
+    tmp_path = f"{CONFIG_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(config_data, f, indent=2)
+    os.replace(tmp_path, CONFIG_PATH)
 
 
 def get_current_data_file() -> str:
@@ -77,7 +94,242 @@ SSL_ENABLED: bool = server_conf['ssl_enabled']
 SSL_CERT: Optional[str] = server_conf.get('ssl_cert')
 SSL_KEY: Optional[str] = server_conf.get('ssl_key')
 MAX_PAYLOAD_SIZE: int = server_conf['max_payload_size']
-DEFAULT_ALGO: str = 'trie'
+DEFAULT_ALGO: str = 'auto'
+
+
+CLIENT_CONF: Dict[str, Any] = load_config().get('client_config', {})
+# Queries of one submission in flight at once
+CONCURRENCY: int = int(CLIENT_CONF.get('concurrency', 8))
+# Idle connections kept open per server
+POOL_SIZE: int = int(CLIENT_CONF.get('pool_size', CONCURRENCY))
+REQUEST_TIMEOUT: float = float(CLIENT_CONF.get('timeout', 10.0))
+# 'binary' for the compact protocol, 'json' for JSON requests and text
+PROTOCOL: str = str(CLIENT_CONF.get('protocol', JSON_PROTOCOL))
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+@functools.lru_cache(maxsize=None)
+def get_ssl_context(
+    certfile: Optional[str],
+    keyfile: Optional[str]
+) -> ssl.SSLContext:
+    """Build the client SSL context once per certificate pair."""
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    if certfile and keyfile:
+        context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+    return context
+
+
+class _Prefixed:
+    """A socket whose first bytes were already read, for ``read_frame``."""
+
+    def __init__(self, prefix: bytes, sock: socket.socket) -> None:
+        self._prefix = prefix
+        self._sock = sock
+
+    def recv_into(self, buffer: memoryview, size: int) -> int:
+        if self._prefix:
+            count = min(size, len(self._prefix))
+            buffer[:count] = self._prefix[:count]
+            self._prefix = self._prefix[count:]
+            return count
+        return self._sock.recv_into(buffer, size)
+
+
+class ConnectionPool:
+    """
+    Persistent keep-alive connections to one server.
+
+    With the JSON protocol a new connection sends its first request as
+    plain JSON with ``keep_alive`` set; after that the server frames every
+    reply and expects framed requests. With the binary protocol each new
+    connection is upgraded once and then carries binary frames only.
+    Connections are reused across requests and page loads, and idle ones
+    the server has since closed are replaced transparently.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        size: int = POOL_SIZE,
+        timeout: float = REQUEST_TIMEOUT,
+        protocol: str = JSON_PROTOCOL
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.size = size
+        self.timeout = timeout
+        self.protocol = protocol
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue()
+        # Latest TLS session; new connections resume it instead of doing
+        # a full handshake
+        self._session: Optional[ssl.SSLSession] = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection(
+            (self.host, self.port), timeout=self.timeout
+        )
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(
+                sock, server_hostname=self.host, session=self._session
+            )
+        if self.protocol == BINARY_PROTOCOL:
+            try:
+                sock.sendall(json.dumps({
+                    'action': 'upgrade', 'protocol': BINARY_PROTOCOL
+                }).encode())
+                ack = json.loads(read_frame(sock).decode())
+            except Exception:
+                sock.close()
+                raise
+            if ack.get('protocol') != BINARY_PROTOCOL:
+                sock.close()
+                raise ConnectionError(
+                    f"Server refused the binary protocol: {ack}"
+                )
+        return sock
+
+    def _exchange(
+        self,
+        payload: bytes,
+        first_payload: Optional[bytes] = None
+    ) -> bytes:
+        """
+        Send one framed request and return the reply payload.
+
+        Args:
+            payload: Request payload, framed before sending.
+            first_payload: Sent unframed instead when the connection is
+                new (the JSON protocol's opening request).
+        """
+        while True:
+            try:
+                sock = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                sock = self._connect()
+                reused = False
+            # An idle connection may have been closed by the server, which
+            # shows as the send failing or the connection closing with no
+            # reply. Only then is the request retried, on a new connection:
+            # any other failure, a timeout above all, may come after the
+            # server ran the request, and running it twice is not safe.
+            try:
+                if not reused and first_payload is not None:
+                    sock.sendall(first_payload)
+                else:
+                    sock.sendall(encode_frame(payload))
+            except OSError:
+                sock.close()
+                if reused:
+                    continue
+                raise
+            try:
+                first = sock.recv(1)
+            except socket.timeout:
+                sock.close()
+                raise
+            except ConnectionResetError:
+                first = b''
+            except OSError:
+                sock.close()
+                raise
+            if not first:
+                sock.close()
+                if reused:
+                    continue
+                raise ConnectionError("Connection closed before the reply")
+            try:
+                response = read_frame(_Prefixed(first, sock))
+            except (ConnectionError, OSError):
+                sock.close()
+                raise
+            self._release(sock)
+            return response
+
+    def request(self, request_data: Dict[str, Any]) -> bytes:
+        """
+        Send one JSON request and return the reply payload.
+
+        Args:
+            request_data: The JSON request; 'keep_alive' is added.
+
+        Returns:
+            The reply frame's payload.
+        """
+        if self.protocol != JSON_PROTOCOL:
+            raise ValueError("JSON requests need a JSON protocol pool")
+        payload = protect_buffer(
+            json.dumps({**request_data, 'keep_alive': True}).encode(),
+            MAX_PAYLOAD_SIZE
+        )
+        return self._exchange(payload, first_payload=payload)
+
+    def query(self, query: str, algo: str) -> BinaryResult:
+        """
+        Send one binary query.
+
+        Args:
+            query: The string to search for.
+            algo: Algorithm to use.
+
+        Returns:
+            The decoded status, search time and log id.
+        """
+        if self.protocol != BINARY_PROTOCOL:
+            raise ValueError("Binary queries need a binary protocol pool")
+        payload = protect_buffer(encode_query(query, algo), MAX_PAYLOAD_SIZE)
+        return decode_result(self._exchange(payload))
+
+    def _release(self, sock: socket.socket) -> None:
+        # TLS 1.3 tickets arrive after the handshake, so the session is
+        # only available once a reply has been read
+        if isinstance(sock, ssl.SSLSocket) and sock.session is not None:
+            self._session = sock.session
+        if self._idle.qsize() < self.size:
+            self._idle.put(sock)
+        else:
+            sock.close()
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools: Dict[Tuple[str, int, bool, Optional[str], Optional[str], str],
+             ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    server_address: str,
+    port: int,
+    ssl_enabled: bool,
+    certfile: Optional[str],
+    keyfile: Optional[str],
+    protocol: str = JSON_PROTOCOL
+) -> ConnectionPool:
+    """Return the shared connection pool for a server and protocol."""
+    key = (server_address, port, ssl_enabled, certfile, keyfile, protocol)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                server_address,
+                port,
+                get_ssl_context(certfile, keyfile) if ssl_enabled else None,
+                protocol=protocol,
+            )
+            _pools[key] = pool
+        return pool
 
 
 def send_request(
@@ -88,11 +340,14 @@ def send_request(
     keyfile: Optional[str],
     action: str,
     query: Optional[str],
-    algo: Optional[str]
+    algo: Optional[str],
+    extra: Optional[Dict[str, Any]] = None
 ) -> Union[Dict[str, Any], str]:
     """
     Send a request to the backend server and return the response.
 
+    The request goes over a pooled keep-alive connection.
+
     Args:
         server_address: Server hostname or IP.
         port: Port number to connect to.
@@ -102,31 +357,22 @@ def send_request(
         action: Action to perform ('create_log', 'read_logs', etc.).
         query: The query string to process.
         algo: Algorithm to use.
+        extra: Additional request fields, e.g. 'cursor' and 'filters'.
 
     Returns:
         Server response as a dict (JSON) or string.
     """
     try:
-        sock = socket.create_connection((server_address, port))
-
-        if ssl_enabled:
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            if certfile and keyfile:
-                context.load_cert_chain(certfile=certfile, keyfile=keyfile)
-            sock = context.wrap_socket(sock, server_hostname=server_address)
-
         request_data = {
             "action": action,
             "query": query,
             "algo": algo
         }
+        if extra:
+            request_data.update(extra)
 
-        payload = json.dumps(request_data).encode()
-        protected_payload = protect_buffer(payload, MAX_PAYLOAD_SIZE)
-        sock.sendall(protected_payload)
-
-        response_data = sock.recv(MAX_PAYLOAD_SIZE)
-        sock.close()
+        pool = get_pool(server_address, port, ssl_enabled, certfile, keyfile)
+        response_data = pool.request(request_data)
 
         if action == 'create_log':
             return response_data.decode()
@@ -143,6 +389,95 @@ def send_request(
         return {'error': str(e)}
 
 
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+_fan_out_executor = ThreadPoolExecutor(
+    max_workers=max(1, CONCURRENCY), thread_name_prefix='query'
+)
+
+
+def format_binary_result(query: str, result: BinaryResult) -> str:
+    """Render a binary response as the text the server would have sent."""
+    if result.status == STATUS_EXISTS:
+        lines = ["STRING EXISTS"]
+    elif result.status == STATUS_NOT_FOUND:
+        lines = ["STRING NOT_FOUND"]
+    elif result.status == STATUS_BUSY:
+        return f"BUSY: {result.error or 'server busy'}\n"
+    else:
+        lines = [f"ERROR: {result.error or 'Unknown error'}"]
+    lines.append("DEBUG:")
+    lines.append(f"  Query: {query}")
+    lines.append(f"  Execution Time: {result.execution_ns / 1e9}s")
+    lines.append(f"  Log ID: {result.log_id}")
+    return "\n".join(lines) + "\n"
+
+
+def run_queries(
+    queries: List[str],
+    algo: str
+) -> List[Tuple[Union[str, Dict[str, Any]], float, Optional[float]]]:
+    """
+    Send every query concurrently, at most CONCURRENCY at a time.
+
+    Uses the binary protocol when client_config.protocol is 'binary',
+    so search times arrive as integers instead of being parsed from text.
+
+    Args:
+        queries: The query strings, one request each.
+        algo: Algorithm to use.
+
+    Returns:
+        (response, round-trip ms, server search ms) per query, in input
+        order; the search time is None when unavailable.
+    """
+    def timed(
+        query: str
+    ) -> Tuple[Union[str, Dict[str, Any]], float, Optional[float]]:
+        started = time.perf_counter()
+        if PROTOCOL == BINARY_PROTOCOL:
+            try:
+                result = get_pool(
+                    SERVER_HOST, SERVER_PORT, SSL_ENABLED, SSL_CERT, SSL_KEY,
+                    BINARY_PROTOCOL
+                ).query(query, algo)
+            except Exception as e:
+                return {'error': str(e)}, (
+                    time.perf_counter() - started
+                ) * 1000, None
+            latency_ms = (time.perf_counter() - started) * 1000
+            exec_ms = (
+                None if result.status in (STATUS_ERROR, STATUS_BUSY)
+                else result.execution_ns / 1e6
+            )
+            return format_binary_result(query, result), latency_ms, exec_ms
+
+        response = send_request(
+            SERVER_HOST,
+            SERVER_PORT,
+            SSL_ENABLED,
+            SSL_CERT,
+            SSL_KEY,
+            'create_log',
+            query,
+            algo
+        )
+        latency_ms = (time.perf_counter() - started) * 1000
+        exec_ms = (
+            extract_execution_time_ms(response)
+            if isinstance(response, str) else None
+        )
+        return response, latency_ms, exec_ms
+
+    return list(_fan_out_executor.map(timed, queries))
+
+
 def extract_execution_time_ms(log_response: str) -> Optional[float]:
     """
     Extract and convert execution time (in seconds) from log response to ms.
@@ -174,7 +509,7 @@ def index() -> str:
     Returns:
         Rendered HTML page.
     """
-    results: List[Union[str, Dict[str, Any]]] = []
+    results: List[Dict[str, Any]] = []
     error: Optional[str] = None
     server_address: str = SERVER_HOST
     server_port: int = SERVER_PORT
@@ -203,38 +538,28 @@ def index() -> str:
                 for q in search_string.split('\n')
                 if q.strip()
             ]
-            all_responses: List[Union[str, Dict[str, Any]]] = []
+            all_responses: List[Dict[str, Any]] = []
             execution_times: List[float] = []
 
-            start_time = time.time()
-
-            for query in queries:
-                response = send_request(
-                    server_address,
-                    server_port,
-                    SSL_ENABLED,
-                    SSL_CERT,
-                    SSL_KEY,
-                    'create_log',
-                    query,
-                    DEFAULT_ALGO
-                )
+            start_time = time.perf_counter()
+            # Fan the queries out over pooled connections
+            outcomes = run_queries(queries, DEFAULT_ALGO)
+            total_time = time.perf_counter() - start_time
 
+            for query, (response, latency_ms, exec_time) in zip(
+                queries, outcomes
+            ):
                 if isinstance(response, dict) and 'error' in response:
-                    all_responses.append(
+                    response = (
                         f"Error for query '{query}': {response['error']}"
                     )
-                else:
-                    exec_time = (
-                        extract_execution_time_ms(response)
-                        if isinstance(response, str) else None
-                    )
-                    if exec_time is not None:
-                        execution_times.append(exec_time)
-                    all_responses.append(response)
+                elif exec_time is not None:
+                    execution_times.append(exec_time)
+                all_responses.append({
+                    'response': response,
+                    'latency_ms': round(latency_ms, 3),
+                })
 
-            end_time = time.time()
-            total_time = end_time - start_time
             queries_per_second = (
                 len(queries) / total_time if total_time > 0 else 0
             )
@@ -242,6 +567,7 @@ def index() -> str:
                 sum(execution_times) / len(execution_times)
                 if execution_times else None
             )
+            latencies = sorted(latency for _, latency, _ in outcomes)
 
             performance_metrics = {
                 'total_queries': len(queries),
@@ -251,8 +577,17 @@ def index() -> str:
                     round(avg_execution_time, 3)
                     if avg_execution_time is not None else "N/A"
                 ),
+                'concurrency': CONCURRENCY,
+                'protocol': PROTOCOL,
                 'data_file': current_file
             }
+            # Client-observed round trip, including queueing and network
+            for p in LATENCY_PERCENTILES + (100,):
+                value = percentile(latencies, p)
+                label = 'max' if p == 100 else f'p{p}'
+                performance_metrics[f'latency_{label}_ms'] = (
+                    round(value, 3) if value is not None else "N/A"
+                )
 
             results = all_responses
         else:
@@ -272,11 +607,27 @@ def read_logs() -> str:
     """
     Flask route to read logs from the server.
 
+    Reads one page at a time. The 'cursor' and 'limit' query parameters
+    select the page; 'since', 'until', 'ip', 'status' and 'query_prefix'
+    are passed through as server-side filters.
+
     Returns:
         Rendered HTML page with logs or an error.
     """
     server_address = SERVER_HOST
     server_port = SERVER_PORT
+
+    filters = {
+        key: request.args[key]
+        for key in ('since', 'until', 'ip', 'status', 'query_prefix')
+        if request.args.get(key)
+    }
+    extra: Dict[str, Any] = {'filters': filters}
+    if request.args.get('cursor', '').isdigit():
+        extra['cursor'] = int(request.args['cursor'])
+    if request.args.get('limit', '').isdigit():
+        extra['limit'] = int(request.args['limit'])
+
     response = send_request(
         server_address,
         server_port,
@@ -285,23 +636,37 @@ def read_logs() -> str:
         SSL_KEY,
         'read_logs',
         None,
-        None
+        None,
+        extra
     )
 
     logs: List[Any] = []
     error: Optional[str] = None
+    next_url: Optional[str] = None
 
     if isinstance(response, dict):
         if 'error' in response:
             error = response['error']
-        elif isinstance(response, list):
-            logs = response
-    elif isinstance(response, list):
-        logs = response
+        else:
+            logs = response.get('logs', [])
+            next_cursor = response.get('next_cursor')
+            if next_cursor is not None:
+                next_url = url_for(
+                    'read_logs',
+                    cursor=next_cursor,
+                    limit=extra.get('limit'),
+                    **filters
+                )
     else:
         error = "Unexpected response format from server"
 
-    return render_template('read_logs.html', logs=logs, error=error)
+    return render_template(
+        'read_logs.html',
+        logs=logs,
+        error=error,
+        filters=filters,
+        next_url=next_url
+    )
 
 
 if __name__ == '__main__':
@@ -16,9 +16,11 @@ Description=Fast Concurrent File Search Server
 After=network.target
 
 [Service]
-Type=simple
+Type=notify
+NotifyAccess=all
 WorkingDirectory=$(pwd)/src
 ExecStart=/usr/bin/python3 -m main
+ExecReload=/bin/kill -HUP \$MAINPID
 Restart=always
 StandardOutput=append:$LOG_FILE
 StandardError=append:$LOG_FILE
@@ -33,3 +35,4 @@ sudo systemctl enable $SERVICE_NAME
 sudo systemctl start $SERVICE_NAME
 
 echo "✅ Setup complete. Use 'sudo systemctl status $SERVICE_NAME' to check status."
+echo "   Deploy without downtime with 'sudo systemctl reload $SERVICE_NAME'."
@@ -0,0 +1,293 @@
+"""
+Admission control for incoming requests.
+
+Every request that does real work takes one of ``max_in_flight`` slots
+before it runs. A request that cannot get a slot within the queue-time
+budget, or whose client IP has run out of tokens in its bucket, is shed:
+the caller answers it with a short BUSY reply instead of queueing it
+behind everyone else. Admitted requests therefore see bounded latency
+during spikes, and shed ones fail fast.
+
+Connections are checked too, as soon as they are accepted: past
+``max_connections`` open ones, or from a client IP with no tokens left,
+they are closed before a thread or a TLS handshake is spent on them.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REGISTRY.describe(
+    "requests_shed_total",
+    "Requests rejected with BUSY, and connections closed on accept, by "
+    "admission control, by reason ('overloaded', 'rate_limited')."
+)
+REGISTRY.describe(
+    "connections_open", "Connections being served by their own thread."
+)
+REGISTRY.describe(
+    "requests_in_flight", "Requests currently holding an admission slot."
+)
+REGISTRY.describe(
+    "admission_wait_seconds",
+    "Time admitted requests waited for a slot."
+)
+
+SHED_OVERLOADED = "overloaded"
+SHED_RATE_LIMITED = "rate_limited"
+
+# Per-IP buckets tracked before idle ones are pruned
+MAX_TRACKED_IPS = 10_000
+
+
+class AdmissionController:
+    """
+    Caps concurrent requests and, optionally, each client IP's request
+    rate. Thread-safe; limits can be changed while running.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        queue_timeout: float = 0.05,
+        per_ip_rate: Optional[float] = None,
+        per_ip_burst: float = 20.0,
+        max_connections: int = 1024
+    ) -> None:
+        """
+        Args:
+            max_in_flight (int): Requests allowed to run at once.
+            queue_timeout (float): Seconds a request may wait for a slot
+                before it is shed; 0 sheds as soon as all slots are taken.
+            per_ip_rate (Optional[float]): Sustained requests per second
+                allowed per client IP; None disables the limit.
+            per_ip_burst (float): Requests a client IP may make at once
+                before the rate applies.
+            max_connections (int): Connections served at once, idle
+                keep-alive ones included.
+        """
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._connections = 0
+        # ip -> [tokens, time of last refill]
+        self._buckets: Dict[str, List[float]] = {}
+        self._shed: Dict[str, int] = {}
+        self.configure(
+            max_in_flight, queue_timeout, per_ip_rate, per_ip_burst,
+            max_connections
+        )
+
+    def configure(
+        self,
+        max_in_flight: int = 64,
+        queue_timeout: float = 0.05,
+        per_ip_rate: Optional[float] = None,
+        per_ip_burst: float = 20.0,
+        max_connections: int = 1024
+    ) -> None:
+        """
+        Replaces the limits; see ``__init__`` for the arguments.
+
+        Clients keep the tokens they have left, capped at the new burst.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        with self._cond:
+            self.max_in_flight = int(max_in_flight)
+            self.max_connections = int(max_connections)
+            self.queue_timeout = max(0.0, float(queue_timeout))
+            self.per_ip_rate = (
+                float(per_ip_rate) if per_ip_rate else None
+            )
+            self.per_ip_burst = max(1.0, float(per_ip_burst))
+            # Unrelated config edits must not refill every client's bucket
+            if self.per_ip_rate is None:
+                self._buckets.clear()
+            else:
+                for bucket in self._buckets.values():
+                    bucket[0] = min(bucket[0], self.per_ip_burst)
+            # A raised limit may free waiting requests
+            self._cond.notify_all()
+
+    def open_connection(self, ip: str) -> Optional[str]:
+        """
+        Checks a connection from ``ip`` right after ``accept()``. Never
+        waits and spends no tokens; each request is still admitted on its
+        own.
+
+        Args:
+            ip (str): The client's address.
+
+        Returns:
+            Optional[str]: None if the connection may be served, in which
+            case ``close_connection()`` must be called once it is closed;
+            otherwise the reason it was shed.
+        """
+        with self._cond:
+            if self._connections >= self.max_connections:
+                return self._count_shed(SHED_OVERLOADED)
+            if self.per_ip_rate is not None:
+                bucket = self._buckets.get(ip)
+                if bucket is not None and self._refill(
+                    bucket, time.perf_counter()
+                ) < 1.0:
+                    return self._count_shed(SHED_RATE_LIMITED)
+            self._connections += 1
+            connections = self._connections
+        REGISTRY.set_gauge("connections_open", float(connections))
+        return None
+
+    def close_connection(self) -> None:
+        """Ends a connection let in by ``open_connection()``."""
+        with self._cond:
+            self._connections -= 1
+            connections = self._connections
+        REGISTRY.set_gauge("connections_open", float(connections))
+
+    def admit(self, ip: str) -> Optional[str]:
+        """
+        Takes a slot for one request from ``ip``.
+
+        Args:
+            ip (str): The client's address.
+
+        Returns:
+            Optional[str]: None if admitted, in which case ``release()``
+            must be called when the request is done; otherwise the reason
+            it was shed.
+        """
+        started = time.perf_counter()
+        with self._cond:
+            if self.per_ip_rate is not None and not self._take_token(
+                ip, started
+            ):
+                return self._count_shed(SHED_RATE_LIMITED)
+
+            deadline = started + self.queue_timeout
+            while self._in_flight >= self.max_in_flight:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return self._count_shed(SHED_OVERLOADED)
+                self._cond.wait(remaining)
+            self._in_flight += 1
+            in_flight = self._in_flight
+
+        REGISTRY.set_gauge("requests_in_flight", float(in_flight))
+        REGISTRY.observe(
+            "admission_wait_seconds", time.perf_counter() - started
+        )
+        return None
+
+    def release(self) -> None:
+        """Returns the slot taken by a successful ``admit()``."""
+        with self._cond:
+            self._in_flight -= 1
+            in_flight = self._in_flight
+            self._cond.notify()
+        REGISTRY.set_gauge("requests_in_flight", float(in_flight))
+
+    def _take_token(self, ip: str, now: float) -> bool:
+        """Refills and spends from ``ip``'s bucket. Caller holds lock."""
+        assert self.per_ip_rate is not None
+        bucket = self._buckets.get(ip)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_IPS:
+                self._prune(now)
+            bucket = self._buckets[ip] = [self.per_ip_burst, now]
+        elif self._refill(bucket, now) < 1.0:
+            return False
+        bucket[0] -= 1.0
+        return True
+
+    def _refill(self, bucket: List[float], now: float) -> float:
+        """Adds the tokens earned since the last refill. Caller holds lock."""
+        assert self.per_ip_rate is not None
+        bucket[0] = min(
+            self.per_ip_burst,
+            bucket[0] + (now - bucket[1]) * self.per_ip_rate
+        )
+        bucket[1] = now
+        return bucket[0]
+
+    def _prune(self, now: float) -> None:
+        """Drops buckets that have refilled completely. Caller holds lock."""
+        assert self.per_ip_rate is not None
+        full_after = self.per_ip_burst / self.per_ip_rate
+        for ip in [
+            ip for ip, (_, last) in self._buckets.items()
+            if now - last >= full_after
+        ]:
+            del self._buckets[ip]
+
+    def _count_shed(self, reason: str) -> str:
+        """Records a shed request. Caller holds lock."""
+        self._shed[reason] = self._shed.get(reason, 0) + 1
+        REGISTRY.inc("requests_shed_total", labels={"reason": reason})
+        return reason
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Current ``in_flight`` and ``connections``
+            counts, the limits and shed counts per reason.
+        """
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "connections": self._connections,
+                "max_connections": self.max_connections,
+                "queue_timeout": self.queue_timeout,
+                "per_ip_rate": self.per_ip_rate,
+                "shed": dict(self._shed),
+            }
+
+    def apply_config(
+        self,
+        file_config: Dict[str, Any],
+        server_config: Dict[str, Any]
+    ) -> None:
+        """Config listener: applies a changed ``admission`` section."""
+        try:
+            self.configure(**_settings(server_config))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Ignoring invalid admission settings: {e}")
+
+
+def _settings(server_config: Dict[str, Any]) -> Dict[str, Any]:
+    settings = server_config.get("admission") or {}
+    return {
+        "max_in_flight": int(settings.get("max_in_flight", 64)),
+        "queue_timeout": float(settings.get("queue_timeout", 0.05)),
+        "per_ip_rate": settings.get("per_ip_rate"),
+        "per_ip_burst": float(settings.get("per_ip_burst", 20.0)),
+        "max_connections": int(settings.get("max_connections", 1024)),
+    }
+
+
+def create_admission_controller(
+    server_config: Dict[str, Any]
+) -> Optional[AdmissionController]:
+    """
+    Builds the controller from the optional ``admission`` section of
+    ``server_config`` (``enabled``, ``max_in_flight``, ``queue_timeout``,
+    ``per_ip_rate``, ``per_ip_burst``, ``max_connections``).
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+
+    Returns:
+        Optional[AdmissionController]: The controller, or None when
+        admission control is disabled.
+    """
+    settings = server_config.get("admission") or {}
+    if not settings.get("enabled", False):
+        return None
+    return AdmissionController(**_settings(server_config))
@@ -1,15 +1,65 @@
-from typing import List, Dict, Optional, Union
+from typing import Any, Iterator, List, Dict, Optional, Tuple, Union
 import uuid
 import logging
 import os
+import threading
+import time
+import weakref
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from repositories import LogRepository, StorageRepository
+from repositories import (
+    NORMALIZED_MODE, IndexSnapshot, LogFilter, LogRepository,
+    StorageRepository, index_memory_limit
+)
+from batch import BatchSearchPool, create_batch_pool
 from config import Config
+from datasets import DatasetRegistry
+from metrics import REGISTRY
+from mode_policy import create_mode_policy
 from models import Log
+from wal import create_write_ahead_log
 
 logger = logging.getLogger(__name__)
 
+REGISTRY.describe(
+    "server_ready", "1 once the startup prewarm has finished, else 0."
+)
+REGISTRY.describe(
+    "time_to_ready_seconds",
+    "Seconds from server start until it was ready to serve queries."
+)
+REGISTRY.describe(
+    "prewarm_seconds", "Seconds the startup prewarm spent per search mode."
+)
+REGISTRY.describe(
+    "key_mutations_total",
+    "add_key and remove_key requests, by operation and outcome."
+)
+REGISTRY.describe(
+    "wal_folds_total", "Write-ahead log folds into the data file."
+)
+
+# Services whose index sizes are reported; the collector below is
+# registered once, so the 'stats' action has them without a metrics port
+_SERVICES: "weakref.WeakSet[AppService]" = weakref.WeakSet()
+
+
+def _collect_index_memory() -> Iterator[Tuple[str, Dict[str, str], float]]:
+    """Collector yielding the size of each prepared search structure."""
+    for service in list(_SERVICES):
+        for mode, size in service.storage_repo.memory_usage().items():
+            yield ("index_memory_bytes", {"mode": mode}, float(size))
+
+
+REGISTRY.register_collector(_collect_index_memory)
+
+# Seconds between checks whether the key log is due to be folded
+FOLD_CHECK_INTERVAL = 1.0
+
+# Row limit with key mutation on, unless 'key_mutation.max_rows' is set;
+# above the default limit so keys can be added to a file already at it
+KEY_MUTATION_MAX_ROWS = 300_000
+
 
 class AppService:
     """
@@ -21,7 +71,9 @@ class AppService:
         self,
         log_repo: LogRepository,
         storage_repo: StorageRepository,
-        config: Config
+        config: Config,
+        datasets: Optional[DatasetRegistry] = None,
+        batch_pool: Optional[BatchSearchPool] = None
     ) -> None:
         """
         Initialize the AppService with required dependencies.
@@ -29,131 +81,605 @@ class AppService:
         :param log_repo: Repository for persisting and retrieving logs
         :param storage_repo: Repository for data storage and search logic
         :param config: Application configuration instance
+        :param datasets: Optional registry of named datasets
+        :param batch_pool: Process pool for batch searches; built from
+                           the 'batch_search' settings when omitted
         """
         self.max_rows = 250_000
         self.log_repo = log_repo
         self.storage_repo = storage_repo
         self.config = config
+        self.datasets = datasets
+        self._switch_lock = threading.Lock()
+        self._switch_thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self.time_to_ready: Optional[float] = None
+        REGISTRY.set_gauge("server_ready", 0.0)
+        _SERVICES.add(self)
 
         file_config = self.config.get_file_config()
         server_config = self.config.get_server_config()
 
         self.file_path: str = file_config.get('linuxpath', '')
+        self._apply_server_config(server_config)
+        self.mode_policy = create_mode_policy(
+            server_config, self.index_memory_limit
+        )
+        self.batch_pool = (
+            batch_pool if batch_pool is not None
+            else create_batch_pool(server_config)
+        )
+
+        # Validate file path at initialization
+        self._validate_file_path()
+
+        # Keys added or removed at runtime are logged next to the data file
+        key_log = create_write_ahead_log(server_config, self.file_path)
+        if key_log is not None:
+            self.storage_repo.key_log = key_log
+            self.max_rows = int(
+                (server_config.get('key_mutation') or {}).get(
+                    'max_rows', KEY_MUTATION_MAX_ROWS
+                )
+            )
+            self.storage_repo.max_rows = self.max_rows
+        self._last_fold = time.monotonic()
+
+    def _apply_server_config(self, server_config: Dict[str, Any]) -> None:
+        """
+        Apply the server settings that can change while running.
+
+        :param server_config: The 'server_config' section
+        """
         # Fix 1: Explicitly convert to boolean
         self.reread_on_query: bool = bool(
             server_config.get('reread_on_query', False)
         )
         self.search_mode: str = server_config.get('search_mode', 'naive')
-
-        # Validate file path at initialization
-        self._validate_file_path()
+        self.read_logs_page_size: int = int(
+            server_config.get('read_logs_page_size', 100)
+        )
+        self.read_logs_max_page_size: int = int(
+            server_config.get('read_logs_max_page_size', 1000)
+        )
+        self.locate_max_matches: int = int(
+            server_config.get('locate_max_matches', 1000)
+        )
+        self.index_memory_limit: Optional[int] = index_memory_limit(
+            server_config
+        )
+        self.trace_index_builds: bool = bool(
+            server_config.get('trace_index_builds', False)
+        )
+        key_mutation = server_config.get('key_mutation') or {}
+        self.fold_interval: float = float(
+            key_mutation.get('fold_interval', 60.0)
+        )
+        self.fold_entries: int = int(key_mutation.get('fold_entries', 10_000))
 
     def _validate_file_path(self) -> None:
         """
         Ensure the configured file path is absolute and exists.
         Logs warnings if issues are detected.
         """
-        if not self.file_path:
+        self.file_path = self._resolve_file_path(self.file_path)
+
+    def _resolve_file_path(self, file_path: str) -> str:
+        """
+        Resolve a configured data file path to an absolute, existing one.
+
+        :param file_path: Path as written in the configuration
+        :return: The resolved path
+        """
+        if not file_path:
             logger.warning(
                 "No file path configured. Search operations will fail."
             )
-            return
+            return file_path
 
         # Convert relative path to absolute
-        if not os.path.isabs(self.file_path):
+        if not os.path.isabs(file_path):
             # Use the project root directory
             project_root = os.path.abspath(
                 os.path.join(os.path.dirname(__file__), "..")
             )
-            absolute_path = os.path.join(project_root, self.file_path)
+            absolute_path = os.path.join(project_root, file_path)
             logger.info(
                 (
-                    f"Converting relative path '{self.file_path}' "
+                    f"Converting relative path '{file_path}' "
                     f"to absolute path '{absolute_path}'"
                 )
             )
-            self.file_path = absolute_path
+            file_path = absolute_path
 
         # Check if file exists
-        if not os.path.exists(self.file_path):
-            logger.warning(f"Data file not found at path: {self.file_path}")
+        if not os.path.exists(file_path):
+            logger.warning(f"Data file not found at path: {file_path}")
 
             # Attempt to find the file in the parent directory
             parent_dir = os.path.dirname(os.getcwd())
-            alternative_path = os.path.join(parent_dir, self.file_path)
+            alternative_path = os.path.join(parent_dir, file_path)
             if os.path.exists(alternative_path):
                 logger.info(
                     f"Found data file in parent directory: {alternative_path}"
                 )
-                self.file_path = alternative_path
+                file_path = alternative_path
+
+        return file_path
+
+    def apply_config(
+        self,
+        file_config: Dict[str, Any],
+        server_config: Dict[str, Any]
+    ) -> None:
+        """
+        Apply a reloaded configuration; registered as a Config listener.
+
+        Search and paging settings take effect immediately. A new data
+        path starts a background switch to that dataset.
+
+        :param file_config: The new 'file_config' section
+        :param server_config: The new 'server_config' section
+        """
+        self._apply_server_config(server_config)
+        policy = create_mode_policy(server_config, self.index_memory_limit)
+        self.mode_policy.upgrade_slow_modes = policy.upgrade_slow_modes
+        self.mode_policy.memory_limit = policy.memory_limit
+        file_path = self._resolve_file_path(file_config.get('linuxpath', ''))
+        if file_path and file_path != self.file_path:
+            self.switch_dataset(file_path)
+
+    def switch_dataset(self, file_path: str) -> threading.Thread:
+        """
+        Load and index a new data file in the background, then swap it in.
+
+        Queries keep using the current dataset until the new one is fully
+        prepared for the current search mode and for every mode prepared
+        on the current dataset; the swap is a single reference
+        assignment. If loading fails the current dataset stays.
+        A later switch supersedes one still in progress.
+
+        :param file_path: Absolute path of the new data file
+        :return: The thread doing the build
+        """
+        def build() -> None:
+            started = time.perf_counter()
+            repo = StorageRepository(
+                memory_limit=self.index_memory_limit,
+                trace_allocations=self.trace_index_builds,
+                columns=self.storage_repo.columns,
+            )
+            repo.key_log = create_write_ahead_log(
+                self.config.get_server_config(), file_path
+            )
+            if repo.key_log is not None:
+                repo.max_rows = self.max_rows
+            if not repo.load_file(file_path):
+                logger.error(f"Dataset switch to {file_path} failed")
+                return
+            # Also build every mode the outgoing dataset had, so none of
+            # them pays for its build on the first request after the swap
+            for mode in self.storage_repo.prepared_modes():
+                if mode == self.search_mode:
+                    continue
+                try:
+                    repo.prepare(mode=mode)
+                except ValueError as e:
+                    logger.error(
+                        f"Dataset switch could not build '{mode}': {e}"
+                    )
+            try:
+                # The default mode last, so it is left active
+                repo.prepare(mode=self.search_mode)
+            except ValueError as e:
+                logger.error(f"Dataset switch to {file_path} failed: {e}")
+                return
+            with self._switch_lock:
+                if self._switch_thread is not threading.current_thread():
+                    return
+                self.file_path = file_path
+                self.storage_repo = repo
+            logger.info(
+                f"Switched dataset to {file_path} in "
+                f"{time.perf_counter() - started:.2f}s"
+            )
+
+        thread = threading.Thread(
+            target=build, name="dataset-switch", daemon=True
+        )
+        with self._switch_lock:
+            self._switch_thread = thread
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        """True once the server has finished warming up."""
+        return self._ready.is_set()
+
+    def mark_ready(self, started: float) -> None:
+        """
+        Record that the server is ready to serve queries.
+
+        :param started: ``time.perf_counter()`` value taken at startup
+        """
+        self.time_to_ready = time.perf_counter() - started
+        REGISTRY.set_gauge("time_to_ready_seconds", self.time_to_ready)
+        REGISTRY.set_gauge("server_ready", 1.0)
+        self._ready.set()
+        logger.info(f"Server ready after {self.time_to_ready:.2f}s")
+
+    def prewarm(
+        self,
+        started: float,
+        modes: Optional[List[str]] = None,
+        datasets: Optional[List[str]] = None
+    ) -> None:
+        """
+        Load the data file and build its indexes before serving, so the
+        first queries do not pay for them; then mark the server ready.
+
+        Failures are logged and leave the work to the first query, as
+        without a prewarm.
+
+        :param started: ``time.perf_counter()`` value taken at startup
+        :param modes: Search modes to prepare; defaults to 'search_mode'
+        :param datasets: Names of registered datasets to prepare too
+        """
+        modes = list(modes) if modes else [self.search_mode]
+        storage_repo = self.storage_repo
+
+        if storage_repo.data is not None or storage_repo.load_file(
+            self.file_path
+        ):
+            # Build the default mode last so it is left active
+            for mode in sorted(modes, key=lambda m: m == self.search_mode):
+                mark = time.perf_counter()
+                try:
+                    storage_repo.prepare(mode=mode)
+                except ValueError as e:
+                    logger.error(f"Prewarm of mode '{mode}' failed: {e}")
+                    continue
+                REGISTRY.set_gauge(
+                    "prewarm_seconds",
+                    time.perf_counter() - mark,
+                    labels={"mode": mode},
+                )
+        else:
+            logger.error(f"Prewarm could not load {self.file_path}")
+
+        for name in datasets or []:
+            if self.datasets is None:
+                logger.error("Prewarm: no datasets are configured")
+                break
+            for mode in modes:
+                try:
+                    self.datasets.get(name, mode)
+                except (KeyError, ValueError) as e:
+                    logger.error(f"Prewarm of dataset '{name}' failed: {e}")
+
+        self.mark_ready(started)
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Report whether the server is ready to serve queries.
+
+        :return: 'status' ('ready' or 'starting'), 'ready' and
+                 'time_to_ready' in seconds (None until ready)
+        """
+        ready = self.ready
+        return {
+            "status": "ready" if ready else "starting",
+            "ready": ready,
+            "time_to_ready": self.time_to_ready,
+        }
+
+    def add_key(self, key: str) -> Dict[str, Any]:
+        """
+        Add a key to the current dataset without rewriting the data file.
+
+        :param key: The key to add
+        :return: 'key', 'status' ('added', 'exists' or 'error'), 'error'
+                 when it failed, and 'keys', the number of keys after it
+        """
+        return self._mutate_key('add', key)
+
+    def remove_key(self, key: str) -> Dict[str, Any]:
+        """
+        Remove every occurrence of a key from the current dataset.
+
+        :param key: The key to remove
+        :return: 'key', 'status' ('removed', 'absent' or 'error'), 'error'
+                 when it failed, and 'keys', the number of keys after it
+        """
+        return self._mutate_key('remove', key)
+
+    def _mutate_key(self, op: str, key: str) -> Dict[str, Any]:
+        """
+        Apply one key mutation to the current repository.
+
+        :param op: 'add' or 'remove'
+        :param key: The key
+        :return: The result described in add_key() and remove_key()
+        """
+        storage_repo = self.storage_repo
+        result: Dict[str, Any] = {"key": key}
+        try:
+            if storage_repo.data is None and not storage_repo.load_file(
+                self.file_path
+            ):
+                raise ValueError(
+                    f"Data file could not be loaded: {self.file_path}"
+                )
+            if op == 'add':
+                changed = storage_repo.add_key(key)
+                result["status"] = "added" if changed else "exists"
+            else:
+                changed = storage_repo.remove_key(key)
+                result["status"] = "removed" if changed else "absent"
+        except (ValueError, OSError) as e:
+            logger.error(f"Could not {op} key: {e}")
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["keys"] = len(storage_repo.data or [])
+        REGISTRY.inc(
+            "key_mutations_total",
+            labels={"op": op, "outcome": result["status"]},
+        )
+        return result
+
+    def fold_if_due(self, now: Optional[float] = None) -> bool:
+        """
+        Fold the key log into the data file once it holds
+        'fold_entries' mutations or the oldest is 'fold_interval'
+        seconds old.
+
+        :param now: ``time.monotonic()`` value; the current time if None
+        :return: True if the log was folded
+        """
+        now = time.monotonic() if now is None else now
+        storage_repo = self.storage_repo
+        key_log = storage_repo.key_log
+        if key_log is None or not len(key_log):
+            self._last_fold = now
+            return False
+        if (
+            len(key_log) < self.fold_entries
+            and now - self._last_fold < self.fold_interval
+        ):
+            return False
+        self._last_fold = now
+        try:
+            folded = storage_repo.fold_key_log()
+        except OSError as e:
+            logger.error(f"Folding the key log failed: {e}")
+            return False
+        if folded:
+            REGISTRY.inc("wal_folds_total")
+        return folded
+
+    def start_folding(self) -> threading.Thread:
+        """
+        Start the background thread that folds the key log when due.
+
+        :return: The daemon thread
+        """
+        def run() -> None:
+            while True:
+                time.sleep(FOLD_CHECK_INTERVAL)
+                self.fold_if_due()
+
+        thread = threading.Thread(target=run, name="fold-wal", daemon=True)
+        thread.start()
+        return thread
+
+    def _error_result(
+        self,
+        query_string: str,
+        requesting_ip: str,
+        error: str
+    ) -> Dict[str, Any]:
+        """
+        Build the result returned for a query that could not be served.
+
+        :param query_string: The search query string
+        :param requesting_ip: IP address of the requester
+        :param error: Message for the client
+        :return: A result dict with status 'error'
+        """
+        return {
+            "id": None,
+            "query": query_string,
+            "requesting_ip": requesting_ip,
+            "execution_time": None,
+            "timestamp": None,
+            "status": "error",
+            "error": error
+        }
+
+    def _prepare_snapshot(
+        self,
+        storage_repo: StorageRepository,
+        file_path: str,
+        algo_name: str,
+        dataset: Optional[str],
+        phases: Dict[str, int]
+    ) -> Tuple[StorageRepository, IndexSnapshot, Optional[str]]:
+        """
+        Load and prepare the data a request searches.
+
+        Named datasets come prepared from the registry; otherwise the
+        given repository is reloaded if needed and prepared. The mode
+        policy picks the mode when it applies to ``algo_name``.
+
+        :param storage_repo: Repository pinned for the request
+        :param file_path: Data file pinned for the request
+        :param algo_name: Algorithm name the client sent
+        :param dataset: Name of a registered dataset, or None
+        :param phases: Dict collecting per-phase durations in ns
+        :return: The repository searched, its snapshot, and the policy's
+                 reason (None when the client's mode was used)
+        :raises ValueError: With the client-facing message if the data
+                            cannot be loaded or prepared
+        """
+        mode = algo_name
+        mode_reason: Optional[str] = None
+
+        if dataset is not None:
+            mark = time.perf_counter_ns()
+            try:
+                if self.datasets is None:
+                    raise KeyError("No datasets are configured")
+                if self.mode_policy.applies_to(algo_name):
+                    n_items, reports = self.datasets.profile(dataset)
+                    mode, mode_reason = self.mode_policy.choose(
+                        algo_name, n_items, reports
+                    )
+                storage_repo = self.datasets.get(dataset, mode)
+                snapshot = storage_repo.snapshot
+            except (KeyError, ValueError) as e:
+                error_msg = str(e.args[0]) if e.args else str(e)
+                logger.error(f"Dataset unavailable: {error_msg}")
+                raise ValueError(error_msg)
+            phases["prepare"] = time.perf_counter_ns() - mark
+            return storage_repo, snapshot, mode_reason
+
+        # Reload data file if needed
+        mark = time.perf_counter_ns()
+        if self.reread_on_query or storage_repo.data is None:
+            file_loaded = storage_repo.load_file(file_path)
+            phases["reload"] = time.perf_counter_ns() - mark
+            if not file_loaded:
+                error_msg = (
+                    f"Data file could not be loaded: {file_path}. "
+                    "Ensure the file exists and has "
+                    f"≤ {self.max_rows} rows."
+                )
+                logger.error(error_msg)
+                raise ValueError(error_msg)
+
+        if storage_repo.data is None:
+            logger.error("No data loaded in storage repository")
+            raise ValueError("No data loaded in storage repository")
+
+        if self.mode_policy.applies_to(algo_name):
+            mode, mode_reason = self.mode_policy.choose(
+                algo_name,
+                len(storage_repo.data),
+                storage_repo.memory_reports,
+            )
+
+        mark = time.perf_counter_ns()
+        try:
+            snapshot = storage_repo.prepare(mode=mode)
+        except ValueError as e:
+            logger.error(f"Failed to prepare storage: {e}")
+            raise ValueError(f"Failed to prepare storage: {str(e)}")
+        phases["prepare"] = time.perf_counter_ns() - mark
+        return storage_repo, snapshot, mode_reason
+
+    def _search_normalized(
+        self,
+        storage_repo: StorageRepository,
+        dataset: Optional[str],
+        query_string: str,
+        phases: Dict[str, int]
+    ) -> bool:
+        """
+        Look a query up in the 'normalized' index of the same data.
+
+        :param storage_repo: Repository the exact search used
+        :param dataset: Name of the dataset searched, or None
+        :param query_string: The query as the client sent it
+        :param phases: Dict collecting per-phase durations in ns
+        :return: Whether the normalized query matches a line
+        """
+        mark = time.perf_counter_ns()
+        if dataset is not None:
+            assert self.datasets is not None
+            storage_repo = self.datasets.get(dataset, NORMALIZED_MODE)
+            snapshot = storage_repo.snapshot
+        else:
+            snapshot = storage_repo.prepare(mode=NORMALIZED_MODE)
+        phases["prepare_normalized"] = time.perf_counter_ns() - mark
+
+        mark = time.perf_counter_ns()
+        found, _ = storage_repo.search(query_string, snapshot)
+        phases["search_normalized"] = time.perf_counter_ns() - mark
+        return found
 
     def create_log(
         self,
         requesting_ip: str,
         query_string: str,
-        algo_name: str
-    ) -> Dict[str, Optional[Union[str, float]]]:
+        algo_name: str,
+        phases: Optional[Dict[str, int]] = None,
+        dataset: Optional[str] = None,
+        normalized: bool = False
+    ) -> Dict[str, Any]:
         """
         Process a query, perform search, and log the results.
 
+        When ``algo_name`` is 'auto' (or a slow mode the policy may
+        upgrade), the mode policy picks the structure; the result then
+        carries the chosen 'mode' and a 'mode_reason'.
+
+        With ``normalized`` the query is also looked up in the 'normalized'
+        index, ignoring case, surrounding whitespace and Unicode form; the
+        answer is added as 'normalized_status' next to the exact 'status'.
+        Searching with ``algo_name`` 'normalized' gives only that answer.
+
+        When the data is indexed by column, a match also returns the full
+        matching row as 'row'.
+
+        The nanosecond duration of each phase (reload, prepare, search,
+        persist) is added to ``phases``. Phases recorded before persisting,
+        including any the caller supplied, are stored with the log entry.
+
         :param requesting_ip: IP address of the requester
         :param query_string: The search query string
         :param algo_name: Algorithm name used for searching
+        :param phases: Optional dict collecting per-phase durations in ns
+        :param dataset: Name of a registered dataset to search instead of
+                        the configured data file
+        :param normalized: Also report the normalized match
         :return: A dictionary containing log information and status
         """
+        if phases is None:
+            phases = {}
+        # Hold one dataset for the whole request even if a switch lands
+        storage_repo = self.storage_repo
+        file_path = self.file_path
+
         try:
             # Initialize log with None to ensure it's defined in all code paths
             log = None
 
-            # Reload data file if needed
-            if self.reread_on_query or self.storage_repo.data is None:
-                file_loaded = self.storage_repo.load_file(self.file_path)
-                if not file_loaded:
-                    error_msg = (
-                        f"Data file could not be loaded: {self.file_path}. "
-                        f"Ensure the file exists and has ≤ {self.max_rows}"
-                        " rows."
-                    )
-
-                    logger.error(error_msg)
-                    return {
-                        "id": None,
-                        "query": query_string,
-                        "requesting_ip": requesting_ip,
-                        "execution_time": None,
-                        "timestamp": None,
-                        "status": "error",
-                        "error": error_msg
-                    }
-
-            if self.storage_repo.data is None:
-                logger.error("No data loaded in storage repository")
-                return {
-                    "id": None,
-                    "query": query_string,
-                    "requesting_ip": requesting_ip,
-                    "execution_time": None,
-                    "timestamp": None,
-                    "status": "error",
-                    "error": "No data loaded in storage repository"
-                }
-
             try:
-                self.storage_repo.prepare(mode=algo_name)
+                storage_repo, snapshot, mode_reason = self._prepare_snapshot(
+                    storage_repo, file_path, algo_name, dataset, phases
+                )
             except ValueError as e:
-                logger.error(f"Failed to prepare storage: {e}")
-                return {
-                    "id": None,
-                    "query": query_string,
-                    "requesting_ip": requesting_ip,
-                    "execution_time": None,
-                    "timestamp": None,
-                    "status": "error",
-                    "error": f"Failed to prepare storage: {str(e)}"
-                }
+                return self._error_result(query_string, requesting_ip, str(e))
 
+            mark = time.perf_counter_ns()
             try:
-                found, exec_time = self.storage_repo.search(query_string)
+                # Search the snapshot prepared above, whatever other
+                # requests have prepared since
+                found, exec_time = storage_repo.search(query_string, snapshot)
+                phases["search"] = time.perf_counter_ns() - mark
+                self.mode_policy.observe(
+                    snapshot.mode, exec_time, found,
+                    len(snapshot.data), id(snapshot.data)
+                )
+                normalized_found: Optional[bool] = None
+                if normalized:
+                    normalized_found = (
+                        found if snapshot.mode == NORMALIZED_MODE
+                        else self._search_normalized(
+                            storage_repo, dataset, query_string, phases
+                        )
+                    )
             except Exception as e:
                 logger.exception("Search failed: %s", e)
                 return {
@@ -174,7 +700,11 @@ class AppService:
                 requesting_ip=requesting_ip
             )
             log.create(found=found, exec_time=exec_time)
+            log.phases = dict(phases)
+            log.mode = snapshot.mode
+            mark = time.perf_counter_ns()
             self.log_repo.create_log(log)
+            phases["persist"] = time.perf_counter_ns() - mark
 
             # Safely access timestamp
             timestamp_str = (
@@ -184,14 +714,28 @@ class AppService:
             )
 
             # Fix 2: Update return type to include float for execution_time
-            return {
+            result: Dict[str, Any] = {
                 "id": log.id,
                 "query": log.query,
                 "requesting_ip": log.requesting_ip,
                 "execution_time": log.execution_time,  # This is likely a float
                 "timestamp": timestamp_str,
-                "status": "STRING_EXISTS" if found else "STRING_NOT_FOUND"
+                "status": "STRING_EXISTS" if found else "STRING_NOT_FOUND",
+                "phases": phases
             }
+            if mode_reason is not None:
+                result["mode"] = log.mode
+                result["mode_reason"] = mode_reason
+            if normalized_found is not None:
+                result["normalized_status"] = (
+                    "STRING_EXISTS" if normalized_found
+                    else "STRING_NOT_FOUND"
+                )
+            if found and storage_repo.row_offsets is not None:
+                mark = time.perf_counter_ns()
+                result["row"] = storage_repo.row_for(query_string)
+                phases["row"] = time.perf_counter_ns() - mark
+            return result
 
         except Exception as e:
             logger.exception("Failed to create log")
@@ -217,6 +761,115 @@ class AppService:
             logger.exception(f"Failed to read logs: {e}")
             return []
 
+    def locate(
+        self,
+        query_string: str,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Find every line of the data file equal to a query.
+
+        :param query_string: The line (or indexed column value) to find
+        :param limit: Most matches to list; clamped to
+                      'locate_max_matches', which is also the default
+        :return: 'query', the total 'count', and for the first ``limit``
+                 matches their 1-based 'lines', byte 'offsets' and full
+                 'context' lines (None where unavailable), plus
+                 'truncated'; or 'status' 'error' with an 'error'
+        """
+        storage_repo = self.storage_repo
+        try:
+            if self.reread_on_query or storage_repo.data is None:
+                if not storage_repo.load_file(self.file_path):
+                    raise ValueError(
+                        f"Data file could not be loaded: {self.file_path}"
+                    )
+            index = storage_repo.line_index()
+        except ValueError as e:
+            logger.error(f"Locate failed: {e}")
+            return {"query": query_string, "status": "error", "error": str(e)}
+
+        max_matches = self.locate_max_matches
+        if limit is not None:
+            max_matches = max(0, min(int(limit), max_matches))
+        rows = index.rows(query_string)
+        shown = rows[:max_matches]
+        return {
+            "query": query_string,
+            "status": "STRING_EXISTS" if rows else "STRING_NOT_FOUND",
+            "count": len(rows),
+            "lines": [index.line_number(row) for row in shown],
+            "offsets": [index.offset(row) for row in shown],
+            "context": [index.line(row) for row in shown],
+            "truncated": len(rows) > len(shown),
+        }
+
+    def read_logs_page(
+        self,
+        cursor: Optional[int] = None,
+        limit: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Retrieve one filtered page of logs, streaming over the log store.
+
+        :param cursor: Cursor returned with the previous page, or None
+        :param limit: Page size; clamped to the configured maximum
+        :param filters: Optional criteria (since, until, ip, status,
+                        query_prefix)
+        :return: Dict with 'logs' and 'next_cursor', plus 'error' on failure
+        """
+        try:
+            if cursor is not None and (
+                isinstance(cursor, bool)
+                or not isinstance(cursor, int)
+                or cursor < 0
+            ):
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+            page_size = int(limit) if limit else self.read_logs_page_size
+            page_size = max(1, min(page_size, self.read_logs_max_page_size))
+            log_filter = LogFilter.from_dict(filters)
+
+            logs, next_cursor = self.log_repo.query_logs(
+                cursor=cursor, limit=page_size, log_filter=log_filter
+            )
+            return {"logs": logs, "next_cursor": next_cursor}
+        except Exception as e:
+            logger.exception(f"Failed to read logs page: {e}")
+            return {"logs": [], "next_cursor": None, "error": str(e)}
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Report the measured memory of every prepared search structure.
+
+        :return: Dict with the default dataset's report under 'default' and,
+                 when datasets are configured, the registry's under
+                 'datasets'
+        """
+        try:
+            report: Dict[str, Any] = {
+                "default": self.storage_repo.memory_report()
+            }
+            if self.datasets is not None:
+                report["datasets"] = self.datasets.usage()
+            return report
+        except Exception as e:
+            logger.exception(f"Failed to report memory: {e}")
+            return {}
+
+    def log_summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarise stored logs per search mode (hit ratio, latency
+        percentiles), computed by the log repository.
+
+        :return: Mapping of mode to its aggregate figures
+        """
+        try:
+            return self.log_repo.aggregate_by_mode()
+        except Exception as e:
+            logger.exception(f"Failed to aggregate logs: {e}")
+            return {}
+
     def create_logs_parallel(
         self,
         requests: List[Dict[str, str]]
@@ -224,6 +877,9 @@ class AppService:
         """
         Create logs in parallel using a thread pool for performance.
 
+        Lookups hold the GIL, so the threads mostly overlap I/O; for many
+        queries with one algorithm, create_logs_batch() is faster.
+
         :param requests: List of request dicts, each containing:
                          'requesting_ip', 'query_string', and 'algo_name'
         :return: List of log results with success/error statuses
@@ -258,3 +914,95 @@ class AppService:
                     })
 
         return results
+
+    def create_logs_batch(
+        self,
+        requesting_ip: str,
+        queries: List[str],
+        algo_name: str,
+        phases: Optional[Dict[str, int]] = None,
+        dataset: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search many queries against one prepared index and log them all.
+
+        The data is loaded and prepared once for the whole batch. The
+        lookups run in the batch process pool, which holds the prepared
+        index across calls, and the logs are persisted in one write.
+
+        :param requesting_ip: IP address of the requester
+        :param queries: The search query strings
+        :param algo_name: Algorithm name used for searching
+        :param phases: Optional dict collecting per-phase durations in ns
+                       for the batch as a whole
+        :param dataset: Name of a registered dataset to search instead of
+                        the configured data file
+        :return: One result per query, in the order of ``queries``
+        """
+        if phases is None:
+            phases = {}
+        storage_repo = self.storage_repo
+        file_path = self.file_path
+
+        try:
+            _, snapshot, mode_reason = self._prepare_snapshot(
+                storage_repo, file_path, algo_name, dataset, phases
+            )
+        except ValueError as e:
+            return [
+                self._error_result(query, requesting_ip, str(e))
+                for query in queries
+            ]
+
+        mark = time.perf_counter_ns()
+        try:
+            outcomes = self.batch_pool.search(snapshot, queries)
+        except Exception as e:
+            logger.exception("Batch search failed: %s", e)
+            return [
+                self._error_result(
+                    query, requesting_ip, f"Search operation failed: {e}"
+                )
+                for query in queries
+            ]
+        phases["search"] = time.perf_counter_ns() - mark
+
+        logs: List[Log] = []
+        for query, (found, exec_time) in zip(queries, outcomes):
+            self.mode_policy.observe(
+                snapshot.mode, exec_time, found,
+                len(snapshot.data), id(snapshot.data)
+            )
+            log = Log(
+                id=str(uuid.uuid4()),
+                query=query,
+                requesting_ip=requesting_ip
+            )
+            log.create(found=found, exec_time=exec_time)
+            log.mode = snapshot.mode
+            logs.append(log)
+
+        mark = time.perf_counter_ns()
+        try:
+            self.log_repo.create_logs(logs)
+        except Exception:
+            logger.exception("Failed to persist batch logs")
+        phases["persist"] = time.perf_counter_ns() - mark
+
+        results: List[Dict[str, Any]] = []
+        for log, (found, _) in zip(logs, outcomes):
+            result: Dict[str, Any] = {
+                "id": log.id,
+                "query": log.query,
+                "requesting_ip": log.requesting_ip,
+                "execution_time": log.execution_time,
+                "timestamp": (
+                    log.timestamp.isoformat() if log.timestamp else None
+                ),
+                "status": "STRING_EXISTS" if found else "STRING_NOT_FOUND",
+            }
+            if mode_reason is not None:
+                result["mode"] = log.mode
+                result["mode_reason"] = mode_reason
+            results.append(result)
+        return results
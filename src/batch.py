@@ -0,0 +1,241 @@
+"""
+Batch search over a persistent process pool.
+
+Exact-match lookups are pure Python and hold the GIL, so threads cannot
+run them in parallel. ``BatchSearchPool`` forks worker processes after the
+index is prepared; each worker inherits the snapshot copy-on-write instead
+of receiving it by pickle, and only query chunks and (found, seconds)
+pairs cross the pipes. The pool stays up between batches and is re-forked
+when a different snapshot is searched, or when appends or key mutations
+have changed the one the workers hold (its ``generation`` moved on).
+
+Workers never log or take locks, which keeps forking from the threaded
+server safe. Where ``fork`` is unavailable, or a batch is too small to
+repay the round trip, the batch is searched in the calling process.
+"""
+
+import gc
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+from repositories import IndexSnapshot, StorageRepository
+
+logger = logging.getLogger(__name__)
+
+REGISTRY.describe(
+    "batch_pool_forks_total",
+    "Times the batch search workers were forked, by search mode; each "
+    "fork follows a change of prepared index."
+)
+REGISTRY.describe(
+    "batch_queries_total",
+    "Queries searched in batches, by where they ran ('workers' or "
+    "'inline')."
+)
+
+# Batches smaller than this are searched in-process
+MIN_PARALLEL = 256
+
+# Chunks per worker; a few per worker evens out uneven chunk costs
+CHUNKS_PER_PROCESS = 4
+
+# Lookup methods only; never prepared or loaded
+_SEARCHER = StorageRepository()
+
+# Snapshot searched by forked workers, set in the parent just before forking
+_SNAPSHOT: Optional[IndexSnapshot] = None
+
+
+def search_chunk(
+    snapshot: IndexSnapshot,
+    queries: List[str]
+) -> List[Tuple[bool, float]]:
+    """
+    Searches ``queries`` in ``snapshot`` without per-query logging.
+
+    Args:
+        snapshot (IndexSnapshot): Prepared snapshot to search.
+        queries (List[str]): Words to look up.
+
+    Returns:
+        List[Tuple[bool, float]]: (Found or not, seconds) per query, in
+        order. Empty queries are not found and take no time.
+    """
+    search = getattr(
+        _SEARCHER, f"{snapshot.mode}_search", _SEARCHER.naive_search
+    )
+    structure = snapshot.structure
+    results: List[Tuple[bool, float]] = []
+    for query in queries:
+        if not query:
+            results.append((False, 0.0))
+            continue
+        start = time.perf_counter()
+        found = bool(search(query, structure))
+        results.append((found, time.perf_counter() - start))
+    return results
+
+
+def _search_inherited(queries: List[str]) -> List[Tuple[bool, float]]:
+    """Worker entry point: searches the snapshot inherited at fork."""
+    assert _SNAPSHOT is not None
+    return search_chunk(_SNAPSHOT, queries)
+
+
+class BatchSearchPool:
+    """
+    Process pool that searches batches of queries against one prepared
+    snapshot at a time. Thread-safe; batches from concurrent callers run
+    one after another, each using every worker.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        min_parallel: int = MIN_PARALLEL
+    ) -> None:
+        """
+        Args:
+            processes (Optional[int]): Worker count; defaults to the number
+                of CPUs. 0 or 1 searches every batch in-process.
+            min_parallel (int): Smallest batch sent to the workers.
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = int(processes)
+        self.min_parallel = min_parallel
+        self._lock = threading.Lock()
+        self._pool: Optional[Any] = None
+        self._snapshot: Optional[IndexSnapshot] = None
+        # Generation of the snapshot when the workers were forked
+        self._generation = 0
+        self._forks = 0
+
+    @property
+    def parallel(self) -> bool:
+        """Whether batches can be handed to worker processes."""
+        return (
+            self.processes > 1
+            and "fork" in multiprocessing.get_all_start_methods()
+        )
+
+    def search(
+        self,
+        snapshot: IndexSnapshot,
+        queries: List[str]
+    ) -> List[Tuple[bool, float]]:
+        """
+        Searches every query in ``snapshot``.
+
+        Args:
+            snapshot (IndexSnapshot): Prepared snapshot to search.
+            queries (List[str]): Words to look up.
+
+        Returns:
+            List[Tuple[bool, float]]: (Found or not, seconds) per query, in
+            the order of ``queries``.
+        """
+        if not self.parallel or len(queries) < self.min_parallel:
+            REGISTRY.inc(
+                "batch_queries_total", len(queries), {"where": "inline"}
+            )
+            return search_chunk(snapshot, queries)
+
+        chunk_size = -(-len(queries) // (self.processes * CHUNKS_PER_PROCESS))
+        chunks = [
+            queries[i:i + chunk_size]
+            for i in range(0, len(queries), chunk_size)
+        ]
+        with self._lock:
+            pool = self._pool_for(snapshot)
+            # map() returns chunk results in submission order
+            chunk_results = pool.map(_search_inherited, chunks)
+        REGISTRY.inc("batch_queries_total", len(queries), {"where": "workers"})
+        return [result for chunk in chunk_results for result in chunk]
+
+    def _pool_for(self, snapshot: IndexSnapshot) -> Any:
+        """Returns workers holding ``snapshot``. Caller holds the lock."""
+        if (
+            self._pool is not None and self._snapshot is snapshot
+            and self._generation == snapshot.generation
+        ):
+            return self._pool
+        self._terminate()
+        # Read before forking: a change made while forking then still
+        # causes a fork for the next batch
+        generation = snapshot.generation
+
+        global _SNAPSHOT
+        _SNAPSHOT = snapshot
+        started = time.perf_counter()
+        # Frozen objects are skipped by the collector, so workers do not
+        # touch (and copy) the index pages just by collecting garbage
+        gc.freeze()
+        try:
+            self._pool = multiprocessing.get_context("fork").Pool(
+                self.processes
+            )
+        finally:
+            gc.unfreeze()
+        self._snapshot = snapshot
+        self._generation = generation
+        self._forks += 1
+        REGISTRY.inc("batch_pool_forks_total", labels={"mode": snapshot.mode})
+        logger.info(
+            f"Forked {self.processes} batch workers for mode "
+            f"'{snapshot.mode}' ({len(snapshot.data)} items) in "
+            f"{time.perf_counter() - started:.3f}s"
+        )
+        return self._pool
+
+    def _terminate(self) -> None:
+        global _SNAPSHOT
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+        self._pool = None
+        self._snapshot = None
+        _SNAPSHOT = None
+
+    def close(self) -> None:
+        """Stops the workers; the next parallel batch forks new ones."""
+        with self._lock:
+            self._terminate()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: ``processes``, whether workers are ``running``,
+            the ``mode`` they hold and how many times the pool was forked.
+        """
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "running": self._pool is not None,
+                "mode": self._snapshot.mode if self._snapshot else None,
+                "forks": self._forks,
+            }
+
+
+def create_batch_pool(server_config: Dict[str, Any]) -> BatchSearchPool:
+    """
+    Builds the pool from the optional ``batch_search`` section of
+    ``server_config`` (``processes``, ``min_parallel``).
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+
+    Returns:
+        BatchSearchPool: The configured pool; workers start on first use.
+    """
+    settings = server_config.get("batch_search") or {}
+    processes = settings.get("processes")
+    return BatchSearchPool(
+        processes=None if processes is None else int(processes),
+        min_parallel=int(settings.get("min_parallel", MIN_PARALLEL)),
+    )
@@ -0,0 +1,239 @@
+"""
+Offline bulk lookup of a queries file against a data file.
+
+Answers every line of a queries file (one query per line, as in the
+``*_queries*.txt`` files) without going through the server. The data file
+is loaded with ``StorageRepository``, and queries are streamed in chunks
+and answered a chunk at a time:
+
+- ``set``: membership tests against the prepared set, one hash lookup per
+  query.
+- ``merge``: each chunk is sorted and walked alongside the prepared sorted
+  list, so the search for each query starts where the previous one ended.
+  Uses less memory than ``set`` on large data files.
+
+Usage:
+    python src/bulk_query.py DATA QUERIES [-o OUTPUT] [--join set|merge]
+        [--format tsv|found] [--column N] [--delimiter D] [--header]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from bisect import bisect_left
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Set
+
+from columns import column_extractor_from
+from repositories import StorageRepository
+
+JOINS = ("set", "merge")
+FORMATS = ("tsv", "found")
+
+# Queries read and answered at a time
+CHUNK_SIZE = 65_536
+
+
+def read_chunks(
+    stream: IO[str],
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[List[str]]:
+    """
+    Yields the lines of ``stream`` without their endings, ``chunk_size``
+    at a time.
+    """
+    chunk: List[str] = []
+    for line in stream:
+        chunk.append(line.rstrip("\r\n"))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def set_join(keys: Set[str], queries: List[str]) -> List[bool]:
+    """
+    Args:
+        keys (Set[str]): The data, as prepared for the ``set`` mode.
+        queries (List[str]): Queries in file order.
+
+    Returns:
+        List[bool]: Whether each query is in ``keys``.
+    """
+    return list(map(keys.__contains__, queries))
+
+
+def merge_join(keys: Sequence[str], queries: List[str]) -> List[bool]:
+    """
+    Args:
+        keys (Sequence[str]): The data, sorted, as prepared for the
+            ``binary`` mode.
+        queries (List[str]): Queries in file order.
+
+    Returns:
+        List[bool]: Whether each query is in ``keys``.
+    """
+    found = [False] * len(queries)
+    size = len(keys)
+    low = 0
+    for index in sorted(range(len(queries)), key=queries.__getitem__):
+        query = queries[index]
+        # Queries come in ascending order, so keys before low are smaller
+        low = bisect_left(keys, query, low)
+        if low == size:
+            break
+        found[index] = keys[low] == query
+    return found
+
+
+def run_bulk_query(
+    repo: StorageRepository,
+    queries: IO[str],
+    output: IO[str],
+    join: str = "set",
+    output_format: str = "tsv",
+    chunk_size: int = CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Answers every query in ``queries`` against the data loaded in ``repo``.
+
+    Args:
+        repo (StorageRepository): Repository with the data file loaded.
+        queries (IO[str]): Text stream with one query per line.
+        output (IO[str]): Where results are written. ``tsv`` writes
+            ``<0|1>\\t<query>`` per query, in order; ``found`` writes only
+            the queries that were found.
+        join (str): ``set`` or ``merge``.
+        output_format (str): ``tsv`` or ``found``.
+        chunk_size (int): Queries answered at a time.
+
+    Returns:
+        Dict[str, Any]: ``queries``, ``found``, ``prepare_seconds``,
+        ``join_seconds`` (lookups only), ``total_seconds`` and
+        ``queries_per_second`` (over the total).
+
+    Raises:
+        ValueError: If ``join`` or ``output_format`` is unknown, or no
+        data is loaded.
+    """
+    if join not in JOINS:
+        raise ValueError(f"Unknown join: {join}")
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    started = time.perf_counter()
+    snapshot = repo.prepare("set" if join == "set" else "binary")
+    prepare_seconds = time.perf_counter() - started
+    structure: Any = snapshot.structure
+    answer = set_join if join == "set" else merge_join
+
+    total = found_total = 0
+    join_seconds = 0.0
+    for chunk in read_chunks(queries, chunk_size):
+        mark = time.perf_counter()
+        found = answer(structure, chunk)
+        join_seconds += time.perf_counter() - mark
+        total += len(chunk)
+        found_total += sum(found)
+        if output_format == "tsv":
+            output.writelines(
+                f"{'1' if hit else '0'}\t{query}\n"
+                for query, hit in zip(chunk, found)
+            )
+        else:
+            output.writelines(
+                f"{query}\n" for query, hit in zip(chunk, found) if hit
+            )
+
+    total_seconds = time.perf_counter() - started
+    return {
+        "queries": total,
+        "found": found_total,
+        "prepare_seconds": prepare_seconds,
+        "join_seconds": join_seconds,
+        "total_seconds": total_seconds,
+        "queries_per_second": (
+            total / total_seconds if total_seconds else 0.0
+        ),
+    }
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Answer a file of queries against a data file."
+    )
+    parser.add_argument("data", help="data file, one key per line")
+    parser.add_argument("queries", help="queries file, one query per line")
+    parser.add_argument(
+        "-o", "--output", default="-",
+        help="results file (default: standard output)"
+    )
+    parser.add_argument("--join", choices=JOINS, default="set")
+    parser.add_argument("--format", choices=FORMATS, default="tsv")
+    parser.add_argument(
+        "--max-rows", type=int, default=None,
+        help="refuse data files with more rows (default: no limit)"
+    )
+    parser.add_argument(
+        "--column", type=int, default=None,
+        help="index this field of a delimited data file"
+    )
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--header", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the CLI; throughput stats go to standard error.
+
+    Returns:
+        int: The exit status.
+    """
+    args = _parse_args(argv)
+    # Per-load and per-build messages would drown out the stats
+    logging.getLogger().setLevel(logging.WARNING)
+
+    repo = StorageRepository(columns=column_extractor_from({
+        "column": args.column,
+        "delimiter": args.delimiter,
+        "header": args.header,
+    }))
+    repo.max_rows = args.max_rows if args.max_rows else sys.maxsize
+    started = time.perf_counter()
+    if not repo.load_file(args.data):
+        print(f"Could not load data file: {args.data}", file=sys.stderr)
+        return 1
+    load_seconds = time.perf_counter() - started
+
+    try:
+        with open(args.queries, "r", encoding="utf-8") as queries:
+            if args.output == "-":
+                stats = run_bulk_query(
+                    repo, queries, sys.stdout, args.join, args.format
+                )
+            else:
+                with open(args.output, "w", encoding="utf-8") as output:
+                    stats = run_bulk_query(
+                        repo, queries, output, args.join, args.format
+                    )
+    except OSError as e:
+        print(f"Bulk query failed: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"{stats['queries']:,} queries, {stats['found']:,} found "
+        f"({args.join} join over {len(repo.data or []):,} keys)\n"
+        f"  load     {load_seconds:8.3f}s\n"
+        f"  prepare  {stats['prepare_seconds']:8.3f}s\n"
+        f"  join     {stats['join_seconds']:8.3f}s\n"
+        f"  total    {stats['total_seconds']:8.3f}s  "
+        f"{stats['queries_per_second']:,.0f} queries/s",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
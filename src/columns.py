@@ -0,0 +1,117 @@
+"""
+Column extraction for delimited (CSV/TSV) data files.
+
+With a column configured, ``StorageRepository`` indexes one field of each
+row instead of the whole line. Only that field is kept in memory, next to
+the byte offset of its row, so a match can still return the full row by
+reading it back from the file.
+"""
+
+import csv
+from typing import Any, Dict, Optional
+
+# Names accepted for delimiters that are awkward to write in JSON
+_DELIMITER_NAMES = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|"}
+
+
+class ColumnExtractor:
+    """Picks one field out of a delimited row."""
+
+    def __init__(
+        self,
+        column: int = 0,
+        delimiter: str = ",",
+        header: bool = False,
+        quotechar: str = '"'
+    ) -> None:
+        """
+        Args:
+            column (int): Zero-based index of the field to index.
+            delimiter (str): Field separator, one character.
+            header (bool): The first row holds column names, not data.
+            quotechar (str): Quote character; rows containing it are
+                parsed with the csv module, the rest are split directly.
+
+        Raises:
+            ValueError: If ``column`` is negative or ``delimiter`` is not
+            a single character.
+        """
+        if column < 0:
+            raise ValueError("column must be zero or more")
+        if len(delimiter) != 1:
+            raise ValueError(f"Invalid delimiter: {delimiter!r}")
+        self.column = column
+        self.delimiter = delimiter
+        self.header = header
+        self.quotechar = quotechar
+
+    def extract(self, row: str) -> str:
+        """
+        Returns the configured field of ``row``.
+
+        Args:
+            row (str): One line of the file, without its line ending.
+
+        Returns:
+            str: The field, or an empty string if the row is too short.
+        """
+        if self.quotechar in row:
+            fields = next(csv.reader(
+                [row], delimiter=self.delimiter, quotechar=self.quotechar
+            ), [])
+        else:
+            # No quoting to honour, so a plain split is enough
+            fields = row.split(self.delimiter, self.column + 1)
+        if self.column < len(fields):
+            return fields[self.column]
+        return ""
+
+    def describe(self) -> Dict[str, Any]:
+        """Returns the settings, as reported by ``stats``."""
+        return {
+            "column": self.column,
+            "delimiter": self.delimiter,
+            "header": self.header,
+        }
+
+
+def column_extractor_from(
+    settings: Optional[Dict[str, Any]]
+) -> Optional[ColumnExtractor]:
+    """
+    Builds an extractor from ``column``, ``delimiter`` and ``header``
+    settings.
+
+    Args:
+        settings (Optional[Dict[str, Any]]): The settings; the delimiter
+            may be given as 'tab', 'comma', 'semicolon' or 'pipe'.
+
+    Returns:
+        Optional[ColumnExtractor]: The extractor, or None when no column
+        is set and whole lines are indexed.
+    """
+    if not settings or settings.get("column") is None:
+        return None
+    delimiter = str(settings.get("delimiter", ","))
+    return ColumnExtractor(
+        column=int(settings["column"]),
+        delimiter=_DELIMITER_NAMES.get(delimiter.lower(), delimiter),
+        header=bool(settings.get("header", False)),
+    )
+
+
+def create_column_extractor(
+    server_config: Dict[str, Any]
+) -> Optional[ColumnExtractor]:
+    """
+    Builds the extractor for the data file from the optional
+    ``column_index`` section of ``server_config``.
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+
+    Returns:
+        Optional[ColumnExtractor]: The extractor, or None to index whole
+        lines.
+    """
+    return column_extractor_from(server_config.get("column_index"))
@@ -1,6 +1,12 @@
 import json
+import logging
 import os
-from typing import Dict, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ConfigListener = Callable[[Dict[str, Any], Dict[str, Any]], None]
 
 
 class Config:
@@ -32,22 +38,77 @@ class Config:
                 f"Config file '{config_path}' not found."
             )
 
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._listeners: List[ConfigListener] = []
+        self._stamp = self._file_stamp()
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        # Assign configuration values
+        self._file_config, self._server_config = self._load()
+
+    def _load(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Reads and validates the configuration file.
+
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, Any]]: The 'file_config' and
+            'server_config' sections.
+
+        Raises:
+            ValueError: If the file is not valid JSON or a setting has the
+            wrong type.
+            KeyError: If a required section is missing.
+        """
         try:
-            with open(config_path, "r") as f:
+            with open(self.config_path, "r") as f:
                 config_data = json.load(f)
         except json.JSONDecodeError as e:
             raise ValueError(f"Error parsing config file: {e}")
 
-        # Assign configuration values
-        self._file_config = config_data.get("file_config", {})
-        self._server_config = config_data.get("server_config", {})
+        file_config = config_data.get("file_config", {})
+        server_config = config_data.get("server_config", {})
 
         # Validate required keys in server_config and file_config
-        if not self._file_config or not self._server_config:
+        if not file_config or not server_config:
             raise KeyError(
                 "Missing required sections in the config file: "
                 "'file_config' or 'server_config'"
             )
+        self._validate(file_config, server_config)
+        return file_config, server_config
+
+    @staticmethod
+    def _validate(
+        file_config: Dict[str, Any],
+        server_config: Dict[str, Any]
+    ) -> None:
+        """
+        Checks the types of the settings that can change at runtime.
+
+        Raises:
+            ValueError: If a setting has the wrong type.
+        """
+        if not isinstance(file_config.get("linuxpath", ""), str):
+            raise ValueError("file_config.linuxpath must be a string")
+        if not isinstance(server_config.get("search_mode", ""), str):
+            raise ValueError("server_config.search_mode must be a string")
+        for section in ("logging", "log_storage"):
+            if not isinstance(server_config.get(section, {}), dict):
+                raise ValueError(f"server_config.{section} must be an object")
+        if "port" in server_config:
+            try:
+                int(server_config["port"])
+            except (TypeError, ValueError):
+                raise ValueError("server_config.port must be an integer")
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def get_file_config(self) -> Dict[str, str]:
         """
@@ -66,3 +127,93 @@ class Config:
             dict: The 'server_config' section from the loaded configuration.
         """
         return self._server_config
+
+    def add_listener(self, listener: ConfigListener) -> None:
+        """
+        Registers a callback run after a changed configuration is applied.
+
+        Args:
+            listener (ConfigListener): Called with the new 'file_config' and
+            'server_config' sections.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        """
+        Re-reads the configuration file and applies it if it is valid and
+        differs from the current one.
+
+        An invalid file is logged and ignored; the previous configuration
+        stays in effect. Sections are replaced, never mutated, so readers
+        holding the old dictionaries see a consistent view.
+
+        Returns:
+            bool: True if a new configuration was applied.
+        """
+        try:
+            file_config, server_config = self._load()
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Ignoring invalid config change: {e}")
+            return False
+
+        with self._lock:
+            if (
+                file_config == self._file_config
+                and server_config == self._server_config
+            ):
+                return False
+            self._file_config = file_config
+            self._server_config = server_config
+            listeners = list(self._listeners)
+
+        logger.info(f"Applied configuration change from {self.config_path}")
+        for listener in listeners:
+            try:
+                listener(file_config, server_config)
+            except Exception as e:
+                logger.exception(f"Config listener failed: {e}")
+        return True
+
+    def check_for_changes(self) -> bool:
+        """
+        Reloads the configuration if the file changed since the last check.
+
+        Returns:
+            bool: True if a new configuration was applied.
+        """
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        return self.reload()
+
+    def start_watching(self, interval: float = 1.0) -> None:
+        """
+        Polls the configuration file for changes in a daemon thread.
+
+        Args:
+            interval (float): Seconds between checks.
+        """
+        if self._watcher is not None:
+            return
+        self._stopped.clear()
+
+        def watch() -> None:
+            while not self._stopped.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    logger.exception(f"Config watch failed: {e}")
+
+        self._watcher = threading.Thread(
+            target=watch, name="config-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        """Stops the watcher thread started by start_watching()."""
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,337 @@
+"""
+Registry of named datasets served side by side.
+
+Each dataset is a data file loaded once and shared by one prepared
+StorageRepository per search mode. Everything the registry holds counts
+against an optional memory budget; when a build pushes usage over it, the
+least recently used indexes are dropped, and a dataset's raw lines go with
+its last index. Evicted entries are rebuilt on the next request that needs
+them.
+"""
+
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from columns import column_extractor_from
+from metrics import REGISTRY
+from repositories import StorageRepository, index_memory_limit
+
+logger = logging.getLogger(__name__)
+
+REGISTRY.describe(
+    "dataset_evictions_total",
+    "Prepared indexes evicted from the dataset registry, by dataset and "
+    "mode; mode 'data' counts raw dataset lines."
+)
+REGISTRY.describe(
+    "dataset_memory_bytes",
+    "Approximate memory held per dataset (raw lines plus prepared indexes)."
+)
+REGISTRY.describe(
+    "dataset_loads_total", "Dataset indexes built on demand, by dataset."
+)
+
+EntryKey = Tuple[str, str]
+
+
+class DatasetRegistry:
+    """
+    Named datasets, each with lazily built per-mode indexes under a shared
+    memory budget.
+    """
+
+    def __init__(
+        self,
+        datasets: Optional[Dict[str, Union[str, Dict[str, Any]]]] = None,
+        memory_budget: Optional[int] = None,
+        index_memory_limit: Optional[int] = None
+    ) -> None:
+        """
+        Args:
+            datasets (Optional[Dict[str, Union[str, Dict[str, Any]]]]):
+                Dataset name to file path, or to ``{"path": ...,
+                "max_rows": ...}`` for files larger than the default row
+                limit. ``column``, ``delimiter`` and ``header`` index one
+                field of a delimited file instead of whole lines.
+            memory_budget (Optional[int]): Bytes the registry may hold
+                before evicting; None means unlimited.
+            index_memory_limit (Optional[int]): Largest single index a
+                build may project; larger builds are refused.
+        """
+        self.memory_budget = memory_budget
+        self.index_memory_limit = index_memory_limit
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        self._data: Dict[str, List[str]] = {}
+        self._row_offsets: Dict[str, Optional["array[int]"]] = {}
+        self._data_bytes: Dict[str, int] = {}
+        # (dataset, mode) -> prepared repository, least recently used first
+        self._entries: "OrderedDict[EntryKey, StorageRepository]" = (
+            OrderedDict()
+        )
+        self._entry_bytes: Dict[EntryKey, int] = {}
+        self._evictions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # One build at a time per dataset so concurrent misses share it
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+        for name, source in (datasets or {}).items():
+            self.register(name, source)
+
+    def register(
+        self,
+        name: str,
+        source: Union[str, Dict[str, Any]]
+    ) -> None:
+        """
+        Adds or replaces a dataset; a replaced dataset's indexes are dropped.
+
+        Args:
+            name (str): Name clients pass in the ``dataset`` request field.
+            source (Union[str, Dict[str, Any]]): File path or settings dict.
+
+        Raises:
+            ValueError: If no path is given.
+        """
+        settings = {"path": source} if isinstance(source, str) else dict(
+            source
+        )
+        if not settings.get("path"):
+            raise ValueError(f"Dataset '{name}' has no path")
+        path = Path(str(settings["path"]))
+        if not path.is_absolute():
+            path = Path(__file__).resolve().parents[1] / path
+        settings["path"] = str(path)
+
+        with self._lock:
+            self._sources[name] = settings
+            self._build_locks.setdefault(name, threading.Lock())
+            self._drop_dataset(name)
+
+    def names(self) -> List[str]:
+        """Returns the registered dataset names."""
+        with self._lock:
+            return sorted(self._sources)
+
+    def profile(
+        self,
+        name: str
+    ) -> Tuple[Optional[int], Dict[str, Dict[str, Any]]]:
+        """
+        Returns what is known about a dataset without loading it.
+
+        Args:
+            name (str): Dataset name.
+
+        Returns:
+            Tuple[Optional[int], Dict[str, Dict[str, Any]]]: Line count (None
+            if not resident) and the memory reports of resident modes.
+        """
+        with self._lock:
+            lines = self._data.get(name)
+            reports: Dict[str, Dict[str, Any]] = {}
+            for (other, _), repo in self._entries.items():
+                if other == name:
+                    reports.update(repo.memory_reports)
+            return (None if lines is None else len(lines)), reports
+
+    def get(self, name: str, mode: str) -> StorageRepository:
+        """
+        Returns a repository prepared for ``mode`` on dataset ``name``,
+        loading and building it if it is not resident.
+
+        Args:
+            name (str): Dataset name.
+            mode (str): Search mode to prepare; unknown modes fall back to
+                'naive', as in ``StorageRepository.prepare()``.
+
+        Returns:
+            StorageRepository: The prepared repository. Callers only search
+            it; it is never re-prepared in place.
+
+        Raises:
+            KeyError: If the dataset is unknown.
+            ValueError: If the data file cannot be loaded.
+        """
+        # Normalise first, so unknown modes share the one naive entry
+        mode = mode if mode in StorageRepository.BUILDERS else 'naive'
+        key = (name, mode)
+        with self._lock:
+            if name not in self._sources:
+                raise KeyError(f"Unknown dataset: {name}")
+            repo = self._entries.get(key)
+            if repo is not None:
+                self._entries.move_to_end(key)
+                return repo
+            build_lock = self._build_locks[name]
+
+        with build_lock:
+            with self._lock:
+                repo = self._entries.get(key)
+                if repo is not None:
+                    self._entries.move_to_end(key)
+                    return repo
+                lines = self._data.get(name)
+                settings = self._sources[name]
+            return self._build(name, mode, lines, settings)
+
+    def _build(
+        self,
+        name: str,
+        mode: str,
+        lines: Optional[List[str]],
+        settings: Dict[str, Any]
+    ) -> StorageRepository:
+        """Loads (if needed) and prepares one entry. Caller holds build lock."""
+        started = time.perf_counter()
+        repo = StorageRepository(
+            memory_limit=self.index_memory_limit,
+            columns=column_extractor_from(settings),
+        )
+        if "max_rows" in settings:
+            repo.max_rows = int(settings["max_rows"])
+        if lines is None:
+            if not repo.load_file(settings["path"]):
+                raise ValueError(
+                    f"Dataset '{name}' could not be loaded from "
+                    f"{settings['path']}"
+                )
+        else:
+            repo.row_offsets = self._row_offsets.get(name)
+            repo.data = lines
+            repo.last_loaded_file = settings["path"]
+        assert repo.data is not None
+        repo.prepare(mode=mode)
+
+        key = (name, mode)
+        with self._lock:
+            if name not in self._data:
+                self._data[name] = repo.data
+                self._row_offsets[name] = repo.row_offsets
+                self._data_bytes[name] = repo.data_memory
+            self._entries[key] = repo
+            self._entry_bytes[key] = repo.memory_usage().get(repo.mode, 0)
+            self._enforce_budget(keep=key)
+            self._publish(name)
+        REGISTRY.inc("dataset_loads_total", labels={"dataset": name})
+        logger.info(
+            f"Built dataset '{name}' mode '{repo.mode}' in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        return repo
+
+    def _used(self) -> int:
+        return sum(self._data_bytes.values()) + sum(self._entry_bytes.values())
+
+    def _enforce_budget(self, keep: EntryKey) -> None:
+        """Evicts LRU entries until within budget. Caller holds lock."""
+        if self.memory_budget is None:
+            return
+        for key in list(self._entries):
+            if self._used() <= self.memory_budget:
+                break
+            if key == keep:
+                continue
+            self._evict(key)
+        if self._used() > self.memory_budget:
+            logger.warning(
+                f"Dataset '{keep[0]}' mode '{keep[1]}' alone exceeds the "
+                f"memory budget of {self.memory_budget} bytes"
+            )
+
+    def _evict(self, key: EntryKey) -> None:
+        """Drops one entry, and its dataset's lines if it was the last."""
+        name, mode = key
+        del self._entries[key]
+        del self._entry_bytes[key]
+        self._count_eviction(name, mode)
+        if not any(other == name for other, _ in self._entries):
+            self._data.pop(name, None)
+            self._row_offsets.pop(name, None)
+            self._data_bytes.pop(name, None)
+            self._count_eviction(name, "data")
+        self._publish(name)
+        logger.info(f"Evicted dataset '{name}' mode '{mode}'")
+
+    def _count_eviction(self, name: str, mode: str) -> None:
+        self._evictions[name] = self._evictions.get(name, 0) + 1
+        REGISTRY.inc(
+            "dataset_evictions_total", labels={"dataset": name, "mode": mode}
+        )
+
+    def _drop_dataset(self, name: str) -> None:
+        """Forgets everything built for a dataset. Caller holds lock."""
+        for key in [k for k in self._entries if k[0] == name]:
+            del self._entries[key]
+            del self._entry_bytes[key]
+        self._data.pop(name, None)
+        self._row_offsets.pop(name, None)
+        self._data_bytes.pop(name, None)
+
+    def _publish(self, name: str) -> None:
+        size = self._data_bytes.get(name, 0) + sum(
+            size for (other, _), size in self._entry_bytes.items()
+            if other == name
+        )
+        REGISTRY.set_gauge(
+            "dataset_memory_bytes", float(size), labels={"dataset": name}
+        )
+
+    def usage(self) -> Dict[str, Any]:
+        """
+        Summarises what the registry holds.
+
+        Returns:
+            Dict[str, Any]: ``budget`` and ``used`` bytes, and per dataset
+            the resident modes with their sizes, data bytes and eviction
+            count.
+        """
+        with self._lock:
+            datasets: Dict[str, Any] = {}
+            for name in sorted(self._sources):
+                datasets[name] = {
+                    "data_bytes": self._data_bytes.get(name, 0),
+                    "modes": {
+                        mode: self._entry_bytes[(other, mode)]
+                        for other, mode in self._entries if other == name
+                    },
+                    "evictions": self._evictions.get(name, 0),
+                }
+            return {
+                "budget": self.memory_budget,
+                "used": self._used(),
+                "datasets": datasets,
+            }
+
+
+def create_dataset_registry(
+    server_config: Dict[str, Any]
+) -> Optional[DatasetRegistry]:
+    """
+    Builds the dataset registry from ``server_config``.
+
+    Reads ``datasets`` (name to path or settings),
+    ``dataset_memory_budget_mb`` and ``index_memory_limit_mb``.
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+
+    Returns:
+        Optional[DatasetRegistry]: The registry, or None when no datasets
+        are configured.
+    """
+    datasets = server_config.get("datasets")
+    if not datasets:
+        return None
+    budget_mb = server_config.get("dataset_memory_budget_mb")
+    return DatasetRegistry(
+        datasets,
+        memory_budget=(
+            int(float(budget_mb) * 1024 * 1024) if budget_mb else None
+        ),
+        index_memory_limit=index_memory_limit(server_config),
+    )
@@ -0,0 +1,225 @@
+"""
+Zero-downtime restarts by handing the listening socket to a new process.
+
+On SIGHUP the running server starts a copy of itself that inherits the
+listening socket's file descriptor, so the kernel keeps queueing new
+connections throughout. The metrics listener's socket is handed over the
+same way, as its port is still bound by the old process. The new process
+prewarms, starts accepting on the inherited socket, tells systemd it is
+the main process now, and sends SIGTERM to the old one. The old process
+then stops accepting, lets the requests already in progress finish, and
+exits. If the new process exits before it takes over, the old one tells
+systemd it is ready again and keeps serving.
+"""
+
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+from typing import Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REGISTRY.describe(
+    "handoffs_total",
+    "Listening-socket handoffs to a new server process, by outcome."
+)
+REGISTRY.describe(
+    "requests_in_progress", "Requests being served right now."
+)
+
+# Environment passed to the successor process
+LISTEN_FD_ENV = "SEARCH_SERVER_LISTEN_FD"
+METRICS_FD_ENV = "SEARCH_SERVER_METRICS_FD"
+PARENT_PID_ENV = "SEARCH_SERVER_PARENT_PID"
+
+
+class Draining(Exception):
+    """Raised in the main thread when the server should stop accepting."""
+
+
+class RequestTracker:
+    """Counts requests in progress so a draining server knows when to exit."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._active = 0
+        self.draining = False
+
+    def begin(self) -> None:
+        """Marks the start of a request; pair with ``end()``."""
+        with self._cond:
+            self._active += 1
+            active = self._active
+        REGISTRY.set_gauge("requests_in_progress", float(active))
+
+    def end(self) -> None:
+        """Marks the end of a request started with ``begin()``."""
+        with self._cond:
+            self._active -= 1
+            active = self._active
+            if active == 0:
+                self._cond.notify_all()
+        REGISTRY.set_gauge("requests_in_progress", float(active))
+
+    @property
+    def active(self) -> int:
+        """Number of requests in progress."""
+        return self._active
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stops keep-alive connections from taking further requests and
+        waits for the requests in progress to finish.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most; None waits
+                indefinitely.
+
+        Returns:
+            bool: True if every request finished in time.
+        """
+        with self._cond:
+            self.draining = True
+            return self._cond.wait_for(lambda: self._active == 0, timeout)
+
+
+# Requests in progress in this process
+IN_FLIGHT = RequestTracker()
+
+
+def inherited_socket(
+    variable: str = LISTEN_FD_ENV
+) -> Optional[socket.socket]:
+    """
+    Returns the listening socket handed over by the previous process, or
+    None when this process was started normally.
+
+    Args:
+        variable (str): Environment variable holding the descriptor;
+            ``METRICS_FD_ENV`` for the metrics listener.
+    """
+    fd = os.environ.pop(variable, None)
+    if fd is None:
+        return None
+    sock = socket.socket(fileno=int(fd))
+    sock.set_inheritable(False)
+    logger.info(f"Took over listening socket (fd {fd})")
+    return sock
+
+
+def spawn_successor(
+    sock: socket.socket,
+    metrics_sock: Optional[socket.socket] = None
+) -> subprocess.Popen:
+    """
+    Starts a new server process that inherits ``sock``.
+
+    Args:
+        sock (socket.socket): The listening socket.
+        metrics_sock (Optional[socket.socket]): The metrics listener's
+            socket, when metrics are served.
+
+    Returns:
+        subprocess.Popen: The new process. It takes over by sending this
+        process SIGTERM once it is ready.
+    """
+    fd = sock.fileno()
+    env = dict(os.environ)
+    env[LISTEN_FD_ENV] = str(fd)
+    env[PARENT_PID_ENV] = str(os.getpid())
+    fds = [fd]
+    if metrics_sock is not None:
+        env[METRICS_FD_ENV] = str(metrics_sock.fileno())
+        fds.append(metrics_sock.fileno())
+    process = subprocess.Popen(
+        [sys.executable] + sys.argv, pass_fds=fds, env=env
+    )
+    logger.info(f"Started successor process {process.pid}")
+    return process
+
+
+def watch_successor(
+    process: subprocess.Popen,
+    tracker: RequestTracker = IN_FLIGHT
+) -> threading.Thread:
+    """
+    Waits on a daemon thread for ``process`` to exit. If it exits while
+    this process is not draining, it never took over, so this process
+    tells systemd it is ready again after the ``RELOADING=1`` it sent.
+
+    Args:
+        process (subprocess.Popen): The successor from
+            ``spawn_successor()``.
+        tracker (RequestTracker): Tells whether this process is draining.
+
+    Returns:
+        threading.Thread: The watching thread.
+    """
+    def watch() -> None:
+        code = process.wait()
+        if tracker.draining:
+            return
+        REGISTRY.inc("handoffs_total", labels={"outcome": "failed"})
+        logger.error(
+            f"Successor process {process.pid} exited with code {code} "
+            "before taking over; still serving"
+        )
+        sd_notify("READY=1")
+
+    thread = threading.Thread(
+        target=watch, name="successor-watch", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def complete_takeover() -> None:
+    """
+    Announces this process as ready to systemd and, when it was started
+    by a handoff, tells the previous process to drain and exit.
+    """
+    parent = os.environ.pop(PARENT_PID_ENV, None)
+    if parent is None:
+        sd_notify("READY=1")
+        return
+    sd_notify(f"MAINPID={os.getpid()}\nREADY=1")
+    try:
+        os.kill(int(parent), signal.SIGTERM)
+    except (OSError, ValueError) as e:
+        REGISTRY.inc("handoffs_total", labels={"outcome": "error"})
+        logger.error(f"Could not stop previous process {parent}: {e}")
+        return
+    REGISTRY.inc("handoffs_total", labels={"outcome": "ok"})
+    logger.info(f"Took over from process {parent}")
+
+
+def sd_notify(state: str) -> bool:
+    """
+    Sends a status message to systemd when running as a notify service.
+
+    Args:
+        state (str): Newline-separated assignments, e.g. ``"READY=1"``.
+
+    Returns:
+        bool: True if the message was sent.
+    """
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        # Abstract namespace socket
+        address = "\0" + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+    except OSError as e:
+        logger.warning(f"sd_notify failed: {e}")
+        return False
+    return True
@@ -0,0 +1,172 @@
+"""
+Inverted index from each distinct line to the lines it occurs on.
+
+Postings are ``array('I')`` row numbers, four bytes per occurrence, rather
+than lists of int objects. Matching lines are read back from the source
+file by offset, so none of their text has to stay resident beyond the
+keys themselves. The file is opened for each read rather than mapped: a
+mapping of a file that shrinks underneath it faults on the lost pages,
+while a read past the end just comes back short.
+"""
+
+import logging
+import os
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from memory import format_bytes
+
+logger = logging.getLogger(__name__)
+
+_EMPTY: "array[int]" = array('I')
+
+
+def _line_offsets(path: str) -> "array[int]":
+    """Byte offset of the start of every line in the file."""
+    offsets = array('Q')
+    position = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            offsets.append(position)
+            position += len(line)
+    return offsets
+
+
+class LineIndex:
+    """
+    Maps each distinct key to the row numbers it appears on, and reads the
+    matching lines back from the file.
+    """
+
+    def __init__(
+        self,
+        data: List[str],
+        path: Optional[str],
+        row_offsets: Optional["array[int]"] = None,
+        first_line: int = 1
+    ) -> None:
+        """
+        Args:
+            data (List[str]): Keys in file order, one per row.
+            path (Optional[str]): The file ``data`` was loaded from; without
+                it only counts and line numbers are available.
+            row_offsets (Optional[array[int]]): Byte offset of each row when
+                known (column indexing); otherwise found by scanning the
+                file for newlines.
+            first_line (int): Line number of the first row; 2 when a
+                header line was skipped.
+        """
+        started = time.perf_counter()
+        self.data = data
+        self.path = path
+        self.first_line = first_line
+
+        self._postings: Dict[str, "array[int]"] = {}
+        self._rows = 0
+        self._add_postings(data, 0)
+
+        self.offsets: Optional["array[int]"] = row_offsets
+        if self.offsets is None and path is not None:
+            try:
+                offsets = _line_offsets(path)
+            except OSError as e:
+                logger.warning(f"Cannot read {path} for line context: {e}")
+            else:
+                # Lines split on other separators than \n cannot be placed
+                if len(offsets) == len(data):
+                    self.offsets = offsets
+
+        logger.info(
+            f"Built line index of {len(self._postings)} keys over "
+            f"{len(data)} rows ({format_bytes(self.memory_bytes)}) in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+    def _add_postings(self, keys: List[str], start: int) -> None:
+        """Records ``keys`` as the rows from ``start`` on."""
+        postings = self._postings
+        for row, key in enumerate(keys, start):
+            entry = postings.get(key)
+            if entry is None:
+                postings[key] = entry = array('I')
+            entry.append(row)
+        self._rows = start + len(keys)
+        # Projected: walking every posting would cost as much as the build.
+        # Each key has one array header; each row adds four bytes.
+        self.memory_bytes = (
+            sys.getsizeof(postings)
+            + len(postings) * sys.getsizeof(_EMPTY) + 4 * self._rows
+        )
+
+    def extend(
+        self,
+        keys: List[str],
+        start: int,
+        offsets: Optional["array[int]"] = None
+    ) -> None:
+        """
+        Adds rows appended to the data, in place. Lookups running meanwhile
+        see each key's rows before or after the append.
+
+        Args:
+            keys (List[str]): The appended keys, in file order.
+            start (int): Row number of the first of them.
+            offsets (Optional[array[int]]): Their byte offsets in the file;
+                without them, offsets and context are no longer available.
+        """
+        self._add_postings(keys, start)
+        known = self.offsets
+        if known is None:
+            return
+        if offsets is None or len(offsets) != len(keys):
+            self.offsets = None
+        elif len(known) == start:
+            # Not already extended by its owner (the column row offsets)
+            known.extend(offsets)
+
+    def rows(self, key: str) -> "array[int]":
+        """
+        Args:
+            key (str): The key to look up.
+
+        Returns:
+            array[int]: Zero-based row numbers of ``key``, in file order.
+        """
+        return self._postings.get(key, _EMPTY)
+
+    def line_number(self, row: int) -> int:
+        """Returns the file line number of ``row``."""
+        return row + self.first_line
+
+    def offset(self, row: int) -> Optional[int]:
+        """Returns the byte offset of ``row`` in the file, if known."""
+        if self.offsets is None:
+            return None
+        return self.offsets[row]
+
+    def line(self, row: int) -> Optional[str]:
+        """
+        Reads the full line of ``row`` from the file.
+
+        Args:
+            row (int): Zero-based row number.
+
+        Returns:
+            Optional[str]: The line without its ending, or None when its
+            offset is unknown or the file can no longer be read up to it.
+        """
+        start = self.offset(row)
+        if self.path is None or start is None:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                if start >= os.fstat(f.fileno()).st_size:
+                    return None
+                f.seek(start)
+                line = f.readline()
+        except OSError as e:
+            logger.warning(f"Cannot read line {row} of {self.path}: {e}")
+            return None
+        return line.decode('utf-8', errors='replace').rstrip('\r\n')
@@ -0,0 +1,400 @@
+"""
+Compact binary encoding for log records.
+
+A stream starts with the 4-byte ``MAGIC`` header and is followed by
+records, each introduced by a one-byte tag:
+
+- ``TAG_STRING``: defines the next string-table entry (varint length plus
+  UTF-8 bytes). Queries, IPs, modes and phase names are written once per
+  stream and referenced by index afterwards.
+- ``TAG_LOG``: one log entry. A flags byte says which optional fields are
+  present; the id is 16 raw bytes when it is a UUID; the timestamp is a
+  signed 64-bit count of microseconds since 1970-01-01 (naive, like the
+  ``datetime`` it came from); status lives in the flags and execution time
+  is a fixed-width float64. Fields outside the known set are kept as a JSON
+  blob so conversion is lossless.
+- ``TAG_DELETE`` / ``TAG_UPDATE``: tombstones used by segmented storage,
+  made of a flags byte, the id and (for updates) a JSON blob of changes.
+
+``to_binary`` and ``from_binary`` convert between this format and the JSON
+shape produced by ``Log.to_dict``.
+"""
+
+import json
+import struct
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b'LGB1'
+
+TAG_STRING = 0x01
+TAG_LOG = 0x02
+TAG_DELETE = 0x03
+TAG_UPDATE = 0x04
+
+_F_UUID_ID = 0x01
+_F_EXEC_TIME = 0x02
+_F_TIMESTAMP = 0x04
+_F_STATUS_KNOWN = 0x08
+_F_STATUS_TRUE = 0x10
+_F_PHASES = 0x20
+_F_MODE = 0x40
+_F_EXTRA = 0x80
+
+_KNOWN_FIELDS = frozenset((
+    'id', 'query', 'requesting_ip', 'execution_time',
+    'timestamp', 'status', 'phases', 'mode'
+))
+# Written by older versions of LogRepository that persisted log.__dict__
+_IGNORED_FIELDS = frozenset(('_lock',))
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+
+
+class TruncatedRecord(ValueError):
+    """Raised when a stream ends in the middle of a record."""
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append an unsigned LEB128 integer."""
+    if value < 0:
+        raise ValueError(f"varint must be non-negative: {value}")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: memoryview, pos: int) -> Tuple[int, int]:
+    """Read an unsigned LEB128 integer; returns (value, new position)."""
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise TruncatedRecord("varint runs past end of data")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_bytes(out: bytearray, raw: bytes) -> None:
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_bytes(data: memoryview, pos: int) -> Tuple[bytes, int]:
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise TruncatedRecord("byte string runs past end of data")
+    return bytes(data[pos:end]), end
+
+
+def _take(data: memoryview, pos: int, size: int) -> Tuple[memoryview, int]:
+    end = pos + size
+    if end > len(data):
+        raise TruncatedRecord("fixed-width field runs past end of data")
+    return data[pos:end], end
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+class LogEncoder:
+    """
+    Stateful encoder for one binary stream.
+
+    The string table grows as new strings are seen; every string definition
+    is emitted just before the first record that uses it.
+    """
+
+    def __init__(self, strings: Optional[Iterable[str]] = None) -> None:
+        """
+        Args:
+            strings (Optional[Iterable[str]]): String table already written
+                to the stream, e.g. ``LogDecoder.strings`` when appending to
+                an existing stream.
+        """
+        self._strings: Dict[str, int] = {}
+        for text in strings or ():
+            self._strings.setdefault(text, len(self._strings))
+
+    def _ref(self, out: bytearray, defs: bytearray, text: str) -> None:
+        """Write a string-table reference, defining the string if new."""
+        index = self._strings.get(text)
+        if index is None:
+            index = len(self._strings)
+            self._strings[text] = index
+            defs.append(TAG_STRING)
+            _write_bytes(defs, text.encode('utf-8'))
+        _write_varint(out, index)
+
+    def _write_id(self, out: bytearray, flags: int, log_id: Any) -> int:
+        text = '' if log_id is None else str(log_id)
+        try:
+            parsed = uuid.UUID(text)
+            if str(parsed) == text:
+                out += parsed.bytes
+                return flags | _F_UUID_ID
+        except ValueError:
+            pass
+        _write_bytes(out, text.encode('utf-8'))
+        return flags
+
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        """
+        Encode a log entry or a tombstone record.
+
+        Tombstones are dictionaries with ``_op`` set to ``'delete'`` or
+        ``'update'``, as written by SegmentedLogRepository.
+
+        Args:
+            record (Dict[str, Any]): The record to encode.
+
+        Returns:
+            bytes: Any new string definitions followed by the record.
+        """
+        defs = bytearray()
+        body = bytearray()
+
+        op = record.get('_op')
+        if op is not None:
+            if op not in ('delete', 'update'):
+                raise ValueError(f"Unknown tombstone operation: {op}")
+            id_field = bytearray()
+            flags = self._write_id(id_field, 0, record.get('id'))
+            body.append(TAG_DELETE if op == 'delete' else TAG_UPDATE)
+            body.append(flags)
+            body += id_field
+            if op == 'update':
+                _write_bytes(
+                    body,
+                    json.dumps(record.get('updates', {}), default=str)
+                    .encode('utf-8')
+                )
+            return bytes(defs + body)
+
+        fields = bytearray()
+        flags = self._write_id(fields, 0, record.get('id'))
+        self._ref(fields, defs, str(record.get('query') or ''))
+        self._ref(fields, defs, str(record.get('requesting_ip') or ''))
+
+        timestamp = _parse_timestamp(record.get('timestamp'))
+        if timestamp is not None:
+            flags |= _F_TIMESTAMP
+            fields += _INT64.pack((timestamp - _EPOCH) // _MICROSECOND)
+
+        exec_time = record.get('execution_time')
+        if exec_time is not None:
+            flags |= _F_EXEC_TIME
+            fields += _FLOAT64.pack(float(exec_time))
+
+        status = record.get('status')
+        if status is not None:
+            flags |= _F_STATUS_KNOWN
+            if status:
+                flags |= _F_STATUS_TRUE
+
+        mode = record.get('mode')
+        if mode is not None:
+            flags |= _F_MODE
+            self._ref(fields, defs, str(mode))
+
+        phases = record.get('phases')
+        if phases:
+            flags |= _F_PHASES
+            _write_varint(fields, len(phases))
+            for name, duration in phases.items():
+                self._ref(fields, defs, str(name))
+                _write_varint(fields, int(duration))
+
+        extra = {
+            key: value for key, value in record.items()
+            if key not in _KNOWN_FIELDS and key not in _IGNORED_FIELDS
+        }
+        if extra:
+            flags |= _F_EXTRA
+            _write_bytes(
+                fields, json.dumps(extra, default=str).encode('utf-8')
+            )
+
+        body.append(TAG_LOG)
+        body.append(flags)
+        body += fields
+        return bytes(defs + body)
+
+
+class LogDecoder:
+    """Stateful decoder for one binary stream."""
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+
+    def _read_id(
+        self, data: memoryview, pos: int, flags: int
+    ) -> Tuple[str, int]:
+        if flags & _F_UUID_ID:
+            raw, pos = _take(data, pos, 16)
+            return str(uuid.UUID(bytes=bytes(raw))), pos
+        raw_id, pos = _read_bytes(data, pos)
+        return raw_id.decode('utf-8'), pos
+
+    def _string(self, data: memoryview, pos: int) -> Tuple[str, int]:
+        index, pos = _read_varint(data, pos)
+        if index >= len(self.strings):
+            raise ValueError(f"Undefined string reference {index}")
+        return self.strings[index], pos
+
+    def _decode_one(
+        self, data: memoryview, pos: int
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Decode the record at ``pos``; string definitions yield None."""
+        tag = data[pos]
+        pos += 1
+
+        if tag == TAG_STRING:
+            raw, pos = _read_bytes(data, pos)
+            self.strings.append(raw.decode('utf-8'))
+            return None, pos
+
+        if tag in (TAG_DELETE, TAG_UPDATE):
+            raw, pos = _take(data, pos, 1)
+            log_id, pos = self._read_id(data, pos, raw[0])
+            if tag == TAG_DELETE:
+                return {'_op': 'delete', 'id': log_id}, pos
+            raw, pos = _read_bytes(data, pos)
+            return {
+                '_op': 'update', 'id': log_id, 'updates': json.loads(raw)
+            }, pos
+
+        if tag != TAG_LOG:
+            raise ValueError(f"Unknown record tag 0x{tag:02x}")
+
+        raw, pos = _take(data, pos, 1)
+        flags = raw[0]
+        log_id, pos = self._read_id(data, pos, flags)
+        query, pos = self._string(data, pos)
+        requesting_ip, pos = self._string(data, pos)
+
+        timestamp = None
+        if flags & _F_TIMESTAMP:
+            raw, pos = _take(data, pos, 8)
+            micros = _INT64.unpack(raw)[0]
+            timestamp = (_EPOCH + micros * _MICROSECOND).isoformat()
+
+        exec_time = None
+        if flags & _F_EXEC_TIME:
+            raw, pos = _take(data, pos, 8)
+            exec_time = _FLOAT64.unpack(raw)[0]
+
+        status = None
+        if flags & _F_STATUS_KNOWN:
+            status = bool(flags & _F_STATUS_TRUE)
+
+        mode = None
+        if flags & _F_MODE:
+            mode, pos = self._string(data, pos)
+
+        phases = None
+        if flags & _F_PHASES:
+            count, pos = _read_varint(data, pos)
+            phases = {}
+            for _ in range(count):
+                name, pos = self._string(data, pos)
+                phases[name], pos = _read_varint(data, pos)
+
+        entry: Dict[str, Any] = {
+            'id': log_id,
+            'query': query,
+            'requesting_ip': requesting_ip,
+            'execution_time': exec_time,
+            'timestamp': timestamp,
+            'status': status,
+            'phases': phases,
+            'mode': mode,
+        }
+        if flags & _F_EXTRA:
+            raw, pos = _read_bytes(data, pos)
+            entry.update(json.loads(raw))
+        return entry, pos
+
+    def iter_records(
+        self,
+        data: bytes,
+        start: int = 0
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Decode a stream, yielding records at or after byte ``start``.
+
+        Records before ``start`` are still decoded to rebuild the string
+        table, but not yielded. A truncated record at the end of the data
+        (an append in progress) ends iteration silently.
+
+        Args:
+            data (bytes): The complete stream, including ``MAGIC``.
+            start (int): Byte offset previously yielded by this method.
+
+        Yields:
+            Tuple[int, Dict[str, Any]]: Offset past the record, and the
+            record.
+
+        Raises:
+            ValueError: If the header is missing or a record is malformed.
+        """
+        view = memoryview(data)
+        if len(view) == 0:
+            return
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a binary log stream")
+        pos = len(MAGIC)
+        while pos < len(view):
+            try:
+                record, end = self._decode_one(view, pos)
+            except TruncatedRecord:
+                return
+            pos = end
+            if record is not None and end > start:
+                yield end, record
+
+
+def to_binary(entries: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Convert log dictionaries (the JSON shape) into one binary stream.
+
+    Args:
+        entries (Iterable[Dict[str, Any]]): Entries as produced by
+            ``Log.to_dict`` or stored by LogRepository.
+
+    Returns:
+        bytes: The encoded stream.
+    """
+    encoder = LogEncoder()
+    out = bytearray(MAGIC)
+    for entry in entries:
+        out += encoder.encode(entry)
+    return bytes(out)
+
+
+def from_binary(data: bytes) -> List[Dict[str, Any]]:
+    """
+    Convert a binary stream back into log dictionaries.
+
+    Args:
+        data (bytes): A stream produced by ``to_binary`` or ``LogEncoder``.
+
+    Returns:
+        List[Dict[str, Any]]: The decoded records.
+    """
+    return [record for _, record in LogDecoder().iter_records(data)]
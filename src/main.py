@@ -7,20 +7,47 @@ and spawns a new thread to handle each client request using the
 AppService layer.
 """
 
+from admission import AdmissionController, create_admission_controller
 from app import AppService
-from security import secure_socket, protect_buffer
-from repositories import LogRepository, StorageRepository
+from security import create_server_context, protect_buffer, tls_handshake
+from repositories import (
+    StorageRepository, create_log_repository, index_memory_limit
+)
 from config import Config
+from columns import create_column_extractor
+from datasets import create_dataset_registry
+from handoff import (
+    IN_FLIGHT, METRICS_FD_ENV, Draining, complete_takeover,
+    inherited_socket, sd_notify, spawn_successor, watch_successor
+)
+from metrics import REGISTRY, start_metrics_server
+from structured_logging import REQUEST_LOGGER, configure_logging, log_event
+from protocol import (
+    BINARY_PROTOCOL, BINARY_VERSION, JSON_PROTOCOL, OP_QUERY, STATUS_BUSY,
+    STATUS_ERROR, STATUS_EXISTS, STATUS_NOT_FOUND, decode_query,
+    encode_frame, encode_result, read_frame
+)
 import os
+import logging
+import signal
 import socket
 import threading
 import json
+import ssl
+import subprocess
 import sys
+import time
 from typing import Optional, Dict, Any
 import datetime
+from http.server import ThreadingHTTPServer
 
 sys.path.append(os.path.abspath("."))
 
+# Actions that do real work and so go through admission control
+ADMITTED_ACTIONS = (
+    "create_log", "read_logs", "batch", "locate", "add_key", "remove_key"
+)
+
 
 def format_tcp_response(result: Dict[str, Any]) -> bytes:
     """
@@ -36,6 +63,10 @@ def format_tcp_response(result: Dict[str, Any]) -> bytes:
     """
     status = result.get("status", "error")
 
+    # Shed requests get one short line; nothing else is worth the time
+    if status == "busy":
+        return f"BUSY: {result.get('error', 'server busy')}\n".encode()
+
     # Determine the main response string
     if status == "STRING_EXISTS":
         response_lines = ["STRING EXISTS\n"]
@@ -55,81 +86,367 @@ def format_tcp_response(result: Dict[str, Any]) -> bytes:
     response_lines.append(f"  Timestamp: {result.get('timestamp', 'N/A')}\n")
     response_lines.append(f"  Log ID: {result.get('id', 'N/A')}\n")
 
+    # Full row of a match in a column-indexed file
+    row = result.get("row")
+    if row is not None:
+        response_lines.append(f"  Row: {row}\n")
+
+    # Answer of the normalized index, when the client asked for it too
+    normalized_status = result.get("normalized_status")
+    if normalized_status is not None:
+        response_lines.append(
+            f"  Normalized: {normalized_status.replace('_', ' ', 1)}\n"
+        )
+
+    # Per-phase timing breakdown, when the request recorded one
+    phases = result.get("phases")
+    if phases:
+        breakdown = " ".join(
+            f"{name}={duration / 1e6:.3f}ms"
+            for name, duration in phases.items()
+        )
+        response_lines.append(f"  Phases: {breakdown}\n")
+
     # Join all lines and encode
     return "".join(response_lines).encode()
 
 
+def serve_connection(conn: socket.socket,
+                     addr: tuple[str, int],
+                     app_service: AppService,
+                     config: Config,
+                     tls_context: Optional[ssl.SSLContext] = None,
+                     admission: Optional[AdmissionController] = None
+                     ) -> None:
+    """
+    Runs in each connection's thread: completes the TLS handshake, when
+    enabled, and then serves the connection with ``client_handler``.
+    With admission control the connection was let in by
+    ``admission.open_connection()``, and is counted out again here.
+
+    Args:
+        conn (socket.socket): Plain connection returned by ``accept()``.
+        addr (tuple[str, int]): IP address and port of the connected client.
+        app_service (AppService): Core application logic for log handling.
+        config (Config): Configuration object for retrieving server settings.
+        tls_context (Optional[ssl.SSLContext]): Server TLS context, or None
+            for plain TCP.
+        admission (Optional[AdmissionController]): Limits applied to each
+            request, or None to admit everything.
+    """
+    try:
+        if tls_context is not None:
+            timeout = float(
+                config.get_server_config().get("ssl_handshake_timeout", 5.0)
+            )
+            try:
+                conn = tls_handshake(tls_context, conn, timeout)
+            except (ssl.SSLError, OSError) as e:
+                log_event(
+                    "tls_handshake_failed",
+                    {"ip": addr[0], "error": str(e)},
+                    logging.WARNING,
+                )
+                conn.close()
+                return
+        client_handler(conn, addr, app_service, config, admission)
+    finally:
+        if admission is not None:
+            admission.close_connection()
+
+
 def client_handler(conn: socket.socket,
                    addr: tuple[str,
                                int],
                    app_service: AppService,
-                   config: Config) -> None:
+                   config: Config,
+                   admission: Optional[AdmissionController] = None) -> None:
     """
     Handles a client connection by reading its request and sending an
     appropriate response.
 
     Supports actions like:
-    - 'create_log': stores a query log.
-    - 'read_logs': returns all existing logs.
+    - 'create_log': stores a query log. An optional 'dataset' field
+      searches a named dataset instead of the configured data file, and
+      ``"normalized": true`` also reports whether the query matches once
+      case, surrounding whitespace and Unicode form are ignored.
+    - 'read_logs': returns one length-prefixed JSON page of logs, filtered
+      and paginated by the optional 'cursor', 'limit' and 'filters' fields.
+    - 'batch': searches every string in 'queries' against one prepared
+      index, in worker processes for large batches, and returns one
+      length-prefixed JSON message with a result per query, in order.
+    - 'locate': returns one length-prefixed JSON message with how many
+      lines equal 'query', and the line numbers, byte offsets and text of
+      up to 'limit' of them.
+    - 'stats': returns a JSON snapshot of the server's internal metrics,
+      log aggregates and the measured memory of each prepared index.
+    - 'health': returns JSON saying whether the server has finished
+      warming up ('ready') or is still 'starting'.
+
+    A request with ``"keep_alive": true`` keeps the connection open: every
+    reply on it is then a single length-prefixed frame, and further
+    requests must be framed too. The connection closes when the client
+    closes it, sends ``"keep_alive": false``, stays idle for
+    ``keep_alive_timeout`` seconds, or the server starts draining.
+
+    ``{"action": "upgrade", "protocol": "binary"}`` switches the connection
+    to the compact binary protocol described in ``protocol``.
+
+    When admission control is on, requests for the actions in
+    ``ADMITTED_ACTIONS`` ('create_log', 'read_logs', 'batch', 'locate',
+    'add_key' and 'remove_key') that exceed its limits get an immediate
+    BUSY reply.
+
+    Args:
+        conn (socket.socket): Active socket connection to the client.
+        addr (tuple[str, int]): IP address and port of the connected client.
+        app_service (AppService): Core application logic for log handling.
+        config (Config): Configuration object for retrieving server settings.
+        admission (Optional[AdmissionController]): Limits applied to each
+            request, or None to admit everything.
+    """
+    try:
+        protocol = handle_request(
+            conn, addr, app_service, config, admission=admission
+        )
+        if protocol is not None:
+            conn.settimeout(float(
+                config.get_server_config().get("keep_alive_timeout", 30.0)
+            ))
+        while protocol is not None and not IN_FLIGHT.draining:
+            if protocol == BINARY_PROTOCOL:
+                protocol = handle_binary_request(
+                    conn, addr, app_service, config, admission
+                )
+            else:
+                protocol = handle_request(
+                    conn, addr, app_service, config, framed=True,
+                    admission=admission
+                )
+    finally:
+        # Ensure the socket is closed to free up resources
+        conn.close()
+
+
+def handle_request(conn: socket.socket,
+                   addr: tuple[str, int],
+                   app_service: AppService,
+                   config: Config,
+                   framed: bool = False,
+                   admission: Optional[AdmissionController] = None
+                   ) -> Optional[str]:
+    """
+    Reads one request from the connection, serves it and sends the reply.
 
     Args:
         conn (socket.socket): Active socket connection to the client.
         addr (tuple[str, int]): IP address and port of the connected client.
         app_service (AppService): Core application logic for log handling.
         config (Config): Configuration object for retrieving server settings.
+        framed (bool): The connection is in keep-alive mode, so the request
+            arrives as a length-prefixed frame.
+        admission (Optional[AdmissionController]): Limits applied to the
+            request, or None to admit everything.
+
+    Returns:
+        Optional[str]: The protocol of the next request on the connection
+        (``JSON_PROTOCOL`` or ``BINARY_PROTOCOL``), or None to close it.
     """
     server_config = config.get_server_config()
     # Explicitly cast to int to satisfy mypy
     max_payload_size: int = int(server_config["max_payload_size"])
 
+    keep_alive = framed
+    next_protocol: Optional[str] = None
+    if framed:
+        # Waiting for the next request is idle time, not request time
+        try:
+            data = read_frame(conn, max_payload_size)
+        except (BufferError, ConnectionError, OSError):
+            return None
+
+    start = time.perf_counter()
+    action: Optional[str] = None
+    outcome = "error"
+    admitted = False
+    IN_FLIGHT.begin()
+
+    # Nanosecond durations of each request phase, in execution order
+    phases: Dict[str, int] = {}
+    mark = time.perf_counter_ns()
+
+    def reply(payload: bytes, is_frame: bool = False) -> None:
+        # On keep-alive connections every reply is exactly one frame
+        if keep_alive and not is_frame:
+            payload = encode_frame(payload)
+        conn.sendall(payload)
+
     try:
-        # Receive raw bytes from client
-        data = conn.recv(max_payload_size)
+        if not framed:
+            # Receive raw bytes from client
+            data = conn.recv(max_payload_size)
+            phases["recv"] = time.perf_counter_ns() - mark
+            mark = time.perf_counter_ns()
 
         # Protect buffer from overflow or unsafe input
         data = protect_buffer(data, max_payload_size)
 
         # Decode bytes to JSON object
         request = json.loads(data.decode())
+        phases["decode"] = time.perf_counter_ns() - mark
+        keep_alive = bool(request.get("keep_alive", framed))
 
         # Determine requested action
-        action: Optional[str] = request.get("action")
-
-        if action == "create_log":
-            # Handle log creation
+        action = request.get("action")
+
+        shed: Optional[str] = None
+        if admission is not None and action in ADMITTED_ACTIONS:
+            shed = admission.admit(addr[0])
+            admitted = shed is None
+
+        if shed is not None:
+            # Over the limits: answer at once, without doing the work
+            outcome = "busy"
+            if action == "create_log":
+                reply(format_tcp_response({"status": "busy", "error": shed}))
+            else:
+                reply(encode_frame(json.dumps(
+                    {"status": "busy", "error": f"busy: {shed}"}
+                )), is_frame=True)
+
+        elif action == "create_log":
+            # Handle log creation, optionally against a named dataset
+            options: Dict[str, Any] = {}
+            if request.get("dataset") is not None:
+                options["dataset"] = str(request["dataset"])
+            if request.get("normalized"):
+                options["normalized"] = True
             result = app_service.create_log(
                 requesting_ip=addr[0],
                 query_string=request["query"],
                 algo_name=request["algo"],
+                phases=phases,
+                **options,
             )
             # Format response according to requirements
+            mark = time.perf_counter_ns()
             response = format_tcp_response(result)
-
-            # Print the same response to terminal
-            print("\n" + response.decode(), end="")
+            phases["format"] = time.perf_counter_ns() - mark
 
             # Send response to client
-            conn.sendall(response)
+            mark = time.perf_counter_ns()
+            reply(response)
+            phases["send"] = time.perf_counter_ns() - mark
+            outcome = str(result.get("status", "error"))
+
+            # Hand the result to the log listener; nothing is formatted here
+            log_event("create_log", result)
 
         elif action == "read_logs":
-            # Handle log retrieval
-            logs = app_service.read_logs()
-
-            # For read_logs, we'll print a more readable format to terminal
-            print("\n[*] Sending log data to client:")
-            for log in logs:
-                print("DEBUG:")
-                print(f"  Query: {log.get('query', 'N/A')}")
-                print(f"  Requesting IP: {log.get('requesting_ip', 'N/A')}")
-                print(f"  Execution Time: {log.get('execution_time', 'N/A')}s")
-                print(f"  Timestamp: {log.get('timestamp', 'N/A')}")
-                print(f"  Log ID: {log.get('id', 'N/A')}")
-                print(f"  Status: {log.get('status', 'N/A')}")
-                print("")
-
-            # For read_logs, we'll send a JSON response since we're returning
-            # multiple logs
-            conn.sendall(json.dumps(logs).encode())
+            # Handle log retrieval, one page at a time
+            page = app_service.read_logs_page(
+                cursor=request.get("cursor"),
+                limit=request.get("limit"),
+                filters=request.get("filters"),
+            )
+            logs = page["logs"]
+
+            # Summarise the request; individual entries only at DEBUG level
+            log_event(
+                "read_logs",
+                {
+                    "requesting_ip": addr[0],
+                    "count": len(logs),
+                    "next_cursor": page.get("next_cursor"),
+                },
+            )
+            if REQUEST_LOGGER.isEnabledFor(logging.DEBUG):
+                for log in logs:
+                    log_event("read_logs.entry", log, logging.DEBUG)
+
+            # The page is length-prefixed so clients read exactly one message
+            reply(encode_frame(json.dumps(page)), is_frame=True)
+            outcome = "error" if "error" in page else "ok"
+
+        elif action == "batch":
+            # Many queries against one prepared index in one request
+            queries = request["queries"]
+            if not isinstance(queries, list) or not all(
+                isinstance(query, str) for query in queries
+            ):
+                raise ValueError("'queries' must be a list of strings")
+            options = {}
+            if request.get("dataset") is not None:
+                options["dataset"] = str(request["dataset"])
+            results = app_service.create_logs_batch(
+                requesting_ip=addr[0],
+                queries=queries,
+                algo_name=request["algo"],
+                phases=phases,
+                **options,
+            )
+            mark = time.perf_counter_ns()
+            reply(
+                encode_frame(json.dumps({"results": results})), is_frame=True
+            )
+            phases["send"] = time.perf_counter_ns() - mark
+            errors = sum(1 for r in results if r.get("status") == "error")
+            outcome = "error" if errors else "ok"
+            log_event(
+                "batch",
+                {
+                    "requesting_ip": addr[0],
+                    "count": len(results),
+                    "errors": errors,
+                },
+            )
+
+        elif action == "upgrade":
+            # Switch this connection to the binary protocol
+            if request.get("protocol") != BINARY_PROTOCOL:
+                raise ValueError(
+                    f"Unsupported protocol: {request.get('protocol')}"
+                )
+            reply(encode_frame(json.dumps({
+                "protocol": BINARY_PROTOCOL, "version": BINARY_VERSION
+            })), is_frame=True)
+            next_protocol = BINARY_PROTOCOL
+            outcome = "ok"
+
+        elif action == "locate":
+            if not isinstance(request.get("query"), str):
+                raise ValueError("'query' must be a string")
+            mark = time.perf_counter_ns()
+            result = app_service.locate(
+                request["query"], limit=request.get("limit")
+            )
+            phases["locate"] = time.perf_counter_ns() - mark
+            reply(encode_frame(json.dumps(result)), is_frame=True)
+            outcome = str(result.get("status", "error"))
+
+        elif action in ("add_key", "remove_key"):
+            if not isinstance(request.get("key"), str):
+                raise ValueError("'key' must be a string")
+            mark = time.perf_counter_ns()
+            if action == "add_key":
+                result = app_service.add_key(request["key"])
+            else:
+                result = app_service.remove_key(request["key"])
+            phases["mutate"] = time.perf_counter_ns() - mark
+            reply(encode_frame(json.dumps(result)), is_frame=True)
+            outcome = str(result.get("status", "error"))
+            log_event(action, {"requesting_ip": addr[0], **result})
+
+        elif action == "health":
+            reply(json.dumps(app_service.health()).encode())
+            outcome = "ok"
+
+        elif action == "stats":
+            stats = REGISTRY.snapshot()
+            stats["log_aggregates"] = app_service.log_summary()
+            stats["index_memory"] = app_service.memory_report()
+            reply(json.dumps(stats).encode())
+            outcome = "ok"
 
         else:
             # Invalid action provided by client
@@ -143,8 +460,8 @@ def client_handler(conn: socket.socket,
                 "id": None,
             }
             response = format_tcp_response(error_result)
-            print("\n" + response.decode(), end="")
-            conn.sendall(response)
+            log_event("invalid_action", error_result, logging.WARNING)
+            reply(response)
 
     except json.JSONDecodeError:
         error_result = {
@@ -156,8 +473,8 @@ def client_handler(conn: socket.socket,
             "id": None,
         }
         response = format_tcp_response(error_result)
-        print("\n" + response.decode(), end="")
-        conn.sendall(response)
+        log_event("request_error", error_result, logging.WARNING)
+        reply(response)
 
     except KeyError as e:
         error_result = {
@@ -169,8 +486,8 @@ def client_handler(conn: socket.socket,
             "id": None,
         }
         response = format_tcp_response(error_result)
-        print("\n" + response.decode(), end="")
-        conn.sendall(response)
+        log_event("request_error", error_result, logging.WARNING)
+        reply(response)
 
     except Exception as e:
         # Catch-all for unexpected errors
@@ -183,12 +500,146 @@ def client_handler(conn: socket.socket,
             "id": None,
         }
         response = format_tcp_response(error_result)
-        print("\n" + response.decode(), end="")
-        conn.sendall(response)
+        log_event("request_error", error_result, logging.WARNING)
+        reply(response)
 
     finally:
-        # Ensure the socket is closed to free up resources
-        conn.close()
+        if admitted:
+            assert admission is not None
+            admission.release()
+        IN_FLIGHT.end()
+        _record_request(action, outcome, start, phases)
+
+    if next_protocol is not None:
+        return next_protocol
+    return JSON_PROTOCOL if keep_alive else None
+
+
+def handle_binary_request(conn: socket.socket,
+                          addr: tuple[str, int],
+                          app_service: AppService,
+                          config: Config,
+                          admission: Optional[AdmissionController] = None
+                          ) -> Optional[str]:
+    """
+    Reads one binary-protocol request, serves it and sends the binary
+    reply. Nothing is parsed or formatted as text on this path.
+
+    Args:
+        conn (socket.socket): Active socket connection to the client.
+        addr (tuple[str, int]): IP address and port of the connected client.
+        app_service (AppService): Core application logic for log handling.
+        config (Config): Configuration object for retrieving server settings.
+        admission (Optional[AdmissionController]): Limits applied to the
+            request, or None to admit everything.
+
+    Returns:
+        Optional[str]: ``BINARY_PROTOCOL`` to keep serving the connection,
+        or None to close it.
+    """
+    max_payload_size = int(config.get_server_config()["max_payload_size"])
+    try:
+        payload = read_frame(conn, max_payload_size)
+    except (BufferError, ConnectionError, OSError):
+        return None
+
+    start = time.perf_counter()
+    action: Optional[str] = None
+    outcome = "error"
+    admitted = False
+    IN_FLIGHT.begin()
+    phases: Dict[str, int] = {}
+    try:
+        try:
+            request = decode_query(payload)
+        except ValueError as e:
+            conn.sendall(encode_frame(
+                encode_result(STATUS_ERROR, error=str(e))
+            ))
+            return BINARY_PROTOCOL
+        if request.opcode != OP_QUERY:
+            conn.sendall(encode_frame(encode_result(
+                STATUS_ERROR, error=f"Invalid opcode: {request.opcode}"
+            )))
+            return BINARY_PROTOCOL
+
+        action = "create_log"
+        if admission is not None:
+            shed = admission.admit(addr[0])
+            if shed is not None:
+                outcome = "busy"
+                conn.sendall(encode_frame(
+                    encode_result(STATUS_BUSY, error=shed)
+                ))
+                return BINARY_PROTOCOL
+            admitted = True
+
+        options = {}
+        if request.dataset is not None:
+            options["dataset"] = request.dataset
+        result = app_service.create_log(
+            requesting_ip=addr[0],
+            query_string=request.query,
+            algo_name=request.algo,
+            phases=phases,
+            **options,
+        )
+        outcome = str(result.get("status", "error"))
+        status = _BINARY_STATUS.get(outcome, STATUS_ERROR)
+
+        mark = time.perf_counter_ns()
+        conn.sendall(encode_frame(encode_result(
+            status,
+            int((result.get("execution_time") or 0) * 1e9),
+            result.get("id"),
+            result.get("error") if status == STATUS_ERROR else None,
+        )))
+        phases["send"] = time.perf_counter_ns() - mark
+        log_event("create_log", result)
+        return BINARY_PROTOCOL
+    except OSError:
+        # The client went away mid-request
+        return None
+    finally:
+        if admitted:
+            assert admission is not None
+            admission.release()
+        IN_FLIGHT.end()
+        _record_request(action, outcome, start, phases)
+
+
+_BINARY_STATUS = {
+    "STRING_EXISTS": STATUS_EXISTS,
+    "STRING_NOT_FOUND": STATUS_NOT_FOUND,
+}
+
+
+def _record_request(
+    action: Optional[str],
+    outcome: str,
+    start: float,
+    phases: Dict[str, int]
+) -> None:
+    """Records the request counters, duration and phase histograms."""
+    known_action = action if action in (
+        "create_log", "read_logs", "batch", "locate", "add_key",
+        "remove_key", "stats", "health", "upgrade"
+    ) else "invalid"
+    REGISTRY.inc(
+        "requests_total",
+        labels={"action": known_action, "outcome": outcome},
+    )
+    REGISTRY.observe(
+        "request_duration_seconds",
+        time.perf_counter() - start,
+        labels={"action": known_action},
+    )
+    for phase, duration in phases.items():
+        REGISTRY.observe(
+            "request_phase_seconds",
+            duration / 1e9,
+            labels={"action": known_action, "phase": phase},
+        )
 
 
 def main() -> None:
@@ -199,7 +650,13 @@ def main() -> None:
     starts the socket server (optionally with SSL), and begins accepting
     connections.
     Each client is handled in a separate daemon thread.
+
+    SIGHUP starts a replacement process that inherits the listening
+    socket (see ``handoff``); SIGTERM stops accepting, waits up to
+    ``drain_timeout`` seconds for requests in progress, and exits.
     """
+    started = time.perf_counter()
+    log_listener = None
     try:
         # Configure console output formatting
         print("\n" + "=" * 50)
@@ -215,26 +672,145 @@ def main() -> None:
         certfile: Optional[str] = server_conf.get("ssl_cert")
         keyfile: Optional[str] = server_conf.get("ssl_key")
 
+        # Request logging goes through a queue drained by a listener thread
+        logging_settings = server_conf.get("logging", {})
+        log_listener = configure_logging(logging_settings)
+
         # Initialize repositories and application service
-        log_repo = LogRepository()
-        storage_repo = StorageRepository()
-        app_service = AppService(log_repo, storage_repo, config)
-
-        # Setup server socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind(("0.0.0.0", port))
-        sock.listen(5)
+        log_repo = create_log_repository(server_conf.get("log_storage"))
+        storage_repo = StorageRepository(
+            memory_limit=index_memory_limit(server_conf),
+            trace_allocations=bool(
+                server_conf.get("trace_index_builds", False)
+            ),
+            columns=create_column_extractor(server_conf),
+        )
+        datasets = create_dataset_registry(server_conf)
+        app_service = AppService(log_repo, storage_repo, config, datasets)
+
+        # Apply edits to config.json without a restart. Port, SSL and log
+        # storage settings still need one.
+        def reconfigure_logging(
+            file_conf: Dict[str, Any],
+            new_server_conf: Dict[str, Any]
+        ) -> None:
+            nonlocal log_listener, logging_settings
+            new_settings = new_server_conf.get("logging", {})
+            if new_settings == logging_settings:
+                return
+            logging_settings = new_settings
+            old_listener = log_listener
+            log_listener = configure_logging(new_settings)
+            if old_listener is not None:
+                old_listener.stop()
+
+        admission = create_admission_controller(server_conf)
+
+        config.add_listener(app_service.apply_config)
+        config.add_listener(reconfigure_logging)
+        if admission is not None:
+            config.add_listener(admission.apply_config)
+        poll_interval = float(server_conf.get("config_poll_interval", 1.0))
+        if poll_interval > 0:
+            config.start_watching(poll_interval)
+
+        # Optional Prometheus listener on its own port. On a reload the
+        # old process still holds that port, so its socket is taken over.
+        metrics_server: Optional[ThreadingHTTPServer] = None
+        metrics_sock = inherited_socket(METRICS_FD_ENV)
+        if server_conf.get("metrics_enabled", False):
+            metrics_port = int(server_conf.get("metrics_port", 9100))
+            if (metrics_sock is not None
+                    and metrics_sock.getsockname()[1] != metrics_port):
+                # The port was changed in the config meanwhile
+                metrics_sock.close()
+                metrics_sock = None
+            metrics_server = start_metrics_server(
+                str(server_conf.get("metrics_host", "0.0.0.0")),
+                metrics_port,
+                sock=metrics_sock,
+            )
+            print(f"[*] Metrics available on port {metrics_port}/metrics")
+        elif metrics_sock is not None:
+            metrics_sock.close()
+
+        # Fold keys added or removed at runtime back into the data file
+        if (server_conf.get("key_mutation") or {}).get("enabled", False):
+            app_service.start_folding()
+
+        # Build the indexes before taking traffic, or in the background
+        # with 'health' answering "starting" until they are done
+        prewarm_conf = server_conf.get("prewarm") or {}
+        prewarm_enabled = bool(prewarm_conf.get("enabled", False))
+        if prewarm_enabled:
+            prewarm_args = (
+                started,
+                prewarm_conf.get("modes"),
+                prewarm_conf.get("datasets"),
+            )
+            background = bool(prewarm_conf.get("background", False))
+            if background:
+                def prewarm_then_take_over() -> None:
+                    app_service.prewarm(*prewarm_args)
+                    complete_takeover()
+
+                threading.Thread(
+                    target=prewarm_then_take_over,
+                    name="prewarm",
+                    daemon=True,
+                ).start()
+            else:
+                print("[*] Prewarming indexes...")
+                app_service.prewarm(*prewarm_args)
+
+        # Setup server socket, or keep serving on the one handed over by
+        # the process this one replaces
+        sock = inherited_socket()
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # A plain restart must not wait out connections in TIME_WAIT
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("0.0.0.0", port))
+            sock.listen(5)
         print(f"[*] Server started. Listening on port {port}...")
+        if not prewarm_enabled:
+            app_service.mark_ready(started)
+        if not (prewarm_enabled and background):
+            complete_takeover()
+
+        successor: Optional[subprocess.Popen] = None
+
+        def reload(signum: int, frame: Any) -> None:
+            nonlocal successor
+            if successor is not None and successor.poll() is None:
+                return  # A handoff is already under way
+            sd_notify("RELOADING=1")
+            successor = spawn_successor(
+                sock,
+                metrics_server.socket if metrics_server is not None
+                else None,
+            )
+            watch_successor(successor)
+
+        def stop(signum: int, frame: Any) -> None:
+            # From here on a successor exiting is no failed handoff
+            IN_FLIGHT.draining = True
+            raise Draining()
+
+        signal.signal(signal.SIGHUP, reload)
+        signal.signal(signal.SIGTERM, stop)
 
-        # Wrap socket with SSL if configured
+        # One TLS context for the server's lifetime, so sessions resume.
+        # Handshakes run in the connection threads, not in accept().
+        tls_context: Optional[ssl.SSLContext] = None
         if ssl_enabled:
-            # Fix: Ensure certfile and keyfile are not None before passing to
-            # secure_socket
+            # Fix: Ensure certfile and keyfile are not None before building
+            # the TLS context
             if certfile is None or keyfile is None:
                 raise ValueError(
                     "SSL is enabled but certificate or key file is missing"
                 )
-            sock = secure_socket(sock, certfile, keyfile)
+            tls_context = create_server_context(certfile, keyfile)
             print("[*] SSL enabled")
 
         print("\n[*] Ready to accept connections.")
@@ -243,24 +819,62 @@ def main() -> None:
         # Continuously accept and handle new connections
         while True:
             conn, addr = sock.accept()
-            print(f"\n[*] New connection from {addr[0]}:{addr[1]}")
+            log_event(
+                "connection",
+                {"ip": addr[0], "port": addr[1]},
+                logging.DEBUG,
+            )
+
+            # Turn away what admission control would shed anyway before a
+            # thread and a TLS handshake are spent on it
+            if admission is not None:
+                shed = admission.open_connection(addr[0])
+                if shed is not None:
+                    log_event(
+                        "connection_shed",
+                        {"ip": addr[0], "reason": shed},
+                        logging.DEBUG,
+                    )
+                    conn.close()
+                    continue
 
             # Spawn a new thread to handle the client
             thread = threading.Thread(
-                target=client_handler,
-                args=(conn, addr, app_service, config),
+                target=serve_connection,
+                args=(
+                    conn, addr, app_service, config, tls_context, admission
+                ),
                 daemon=True,
             )
             thread.start()
 
+    except Draining:
+        # Replaced by a new process, or stopped: finish what is running
+        sock.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        drain_timeout = float(server_conf.get("drain_timeout", 30.0))
+        print(f"[*] Draining {IN_FLIGHT.active} request(s)...")
+        if not IN_FLIGHT.drain(drain_timeout):
+            print(f"[!] {IN_FLIGHT.active} request(s) still running")
+        print("[*] Server stopped.")
+        if log_listener is not None:
+            log_listener.stop()
+        sys.exit(0)
+
     except KeyboardInterrupt:
         # Graceful shutdown on user interrupt
         print("\n[*] Server shutting down.")
+        if log_listener is not None:
+            log_listener.stop()
         sys.exit(0)
 
     except Exception as e:
         # Log unexpected errors and exit
         print(f"[!] Server error: {e}")
+        if log_listener is not None:
+            log_listener.stop()
         sys.exit(1)
 
 
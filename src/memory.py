@@ -0,0 +1,150 @@
+"""
+Memory measurement for prepared search structures.
+
+``deep_sizeof`` walks a structure and adds up the size of every object it
+reaches, optionally skipping objects owned elsewhere (the data lines an
+index points into). ``traced`` runs a build under tracemalloc to capture
+what it actually allocated. ``project_build_bytes`` estimates what a full
+build would cost by building the same structure over an evenly spaced
+sample and scaling, so oversized builds can be refused up front, and
+``project_data_bytes`` does the same for the data lines themselves. Exact
+walks are left to reporting; loads and builds only project.
+"""
+
+import sys
+import tracemalloc
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+# Enough to be representative of long-tail string lengths and trie
+# branching without making the projection itself costly.
+PROJECTION_SAMPLE = 2_000
+
+
+def deep_sizeof(obj: Any, exclude: Optional[Set[int]] = None) -> int:
+    """
+    Size in bytes of ``obj`` and everything reachable from it.
+
+    Containers (dict, list, tuple, set, frozenset) are followed; each object
+    is counted once however many times it is referenced.
+
+    Args:
+        obj (Any): Root of the structure.
+        exclude (Optional[Set[int]]): ``id()`` of objects to leave out, e.g.
+            strings shared with the loaded data.
+
+    Returns:
+        int: Total size in bytes.
+    """
+    seen: Set[int] = set(exclude) if exclude else set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+def shared_ids(items: Iterable[Any]) -> Set[int]:
+    """Returns the ids of ``items`` for use as ``deep_sizeof(exclude=...)``."""
+    return {id(item) for item in items}
+
+
+def traced(func: Callable[[], Any]) -> Tuple[Any, int, int]:
+    """
+    Runs ``func`` while tracing allocations.
+
+    If tracemalloc is not already running it is started for the call and
+    stopped afterwards; otherwise the existing trace is reused.
+
+    Args:
+        func (Callable[[], Any]): The build to measure.
+
+    Returns:
+        Tuple[Any, int, int]: The result, bytes still allocated by the build
+        when it returned, and the peak bytes allocated during it.
+    """
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+    return result, max(0, after - before), max(0, peak - before)
+
+
+def project_build_bytes(
+    build: Callable[[List[str]], Any],
+    data: List[str],
+    sample_size: int = PROJECTION_SAMPLE
+) -> int:
+    """
+    Estimates the memory a structure built over ``data`` will hold.
+
+    The structure is built over an evenly spaced sample and its own size,
+    excluding the sampled strings, is scaled by ``len(data) / sample``.
+    Hash tables grow in powers of two, so the result is a rough, usually
+    slightly high, figure; it is meant for refusing builds that are far
+    over budget, not for exact accounting.
+
+    Args:
+        build (Callable[[List[str]], Any]): Builds the structure from lines.
+        data (List[str]): The full data.
+        sample_size (int): Number of lines to sample.
+
+    Returns:
+        int: Projected size in bytes.
+    """
+    if not data:
+        return 0
+    step = max(1, len(data) // sample_size)
+    sample = data[::step]
+    size = deep_sizeof(build(sample), exclude=shared_ids(sample))
+    return int(size * len(data) / len(sample))
+
+
+def project_data_bytes(
+    data: List[str],
+    sample_size: int = PROJECTION_SAMPLE
+) -> int:
+    """
+    Estimates the memory held by ``data`` and its strings from the mean
+    size of an evenly spaced sample.
+
+    Args:
+        data (List[str]): The data lines.
+        sample_size (int): Number of lines to sample.
+
+    Returns:
+        int: Projected size in bytes.
+    """
+    if not data:
+        return sys.getsizeof(data)
+    step = max(1, len(data) // sample_size)
+    sample = data[::step]
+    per_line = sum(sys.getsizeof(line) for line in sample) / len(sample)
+    return sys.getsizeof(data) + int(per_line * len(data))
+
+
+def format_bytes(size: Optional[float]) -> str:
+    """Renders a byte count for log messages, e.g. ``'12.3 MiB'``."""
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
@@ -0,0 +1,446 @@
+"""
+In-process metrics registry with a Prometheus text exposition endpoint.
+
+Counters, gauges and histograms are kept in plain dictionaries guarded by a
+single lock so that recording a sample on the request hot path costs little
+more than a dictionary update. Values that are expensive to compute (process
+RSS, GC statistics, prepared index sizes) are gathered by collectors that
+only run when the metrics are scraped or a stats snapshot is requested.
+"""
+
+import gc
+import os
+import socket
+import sys
+import threading
+import logging
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+_KEY_CACHE: Dict[Tuple[Tuple[str, object], ...], LabelKey] = {}
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    """
+    Convert a label dictionary into a hashable, ordered key.
+
+    Sorting and stringifying labels is the most expensive part of recording a
+    sample, so the normalised key is memoised by the raw ``items()`` tuple.
+    Label sets are few and fixed per call site, which keeps the cache small.
+    """
+    if not labels:
+        return ()
+    raw = tuple(labels.items())
+    key = _KEY_CACHE.get(raw)
+    if key is None:
+        key = tuple(sorted((k, str(v)) for k, v in raw))
+        _KEY_CACHE[raw] = key
+    return key
+
+
+def _format_labels(key: LabelKey) -> str:
+    """Render a label key in Prometheus exposition syntax."""
+    if not key:
+        return ""
+    parts = []
+    for name, value in key:
+        value = (
+            value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"')
+        )
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing '.0'."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Histogram:
+    """Cumulative-bucket histogram for a single label set."""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters, gauges and histograms.
+
+    Metric families are created on first use. ``describe`` may be called
+    beforehand to attach HELP text; undocumented families are still exported.
+    """
+
+    def __init__(self, prefix: str = "search_server_") -> None:
+        """
+        Initialize an empty registry.
+
+        Args:
+            prefix (str): Prefix prepended to every exported metric name.
+        """
+        self.prefix = prefix
+        self.enabled: bool = True
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Optional[Tuple[float, ...]] = None
+    ) -> None:
+        """
+        Attach HELP text (and optionally histogram buckets) to a family.
+
+        Args:
+            name (str): Metric family name without the registry prefix.
+            help_text (str): One-line description exported as HELP.
+            buckets (Optional[Tuple[float, ...]]): Histogram bucket bounds.
+        """
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = tuple(sorted(buckets))
+
+    def inc(
+        self,
+        name: str,
+        value: float = 1.0,
+        labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Increment a counter by ``value``."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            family = self._counters.setdefault(name, {})
+            family[key] = family.get(key, 0.0) + value
+
+    def set_gauge(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Set a gauge to ``value``."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Record a single observation in a histogram."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            family = self._histograms.setdefault(name, {})
+            hist = family.get(key)
+            if hist is None:
+                hist = _Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+                family[key] = hist
+            hist.observe(value)
+
+    def register_collector(
+        self,
+        collector: Callable[[], Iterable[Sample]]
+    ) -> None:
+        """
+        Register a callable that yields gauge samples at scrape time.
+
+        Args:
+            collector: Callable returning ``(name, labels, value)`` tuples.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self) -> Dict[str, Dict[LabelKey, float]]:
+        """Run all collectors and group their samples by family."""
+        collected: Dict[str, Dict[LabelKey, float]] = {}
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    collected.setdefault(name, {})[_label_key(labels)] = value
+            except Exception as e:
+                logger.exception("Metrics collector failed: %s", e)
+        return collected
+
+    def render(self) -> str:
+        """
+        Render all metrics in Prometheus text exposition format.
+
+        Returns:
+            str: The exposition document, terminated by a newline.
+        """
+        collected = self._collect()
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> None:
+            full = self.prefix + name
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+
+        with self._lock:
+            counters = {k: dict(v) for k, v in self._counters.items()}
+            gauges = {k: dict(v) for k, v in self._gauges.items()}
+            histograms = {
+                name: {
+                    key: (h.buckets, list(h.counts), h.total, h.count)
+                    for key, h in family.items()
+                }
+                for name, family in self._histograms.items()
+            }
+
+        for name in sorted(counters):
+            header(name, "counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(
+                    f"{self.prefix}{name}{_format_labels(key)} "
+                    f"{_format_value(value)}"
+                )
+
+        for name, family in sorted({**collected, **gauges}.items()):
+            header(name, "gauge")
+            for key, value in sorted(family.items()):
+                lines.append(
+                    f"{self.prefix}{name}{_format_labels(key)} "
+                    f"{_format_value(value)}"
+                )
+
+        for name in sorted(histograms):
+            header(name, "histogram")
+            for key, (buckets, counts, total, count) in sorted(
+                histograms[name].items()
+            ):
+                cumulative = 0
+                for bound, bucket_count in zip(
+                    buckets + (float("inf"),), counts
+                ):
+                    cumulative += bucket_count
+                    bucket_key = key + (("le", _format_value(bound)),)
+                    lines.append(
+                        f"{self.prefix}{name}_bucket"
+                        f"{_format_labels(bucket_key)} {cumulative}"
+                    )
+                lines.append(
+                    f"{self.prefix}{name}_sum{_format_labels(key)} "
+                    f"{_format_value(total)}"
+                )
+                lines.append(
+                    f"{self.prefix}{name}_count{_format_labels(key)} {count}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """
+        Return a JSON-serialisable view of all metrics for the stats action.
+
+        Returns:
+            dict: ``{"counters": ..., "gauges": ..., "histograms": ...}``
+            where each family maps a rendered label string to its value.
+        """
+        collected = self._collect()
+        with self._lock:
+            counters = {
+                name: {_format_labels(k): v for k, v in family.items()}
+                for name, family in self._counters.items()
+            }
+            gauges = {
+                name: {_format_labels(k): v for k, v in family.items()}
+                for name, family in {**collected, **self._gauges}.items()
+            }
+            histograms = {
+                name: {
+                    _format_labels(k): {
+                        "count": h.count,
+                        "sum": h.total,
+                        "mean": h.total / h.count if h.count else None,
+                    }
+                    for k, h in family.items()
+                }
+                for name, family in self._histograms.items()
+            }
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+
+def process_rss_bytes() -> Optional[int]:
+    """
+    Return the resident set size of the current process in bytes.
+
+    Reads ``/proc/self/statm`` on Linux and falls back to the peak RSS
+    reported by ``resource.getrusage`` elsewhere.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    except (ImportError, OSError):
+        return None
+
+
+def collect_process_metrics() -> Iterable[Sample]:
+    """Collector yielding process RSS and garbage collector statistics."""
+    rss = process_rss_bytes()
+    if rss is not None:
+        yield ("process_resident_memory_bytes", {}, float(rss))
+
+    for generation, stats in enumerate(gc.get_stats()):
+        labels = {"generation": str(generation)}
+        yield ("python_gc_collections", labels, float(stats["collections"]))
+        yield ("python_gc_objects_collected", labels, float(stats["collected"]))
+        yield (
+            "python_gc_objects_uncollectable",
+            labels,
+            float(stats["uncollectable"]),
+        )
+
+    for generation, count in enumerate(gc.get_count()):
+        yield (
+            "python_gc_pending_objects",
+            {"generation": str(generation)},
+            float(count),
+        )
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.register_collector(collect_process_metrics)
+REGISTRY.describe(
+    "requests_total", "Requests handled, by action and outcome."
+)
+REGISTRY.describe(
+    "request_duration_seconds",
+    "Wall-clock time spent in client_handler, by action."
+)
+REGISTRY.describe(
+    "request_phase_seconds",
+    "Time spent in each request phase (recv, decode, reload, prepare, "
+    "search, persist, format, send)."
+)
+REGISTRY.describe(
+    "process_resident_memory_bytes", "Resident set size of the server."
+)
+REGISTRY.describe(
+    "index_memory_bytes",
+    "Approximate memory held by each prepared search structure."
+)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves the registry on ``/metrics``; every other path is a 404."""
+
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug("metrics %s - %s", self.address_string(), format % args)
+
+
+def start_metrics_server(
+    host: str,
+    port: int,
+    registry: MetricsRegistry = REGISTRY,
+    sock: Optional[socket.socket] = None
+) -> ThreadingHTTPServer:
+    """
+    Start the Prometheus HTTP listener on a daemon thread.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): TCP port to bind; 0 picks a free port.
+        registry (MetricsRegistry): Registry to expose.
+        sock (Optional[socket.socket]): A socket already bound and
+            listening, e.g. one handed over by the previous server
+            process; ``host`` and ``port`` are then not bound.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown()`` to stop.
+    """
+    handler = type(
+        "MetricsRequestHandler",
+        (_MetricsRequestHandler,),
+        {"registry": registry},
+    )
+    if sock is None:
+        server = ThreadingHTTPServer((host, port), handler)
+    else:
+        server = ThreadingHTTPServer(
+            (host, port), handler, bind_and_activate=False
+        )
+        server.socket.close()
+        server.socket = sock
+        server.server_address = sock.getsockname()
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever,
+        name="metrics-http",
+        daemon=True,
+    )
+    thread.start()
+    logger.info(
+        "Metrics listener started on %s:%d", *server.server_address[:2]
+    )
+    return server
@@ -0,0 +1,243 @@
+"""
+Search-mode selection for the ``auto`` algorithm.
+
+The policy compares, for each structure, the cost of building it plus the
+cost of the lookups expected before the data changes again, against a
+plain scan of the lines. Build cost and size come from the repository's
+own measurements when a mode has been built before and from per-item
+defaults otherwise; lookup cost comes from observed search times. The
+workload side is learned from traffic: how many queries each loaded copy of
+the data serves, and the hit rate, which decides how far a scan runs on
+average.
+
+Only exact-match lookups exist in this server, so the query mix is
+described by hit rate and queries per build.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+AUTO_MODE = 'auto'
+
+# Modes whose lookups scan every line
+SLOW_MODES = ('naive', 'index_map')
+INDEXED_MODES = ('set', 'dict', 'binary', 'trie')
+
+# Defaults used until a mode has been measured in this process, from
+# data250k.txt on a modest VM: nanoseconds per line to build, bytes per line
+# held, and nanoseconds per lookup (per line scanned for the slow modes).
+BUILD_NS_PER_ITEM = {
+    'set': 240.0, 'dict': 360.0, 'binary': 680.0, 'trie': 7000.0,
+    'index_map': 160.0, 'naive': 0.0,
+}
+BYTES_PER_ITEM = {
+    'set': 34.0, 'dict': 31.0, 'binary': 8.0, 'trie': 900.0,
+    'index_map': 70.0, 'naive': 0.0,
+}
+LOOKUP_NS = {
+    'set': 110.0, 'dict': 110.0, 'binary': 4000.0, 'trie': 1000.0,
+}
+SCAN_NS_PER_ITEM = {'naive': 19.0, 'index_map': 30.0}
+
+# Weight of the newest sample in the moving averages
+_ALPHA = 0.2
+
+
+class ModePolicy:
+    """
+    Chooses a search mode from data size, measured costs and observed
+    workload. Thread-safe; one instance is shared by all requests.
+    """
+
+    def __init__(
+        self,
+        upgrade_slow_modes: bool = False,
+        queries_per_build: float = 100.0,
+        memory_limit: Optional[int] = None
+    ) -> None:
+        """
+        Args:
+            upgrade_slow_modes (bool): Replace client-requested 'naive' and
+                'index_map' with the policy's choice.
+            queries_per_build (float): Expected lookups per loaded copy of
+                the data before any have been observed.
+            memory_limit (Optional[int]): Structures projected above this
+                many bytes are not considered.
+        """
+        self.upgrade_slow_modes = upgrade_slow_modes
+        self.memory_limit = memory_limit
+        self._lock = threading.Lock()
+        self._queries_per_build = float(queries_per_build)
+        self._hit_rate = 0.5
+        # Moving average of lookup time: ns per lookup for indexed modes,
+        # ns per scanned line for slow modes
+        self._lookup_ns: Dict[str, float] = {}
+        self._version: Optional[int] = None
+        self._version_queries = 0
+
+    def applies_to(self, requested: str) -> bool:
+        """
+        Whether the policy decides the mode for a request.
+
+        Args:
+            requested (str): The ``algo`` the client sent.
+
+        Returns:
+            bool: True for 'auto', and for slow modes when upgrades are on.
+        """
+        return requested == AUTO_MODE or (
+            self.upgrade_slow_modes and requested in SLOW_MODES
+        )
+
+    def _lookup_cost(self, mode: str, n_items: int) -> float:
+        """Expected nanoseconds for one lookup in ``mode``."""
+        measured = self._lookup_ns.get(mode)
+        if mode in SCAN_NS_PER_ITEM:
+            per_item = measured or SCAN_NS_PER_ITEM[mode]
+            # A hit stops halfway through on average, a miss scans it all
+            return per_item * n_items * (1.0 - self._hit_rate / 2.0)
+        return measured or LOOKUP_NS[mode]
+
+    @staticmethod
+    def _build_cost(
+        mode: str,
+        n_items: int,
+        reports: Dict[str, Dict[str, Any]]
+    ) -> Tuple[float, float]:
+        """Returns (build ns, bytes) for ``mode`` over ``n_items`` lines."""
+        report = reports.get(mode) or {}
+        measured_items = report.get('items') or 0
+        if measured_items:
+            scale = n_items / measured_items
+            return (
+                float(report.get('build_seconds', 0.0)) * 1e9 * scale,
+                float(report.get('bytes', 0)) * scale,
+            )
+        return (
+            BUILD_NS_PER_ITEM[mode] * n_items,
+            BYTES_PER_ITEM[mode] * n_items,
+        )
+
+    def choose(
+        self,
+        requested: str,
+        n_items: Optional[int],
+        reports: Optional[Dict[str, Dict[str, Any]]] = None,
+        rebuild_per_query: bool = False
+    ) -> Tuple[str, str]:
+        """
+        Picks the mode for one request.
+
+        Args:
+            requested (str): The ``algo`` the client sent.
+            n_items (Optional[int]): Lines in the dataset, or None if it is
+                not loaded yet.
+            reports (Optional[Dict[str, Dict[str, Any]]]): Per-mode
+                measurements from ``StorageRepository.memory_reports``.
+            rebuild_per_query (bool): The data is reloaded for every query
+                (``reread_on_query``), so every build serves one lookup.
+
+        Returns:
+            Tuple[str, str]: The mode and a short reason to log with it.
+        """
+        if not self.applies_to(requested):
+            return requested, "requested"
+        if n_items is None:
+            return 'set', "dataset not loaded; default"
+
+        reports = reports or {}
+        with self._lock:
+            queries = 1.0 if rebuild_per_query else max(
+                1.0, self._queries_per_build
+            )
+            costs: Dict[str, float] = {}
+            candidates = SLOW_MODES if requested == AUTO_MODE else ()
+            for mode in candidates + INDEXED_MODES:
+                build_ns, size = self._build_cost(mode, n_items, reports)
+                if self.memory_limit is not None and size > self.memory_limit:
+                    continue
+                costs[mode] = build_ns + queries * self._lookup_cost(
+                    mode, n_items
+                )
+            hit_rate = self._hit_rate
+
+        if not costs:
+            return 'naive', "no structure fits the memory limit"
+        mode = min(costs, key=costs.__getitem__)
+        verb = "auto" if requested == AUTO_MODE else f"upgraded {requested}"
+        return mode, (
+            f"{verb}: {mode} for {n_items} items, "
+            f"~{queries:.0f} queries/build, hit rate {hit_rate:.2f}"
+        )
+
+    def observe(
+        self,
+        mode: str,
+        seconds: float,
+        found: bool,
+        n_items: int,
+        version: int
+    ) -> None:
+        """
+        Records one completed lookup.
+
+        Args:
+            mode (str): Mode the lookup ran in.
+            seconds (float): Search time reported by the repository.
+            found (bool): Whether the key was present.
+            n_items (int): Lines in the dataset searched.
+            version (int): Identity of the loaded data (``id()`` of the
+                line list); a change marks a rebuild.
+        """
+        with self._lock:
+            self._hit_rate += _ALPHA * ((1.0 if found else 0.0)
+                                        - self._hit_rate)
+
+            if version != self._version:
+                if self._version is not None:
+                    self._queries_per_build += _ALPHA * (
+                        self._version_queries - self._queries_per_build
+                    )
+                self._version = version
+                self._version_queries = 0
+            self._version_queries += 1
+            # Once the current copy has outlived the estimate, raise it now
+            if self._version_queries > self._queries_per_build:
+                self._queries_per_build = float(self._version_queries)
+
+            if mode in SCAN_NS_PER_ITEM:
+                if not n_items:
+                    return
+                fraction = 1.0 - (0.5 if found else 0.0)
+                sample = seconds * 1e9 / (n_items * fraction)
+            elif mode in LOOKUP_NS:
+                sample = seconds * 1e9
+            else:
+                return
+            previous = self._lookup_ns.get(mode)
+            self._lookup_ns[mode] = sample if previous is None else (
+                previous + _ALPHA * (sample - previous)
+            )
+
+
+def create_mode_policy(
+    server_config: Dict[str, Any],
+    memory_limit: Optional[int] = None
+) -> ModePolicy:
+    """
+    Builds the policy from the optional ``mode_policy`` section of
+    ``server_config`` (``upgrade_slow_modes``, ``queries_per_build``).
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+        memory_limit (Optional[int]): The index memory limit in bytes.
+
+    Returns:
+        ModePolicy: The configured policy.
+    """
+    settings = server_config.get('mode_policy') or {}
+    return ModePolicy(
+        upgrade_slow_modes=bool(settings.get('upgrade_slow_modes', False)),
+        queries_per_build=float(settings.get('queries_per_build', 100.0)),
+        memory_limit=memory_limit,
+    )
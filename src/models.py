@@ -1,16 +1,22 @@
-import threading
 from datetime import datetime
 from typing import Optional, Dict, Union
 
 
 class Log:
     """
-    A thread-safe log entry for recording query executions.
+    A log entry for recording query executions.
 
     This class records details such as query text, requester's IP,
-    execution time, timestamp, and query status.
+    execution time, timestamp, and query status. Each entry is owned by
+    the request that creates it, so it needs no lock, and ``__slots__``
+    keeps the per-instance footprint small.
     """
 
+    __slots__ = (
+        "id", "query", "requesting_ip", "execution_time",
+        "timestamp", "status", "phases", "mode"
+    )
+
     def __init__(self, id: str, query: str, requesting_ip: str) -> None:
         """
         Initialize a Log object.
@@ -26,7 +32,8 @@ class Log:
         self.execution_time: Optional[float] = None
         self.timestamp: Optional[datetime] = None
         self.status: Optional[bool] = None
-        self._lock = threading.Lock()
+        self.phases: Optional[Dict[str, int]] = None
+        self.mode: Optional[str] = None
 
         self._set_query(query)
 
@@ -63,10 +70,9 @@ class Log:
             found (bool): Whether the query returned any results.
             exec_time (float): Time taken to execute the query in seconds.
         """
-        with self._lock:
-            self.status = found
-            self.execution_time = exec_time
-            self.timestamp = datetime.now()
+        self.status = found
+        self.execution_time = exec_time
+        self.timestamp = datetime.now()
 
     def to_dict(self) -> Dict[str, Union[str, float, bool, None]]:
         """
@@ -83,5 +89,7 @@ class Log:
             "timestamp": (
                 self.timestamp.isoformat() if self.timestamp else None
             ),
-            "status": self.status
+            "status": self.status,
+            "phases": self.phases,
+            "mode": self.mode
         }
@@ -0,0 +1,259 @@
+"""
+Wire framing shared by the server and its clients.
+
+A frame is a 4-byte big-endian unsigned length followed by that many payload
+bytes. Framed responses let a client read exactly one message from a stream
+without relying on the server closing the connection or on a fixed-size
+``recv``.
+
+The compact binary protocol also lives here. A client switches to it by
+sending ``{"action": "upgrade", "protocol": "binary"}`` as its first
+request; the server acknowledges with a framed JSON message, and every
+later message on that connection is a frame holding:
+
+- request: opcode (1 byte), algo length (1 byte) and algo, dataset length
+  (1 byte) and dataset (empty for the configured data file), then the
+  UTF-8 query as the rest of the frame;
+- response: status (1 byte), search time in nanoseconds (8 bytes), log id
+  (16-byte UUID, zero on error), then a UTF-8 error message on errors;
+  status ``STATUS_BUSY`` means the request was shed and can be retried.
+"""
+
+import socket
+import struct
+from typing import NamedTuple, Optional, Union
+
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+JSON_PROTOCOL = "json"
+BINARY_PROTOCOL = "binary"
+BINARY_VERSION = 1
+
+# Request opcodes
+OP_QUERY = 0x01
+
+# Response status bytes
+STATUS_NOT_FOUND = 0x00
+STATUS_EXISTS = 0x01
+STATUS_ERROR = 0x02
+STATUS_BUSY = 0x03
+
+_REQUEST_HEAD = struct.Struct("!BB")
+_RESPONSE_HEAD = struct.Struct("!BQ16s")
+_NO_ID = bytes(16)
+
+
+class BinaryQuery(NamedTuple):
+    """A decoded binary query request."""
+    opcode: int
+    algo: str
+    dataset: Optional[str]
+    query: str
+
+
+class BinaryResult(NamedTuple):
+    """A decoded binary response."""
+    status: int
+    execution_ns: int
+    log_id: Optional[str]
+    error: Optional[str]
+
+
+def encode_frame(payload: Union[bytes, str]) -> bytes:
+    """
+    Prefix a payload with its length.
+
+    Args:
+        payload (Union[bytes, str]): Message body; strings are UTF-8 encoded.
+
+    Returns:
+        bytes: The framed message.
+
+    Raises:
+        ValueError: If the payload exceeds ``MAX_FRAME_SIZE``.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ValueError(
+            f"Frame too large: {len(payload)} > {MAX_FRAME_SIZE} bytes"
+        )
+    return HEADER.pack(len(payload)) + payload
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Read exactly ``size`` bytes from a socket.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        size (int): Number of bytes to read.
+
+    Returns:
+        bytes: The bytes read.
+
+    Raises:
+        ConnectionError: If the peer closes the connection early.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError(
+                f"Connection closed after {received} of {size} bytes"
+            )
+        received += count
+    return bytes(buffer)
+
+
+def read_frame(sock: socket.socket, max_size: int = MAX_FRAME_SIZE) -> bytes:
+    """
+    Read one length-prefixed frame from a socket.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        max_size (int): Largest payload accepted.
+
+    Returns:
+        bytes: The frame payload.
+
+    Raises:
+        BufferError: If the announced length exceeds ``max_size``.
+        ConnectionError: If the peer closes the connection mid-frame.
+    """
+    (length,) = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    if length > max_size:
+        raise BufferError(
+            f"Frame too large. Max allowed: {max_size} bytes"
+        )
+    return recv_exactly(sock, length)
+
+
+def encode_query(
+    query: str,
+    algo: str,
+    dataset: Optional[str] = None
+) -> bytes:
+    """
+    Build the payload of a binary query request.
+
+    Args:
+        query (str): The string to search for.
+        algo (str): Search mode.
+        dataset (Optional[str]): Named dataset, or None for the default.
+
+    Returns:
+        bytes: The payload, to be sent with ``encode_frame``.
+
+    Raises:
+        ValueError: If ``algo`` or ``dataset`` exceeds 255 bytes.
+    """
+    algo_bytes = algo.encode("utf-8")
+    dataset_bytes = (dataset or "").encode("utf-8")
+    if len(algo_bytes) > 255 or len(dataset_bytes) > 255:
+        raise ValueError("algo and dataset must be at most 255 bytes")
+    return b"".join((
+        _REQUEST_HEAD.pack(OP_QUERY, len(algo_bytes)),
+        algo_bytes,
+        bytes((len(dataset_bytes),)),
+        dataset_bytes,
+        query.encode("utf-8"),
+    ))
+
+
+def decode_query(payload: bytes) -> BinaryQuery:
+    """
+    Parse a binary request payload.
+
+    Args:
+        payload (bytes): One frame's payload.
+
+    Returns:
+        BinaryQuery: The opcode and fields. Opcodes other than
+        ``OP_QUERY`` are returned with empty fields.
+
+    Raises:
+        ValueError: If the payload is truncated or not valid UTF-8.
+    """
+    if len(payload) < _REQUEST_HEAD.size:
+        raise ValueError("Truncated binary request")
+    opcode, algo_length = _REQUEST_HEAD.unpack_from(payload)
+    if opcode != OP_QUERY:
+        return BinaryQuery(opcode, "", None, "")
+    offset = _REQUEST_HEAD.size + algo_length
+    if len(payload) <= offset:
+        raise ValueError("Truncated binary request")
+    algo = payload[_REQUEST_HEAD.size:offset].decode("utf-8")
+    dataset_length = payload[offset]
+    offset += 1
+    dataset = payload[offset:offset + dataset_length].decode("utf-8")
+    offset += dataset_length
+    if len(payload) < offset:
+        raise ValueError("Truncated binary request")
+    return BinaryQuery(
+        opcode, algo, dataset or None, payload[offset:].decode("utf-8")
+    )
+
+
+def encode_result(
+    status: int,
+    execution_ns: int = 0,
+    log_id: Optional[str] = None,
+    error: Optional[str] = None
+) -> bytes:
+    """
+    Build the payload of a binary response.
+
+    Args:
+        status (int): ``STATUS_EXISTS``, ``STATUS_NOT_FOUND``,
+            ``STATUS_ERROR`` or ``STATUS_BUSY``.
+        execution_ns (int): Search time in nanoseconds.
+        log_id (Optional[str]): UUID of the stored log entry.
+        error (Optional[str]): Message for ``STATUS_ERROR``, or the shed
+            reason for ``STATUS_BUSY``.
+
+    Returns:
+        bytes: The payload, to be sent with ``encode_frame``.
+    """
+    raw_id = _NO_ID
+    if log_id:
+        try:
+            # Much cheaper than uuid.UUID(); ids are canonical uuid4 strings
+            raw_id = bytes.fromhex(log_id.replace("-", ""))
+        except ValueError:
+            pass
+        if len(raw_id) != 16:
+            raw_id = _NO_ID
+    head = _RESPONSE_HEAD.pack(status, max(0, execution_ns), raw_id)
+    return (head + error.encode("utf-8")) if error else head
+
+
+def decode_result(payload: bytes) -> BinaryResult:
+    """
+    Parse a binary response payload.
+
+    Args:
+        payload (bytes): One frame's payload.
+
+    Returns:
+        BinaryResult: Status, search time, log id and error message.
+
+    Raises:
+        ValueError: If the payload is truncated.
+    """
+    if len(payload) < _RESPONSE_HEAD.size:
+        raise ValueError("Truncated binary response")
+    status, execution_ns, raw_id = _RESPONSE_HEAD.unpack_from(payload)
+    error = payload[_RESPONSE_HEAD.size:].decode("utf-8") or None
+    log_id = None
+    if raw_id != _NO_ID:
+        digits = raw_id.hex()
+        log_id = (
+            f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-"
+            f"{digits[16:20]}-{digits[20:]}"
+        )
+    return BinaryResult(status, execution_ns, log_id, error)
+
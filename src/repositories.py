@@ -1,15 +1,132 @@
 import os
+import re
+import functools
+import bisect
+import gzip
+import heapq
+import math
+import shutil
+import sqlite3
+import sys
 import time
 import json
+import codecs
+import tempfile
 import threading
 import logging
+import unicodedata
+from array import array
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict, Callable, cast, Any, Set, Union
+from typing import (
+    List, Optional, Tuple, Dict, Callable, cast, Any, Set, Union, Iterator,
+    Iterable, NamedTuple, FrozenSet
+)
+from columns import ColumnExtractor
+from locate import LineIndex
+from log_codec import MAGIC, LogDecoder, LogEncoder
+from memory import (
+    deep_sizeof, format_bytes, project_build_bytes, project_data_bytes,
+    shared_ids, traced
+)
 from models import Log
+from wal import ADD, REMOVE, WriteAheadLog, apply_entries, check_key
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Percentiles reported by aggregate_by_mode when none are requested
+DEFAULT_PERCENTILES: Tuple[float, ...] = (50, 90, 99)
+
+# Whitespace, separators and the opening bracket between array entries
+_ENTRY_GAP = re.compile(r'[\s,\[]*')
+
+
+class LogFilter:
+    """
+    Server-side predicate over stored log entries.
+
+    All criteria are optional and combined with AND.
+    """
+
+    FIELDS = ('since', 'until', 'ip', 'status', 'query_prefix')
+
+    def __init__(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        ip: Optional[str] = None,
+        status: Optional[Union[bool, str]] = None,
+        query_prefix: Optional[str] = None
+    ) -> None:
+        """
+        Args:
+            since (Optional[str]): ISO timestamp; entries at or after it.
+            until (Optional[str]): ISO timestamp; entries strictly before it.
+            ip (Optional[str]): Exact requesting IP.
+            status (Optional[Union[bool, str]]): True/False, or
+                'STRING_EXISTS'/'STRING_NOT_FOUND'.
+            query_prefix (Optional[str]): Prefix the query must start with.
+
+        Raises:
+            ValueError: If a timestamp or status cannot be parsed.
+        """
+        self.since = datetime.fromisoformat(since) if since else None
+        self.until = datetime.fromisoformat(until) if until else None
+        self.ip = ip
+        self.status = self._parse_status(status)
+        self.query_prefix = query_prefix
+
+    @classmethod
+    def from_dict(cls, filters: Optional[Dict[str, Any]]) -> 'LogFilter':
+        """
+        Build a filter from a request dictionary.
+
+        Raises:
+            ValueError: If an unknown filter key is supplied.
+        """
+        filters = filters or {}
+        unknown = set(filters) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        return cls(**filters)
+
+    @staticmethod
+    def _parse_status(status: Optional[Union[bool, str]]) -> Optional[bool]:
+        if status is None or isinstance(status, bool):
+            return status
+        normalized = str(status).strip().upper()
+        if normalized in ('STRING_EXISTS', 'TRUE', 'FOUND'):
+            return True
+        if normalized in ('STRING_NOT_FOUND', 'FALSE', 'NOT_FOUND'):
+            return False
+        raise ValueError(f"Invalid status filter: {status}")
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        """Return True if the log entry satisfies every criterion."""
+        if self.ip is not None and entry.get('requesting_ip') != self.ip:
+            return False
+        if self.status is not None and entry.get('status') != self.status:
+            return False
+        if self.query_prefix is not None and not str(
+            entry.get('query', '')
+        ).startswith(self.query_prefix):
+            return False
+        if self.since is not None or self.until is not None:
+            raw = entry.get('timestamp')
+            if not raw:
+                return False
+            try:
+                timestamp = datetime.fromisoformat(str(raw))
+            except ValueError:
+                return False
+            if self.since is not None and timestamp < self.since:
+                return False
+            if self.until is not None and timestamp >= self.until:
+                return False
+        return True
+
 
 class LogRepository:
     """
@@ -53,12 +170,26 @@ class LogRepository:
         with self._lock:
             try:
                 logs = self.read_logs()
-                logs.append(log.__dict__)  # Assumes Log is JSON-serializable
-                with open(self.filepath, 'w') as f:
-                    json.dump(logs, f, default=str, indent=4)
+                logs.append(log.to_dict())
+                self._write_logs(logs)
             except Exception as e:
                 logger.exception("Failed to create log: %s", e)
 
+    def create_logs(self, logs: List[Log]) -> None:
+        """
+        Appends several log entries with a single rewrite of the file.
+
+        Args:
+            logs (List[Log]): The log instances to persist.
+        """
+        with self._lock:
+            try:
+                entries = self.read_logs()
+                entries.extend(log.to_dict() for log in logs)
+                self._write_logs(entries)
+            except Exception as e:
+                logger.exception("Failed to create logs: %s", e)
+
     def read_logs(self) -> List[Dict]:
         """
         Reads all log entries from the file.
@@ -80,6 +211,121 @@ class LogRepository:
             logger.exception("Failed to read logs: %s", e)
             return []
 
+    def _write_logs(self, logs: List[Dict]) -> None:
+        """
+        Atomically replaces the log file with the given entries.
+
+        The new content is written to a temporary file in the same directory
+        and moved into place, so concurrent readers streaming the old file
+        keep a consistent view.
+
+        Args:
+            logs (List[Dict]): Entries to persist.
+        """
+        directory = os.path.dirname(os.path.abspath(self.filepath))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(logs, f, default=str, indent=4)
+            os.replace(tmp_path, self.filepath)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def iter_logs(
+        self,
+        start: int = 0,
+        chunk_size: int = 64 * 1024
+    ) -> Iterator[Tuple[int, Dict]]:
+        """
+        Streams log entries from the file without loading it whole.
+
+        Entries are decoded one at a time from a buffer of at most a chunk
+        plus one entry, so memory stays flat regardless of file size.
+
+        Args:
+            start (int): Byte offset to resume from; 0 for the beginning,
+                otherwise a value previously yielded by this method.
+            chunk_size (int): Number of bytes read per I/O call.
+
+        Yields:
+            Tuple[int, Dict]: Byte offset just past the entry, and the entry.
+        """
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            f = open(self.filepath, 'rb')
+        except OSError as e:
+            logger.exception("Failed to open log file: %s", e)
+            return
+
+        with f:
+            f.seek(start)
+            buf = ''
+            pos = 0
+            offset = start  # byte offset of buf[pos]
+            eof = False
+
+            while True:
+                gap_end = _ENTRY_GAP.match(buf, pos).end()
+                # Separators are ASCII, so characters equal bytes here
+                offset += gap_end - pos
+                pos = gap_end
+
+                if pos < len(buf) and buf[pos] == ']':
+                    return
+
+                if pos < len(buf):
+                    try:
+                        entry, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        entry = None
+                    if entry is not None:
+                        offset += len(buf[pos:end].encode('utf-8'))
+                        pos = end
+                        yield offset, entry
+                        continue
+
+                if eof:
+                    if pos < len(buf):
+                        logger.error(
+                            "Invalid JSON in log file at byte %d", offset
+                        )
+                    return
+
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+                pos = 0
+
+    def query_logs(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = 100,
+        log_filter: Optional[LogFilter] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Returns one page of entries matching a filter.
+
+        Args:
+            cursor (Optional[int]): Opaque position returned by a previous
+                call, or None to start from the oldest entry.
+            limit (int): Maximum number of entries in the page.
+            log_filter (Optional[LogFilter]): Criteria entries must satisfy.
+
+        Returns:
+            Tuple[List[Dict], Optional[int]]: The page and the cursor of the
+            next page, or None when the log is exhausted.
+        """
+        page: List[Dict] = []
+        for next_offset, entry in self.iter_logs(cursor or 0):
+            if log_filter is None or log_filter.matches(entry):
+                page.append(entry)
+                if len(page) >= limit:
+                    return page, next_offset
+        return page, None
+
     def update_log(self, log_id: str, updates: Dict) -> bool:
         """
         Updates a log entry by ID.
@@ -97,8 +343,7 @@ class LogRepository:
                 for log in logs:
                     if log['id'] == log_id:
                         log.update(updates)
-                        with open(self.filepath, 'w') as f:
-                            json.dump(logs, f, default=str, indent=4)
+                        self._write_logs(logs)
                         return True
                 return False
             except Exception as e:
@@ -120,206 +365,2663 @@ class LogRepository:
                 logs = self.read_logs()
                 updated_logs = [log for log in logs if log['id'] != log_id]
                 if len(updated_logs) < len(logs):
-                    with open(self.filepath, 'w') as f:
-                        json.dump(updated_logs, f, default=str, indent=4)
+                    self._write_logs(updated_logs)
                     return True
                 return False
             except Exception as e:
                 logger.exception("Failed to delete log: %s", e)
                 return False
 
+    def get_log(self, log_id: str) -> Optional[Dict]:
+        """
+        Finds a single log entry by ID, streaming over the file.
 
-# Define search data types
-SearchDataType = Union[
-    List[str],  # For naive and binary search
-    Set[str],   # For set search
-    Dict[str, bool],  # For dict search
-    Dict[int, str],   # For index map search
-    Dict[str, Any]    # For trie search
-]
+        Args:
+            log_id (str): ID of the log to fetch.
 
+        Returns:
+            Optional[Dict]: The entry, or None if no entry has that ID.
+        """
+        for _, entry in self.iter_logs():
+            if entry.get('id') == log_id:
+                return entry
+        return None
 
-class StorageRepository:
+    def aggregate_by_mode(
+        self,
+        percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Computes hit ratio and latency percentiles per search mode.
+
+        Args:
+            percentiles (Tuple[float, ...]): Percentiles to report (0-100).
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Per-mode 'count', 'hit_ratio' and
+            'p<N>' execution times in seconds.
+        """
+        return _aggregate_entries(
+            (entry for _, entry in self.iter_logs()), percentiles
+        )
+
+
+def _percentile_key(p: float) -> str:
+    """Name of the summary field holding percentile ``p``."""
+    return f"p{p:g}".replace('.', '_')
+
+
+def _nearest_rank(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def _aggregate_entries(
+    entries: Iterator[Dict[str, Any]],
+    percentiles: Tuple[float, ...]
+) -> Dict[str, Dict[str, Any]]:
     """
-    Handles data loading and searching with multiple search modes.
+    Computes per-mode count, hit ratio and latency percentiles in Python.
 
-    Supports naive, set, dictionary, index map, binary search, and trie search.
+    Used by the file-based repositories; SQLiteLogRepository computes the
+    same figures in SQL.
+    """
+    hits: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    latencies: Dict[str, List[float]] = {}
+    for entry in entries:
+        mode = entry.get('mode') or 'unknown'
+        counts[mode] = counts.get(mode, 0) + 1
+        hits[mode] = hits.get(mode, 0) + (1 if entry.get('status') else 0)
+        if entry.get('execution_time') is not None:
+            latencies.setdefault(mode, []).append(
+                float(entry['execution_time'])
+            )
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for mode, count in counts.items():
+        values = sorted(latencies.get(mode, []))
+        row: Dict[str, Any] = {
+            'count': count,
+            'hit_ratio': hits[mode] / count,
+        }
+        for p in percentiles:
+            row[_percentile_key(p)] = _nearest_rank(values, p)
+        summary[mode] = row
+    return summary
+
+
+class SQLiteLogRepository:
     """
+    Persists Log objects in an SQLite database running in WAL mode.
 
-    def __init__(self) -> None:
-        self.data: Optional[List[str]] = None
-        self.search_data: Optional[SearchDataType] = None
-        self.mode: str = 'naive'
-        self.last_loaded_file: Optional[str] = None
-        self.max_rows = 250_000
+    Offers the same interface as LogRepository, plus lookups and
+    aggregations that are answered by indexed SQL rather than a file scan.
+    Inserts are buffered and written in batches with ``executemany``; the
+    buffer is flushed when it reaches ``batch_size``, after
+    ``flush_interval`` seconds, and before every read so callers always see
+    their own writes. Statements use fixed SQL text with bound parameters,
+    so the sqlite3 statement cache reuses the prepared statements.
+    """
 
-    def load_file(self, filepath: str) -> bool:
+    _SCHEMA = (
         """
-        Loads data from a file, enforcing a maximum row limit.
+        CREATE TABLE IF NOT EXISTS logs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            query TEXT,
+            requesting_ip TEXT,
+            execution_time REAL,
+            timestamp TEXT,
+            status INTEGER,
+            mode TEXT,
+            phases TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_ip ON logs (requesting_ip)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_query ON logs (query)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_mode_time "
+        "ON logs (mode, execution_time)",
+    )
+    _COLUMNS = (
+        'id', 'query', 'requesting_ip', 'execution_time',
+        'timestamp', 'status', 'mode', 'phases'
+    )
+    _INSERT = (
+        "INSERT OR REPLACE INTO logs "
+        "(id, query, requesting_ip, execution_time, timestamp, status, "
+        "mode, phases) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    _SELECT = (
+        "SELECT seq, id, query, requesting_ip, execution_time, timestamp, "
+        "status, mode, phases FROM logs"
+    )
 
-        Args:
-            filepath (str): Path to the file.
+    def __init__(
+        self,
+        filepath: Optional[Path] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.5
+    ) -> None:
+        """
+        Opens (and if needed creates) the database.
 
-        Returns:
-            bool: True if successfully loaded, else False.
+        Args:
+            filepath (Optional[Path]): Database path. If None, uses
+                data/logs/logs.db under the project root.
+            batch_size (int): Buffered inserts that trigger a flush.
+            flush_interval (float): Seconds after which buffered inserts are
+                flushed by a background thread; 0 disables the thread.
         """
-        try:
-            if not os.path.isfile(filepath):
-                logger.error(f"File not found: {filepath}")
-                return False
+        if filepath is None:
+            ROOT_DIR = Path(__file__).resolve().parents[1]
+            filepath = ROOT_DIR / 'data' / 'logs' / 'logs.db'
+        self.filepath: Path = filepath
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._closed = threading.Event()
 
-            with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.read().splitlines()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            for statement in self._SCHEMA:
+                conn.execute(statement)
 
-            if len(lines) > self.max_rows:
-                logger.error(
-                    f"File exceeds max row limit of {self.max_rows}. "
-                    f"Found: {len(lines)}"
-                )
-                return False
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically,
+                name="sqlite-log-flush",
+                daemon=True,
+            )
+            self._flusher.start()
 
-            self.data = lines
-            self.last_loaded_file = filepath
-            logger.info(f"Loaded {len(lines)} lines from {filepath}")
-            return True
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.filepath), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @classmethod
+    def _to_row(cls, entry: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Converts a log dictionary into an INSERT parameter tuple."""
+        timestamp = entry.get('timestamp')
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        status = entry.get('status')
+        phases = entry.get('phases')
+        return (
+            entry.get('id'),
+            entry.get('query'),
+            entry.get('requesting_ip'),
+            entry.get('execution_time'),
+            timestamp,
+            None if status is None else int(bool(status)),
+            entry.get('mode'),
+            json.dumps(phases) if phases is not None else None,
+        )
+
+    @classmethod
+    def _from_row(cls, row: Tuple[Any, ...]) -> Dict[str, Any]:
+        """Converts a SELECT row (minus seq) back into a log dictionary."""
+        entry = dict(zip(cls._COLUMNS, row))
+        if entry['status'] is not None:
+            entry['status'] = bool(entry['status'])
+        if entry['phases'] is not None:
+            entry['phases'] = json.loads(entry['phases'])
+        return entry
+
+    def flush(self) -> None:
+        """Writes all buffered inserts in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(self._INSERT, rows)
+            except Exception as e:
+                logger.exception("Failed to flush %d logs: %s", len(rows), e)
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Flushes pending inserts and stops the background flusher."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def create_log(self, log: Log) -> None:
+        """
+        Buffers a log entry for the next batched insert.
 
+        Args:
+            log (Log): The log instance to persist.
+        """
+        try:
+            row = self._to_row(log.to_dict())
         except Exception as e:
-            logger.exception(f"Failed to load file: {e}")
-            return False
+            logger.exception("Failed to create log: %s", e)
+            return
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
 
-    def prepare(self, mode: str = 'naive') -> None:
-        if self.data is None:
-            msg = "No data loaded. Call load_file() first."
-            if self.last_loaded_file:
-                msg += f" Last attempt was: {self.last_loaded_file}"
-            raise ValueError(msg)
+    def create_logs(self, logs: List[Log]) -> None:
+        """
+        Inserts several log entries in one transaction.
+
+        Args:
+            logs (List[Log]): The log instances to persist.
+        """
+        rows = [self._to_row(log.to_dict()) for log in logs]
+        with self._lock:
+            self._pending.extend(rows)
+        self.flush()
 
-        # Safely cast self.data to List[str] since we've checked it's not None
-        data: List[str] = self.data
+    def read_logs(self) -> List[Dict]:
+        """
+        Reads all log entries, oldest first.
 
-        valid_modes = ['set', 'dict', 'index_map', 'binary', 'trie', 'naive']
-        self.mode = mode if mode in valid_modes else 'naive'
+        Returns:
+            List[Dict]: List of logs as dictionaries.
+        """
+        return [entry for _, entry in self.iter_logs()]
 
-        mode_map: Dict[str, Callable[[], SearchDataType]] = {
-            'set': lambda: set(data),
-            'dict': lambda: {word: True for word in data},
-            'index_map': lambda: {i: word for i, word in enumerate(data)},
-            'binary': lambda: sorted(data),
-            'trie': lambda: self._build_trie(data),
-            'naive': lambda: data,
-        }
+    def iter_logs(self, start: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """
+        Streams log entries in insertion order.
 
+        Args:
+            start (int): Cursor to resume after; 0 for the beginning.
+
+        Yields:
+            Tuple[int, Dict]: The entry's cursor and the entry.
+        """
+        self.flush()
         try:
-            self.search_data = mode_map.get(self.mode, mode_map['naive'])()
-            logger.info(
-                f"Prepared search mode '{self.mode}' "
-                f"with {len(data)} items."
+            cursor = self._connection().execute(
+                self._SELECT + " WHERE seq > ? ORDER BY seq", (start,)
             )
+            for row in cursor:
+                yield row[0], self._from_row(row[1:])
         except Exception as e:
-            logger.exception(f"Error preparing search mode '{self.mode}': {e}")
-            self.mode = 'naive'
-            self.search_data = data
-            logger.info("Falling back to 'naive' mode.")
+            logger.exception("Failed to read logs: %s", e)
 
-    def _build_trie(self, words: List[str]) -> Dict[str, Any]:
+    def query_logs(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = 100,
+        log_filter: Optional[LogFilter] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
         """
-        Builds a trie data structure from a list of words.
+        Returns one page of entries matching a filter, evaluated in SQL.
 
         Args:
-            words (List[str]): Words to include in trie.
+            cursor (Optional[int]): Cursor returned by a previous call.
+            limit (int): Maximum number of entries in the page.
+            log_filter (Optional[LogFilter]): Criteria entries must satisfy.
 
         Returns:
-            Dict[str, Any]: Trie structure.
+            Tuple[List[Dict], Optional[int]]: The page and the next cursor,
+            or None when no further entries match.
         """
-        trie: Dict[str, Any] = {}
-        for word in words:
-            if not word:
-                continue
-            node = trie
-            for char in word:
-                node = node.setdefault(char, {})
-            node['#'] = True  # End of word marker
-        return trie
+        self.flush()
+        clauses = ["seq > ?"]
+        params: List[Any] = [cursor or 0]
+        if log_filter is not None:
+            if log_filter.ip is not None:
+                clauses.append("requesting_ip = ?")
+                params.append(log_filter.ip)
+            if log_filter.status is not None:
+                clauses.append("status = ?")
+                params.append(int(log_filter.status))
+            if log_filter.query_prefix:
+                # A range keeps the query index usable, unlike LIKE
+                clauses.append("query >= ? AND query < ?")
+                params.extend([
+                    log_filter.query_prefix,
+                    log_filter.query_prefix + '\U0010ffff',
+                ])
+            if log_filter.since is not None:
+                clauses.append("timestamp >= ?")
+                params.append(log_filter.since.isoformat())
+            if log_filter.until is not None:
+                clauses.append("timestamp < ?")
+                params.append(log_filter.until.isoformat())
+
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
+        try:
+            rows = self._connection().execute(
+                self._SELECT + " WHERE " + " AND ".join(clauses)
+                + " ORDER BY seq LIMIT ?",
+                params,
+            ).fetchall()
+        except Exception as e:
+            logger.exception("Failed to query logs: %s", e)
+            return [], None
+
+        page = [self._from_row(row[1:]) for row in rows[:limit]]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return page, next_cursor
 
-    def search(self, target: str) -> Tuple[bool, float]:
+    def get_log(self, log_id: str) -> Optional[Dict]:
         """
-        Searches for a word using the currently prepared mode.
+        Fetches a single log entry by ID.
 
         Args:
-            target (str): Word to search.
+            log_id (str): ID of the log to fetch.
 
         Returns:
-            Tuple[bool, float]: (Found or not, time taken in seconds)
+            Optional[Dict]: The entry, or None if no entry has that ID.
+        """
+        self.flush()
+        row = self._connection().execute(
+            self._SELECT + " WHERE id = ?", (log_id,)
+        ).fetchone()
+        return self._from_row(row[1:]) if row else None
 
-        Raises:
-            ValueError: If search data has not been prepared.
+    def update_log(self, log_id: str, updates: Dict) -> bool:
         """
-        if self.search_data is None:
-            raise ValueError("Search data not prepared. Call prepare() first.")
+        Updates a log entry by ID.
 
-        if not target:
-            logger.warning("Empty search target provided.")
-            return False, 0.0
+        Args:
+            log_id (str): ID of the log to update.
+            updates (Dict): Dictionary of fields to update.
 
-        search_method = getattr(self, f"{self.mode}_search", self.naive_search)
-        start = time.perf_counter()
-        result = search_method(target)
-        end = time.perf_counter()
-        execution_time = end - start
+        Returns:
+            bool: True if log was updated, False otherwise.
+        """
+        columns = [c for c in updates if c in self._COLUMNS and c != 'id']
+        if not columns:
+            return False
+        values = dict(zip(self._COLUMNS, self._to_row(updates)))
+        self.flush()
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE logs SET "
+                    + ", ".join(f"{c} = ?" for c in columns)
+                    + " WHERE id = ?",
+                    [values[c] for c in columns] + [log_id],
+                )
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.exception("Failed to update log: %s", e)
+            return False
 
-        logger.info(
-            f"Search '{target}' with mode '{self.mode}' "
-            f"took {execution_time:.6f}s. Found: {result}"
+    def delete_log(self, log_id: str) -> bool:
+        """
+        Deletes a log entry by ID.
+
+        Args:
+            log_id (str): ID of the log to delete.
+
+        Returns:
+            bool: True if deletion was successful, False otherwise.
+        """
+        self.flush()
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute("DELETE FROM logs WHERE id = ?", (log_id,))
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.exception("Failed to delete log: %s", e)
+            return False
+
+    def aggregate_by_mode(
+        self,
+        percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Computes hit ratio and latency percentiles per mode inside SQLite.
+
+        Percentiles use the nearest-rank method over a window function, so
+        no rows are transferred to Python.
+
+        Args:
+            percentiles (Tuple[float, ...]): Percentiles to report (0-100).
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Per-mode 'count', 'hit_ratio' and
+            'p<N>' execution times in seconds.
+        """
+        self.flush()
+        percentile_columns = ", ".join(
+            "MIN(CASE WHEN rn >= ? * n_timed THEN execution_time END)"
+            for _ in percentiles
         )
-        return result, execution_time
+        sql = f"""
+            WITH ranked AS (
+                SELECT
+                    COALESCE(mode, 'unknown') AS mode,
+                    status,
+                    execution_time,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY COALESCE(mode, 'unknown'),
+                                     execution_time IS NULL
+                        ORDER BY execution_time
+                    ) AS rn,
+                    COUNT(execution_time) OVER (
+                        PARTITION BY COALESCE(mode, 'unknown')
+                    ) AS n_timed
+                FROM logs
+            )
+            SELECT mode, COUNT(*), AVG(COALESCE(status, 0)),
+                   {percentile_columns}
+            FROM ranked
+            GROUP BY mode
+        """
+        try:
+            rows = self._connection().execute(
+                sql, [p / 100 for p in percentiles]
+            ).fetchall()
+        except Exception as e:
+            logger.exception("Failed to aggregate logs: %s", e)
+            return {}
 
-    # --- Search implementations below ---
+        summary: Dict[str, Dict[str, Any]] = {}
+        for mode, count, hit_ratio, *values in rows:
+            row: Dict[str, Any] = {'count': count, 'hit_ratio': hit_ratio}
+            for p, value in zip(percentiles, values):
+                row[_percentile_key(p)] = value
+            summary[mode] = row
+        return summary
 
-    def naive_search(self, target: str) -> bool:
-        """Naive linear search."""
-        assert self.search_data is not None
-        data = cast(List[str], self.search_data)
-        return target in data
 
-    def set_search(self, target: str) -> bool:
-        """Search using a set."""
-        assert self.search_data is not None
-        data = cast(Set[str], self.search_data)
-        return target in data
+class SegmentedLogRepository:
+    """
+    Persists Log objects as JSON lines across rolling segment files.
 
-    def dict_search(self, target: str) -> bool:
-        """Search using a dictionary."""
-        assert self.search_data is not None
-        data = cast(Dict[str, bool], self.search_data)
-        return target in data
+    New entries are appended to the active segment, which is sealed and
+    replaced when it exceeds ``max_segment_bytes`` or ``max_segment_age``
+    seconds. ``update_log`` and ``delete_log`` append tombstone records
+    instead of rewriting history; reads apply pending tombstones on the fly.
+    A background maintenance thread rolls aged segments, deletes or archives
+    segments past the retention window, and compacts sealed segments by
+    folding tombstones into the entries they target. Appends never touch
+    older segments, so recent-log operations stay cheap as history grows,
+    and retention keeps disk use bounded.
 
-    def index_map_search(self, target: str) -> bool:
-        """Search values in an index map."""
-        assert self.search_data is not None
-        data = cast(Dict[int, str], self.search_data)
-        return target in data.values()
+    Cursors encode a segment number and a byte offset within it.
 
-    def binary_search(self, target: str) -> bool:
-        """Binary search (requires sorted list)."""
-        assert self.search_data is not None
-        data = cast(List[str], self.search_data)
-        low, high = 0, len(data) - 1
-        while low <= high:
-            mid = (low + high) // 2
-            if data[mid] == target:
-                return True
-            elif data[mid] < target:
-                low = mid + 1
-            else:
-                high = mid - 1
-        return False
+    Records are JSON lines by default; ``record_format='binary'`` stores them
+    in the compact encoding of ``log_codec`` instead, with one string table
+    per segment.
+    """
 
-    def trie_search(self, target: str) -> bool:
-        """Search using a trie."""
-        assert self.search_data is not None
-        node = cast(Dict[str, Any], self.search_data)
-        for char in target:
-            if char not in node:
+    SEGMENT_PREFIX = 'segment-'
+    SEGMENT_SUFFIXES = {'json': '.jsonl', 'binary': '.logb'}
+    _OFFSET_BITS = 40
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_segment_bytes: int = 8 * 1024 * 1024,
+        max_segment_age: float = 3600.0,
+        retention_seconds: Optional[float] = 7 * 24 * 3600.0,
+        archive: bool = False,
+        maintenance_interval: float = 30.0,
+        record_format: str = 'json'
+    ) -> None:
+        """
+        Opens the segment directory, creating it if necessary.
+
+        Args:
+            directory (Optional[Path]): Segment directory. If None, uses
+                data/logs/segments under the project root.
+            max_segment_bytes (int): Size at which the active segment rolls.
+            max_segment_age (float): Age in seconds at which it rolls.
+            retention_seconds (Optional[float]): Sealed segments last written
+                longer ago than this are removed; None keeps everything.
+            archive (bool): Gzip expired segments into ``archive/`` instead
+                of deleting them.
+            maintenance_interval (float): Seconds between background
+                maintenance passes; 0 disables the thread.
+            record_format (str): 'json' or 'binary'.
+
+        Raises:
+            ValueError: If the record format is unknown.
+        """
+        if record_format not in self.SEGMENT_SUFFIXES:
+            raise ValueError(f"Unknown log record format: {record_format}")
+        if directory is None:
+            ROOT_DIR = Path(__file__).resolve().parents[1]
+            directory = ROOT_DIR / 'data' / 'logs' / 'segments'
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.retention_seconds = retention_seconds
+        self.archive = archive
+        self.maintenance_interval = maintenance_interval
+        self.record_format = record_format
+        self._suffix = self.SEGMENT_SUFFIXES[record_format]
+        self._binary = record_format == 'binary'
+        self._header_size = len(MAGIC) if self._binary else 0
+        self._encoder: Optional[LogEncoder] = None
+
+        self._lock = threading.RLock()
+        # Pending effects of update/delete not yet folded into sealed
+        # segments: id -> {'deleted': bool, 'updates': dict}
+        self._tombstones: Dict[str, Dict[str, Any]] = {}
+        # Set when a tombstone or a newly sealed segment awaits compaction
+        self._needs_compaction = False
+        self._active_seq = 0
+        self._active_created = time.time()
+        self._active_file: Optional[Any] = None
+
+        segments = self._segments()
+        for seq in segments:
+            for _, record in self._read_segment(seq):
+                if '_op' in record:
+                    self._record_tombstone(record, seq)
+        if segments:
+            self._active_seq = segments[-1]
+            self._active_created = self._segment_path(
+                self._active_seq
+            ).stat().st_ctime
+        else:
+            self._active_seq = 1
+        self._open_active()
+
+        self._stopped = threading.Event()
+        self._maintainer: Optional[threading.Thread] = None
+        if maintenance_interval > 0:
+            self._maintainer = threading.Thread(
+                target=self._maintain_periodically,
+                name="log-segment-maintenance",
+                daemon=True,
+            )
+            self._maintainer.start()
+
+    # --- Segment bookkeeping ---
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / (
+            f"{self.SEGMENT_PREFIX}{seq:08d}{self._suffix}"
+        )
+
+    def _segments(self) -> List[int]:
+        """Returns the sequence numbers of all segments, oldest first."""
+        seqs = []
+        for path in self.directory.glob(
+            f"{self.SEGMENT_PREFIX}*{self._suffix}"
+        ):
+            number = path.name[len(self.SEGMENT_PREFIX):-len(self._suffix)]
+            if number.isdigit():
+                seqs.append(int(number))
+        return sorted(seqs)
+
+    def _open_active(self) -> None:
+        path = self._segment_path(self._active_seq)
+        if not self._binary:
+            self._active_file = open(path, 'a', encoding='utf-8')
+            return
+
+        # Rebuild the segment's string table so appends can reference it,
+        # and cut off a record left half-written by a crash.
+        data = path.read_bytes() if path.exists() else b''
+        end = len(MAGIC)
+        for end, _ in LogDecoder().iter_records(data):
+            pass
+        decoder = LogDecoder()
+        for _ in decoder.iter_records(data[:end]):
+            pass
+        self._active_file = open(path, 'ab')
+        if not data:
+            self._active_file.write(MAGIC)
+            self._active_file.flush()
+        elif len(data) > end:
+            self._active_file.truncate(end)
+        self._encoder = LogEncoder(decoder.strings)
+
+    def _serialize(self, records: List[Dict[str, Any]]) -> bytes:
+        """Encodes a complete segment body in the configured format."""
+        if self._binary:
+            encoder = LogEncoder()
+            out = bytearray(MAGIC)
+            for record in records:
+                out += encoder.encode(record)
+            return bytes(out)
+        return b''.join(
+            (json.dumps(record, default=str) + '\n').encode('utf-8')
+            for record in records
+        )
+
+    def _roll(self) -> None:
+        """Seals the active segment and starts a new one. Caller holds lock."""
+        if self._active_file is not None:
+            self._active_file.close()
+        self._active_seq += 1
+        self._active_created = time.time()
+        self._needs_compaction = bool(self._tombstones)
+        self._open_active()
+        logger.info("Rolled log segment %d", self._active_seq)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Appends one record to the active segment. Caller holds lock."""
+        assert self._active_file is not None
+        if (
+            self._active_file.tell() > self._header_size
+            and time.time() - self._active_created >= self.max_segment_age
+        ):
+            self._roll()
+        if self._binary:
+            assert self._encoder is not None
+            self._active_file.write(self._encoder.encode(record))
+        else:
+            self._active_file.write(json.dumps(record, default=str) + '\n')
+        self._active_file.flush()
+        if self._active_file.tell() >= self.max_segment_bytes:
+            self._roll()
+
+    def _read_segment(
+        self,
+        seq: int,
+        start: int = 0
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yields (offset past record, record) for one segment file."""
+        try:
+            f = open(self._segment_path(seq), 'rb')
+        except FileNotFoundError:
+            return
+        if self._binary:
+            with f:
+                data = f.read()
+            try:
+                yield from LogDecoder().iter_records(data, start)
+            except ValueError as e:
+                logger.error("Skipping corrupt segment %d: %s", seq, e)
+            return
+        with f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    # Partially written tail of the active segment
+                    return
+                if not line.strip():
+                    continue
+                try:
+                    yield offset, json.loads(line)
+                except json.JSONDecodeError:
+                    logger.error(
+                        "Skipping corrupt record in segment %d at byte %d",
+                        seq, offset
+                    )
+
+    def _record_tombstone(self, record: Dict[str, Any], seq: int) -> None:
+        """Merges a tombstone record written to segment ``seq``."""
+        state = self._tombstones.setdefault(
+            record['id'], {'deleted': False, 'updates': {}, 'seq': seq}
+        )
+        state['seq'] = seq
+        self._needs_compaction = True
+        if record['_op'] == 'delete':
+            state['deleted'] = True
+        elif record['_op'] == 'update':
+            state['updates'].update(record.get('updates', {}))
+
+    def _apply_tombstones(
+        self,
+        entry: Dict[str, Any],
+        tombstones: Dict[str, Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the entry with pending updates applied, or None."""
+        state = tombstones.get(entry.get('id'))
+        if state is None:
+            return entry
+        if state['deleted']:
+            return None
+        if state['updates']:
+            entry = {**entry, **state['updates']}
+        return entry
+
+    # --- Repository interface ---
+
+    def create_log(self, log: Log) -> None:
+        """
+        Appends a new log entry to the active segment.
+
+        Args:
+            log (Log): The log instance to persist.
+        """
+        with self._lock:
+            try:
+                self._append(log.to_dict())
+            except Exception as e:
+                logger.exception("Failed to create log: %s", e)
+
+    def create_logs(self, logs: List[Log]) -> None:
+        """
+        Appends several log entries to the active segment under one lock.
+
+        Args:
+            logs (List[Log]): The log instances to persist.
+        """
+        with self._lock:
+            try:
+                for log in logs:
+                    self._append(log.to_dict())
+            except Exception as e:
+                logger.exception("Failed to create logs: %s", e)
+
+    def iter_logs(self, start: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """
+        Streams live log entries, oldest first, with tombstones applied.
+
+        Args:
+            start (int): Cursor to resume from; 0 for the beginning.
+
+        Yields:
+            Tuple[int, Dict]: Cursor just past the entry, and the entry.
+        """
+        start_seq = start >> self._OFFSET_BITS
+        start_offset = start & ((1 << self._OFFSET_BITS) - 1)
+        with self._lock:
+            tombstones = dict(self._tombstones)
+        for seq in self._segments():
+            if seq < start_seq:
+                continue
+            offset = start_offset if seq == start_seq else 0
+            for end, record in self._read_segment(seq, offset):
+                if '_op' in record:
+                    continue
+                entry = self._apply_tombstones(record, tombstones)
+                if entry is not None:
+                    yield (seq << self._OFFSET_BITS) | end, entry
+
+    def read_logs(self) -> List[Dict]:
+        """
+        Reads all live log entries.
+
+        Returns:
+            List[Dict]: List of logs as dictionaries.
+        """
+        return [entry for _, entry in self.iter_logs()]
+
+    def query_logs(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = 100,
+        log_filter: Optional[LogFilter] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Returns one page of entries matching a filter.
+
+        Segments last written before the filter's ``since`` bound are
+        skipped without being read.
+
+        Args:
+            cursor (Optional[int]): Cursor returned by a previous call.
+            limit (int): Maximum number of entries in the page.
+            log_filter (Optional[LogFilter]): Criteria entries must satisfy.
+
+        Returns:
+            Tuple[List[Dict], Optional[int]]: The page and the next cursor,
+            or None when the log is exhausted.
+        """
+        start = cursor or 0
+        if log_filter is not None and log_filter.since is not None:
+            since = log_filter.since.timestamp()
+            for seq in self._segments():
+                try:
+                    last_write = self._segment_path(seq).stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if last_write >= since:
+                    start = max(start, seq << self._OFFSET_BITS)
+                    break
+
+        page: List[Dict] = []
+        for next_cursor, entry in self.iter_logs(start):
+            if log_filter is None or log_filter.matches(entry):
+                page.append(entry)
+                if len(page) >= limit:
+                    return page, next_cursor
+        return page, None
+
+    def get_log(self, log_id: str) -> Optional[Dict]:
+        """
+        Finds a log entry by ID, searching the newest segments first.
+
+        Args:
+            log_id (str): ID of the log to fetch.
+
+        Returns:
+            Optional[Dict]: The entry, or None if it does not exist.
+        """
+        with self._lock:
+            tombstones = dict(self._tombstones)
+        if tombstones.get(log_id, {}).get('deleted'):
+            return None
+        for seq in reversed(self._segments()):
+            found = None
+            for _, record in self._read_segment(seq):
+                if '_op' not in record and record.get('id') == log_id:
+                    found = record
+            if found is not None:
+                return self._apply_tombstones(found, tombstones)
+        return None
+
+    def update_log(self, log_id: str, updates: Dict) -> bool:
+        """
+        Records an update tombstone for an existing entry.
+
+        Args:
+            log_id (str): ID of the log to update.
+            updates (Dict): Dictionary of fields to update.
+
+        Returns:
+            bool: True if log was updated, False otherwise.
+        """
+        with self._lock:
+            try:
+                if self.get_log(log_id) is None:
+                    return False
+                record = {'_op': 'update', 'id': log_id, 'updates': updates}
+                self._append(record)
+                self._record_tombstone(record, self._active_seq)
+                return True
+            except Exception as e:
+                logger.exception("Failed to update log: %s", e)
+                return False
+
+    def delete_log(self, log_id: str) -> bool:
+        """
+        Records a delete tombstone for an existing entry.
+
+        Args:
+            log_id (str): ID of the log to delete.
+
+        Returns:
+            bool: True if deletion was successful, False otherwise.
+        """
+        with self._lock:
+            try:
+                if self.get_log(log_id) is None:
+                    return False
+                record = {'_op': 'delete', 'id': log_id}
+                self._append(record)
+                self._record_tombstone(record, self._active_seq)
+                return True
+            except Exception as e:
+                logger.exception("Failed to delete log: %s", e)
+                return False
+
+    def aggregate_by_mode(
+        self,
+        percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Computes hit ratio and latency percentiles per search mode.
+
+        Args:
+            percentiles (Tuple[float, ...]): Percentiles to report (0-100).
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Per-mode 'count', 'hit_ratio' and
+            'p<N>' execution times in seconds.
+        """
+        return _aggregate_entries(
+            (entry for _, entry in self.iter_logs()), percentiles
+        )
+
+    # --- Maintenance ---
+
+    def enforce_retention(self) -> List[int]:
+        """
+        Removes (or archives) sealed segments past the retention window.
+
+        Returns:
+            List[int]: Sequence numbers of the segments removed.
+        """
+        if self.retention_seconds is None:
+            return []
+        cutoff = time.time() - self.retention_seconds
+        removed = []
+        with self._lock:
+            sealed = [s for s in self._segments() if s < self._active_seq]
+        for seq in sealed:
+            path = self._segment_path(seq)
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                if self.archive:
+                    archive_dir = self.directory / 'archive'
+                    archive_dir.mkdir(exist_ok=True)
+                    with open(path, 'rb') as src, gzip.open(
+                        archive_dir / (path.name + '.gz'), 'wb'
+                    ) as dst:
+                        shutil.copyfileobj(src, dst)
+                path.unlink()
+                removed.append(seq)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.exception("Failed to expire segment %d: %s", seq, e)
+        if removed:
+            logger.info("Expired %d log segment(s)", len(removed))
+        return removed
+
+    def compact(self) -> int:
+        """
+        Folds pending tombstones into the sealed segments they affect.
+
+        Each affected sealed segment is rewritten without deleted entries
+        and tombstone records, with updates applied. A tombstone is then
+        dropped from memory if its target was rewritten, or if the
+        tombstone itself lives in a sealed segment (its target is older, so
+        it was either rewritten now or has already expired). Tombstones in
+        the active segment whose target is not sealed yet stay pending.
+
+        Returns:
+            int: Number of segments rewritten.
+        """
+        with self._lock:
+            tombstones = {
+                log_id: {
+                    'deleted': state['deleted'],
+                    'updates': dict(state['updates']),
+                    'seq': state['seq'],
+                }
+                for log_id, state in self._tombstones.items()
+            }
+            active_seq = self._active_seq
+            sealed = [s for s in self._segments() if s < active_seq]
+            self._needs_compaction = False
+
+        rewritten = 0
+        applied: Set[str] = set()
+        for seq in sealed:
+            kept: List[Dict[str, Any]] = []
+            changed = False
+            for _, record in self._read_segment(seq):
+                if '_op' in record:
+                    changed = True
+                    continue
+                log_id = record.get('id')
+                if log_id in tombstones:
+                    applied.add(log_id)
+                    changed = True
+                    record = self._apply_tombstones(record, tombstones)
+                    if record is None:
+                        continue
+                kept.append(record)
+            if not changed:
+                continue
+
+            path = self._segment_path(seq)
+            tmp_path = path.with_name(path.name + '.compact')
+            with open(tmp_path, 'wb') as f:
+                f.write(self._serialize(kept))
+            with self._lock:
+                if not path.exists():
+                    # Expired while being compacted
+                    tmp_path.unlink()
+                    continue
+                mtime = path.stat().st_mtime
+                os.replace(tmp_path, path)
+                # Keep the last-write time so retention is unaffected
+                os.utime(path, (mtime, mtime))
+            rewritten += 1
+
+        with self._lock:
+            for log_id, state in tombstones.items():
+                if log_id not in applied and state['seq'] >= active_seq:
+                    continue
+                if self._tombstones.get(log_id) == state:
+                    del self._tombstones[log_id]
+        if rewritten:
+            logger.info("Compacted %d log segment(s)", rewritten)
+        return rewritten
+
+    def maintain(self) -> None:
+        """Runs one maintenance pass: roll, expire, then compact."""
+        with self._lock:
+            if (
+                self._active_file is not None
+                and self._active_file.tell() > self._header_size
+                and time.time() - self._active_created >= self.max_segment_age
+            ):
+                self._roll()
+        self.enforce_retention()
+        if self._needs_compaction:
+            self.compact()
+
+    def _maintain_periodically(self) -> None:
+        while not self._stopped.wait(self.maintenance_interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.exception("Log segment maintenance failed: %s", e)
+
+    def close(self) -> None:
+        """Stops background maintenance and closes the active segment."""
+        self._stopped.set()
+        if self._maintainer is not None:
+            self._maintainer.join()
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.close()
+                self._active_file = None
+
+
+def create_log_repository(
+    settings: Optional[Dict[str, Any]] = None
+) -> Union[LogRepository, SQLiteLogRepository, SegmentedLogRepository]:
+    """
+    Builds the log repository selected by configuration.
+
+    Args:
+        settings (Optional[Dict[str, Any]]): The ``log_storage`` section of
+            ``server_config``. ``backend`` is 'json' (default), 'sqlite'
+            or 'segmented'; ``path`` overrides the storage location
+            (relative paths are resolved against the project root).
+            'sqlite' also accepts ``batch_size`` and ``flush_interval``;
+            'segmented' accepts ``max_segment_bytes``, ``max_segment_age``,
+            ``retention_seconds``, ``archive``, ``maintenance_interval``
+            and ``record_format`` ('json' or 'binary').
+
+    Returns:
+        The configured repository.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    settings = settings or {}
+    backend = str(settings.get('backend', 'json')).lower()
+
+    path: Optional[Path] = None
+    if settings.get('path'):
+        path = Path(str(settings['path']))
+        if not path.is_absolute():
+            path = Path(__file__).resolve().parents[1] / path
+
+    if backend == 'json':
+        return LogRepository(filepath=path)
+    if backend == 'sqlite':
+        return SQLiteLogRepository(
+            filepath=path,
+            batch_size=int(settings.get('batch_size', 100)),
+            flush_interval=float(settings.get('flush_interval', 0.5)),
+        )
+    if backend == 'segmented':
+        retention = settings.get('retention_seconds', 7 * 24 * 3600.0)
+        return SegmentedLogRepository(
+            directory=path,
+            max_segment_bytes=int(
+                settings.get('max_segment_bytes', 8 * 1024 * 1024)
+            ),
+            max_segment_age=float(settings.get('max_segment_age', 3600.0)),
+            retention_seconds=(
+                float(retention) if retention is not None else None
+            ),
+            archive=bool(settings.get('archive', False)),
+            maintenance_interval=float(
+                settings.get('maintenance_interval', 30.0)
+            ),
+            record_format=str(settings.get('record_format', 'json')).lower(),
+        )
+    raise ValueError(f"Unknown log storage backend: {backend}")
+
+
+def index_memory_limit(server_config: Dict[str, Any]) -> Optional[int]:
+    """
+    Reads ``index_memory_limit_mb`` from ``server_config``.
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+
+    Returns:
+        Optional[int]: The limit in bytes, or None when unset or zero.
+    """
+    limit_mb = server_config.get('index_memory_limit_mb')
+    if not limit_mb:
+        return None
+    return int(float(limit_mb) * 1024 * 1024)
+
+
+# Define search data types
+class SortedDelta(NamedTuple):
+    """
+    A sorted list plus a small sorted list of keys appended since it was
+    built, and the keys removed from it since; binary search looks in both
+    lists, skipping removed keys in the first, until the delta is merged
+    in.
+    """
+
+    base: List[str]
+    delta: List[str]
+    removed: FrozenSet[str] = frozenset()
+
+
+SearchDataType = Union[
+    List[str],  # For naive and binary search
+    Set[str],   # For set search
+    Dict[str, bool],  # For dict search
+    Dict[int, str],   # For index map search
+    Dict[str, Any],   # For trie search
+    SortedDelta       # For binary search with appended keys
+]
+
+
+class IndexSnapshot:
+    """
+    A published search structure: the data it was built from, its mode and
+    the structure itself. Appended and removed keys change the data and the
+    structure in place, and bump ``generation``; anything else gives a new
+    snapshot. See ``StorageRepository`` for what a holder can rely on.
+    """
+
+    __slots__ = ("data", "mode", "structure", "generation")
+
+    def __init__(
+        self,
+        data: List[str],
+        mode: str,
+        structure: SearchDataType
+    ) -> None:
+        self.data = data
+        self.mode = mode
+        self.structure = structure
+        # In-place changes so far; a copy taken of the snapshot, such as
+        # forked workers hold, is stale once this moves on
+        self.generation = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"IndexSnapshot(mode={self.mode!r}, items={len(self.data)}, "
+            f"generation={self.generation})"
+        )
+
+
+# Search mode whose index holds normalized keys; see normalize_key()
+NORMALIZED_MODE = 'normalized'
+
+# Distinct normalized queries remembered by normalize_query()
+QUERY_CACHE_SIZE = 65_536
+
+
+def normalize_key(text: str) -> str:
+    """
+    Returns the form ``text`` is compared in by the 'normalized' mode:
+    stripped of surrounding whitespace, casefolded and NFC-normalized.
+
+    Args:
+        text (str): A data line or query.
+
+    Returns:
+        str: The normalized key.
+    """
+    text = text.strip()
+    if text.isascii():
+        # ASCII is already NFC, and casefold() is lower() for it
+        return text.lower()
+    return unicodedata.normalize(
+        'NFC', unicodedata.normalize('NFC', text).casefold()
+    )
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def normalize_query(query: str) -> str:
+    """``normalize_key()`` with a cache, for queries that repeat."""
+    return normalize_key(query)
+
+
+class NormalizedKeys(Set[str]):
+    """
+    The set of normalized keys, with the number of lines behind each key
+    that more than one line normalizes to, so a removed line only takes
+    its key out of the set when it was the last line with that key.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()) -> None:
+        super().__init__(keys)
+        # Normalized key -> lines with it, for keys of two or more lines
+        self.shared: Dict[str, int] = {}
+
+    def add_lines(self, lines: Iterable[str]) -> "NormalizedKeys":
+        """Adds the normalized keys of appended lines; returns self."""
+        for line in lines:
+            key = normalize_key(line)
+            if not key:
+                continue
+            if key in self:
+                self.shared[key] = self.shared.get(key, 1) + 1
+            else:
+                self.add(key)
+        return self
+
+    def remove_lines(self, lines: Iterable[str]) -> "NormalizedKeys":
+        """Takes out the keys no remaining line has; returns self."""
+        for line in lines:
+            key = normalize_key(line)
+            count = self.shared.get(key)
+            if count is None:
+                self.discard(key)
+            elif count > 2:
+                self.shared[key] = count - 1
+            else:
+                del self.shared[key]
+        return self
+
+
+def _build_normalized(lines: List[str]) -> NormalizedKeys:
+    """
+    Builds the set of normalized keys of ``lines``.
+
+    Args:
+        lines (List[str]): Data lines.
+
+    Returns:
+        NormalizedKeys: Normalized keys; lines that normalize to nothing
+        are left out.
+    """
+    forms = [normalize_key(line) for line in lines]
+    keys = NormalizedKeys(forms)
+    if len(keys) < len(forms):
+        keys.shared = {
+            key: count for key, count in Counter(forms).items() if count > 1
+        }
+        keys.shared.pop('', None)
+    keys.discard('')
+    return keys
+
+
+# Delta length, relative to the sorted list, that triggers a merge
+DELTA_MERGE_RATIO = 0.01
+DELTA_MERGE_MIN = 1024
+
+# Bytes compared at each end of a file to recognise a pure append
+FINGERPRINT_BYTES = 4096
+
+
+class _LoadedFile(NamedTuple):
+    """What was read from a data file, to tell appends from rewrites."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    head: bytes
+    tail: bytes
+
+
+class _RowOrder(NamedTuple):
+    """Row numbers sorted by key, for ``row_for()``."""
+
+    data: List[str]
+    # Rows up to the last full sort
+    order: "array[int]"
+    # Rows appended since, sorted by key separately
+    appended: "array[int]"
+
+
+def _line_starts(raw: bytes, start: int) -> "array[int]":
+    """Byte offsets of the ``\\n``-separated lines of ``raw``."""
+    offsets = array('Q')
+    rows = raw.split(b'\n')
+    if rows and not rows[-1]:
+        rows.pop()
+    for row in rows:
+        offsets.append(start)
+        start += len(row) + 1
+    return offsets
+
+
+def _first_row(
+    data: List[str],
+    order: "array[int]",
+    key: str
+) -> Optional[int]:
+    """The first row of ``order`` whose line is ``key``, by bisection."""
+    low, high = 0, len(order)
+    while low < high:
+        mid = (low + high) // 2
+        if data[order[mid]] < key:
+            low = mid + 1
+        else:
+            high = mid
+    if low == len(order) or data[order[low]] != key:
+        return None
+    return order[low]
+
+
+def _insert_trie(trie: Dict[str, Any], words: List[str]) -> Dict[str, Any]:
+    """Adds ``words`` to ``trie`` in place and returns it."""
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node['#'] = True
+    return trie
+
+
+def _extend_binary(
+    structure: SearchDataType,
+    words: List[str]
+) -> SortedDelta:
+    """Returns a new SortedDelta with ``words`` added to the delta."""
+    if isinstance(structure, SortedDelta):
+        return structure._replace(delta=sorted(structure.delta + words))
+    return SortedDelta(cast(List[str], structure), sorted(words))
+
+
+def _remove_trie(trie: Dict[str, Any], words: Set[str]) -> Dict[str, Any]:
+    """
+    Unmarks ``words`` in ``trie`` in place and returns it. Their nodes are
+    left behind; a node without the end marker matches nothing.
+    """
+    for word in words:
+        node: Optional[Dict[str, Any]] = trie
+        for char in word:
+            node = node.get(char) if node is not None else None
+        if node is not None:
+            node.pop('#', None)
+    return trie
+
+
+def _positions(values: List[str], keys: Iterable[str]) -> List[int]:
+    """
+    Returns the positions in ``values`` of every item in ``keys``. Meant
+    for a few keys: each is found with ``list.index``, which is much
+    faster than testing every item in Python.
+    """
+    positions: List[int] = []
+    for key in keys:
+        position = -1
+        while True:
+            try:
+                position = values.index(key, position + 1)
+            except ValueError:
+                break
+            positions.append(position)
+    return positions
+
+
+def _remove_keys(mapping: Dict[str, Any], keys: Set[str]) -> Dict[str, Any]:
+    """Deletes ``keys`` from ``mapping`` in place and returns it."""
+    for key in keys:
+        mapping.pop(key, None)
+    return mapping
+
+
+class IndexMap(Dict[int, str]):
+    """
+    Row number -> line, for the 'index_map' mode. Removed lines leave
+    holes in the numbering rather than renumbering every later row; the
+    rows that remain still hold the data's lines in order, so the holes
+    are enough to find the row of any position in the data.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str]] = ()) -> None:
+        super().__init__(rows)
+        # Sorted row numbers of removed lines
+        self.holes: List[int] = []
+
+    def row_at(self, position: int) -> int:
+        """Returns the row number holding ``data[position]``."""
+        row = position
+        while True:
+            # A row's position is its number less the holes before it
+            shifted = position + bisect.bisect_right(self.holes, row)
+            if shifted == row:
+                return row
+            row = shifted
+
+    def add_lines(self, lines: List[str]) -> "IndexMap":
+        """Numbers appended lines after every row so far; returns self."""
+        # Each row number given out is either still held or a hole
+        self.update(enumerate(lines, len(self) + len(self.holes)))
+        return self
+
+    def remove_positions(self, positions: List[int]) -> "IndexMap":
+        """Deletes the rows of the given data positions; returns self."""
+        rows = [self.row_at(position) for position in positions]
+        for row in rows:
+            del self[row]
+            bisect.insort(self.holes, row)
+        return self
+
+
+def _remove_sorted(words: List[str], removed: Set[str]) -> List[str]:
+    """Returns a copy of the sorted ``words`` without ``removed``."""
+    result = words
+    for word in removed:
+        low = bisect.bisect_left(result, word)
+        high = bisect.bisect_right(result, word, low)
+        if low < high:
+            result = result[:low] + result[high:]
+    return result
+
+
+def _remove_binary(
+    structure: SearchDataType,
+    removed: Set[str]
+) -> SortedDelta:
+    """
+    Returns a new SortedDelta without ``removed``. Keys in the sorted list
+    are only marked as removed, which saves copying it; the delta is small
+    enough to copy.
+    """
+    if not isinstance(structure, SortedDelta):
+        structure = SortedDelta(cast(List[str], structure), [])
+    base = structure.base
+    present = set()
+    for word in removed:
+        position = bisect.bisect_left(base, word)
+        if position < len(base) and base[position] == word:
+            present.add(word)
+    return structure._replace(
+        delta=_remove_sorted(structure.delta, removed),
+        removed=structure.removed | present,
+    )
+
+
+def _build_trie(words: List[str]) -> Dict[str, Any]:
+    """
+    Builds a trie data structure from a list of words.
+
+    Args:
+        words (List[str]): Words to include in trie.
+
+    Returns:
+        Dict[str, Any]: Trie structure.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node['#'] = True  # End of word marker
+    return trie
+
+
+class StorageRepository:
+    """
+    Handles data loading and searching with multiple search modes.
+
+    Supports naive, set, dictionary, index map, binary search, and trie search.
+    The 'normalized' mode matches regardless of case, surrounding whitespace
+    and Unicode normal form.
+
+    Prepared structures are published as ``IndexSnapshot`` objects, so one
+    repository can be shared by all handler threads: readers never lock,
+    and a request searches the snapshot prepare() returned to it, whatever
+    other requests prepare or load meanwhile.
+
+    Appends and key mutations are the exception. To cost time in
+    proportion to the change rather than to the data, they change the
+    current snapshots in place instead of publishing copies, so a held
+    snapshot is only consistent per lookup: each lookup sees a change
+    fully or not at all, but later lookups may see newer data, and the
+    snapshot's ``generation`` tells that it changed. Every in-place change
+    holds the mutation lock, and so does everything that reads the data
+    together with a structure built from it (``row_for()``,
+    ``line_index()``).
+
+    Every prepared structure is measured: its deep size excluding the data
+    lines it shares, and optionally what tracemalloc saw during the build.
+    With ``memory_limit`` set, a build whose projected size exceeds it is
+    refused before any memory is committed.
+
+    With a ``columns`` extractor, each line of a delimited file is reduced
+    to one field when loaded, and every mode indexes that field. The byte
+    offset of each row is kept so ``row_for()`` can read a matching row
+    back from the file.
+    """
+
+    BUILDERS: Dict[str, Callable[[List[str]], SearchDataType]] = {
+        'set': set,
+        'dict': lambda lines: {word: True for word in lines},
+        'index_map': lambda lines: IndexMap(enumerate(lines)),
+        'binary': sorted,
+        'trie': _build_trie,
+        NORMALIZED_MODE: _build_normalized,
+        'naive': lambda lines: lines,
+    }
+
+    # Add appended lines to a built structure: (structure, new lines,
+    # row number of the first new line, all lines) -> updated structure.
+    # Hash-based structures and the trie only ever gain keys, so they are
+    # extended in place; searches running meanwhile see old or new keys,
+    # never a broken structure. The binary delta is replaced, since a
+    # bisection running while a list shifts could miss a key.
+    EXTENDERS: Dict[
+        str, Callable[[Any, List[str], int, List[str]], SearchDataType]
+    ] = {
+        'set': lambda s, new, start, data: s.update(new) or s,
+        'dict': lambda d, new, start, data: d.update(
+            dict.fromkeys(new, True)
+        ) or d,
+        'index_map': lambda d, new, start, data: d.add_lines(new),
+        'binary': lambda s, new, start, data: _extend_binary(s, new),
+        'trie': lambda t, new, start, data: _insert_trie(t, new),
+        NORMALIZED_MODE: lambda s, new, start, data: s.add_lines(new),
+        'naive': lambda s, new, start, data: data,
+    }
+
+    # Take removed lines out of a built structure: (structure, removed
+    # keys, removed lines, their positions in the data before removal)
+    # -> updated structure. None of them walks the rest of the data: the
+    # normalized set counts the lines behind keys they share, the index
+    # map leaves holes in its row numbers, and binary marks keys removed
+    # from its sorted list until the next merge.
+    REMOVERS: Dict[
+        str, Callable[[Any, Set[str], List[str], List[int]], SearchDataType]
+    ] = {
+        'set': lambda s, keys, gone, at: s.difference_update(keys) or s,
+        'dict': lambda d, keys, gone, at: _remove_keys(d, keys),
+        'index_map': lambda d, keys, gone, at: d.remove_positions(at),
+        'binary': lambda s, keys, gone, at: _remove_binary(s, keys),
+        'trie': lambda t, keys, gone, at: _remove_trie(t, keys),
+        NORMALIZED_MODE: lambda s, keys, gone, at: s.remove_lines(gone),
+        'naive': lambda s, keys, gone, at: s,
+    }
+
+    def __init__(
+        self,
+        memory_limit: Optional[int] = None,
+        trace_allocations: bool = False,
+        columns: Optional[ColumnExtractor] = None
+    ) -> None:
+        """
+        Args:
+            memory_limit (Optional[int]): Most bytes the structures built
+                for the data may hold together. Least recently used modes
+                are evicted to make room for a build; None disables the
+                check.
+            trace_allocations (bool): Measure builds with tracemalloc. This
+                slows builds down noticeably.
+            columns (Optional[ColumnExtractor]): Index one field of each
+                delimited row instead of whole lines.
+        """
+        self.memory_limit = memory_limit
+        self.trace_allocations = trace_allocations
+        self.columns = columns
+        self.data: Optional[List[str]] = None
+        # Byte offset of each row's line when indexing a column
+        self.row_offsets: Optional["array[int]"] = None
+        # Row numbers sorted by key, built on the first row_for()
+        self._row_order: Optional[_RowOrder] = None
+        # Inverted index for locate, built on the first line_index()
+        self._line_index: Optional[LineIndex] = None
+        # Size and samples of the loaded file, to recognise appends
+        self._loaded: Optional[_LoadedFile] = None
+        # Keys added or removed since the file was last written; replayed
+        # over the file on every full load
+        self.key_log: Optional[WriteAheadLog] = None
+        # Serialises loads, key mutations and folds
+        self._mutation_lock = threading.Lock()
+        self.last_loaded_file: Optional[str] = None
+        self.max_rows = 250_000
+        # Projected at build time; replaced by exact sizes once reported
+        self.index_memory: Dict[str, int] = {}
+        self.memory_reports: Dict[str, Dict[str, Any]] = {}
+        # mode -> (id of the structure, rows, exact bytes) last measured
+        self._measured: Dict[str, Tuple[int, int, int]] = {}
+        # Published snapshots. The dict is replaced as a whole; appends and
+        # key mutations change the current snapshots' data and structures
+        # in place
+        self._active: Optional[IndexSnapshot] = None
+        self._snapshots: Dict[str, IndexSnapshot] = {}
+        # time.monotonic() of each mode's last prepare(), for eviction
+        self._last_used: Dict[str, float] = {}
+        # Guards publication and the per-mode build locks
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def load_file(self, filepath: str) -> bool:
+        """
+        Loads data from a file, enforcing a maximum row limit.
+
+        Reloading the file already loaded is cheap when it is unchanged or
+        has only been appended to: the new complete lines are parsed and
+        added to the data and to every prepared structure, instead of
+        reading everything and rebuilding. Any other change is a full
+        reload.
+
+        With a ``key_log``, the keys it records as added or removed are
+        applied on top of the file.
+
+        Args:
+            filepath (str): Path to the file.
+
+        Returns:
+            bool: True if successfully loaded, else False.
+        """
+        with self._mutation_lock:
+            return self._load_file(filepath)
+
+    def _load_file(self, filepath: str) -> bool:
+        """Loads ``filepath``; see ``load_file()``. Caller holds lock."""
+        try:
+            if not os.path.isfile(filepath):
+                logger.error(f"File not found: {filepath}")
+                return False
+
+            if self._load_appended(filepath):
+                return True
+
+            with open(filepath, 'rb') as f:
+                raw = f.read()
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            lines, offsets = self._parse_rows(
+                raw, 0, self.columns is not None and self.columns.header
+            )
+            if self.key_log is not None and offsets is None:
+                lines = apply_entries(lines, self.key_log.entries())
+
+            if len(lines) > self.max_rows:
+                logger.error(
+                    f"File exceeds max row limit of {self.max_rows}. "
+                    f"Found: {len(lines)}"
+                )
+                return False
+
+            self.row_offsets = offsets
+            self.data = lines
+            self.last_loaded_file = filepath
+            self._loaded = _LoadedFile(
+                filepath, len(raw), mtime_ns,
+                raw[:FINGERPRINT_BYTES], raw[-FINGERPRINT_BYTES:]
+            )
+            logger.info(f"Loaded {len(lines)} lines from {filepath}")
+            return True
+
+        except Exception as e:
+            logger.exception(f"Failed to load file: {e}")
+            return False
+
+    def _parse_rows(
+        self,
+        raw: bytes,
+        start: int,
+        skip_header: bool
+    ) -> Tuple[List[str], Optional["array[int]"]]:
+        """
+        Splits file bytes into lines, or into the indexed column of each
+        row and the byte offset where the row starts.
+
+        Args:
+            raw (bytes): File contents, or an appended part of them.
+            start (int): File offset of ``raw``.
+            skip_header (bool): Leave out the first line.
+
+        Returns:
+            Tuple[List[str], Optional[array[int]]]: The lines or fields, and
+            the row offsets when a column is indexed.
+        """
+        if self.columns is None:
+            lines = raw.decode('utf-8').splitlines()
+            return (lines[1:] if skip_header else lines), None
+
+        keys: List[str] = []
+        offsets = array('Q')
+        extract = self.columns.extract
+        rows = raw.split(b'\n')
+        if rows and not rows[-1]:
+            rows.pop()  # Nothing after the final newline
+        offset = start
+        for number, row in enumerate(rows):
+            if number or not skip_header:
+                keys.append(extract(row.decode('utf-8').rstrip('\r')))
+                offsets.append(offset)
+            offset += len(row) + 1
+        return keys, offsets
+
+    def _load_appended(self, filepath: str) -> bool:
+        """
+        Handles a reload of the loaded file that needs no full read.
+
+        Args:
+            filepath (str): Path to the file.
+
+        Returns:
+            bool: True if the file is unchanged or only appended to, and
+            the data is now current; False if a full reload is needed.
+        """
+        loaded = self._loaded
+        data = self.data
+        if loaded is None or data is None or loaded.path != filepath:
+            return False
+        stat = os.stat(filepath)
+        if stat.st_size == loaded.size and stat.st_mtime_ns == loaded.mtime_ns:
+            return True
+        if stat.st_size <= loaded.size:
+            return False
+        if loaded.tail and not loaded.tail.endswith(b'\n'):
+            return False  # The last line may have been continued
+
+        with open(filepath, 'rb') as f:
+            if f.read(len(loaded.head)) != loaded.head:
+                return False
+            f.seek(loaded.size - len(loaded.tail))
+            if f.read(len(loaded.tail)) != loaded.tail:
+                return False
+            appended = f.read()
+
+        # Only complete lines; a line still being written waits
+        complete = appended.rfind(b'\n') + 1
+        appended = appended[:complete]
+        if appended:
+            skip_header = (
+                loaded.size == 0 and self.columns is not None
+                and self.columns.header
+            )
+            lines, offsets = self._parse_rows(
+                appended, loaded.size, skip_header
+            )
+            if len(data) + len(lines) > self.max_rows:
+                return False
+            if offsets is None:
+                # For the locate index; it drops them if the lines were
+                # split on other separators too
+                offsets = _line_starts(appended, loaded.size)
+            self._append_lines(lines, offsets)
+        self._loaded = loaded._replace(
+            size=loaded.size + complete,
+            mtime_ns=stat.st_mtime_ns,
+            head=(
+                loaded.head if len(loaded.head) == FINGERPRINT_BYTES
+                else (loaded.head + appended)[:FINGERPRINT_BYTES]
+            ),
+            tail=(loaded.tail + appended)[-FINGERPRINT_BYTES:],
+        )
+        return True
+
+    def append_lines(
+        self,
+        lines: List[str],
+        offsets: Optional["array[int]"] = None
+    ) -> None:
+        """
+        Adds lines to the end of the data and to every prepared structure,
+        at a cost proportional to the number of new lines.
+
+        The data list, the structures and the locate index are extended in
+        place, so snapshots of the current data stay current. The binary
+        mode collects new keys in a sorted delta that is merged into the
+        main list in the background once it grows large.
+
+        Args:
+            lines (List[str]): New lines (or indexed fields), in file order.
+            offsets (Optional[array[int]]): Byte offset of each new line in
+                the file, when known.
+
+        Raises:
+            ValueError: If no data is loaded.
+        """
+        with self._mutation_lock:
+            self._append_lines(lines, offsets)
+
+    def _append_lines(
+        self,
+        lines: List[str],
+        offsets: Optional["array[int]"] = None
+    ) -> None:
+        """Appends ``lines``; see ``append_lines()``. Caller holds lock."""
+        if not lines:
+            return
+        started = time.perf_counter()
+        locks = self._hold_builds()
+        try:
+            with self._lock:
+                data = self.data
+                if data is None:
+                    raise ValueError("No data loaded. Call load_file() first.")
+                start = len(data)
+                if self.row_offsets is not None and offsets is not None:
+                    self.row_offsets.extend(offsets)
+                data.extend(lines)
+                self._bump_generation(data)
+                extended: Dict[int, IndexSnapshot] = {}
+                for snap in self._snapshots.values():
+                    # One structure may be published under several names
+                    if snap.data is not data or id(snap) in extended:
+                        continue
+                    structure = self.EXTENDERS[snap.mode](
+                        snap.structure, lines, start, data
+                    )
+                    extended[id(snap)] = (
+                        snap if structure is snap.structure
+                        else IndexSnapshot(data, snap.mode, structure)
+                    )
+                self._republish(extended)
+                index = self._line_index
+                if index is not None and index.data is data:
+                    index.extend(lines, start, offsets)
+                binary = self._snapshots.get('binary')
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        logger.info(
+            f"Appended {len(lines)} lines to {start} in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        self._merge_if_large(binary)
+
+    def _merge_if_large(self, binary: Optional[IndexSnapshot]) -> None:
+        """Merges a binary delta in the background once it is large."""
+        if binary is None or not isinstance(binary.structure, SortedDelta):
+            return
+        base, delta, removed = binary.structure
+        if len(delta) + len(removed) >= max(
+            DELTA_MERGE_MIN, int(len(base) * DELTA_MERGE_RATIO)
+        ):
+            threading.Thread(
+                target=self.merge_delta, name="merge-delta", daemon=True
+            ).start()
+
+    def _hold_builds(self) -> List[threading.Lock]:
+        """
+        Acquires the build lock of every mode and of the locate index, so
+        nothing is built from the data while it changes in place.
+
+        Returns:
+            List[threading.Lock]: The locks, to release in reverse order.
+        """
+        locks = [
+            self._build_lock(mode)
+            for mode in sorted([*self.BUILDERS, 'locate'])
+        ]
+        for lock in locks:
+            lock.acquire()
+        return locks
+
+    def _bump_generation(self, data: List[str]) -> None:
+        """
+        Marks every published snapshot of ``data`` as changed in place.
+        Caller holds ``_lock``.
+        """
+        published = {id(snap): snap for snap in self._snapshots.values()}
+        active = self._active
+        if active is not None:
+            published[id(active)] = active
+        for snap in published.values():
+            if snap.data is data:
+                snap.generation += 1
+
+    def _republish(self, changed: Dict[int, IndexSnapshot]) -> None:
+        """
+        Publishes the replacement of each snapshot in ``changed`` (keyed
+        by the id of the snapshot it replaces). Caller holds ``_lock``.
+        """
+        if all(id(snap) == key for key, snap in changed.items()):
+            return
+        self._snapshots = {
+            name: changed.get(id(snap), snap)
+            for name, snap in self._snapshots.items()
+        }
+        active = self._active
+        if active is not None:
+            self._active = changed.get(id(active), active)
+
+    def merge_delta(self) -> bool:
+        """
+        Merges the binary mode's delta into its sorted list and publishes
+        the result. Searches use the old snapshot until then.
+
+        Returns:
+            bool: True if a merged snapshot was published.
+        """
+        with self._build_lock('binary'):
+            snap = self._snapshots.get('binary')
+            if snap is None or not isinstance(snap.structure, SortedDelta):
+                return False
+            base, delta, removed = snap.structure
+            if removed:
+                base = [word for word in base if word not in removed]
+            merged = list(heapq.merge(base, delta))
+            with self._lock:
+                if self._snapshots.get('binary') is not snap:
+                    return False
+                replacement = IndexSnapshot(snap.data, 'binary', merged)
+                self._snapshots = {
+                    name: (replacement if other is snap else other)
+                    for name, other in self._snapshots.items()
+                }
+                if self._active is snap:
+                    self._active = replacement
+        logger.info(
+            f"Merged {len(delta)} appended and {len(removed)} removed keys "
+            f"into binary index"
+        )
+        return True
+
+    def remove_lines(self, keys: Set[str]) -> int:
+        """
+        Removes every line equal to one of ``keys`` from the data and from
+        every prepared structure, in place, as ``append_lines()`` adds
+        them. The locate index is rebuilt on its next use.
+
+        Args:
+            keys (Set[str]): Lines to remove.
+
+        Returns:
+            int: Number of lines removed.
+
+        Raises:
+            ValueError: If no data is loaded, or a column is indexed.
+        """
+        with self._mutation_lock:
+            return self._remove_lines(keys)
+
+    def _remove_lines(self, keys: Set[str]) -> int:
+        """Removes ``keys``; see ``remove_lines()``. Caller holds lock."""
+        if self.row_offsets is not None:
+            raise ValueError("Lines cannot be removed with column indexing")
+        started = time.perf_counter()
+        locks = self._hold_builds()
+        try:
+            with self._lock:
+                data = self.data
+                if data is None:
+                    raise ValueError("No data loaded. Call load_file() first.")
+                positions = sorted(_positions(data, keys), reverse=True)
+                if not positions:
+                    return 0
+                gone = [data[position] for position in positions]
+                for position in positions:
+                    del data[position]
+                self._bump_generation(data)
+                removed: Dict[int, IndexSnapshot] = {}
+                for snap in self._snapshots.values():
+                    if snap.data is not data or id(snap) in removed:
+                        continue
+                    structure = self.REMOVERS[snap.mode](
+                        snap.structure, keys, gone, positions
+                    )
+                    removed[id(snap)] = (
+                        snap if structure is snap.structure
+                        else IndexSnapshot(data, snap.mode, structure)
+                    )
+                self._republish(removed)
+                # Its rows have shifted
+                self._line_index = None
+                binary = self._snapshots.get('binary')
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        logger.info(
+            f"Removed {len(gone)} lines of {len(data) + len(gone)} in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        self._merge_if_large(binary)
+        return len(gone)
+
+    def _contains(self, key: str) -> bool:
+        """Whether ``key`` is in the data, through a hash index if built."""
+        data = self.data
+        if data is None:
+            return False
+        for snap in list(self._snapshots.values()):
+            if snap.data is data and snap.mode in ('set', 'dict'):
+                return key in cast(Set[str], snap.structure)
+        return key in data
+
+    def add_key(self, key: str) -> bool:
+        """
+        Adds ``key`` to the data and every prepared structure, after
+        recording it in ``key_log``.
+
+        Searches never wait for this: they keep using the snapshot they
+        hold, and hash structures are extended in place.
+
+        Args:
+            key (str): The key to add.
+
+        Returns:
+            bool: True if added, False if it was already present.
+
+        Raises:
+            ValueError: If the key is invalid, no key log is attached, no
+            data is loaded, a column is indexed, or the data is at the
+            row limit.
+        """
+        check_key(key)
+        with self._mutation_lock:
+            self._check_mutable()
+            if self._contains(key):
+                return False
+            if len(cast(List[str], self.data)) >= self.max_rows:
+                # The folded file must still load
+                raise ValueError(
+                    f"Data is at the max row limit of {self.max_rows}"
+                )
+            cast(WriteAheadLog, self.key_log).append(ADD, key)
+            self._append_lines([key])
+        return True
+
+    def remove_key(self, key: str) -> bool:
+        """
+        Removes every line equal to ``key``, after recording the removal
+        in ``key_log``.
+
+        Args:
+            key (str): The key to remove.
+
+        Returns:
+            bool: True if removed, False if it was not present.
+
+        Raises:
+            ValueError: As for ``add_key()``.
+        """
+        check_key(key)
+        with self._mutation_lock:
+            self._check_mutable()
+            if not self._contains(key):
+                return False
+            cast(WriteAheadLog, self.key_log).append(REMOVE, key)
+            self._remove_lines({key})
+        return True
+
+    def _check_mutable(self) -> None:
+        """Raises ValueError unless keys can be mutated. Caller holds lock."""
+        if self.key_log is None:
+            raise ValueError("Key mutation is disabled")
+        if self.columns is not None:
+            raise ValueError("Keys cannot be mutated with column indexing")
+        if self.data is None or self.last_loaded_file is None:
+            raise ValueError("No data loaded. Call load_file() first.")
+
+    def fold_key_log(self) -> bool:
+        """
+        Writes the current data back to the data file and empties the key
+        log, then merges any binary delta into its sorted list.
+
+        The file is reloaded first, so lines written to it by something
+        else since it was loaded are kept: an append is picked up as
+        usual, and any other change is read in full with the log replayed
+        over it. The file is then replaced atomically. A crash before the
+        log is emptied only means it is replayed over a file that already
+        contains it, which changes nothing.
+
+        Returns:
+            bool: True if the log was folded; False if it was empty or the
+            file could not be reloaded.
+        """
+        with self._mutation_lock:
+            key_log = self.key_log
+            path = self.last_loaded_file
+            if key_log is None or not len(key_log) or path is None:
+                return False
+            started = time.perf_counter()
+            if not self._load_file(path):
+                logger.error(f"Not folding key log: cannot reload {path}")
+                return False
+            data = self.data
+            if data is None:
+                return False
+            raw = ''.join(line + '\n' for line in data).encode('utf-8')
+            temp = f"{path}.{os.getpid()}.tmp"
+            with open(temp, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            os.replace(temp, path)
+            # The file now holds exactly the data: not a change to reload
+            self._loaded = _LoadedFile(
+                path, len(raw), mtime_ns,
+                raw[:FINGERPRINT_BYTES], raw[-FINGERPRINT_BYTES:]
+            )
+            folded = len(key_log)
+            key_log.reset()
+        self.merge_delta()
+        logger.info(
+            f"Folded {folded} key mutations into {path} in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        return True
+
+    def row_for(self, key: str) -> Optional[str]:
+        """
+        Returns the full row whose indexed column equals ``key``.
+
+        Args:
+            key (str): Value of the indexed column.
+
+        Returns:
+            Optional[str]: The first such row in the file, or None if there
+            is none or no column is indexed.
+        """
+        with self._mutation_lock:
+            return self._row_for(key)
+
+    def _row_for(self, key: str) -> Optional[str]:
+        """Looks up ``key``; see ``row_for()``. Caller holds lock."""
+        data = self.data
+        offsets = self.row_offsets
+        path = self.last_loaded_file
+        if data is None or offsets is None or path is None:
+            return None
+        size = len(data)
+        if len(offsets) != size:
+            return None  # Offsets out of step with the data
+
+        cached = self._row_order
+        if cached is not None and cached.data is not data:
+            cached = None
+        covered = (
+            len(cached.order) + len(cached.appended) if cached else size
+        )
+        if cached is not None and covered < size:
+            # Appended rows are sorted apart from the rest until there are
+            # enough of them to be worth a full sort
+            appended = array('I', sorted(
+                [*cached.appended, *range(covered, size)],
+                key=data.__getitem__
+            ))
+            if len(appended) < max(
+                DELTA_MERGE_MIN, int(len(cached.order) * DELTA_MERGE_RATIO)
+            ):
+                cached = cached._replace(appended=appended)
+                self._row_order = cached
+            else:
+                cached = None
+        if cached is None or covered > size:
+            # Stable sort, so equal keys stay in file order
+            cached = _RowOrder(
+                data,
+                array('I', sorted(range(size), key=data.__getitem__)),
+                array('I'),
+            )
+            self._row_order = cached
+
+        # Every appended row comes after every sorted one in the file
+        row = _first_row(data, cached.order, key)
+        if row is None:
+            row = _first_row(data, cached.appended, key)
+        if row is None:
+            return None
+
+        with open(path, 'rb') as f:
+            f.seek(offsets[row])
+            return f.readline().decode('utf-8').rstrip('\r\n')
+
+    def line_index(self) -> LineIndex:
+        """
+        Returns the inverted index of the loaded data, building it on
+        first use and again after the data changes.
+
+        It is looked up under the mutation lock, so it matches the data
+        when returned. After that it only ever grows: appends extend it,
+        while removals and reloads leave it alone and build a new one, so
+        callers can keep reading the one they got.
+
+        Returns:
+            LineIndex: Row numbers per distinct line (or indexed column).
+
+        Raises:
+            ValueError: If no data is loaded.
+        """
+        with self._mutation_lock:
+            return self._current_line_index()
+
+    def _current_line_index(self) -> LineIndex:
+        """Returns the index; see ``line_index()``. Caller holds lock."""
+        data = self.data
+        if data is None:
+            raise ValueError("No data loaded. Call load_file() first.")
+        index = self._line_index
+        if index is not None and index.data is data:
+            return index
+
+        with self._build_lock('locate'):
+            index = self._line_index
+            if index is None or index.data is not data:
+                offsets = self.row_offsets
+                index = LineIndex(
+                    data,
+                    self.last_loaded_file,
+                    offsets if offsets is not None
+                    and len(offsets) == len(data) else None,
+                    first_line=(
+                        2 if self.columns is not None and self.columns.header
+                        else 1
+                    ),
+                )
+                self._line_index = index
+        return index
+
+    @property
+    def data_memory(self) -> int:
+        """
+        Projected bytes held by the data lines and row offsets, from a
+        sample of the lines; cheap enough for every load and budget check.
+        """
+        data = self.data
+        if data is None:
+            return 0
+        size = project_data_bytes(data)
+        offsets = self.row_offsets
+        if offsets is not None:
+            size += offsets.itemsize * len(offsets)
+        return size
+
+    def prepared_modes(self) -> List[str]:
+        """Returns the modes with a snapshot built for the current data."""
+        data = self.data
+        return sorted({
+            snap.mode for snap in self._snapshots.values()
+            if snap.data is data
+        })
+
+    @property
+    def snapshot(self) -> Optional[IndexSnapshot]:
+        """The most recently prepared snapshot, or None."""
+        return self._active
+
+    @property
+    def mode(self) -> str:
+        """Mode of the most recently prepared snapshot."""
+        active = self._active
+        return active.mode if active is not None else 'naive'
+
+    @property
+    def search_data(self) -> Optional[SearchDataType]:
+        """Structure of the most recently prepared snapshot."""
+        active = self._active
+        return active.structure if active is not None else None
+
+    def prepare(self, mode: str = 'naive') -> IndexSnapshot:
+        """
+        Returns a snapshot of the current data prepared for ``mode``,
+        building it if needed, and makes it the active snapshot.
+
+        A build happens off to the side and is published with one
+        reference assignment, so concurrent searches never see a half-built
+        structure, and each request can keep searching the snapshot it was
+        given even if another request prepares a different mode or new data
+        is loaded meanwhile. Snapshots are not immutable, though: appended
+        lines and key mutations are applied to the current ones in place,
+        and a lookup sees each change either fully or not at all; a changed
+        snapshot has a new ``generation``. Built
+        snapshots are kept per mode until the data changes, or until the
+        least recently used are evicted to keep the total within
+        ``memory_limit``.
+
+        Args:
+            mode (str): Search mode; unknown modes fall back to 'naive'.
+
+        Returns:
+            IndexSnapshot: The prepared snapshot.
+
+        Raises:
+            ValueError: If no data is loaded, or the build is projected to
+            exceed ``memory_limit``.
+        """
+        data = self.data
+        if data is None:
+            msg = "No data loaded. Call load_file() first."
+            if self.last_loaded_file:
+                msg += f" Last attempt was: {self.last_loaded_file}"
+            raise ValueError(msg)
+
+        mode = mode if mode in self.BUILDERS else 'naive'
+        self._last_used[mode] = time.monotonic()
+        cached = self._snapshots.get(mode)
+        if cached is not None and cached.data is data:
+            # Already built for this data; nothing to do
+            self._active = cached
+            return cached
+
+        with self._build_lock(mode):
+            cached = self._snapshots.get(mode)
+            if cached is not None and cached.data is data:
+                self._active = cached
+                return cached
+            snapshot = self._build(mode, data)
+
+        with self._lock:
+            # Drop snapshots of older data; replace rather than mutate so
+            # lock-free readers of the dict are unaffected
+            snapshots = {
+                other: snap for other, snap in self._snapshots.items()
+                if snap.data is data
+            }
+            snapshots[snapshot.mode] = snapshot
+            if snapshot.mode != mode:
+                snapshots[mode] = snapshot
+            self._snapshots = snapshots
+            self._active = snapshot
+        return snapshot
+
+    def _make_room(self, mode: str, data: List[str], needed: int) -> None:
+        """
+        Evicts the least recently used snapshots of ``data`` until
+        ``needed`` more bytes fit within ``memory_limit``. Requests already
+        holding an evicted snapshot keep searching it, and the active one
+        stays the default until the new build replaces it.
+
+        Raises:
+            ValueError: If the build does not fit even after evicting.
+        """
+        assert self.memory_limit is not None
+        with self._lock:
+            resident = {
+                snap.mode: snap for snap in self._snapshots.values()
+                if snap.data is data and snap.mode != mode
+            }
+            used = sum(self.index_memory.get(other, 0) for other in resident)
+            candidates = sorted(
+                resident, key=lambda other: self._last_used.get(other, 0.0)
+            )
+            evicted: List[str] = []
+            for other in candidates:
+                if used + needed <= self.memory_limit:
+                    break
+                used -= self.index_memory.get(other, 0)
+                evicted.append(other)
+            if used + needed > self.memory_limit:
+                raise ValueError(
+                    f"Search mode '{mode}' would need about "
+                    f"{format_bytes(needed)}, and the modes in use already "
+                    f"hold {format_bytes(used)} of the index memory limit "
+                    f"of {format_bytes(self.memory_limit)}"
+                )
+            if not evicted:
+                return
+            self._snapshots = {
+                name: snap for name, snap in self._snapshots.items()
+                if snap.mode not in evicted
+            }
+            self.index_memory = {
+                other: size for other, size in self.index_memory.items()
+                if other not in evicted
+            }
+        logger.info(
+            f"Evicted search modes {', '.join(evicted)} to make room for "
+            f"'{mode}'"
+        )
+
+    def _build_lock(self, mode: str) -> threading.Lock:
+        """One lock per mode, so different modes build concurrently."""
+        with self._lock:
+            return self._build_locks.setdefault(mode, threading.Lock())
+
+    def _build(self, mode: str, data: List[str]) -> IndexSnapshot:
+        """Builds and measures one snapshot. Caller holds the mode lock."""
+        builder = self.BUILDERS[mode]
+        # Projected from a sample: an exact walk of a large structure costs
+        # more than building it. memory_report() measures on demand.
+        projected = (
+            0 if mode == 'naive' else project_build_bytes(builder, data)
+        )
+        if self.memory_limit is not None:
+            if projected > self.memory_limit:
+                raise ValueError(
+                    f"Search mode '{mode}' would need about "
+                    f"{format_bytes(projected)} for {len(data)} items, over "
+                    f"the index memory limit of "
+                    f"{format_bytes(self.memory_limit)}"
+                )
+            self._make_room(mode, data, projected)
+
+        try:
+            started = time.perf_counter()
+            retained: Optional[int] = None
+            peak: Optional[int] = None
+            if self.trace_allocations:
+                structure, retained, peak = traced(lambda: builder(data))
+            else:
+                structure = builder(data)
+            build_seconds = time.perf_counter() - started
+        except Exception as e:
+            logger.exception(f"Error preparing search mode '{mode}': {e}")
+            logger.info("Falling back to 'naive' mode.")
+            return IndexSnapshot(data, 'naive', data)
+
+        size = projected
+        report = {
+            "bytes": size,
+            "projected_bytes": projected,
+            "traced_retained_bytes": retained,
+            "traced_peak_bytes": peak,
+            "build_seconds": build_seconds,
+            "items": len(data),
+        }
+        with self._lock:
+            self.index_memory = {**self.index_memory, mode: size}
+            self.memory_reports = {**self.memory_reports, mode: report}
+        logger.info(
+            f"Prepared search mode '{mode}' "
+            f"with {len(data)} items ({format_bytes(size)})."
+        )
+        return IndexSnapshot(data, mode, structure)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Returns the size of each prepared search structure.
+
+        Sizes are projected when a mode is built and become exact once
+        ``memory_report()`` has measured it; either way they exclude the
+        data lines the structure shares. Nothing is measured here, so
+        metrics scrapes stay cheap.
+
+        Returns:
+            Dict[str, int]: Mapping of mode name to size in bytes.
+        """
+        return dict(self.index_memory)
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Returns the memory measurements of the loaded data and of every
+        structure built so far.
+
+        Structures built for the current data are measured exactly on the
+        first report after their build (or after they grew or shrank);
+        this walks every object they hold, so it is meant for the
+        ``stats`` action, not for the request path. ``data_bytes`` is
+        projected from a sample.
+
+        Returns:
+            Dict[str, Any]: ``data_bytes``, ``limit_bytes``, the ``active``
+            mode, and per mode its deep size, projection, tracemalloc
+            figures (None when tracing is off) and build time.
+        """
+        self._measure()
+        return {
+            "data_bytes": self.data_memory,
+            "limit_bytes": self.memory_limit,
+            "active": self.mode,
+            "modes": {
+                mode: dict(report)
+                for mode, report in self.memory_reports.items()
+            },
+        }
+
+    def _measure(self) -> None:
+        """Measures resident structures not measured in their current form."""
+        data = self.data
+        if data is None:
+            return
+        for mode, snap in list(self._snapshots.items()):
+            if snap.data is not data or snap.mode != mode:
+                continue
+            key = (id(snap.structure), len(data))
+            measured = self._measured.get(mode)
+            if measured is not None and measured[:2] == key:
+                continue
+            # Only count what the structure adds on top of the data lines;
+            # the build lock keeps appends from changing it mid-walk
+            with self._build_lock(mode):
+                size = deep_sizeof(
+                    snap.structure, exclude=shared_ids(data) | {id(data)}
+                )
+            with self._lock:
+                self._measured[mode] = (key[0], key[1], size)
+                self.index_memory = {**self.index_memory, mode: size}
+                report = self.memory_reports.get(mode)
+                if report is not None:
+                    self.memory_reports = {
+                        **self.memory_reports, mode: {**report, "bytes": size}
+                    }
+
+    def search(
+        self,
+        target: str,
+        snapshot: Optional[IndexSnapshot] = None
+    ) -> Tuple[bool, float]:
+        """
+        Searches for a word in a prepared snapshot.
+
+        Args:
+            target (str): Word to search.
+            snapshot (Optional[IndexSnapshot]): Snapshot returned by
+                prepare(); defaults to the active one.
+
+        Returns:
+            Tuple[bool, float]: (Found or not, time taken in seconds)
+
+        Raises:
+            ValueError: If search data has not been prepared.
+        """
+        if snapshot is None:
+            snapshot = self._active
+        if snapshot is None:
+            raise ValueError("Search data not prepared. Call prepare() first.")
+
+        if not target:
+            logger.warning("Empty search target provided.")
+            return False, 0.0
+
+        search_method = getattr(
+            self, f"{snapshot.mode}_search", self.naive_search
+        )
+        start = time.perf_counter()
+        result = search_method(target, snapshot.structure)
+        end = time.perf_counter()
+        execution_time = end - start
+
+        logger.info(
+            f"Search '{target}' with mode '{snapshot.mode}' "
+            f"took {execution_time:.6f}s. Found: {result}"
+        )
+        return result, execution_time
+
+    # --- Search implementations below ---
+
+    def _structure(
+        self,
+        structure: Optional[SearchDataType]
+    ) -> SearchDataType:
+        """The given structure, or the active snapshot's."""
+        if structure is None:
+            structure = self.search_data
+        assert structure is not None
+        return structure
+
+    def naive_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Naive linear search."""
+        data = cast(List[str], self._structure(structure))
+        return target in data
+
+    def set_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Search using a set."""
+        data = cast(Set[str], self._structure(structure))
+        return target in data
+
+    def dict_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Search using a dictionary."""
+        data = cast(Dict[str, bool], self._structure(structure))
+        return target in data
+
+    def index_map_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Search values in an index map."""
+        data = cast(Dict[int, str], self._structure(structure))
+        return target in data.values()
+
+    def binary_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Binary search (requires sorted list)."""
+        found = self._structure(structure)
+        if isinstance(found, SortedDelta):
+            return (
+                target not in found.removed
+                and self.binary_search(target, found.base)
+            ) or self.binary_search(target, found.delta)
+        data = cast(List[str], found)
+        low, high = 0, len(data) - 1
+        while low <= high:
+            mid = (low + high) // 2
+            if data[mid] == target:
+                return True
+            elif data[mid] < target:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return False
+
+    def trie_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Search using a trie."""
+        node = cast(Dict[str, Any], self._structure(structure))
+        for char in target:
+            if char not in node:
                 return False
             node = node[char]
         return '#' in node
+
+    def normalized_search(
+        self,
+        target: str,
+        structure: Optional[SearchDataType] = None
+    ) -> bool:
+        """Search normalized keys for the normalized target."""
+        data = cast(Set[str], self._structure(structure))
+        return normalize_query(target) in data
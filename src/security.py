@@ -2,10 +2,81 @@ import ssl
 import socket
 import logging
 import os
+import threading
+import time
+from typing import Optional
+
+from metrics import REGISTRY
 
 # Set up a logger for this module
 logger = logging.getLogger(__name__)
 
+# TLS 1.3 session tickets sent to each client after a full handshake
+TLS13_TICKETS = 2
+
+REGISTRY.describe(
+    "tls_handshake_seconds",
+    "Server-side TLS handshake duration, by whether the session was resumed."
+)
+REGISTRY.describe(
+    "tls_handshakes_total",
+    "TLS handshakes by outcome ('ok', 'error', 'timeout') and resumption."
+)
+REGISTRY.describe(
+    "tls_resumption_ratio",
+    "Share of successful TLS handshakes that resumed an earlier session."
+)
+
+
+def create_server_context(certfile: str, keyfile: str) -> ssl.SSLContext:
+    """
+    Build the server's TLS context.
+
+    Create it once and reuse it for every connection: session tickets are
+    encrypted with keys held by the context, so only connections accepted
+    through the same context can resume each other's sessions.
+
+    Args:
+        certfile (str): Path to the SSL certificate file (PEM format).
+        keyfile (str): Path to the private key file (PEM format).
+
+    Returns:
+        ssl.SSLContext: Server context with session tickets enabled.
+
+    Raises:
+        FileNotFoundError: If either the certificate or key file is missing.
+        ssl.SSLError: If the certificate chain cannot be loaded.
+    """
+    if not os.path.exists(certfile):
+        logger.error("Certificate file not found: %s", certfile)
+        raise FileNotFoundError(f"Certificate file not found: {certfile}")
+
+    if not os.path.exists(keyfile):
+        logger.error("Key file not found: %s", keyfile)
+        raise FileNotFoundError(f"Key file not found: {keyfile}")
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+
+    try:
+        context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+    except ssl.SSLError as ssl_error:
+        logger.error(
+            "SSL error when loading certificate chain: %s",
+            ssl_error
+        )
+        if "PEM lib" in str(ssl_error):
+            logger.error(
+                "Invalid PEM format. "
+                "Check certificate and key files."
+            )
+        raise
+
+    # Resumption: TLS 1.2 tickets and the session cache are on by default;
+    # make sure tickets are not disabled and issue TLS 1.3 tickets
+    context.options &= ~ssl.OP_NO_TICKET
+    context.num_tickets = TLS13_TICKETS
+    return context
+
 
 def secure_socket(
     sock: socket.socket, certfile: str, keyfile: str, server_side: bool = True
@@ -13,6 +84,10 @@ def secure_socket(
     """
     Wrap a socket with SSL/TLS encryption for secure communication.
 
+    Wrapping a listening socket makes ``accept()`` perform each handshake
+    in the accepting thread; the server instead accepts plain connections
+    and calls ``tls_handshake`` on them in their handler threads.
+
     Args:
         sock (socket.socket): The socket object to secure.
         certfile (str): Path to the SSL certificate file (PEM format).
@@ -28,30 +103,7 @@ def secure_socket(
         Exception: For any other unexpected error during wrapping.
     """
     try:
-        if not os.path.exists(certfile):
-            logger.error("Certificate file not found: %s", certfile)
-            raise FileNotFoundError(f"Certificate file not found: {certfile}")
-
-        if not os.path.exists(keyfile):
-            logger.error("Key file not found: %s", keyfile)
-            raise FileNotFoundError(f"Key file not found: {keyfile}")
-
-        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-
-        try:
-            context.load_cert_chain(certfile=certfile, keyfile=keyfile)
-        except ssl.SSLError as ssl_error:
-            logger.error(
-                "SSL error when loading certificate chain: %s",
-                ssl_error
-            )
-            if "PEM lib" in str(ssl_error):
-                logger.error(
-                    "Invalid PEM format. "
-                    "Check certificate and key files."
-                )
-            raise
-
+        context = create_server_context(certfile, keyfile)
         secure_sock = context.wrap_socket(sock, server_side=server_side)
         return secure_sock
 
@@ -66,6 +118,73 @@ def secure_socket(
         raise
 
 
+def tls_handshake(
+    context: ssl.SSLContext,
+    conn: socket.socket,
+    timeout: Optional[float] = None
+) -> ssl.SSLSocket:
+    """
+    Wrap an accepted connection and complete the TLS handshake.
+
+    Runs in the connection's own thread, so a slow or stalled client only
+    holds up itself. Duration and whether the session was resumed are
+    recorded in the ``tls_handshake_seconds`` and ``tls_handshakes_total``
+    metrics.
+
+    Args:
+        context (ssl.SSLContext): The server context from
+            ``create_server_context``.
+        conn (socket.socket): A plain connection returned by ``accept()``.
+        timeout (Optional[float]): Seconds the client gets to finish the
+            handshake; None waits indefinitely.
+
+    Returns:
+        ssl.SSLSocket: The established TLS connection, in blocking mode.
+
+    Raises:
+        ssl.SSLError: If the handshake fails.
+        OSError: If the client disconnects or the timeout expires.
+    """
+    started = time.perf_counter()
+    conn.settimeout(timeout)
+    tls_conn = context.wrap_socket(
+        conn, server_side=True, do_handshake_on_connect=False
+    )
+    try:
+        tls_conn.do_handshake()
+    except (ssl.SSLError, OSError) as e:
+        outcome = "timeout" if isinstance(e, socket.timeout) else "error"
+        REGISTRY.inc(
+            "tls_handshakes_total",
+            labels={"outcome": outcome, "resumed": "false"},
+        )
+        raise
+    resumed = "true" if tls_conn.session_reused else "false"
+    REGISTRY.observe(
+        "tls_handshake_seconds",
+        time.perf_counter() - started,
+        labels={"resumed": resumed},
+    )
+    REGISTRY.inc(
+        "tls_handshakes_total", labels={"outcome": "ok", "resumed": resumed}
+    )
+    _count_resumption(resumed == "true")
+    tls_conn.settimeout(None)
+    return tls_conn
+
+
+_handshakes = {"ok": 0, "resumed": 0}
+_handshakes_lock = threading.Lock()
+
+
+def _count_resumption(resumed: bool) -> None:
+    with _handshakes_lock:
+        _handshakes["ok"] += 1
+        _handshakes["resumed"] += int(resumed)
+        ratio = _handshakes["resumed"] / _handshakes["ok"]
+    REGISTRY.set_gauge("tls_resumption_ratio", ratio)
+
+
 def protect_buffer(data: bytes, max_payload_size: int) -> bytes:
     """
     Ensure the data buffer size does not exceed the maximum allowed payload.
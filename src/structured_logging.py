@@ -0,0 +1,165 @@
+"""
+Non-blocking structured logging for the request path.
+
+Request handlers hand log records to a bounded queue; a single listener
+thread formats them and writes them to stdout or a file. Records carry their
+payload as a ``fields`` dictionary, and formatting is deferred to the
+listener so that a handler thread never builds a log string itself. When a
+record would be filtered out by level, sampling or quiet mode, the caller
+skips creating it entirely.
+"""
+
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from metrics import REGISTRY
+
+REQUEST_LOGGER = logging.getLogger("server.requests")
+REQUEST_LOGGER.propagate = False
+REQUEST_LOGGER.addHandler(logging.NullHandler())
+
+_sample_rate: float = 1.0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` formats the message in the calling thread; here the
+    record is enqueued untouched. When the queue is full the record is
+    dropped and counted rather than blocking the request.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            REGISTRY.inc("log_records_dropped_total")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Render a record as a single JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Render a record as ``timestamp LEVEL event key=value ...``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            datetime.fromtimestamp(record.created).isoformat(),
+            record.levelname,
+            record.getMessage(),
+        ]
+        for key, value in getattr(record, "fields", {}).items():
+            text = str(value)
+            if not text or " " in text or '"' in text:
+                text = json.dumps(text)
+            parts.append(f"{key}={text}")
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def log_event(
+    event: str,
+    fields: Dict[str, Any],
+    level: int = logging.INFO
+) -> None:
+    """
+    Emit a structured record from the request path.
+
+    The level and sampling checks happen before a LogRecord is created, so a
+    suppressed event costs a couple of attribute lookups. ``fields`` must not
+    be mutated after the call since it is formatted on another thread.
+
+    Args:
+        event (str): Short event name, e.g. ``"create_log"``.
+        fields (Dict[str, Any]): Structured payload of the record.
+        level (int): Logging level of the record.
+    """
+    if not REQUEST_LOGGER.isEnabledFor(level):
+        return
+    if (
+        level < logging.WARNING
+        and _sample_rate < 1.0
+        and random.random() >= _sample_rate
+    ):
+        return
+    REQUEST_LOGGER.log(level, event, extra={"fields": fields})
+
+
+def configure_logging(
+    settings: Optional[Dict[str, Any]] = None
+) -> QueueListener:
+    """
+    Route request logging through a queue and start its listener thread.
+
+    Recognised settings (all optional):
+        level (str): Minimum level emitted, default ``"INFO"``.
+        sample_rate (float): Fraction of INFO/DEBUG records kept, default 1.
+        json_lines (bool): Write JSON lines instead of key=value text.
+        quiet (bool): Only emit warnings and errors.
+        file (str): Append to this path instead of stdout.
+        queue_size (int): Maximum queued records before dropping, 10000.
+
+    Args:
+        settings (Optional[Dict[str, Any]]): The ``logging`` section of
+            ``server_config``.
+
+    Returns:
+        QueueListener: The started listener; call ``stop()`` to flush.
+    """
+    global _sample_rate
+    settings = settings or {}
+
+    level_name = str(settings.get("level", "INFO")).upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown logging level: {level_name}")
+    if settings.get("quiet", False):
+        level = max(level, logging.WARNING)
+
+    _sample_rate = max(0.0, min(1.0, float(settings.get("sample_rate", 1.0))))
+
+    output: logging.Handler
+    if settings.get("file"):
+        output = logging.FileHandler(str(settings["file"]), encoding="utf-8")
+    else:
+        output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        JsonLinesFormatter() if settings.get("json_lines", False)
+        else KeyValueFormatter()
+    )
+
+    record_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(
+        maxsize=int(settings.get("queue_size", 10_000))
+    )
+    for handler in list(REQUEST_LOGGER.handlers):
+        REQUEST_LOGGER.removeHandler(handler)
+    REQUEST_LOGGER.addHandler(DeferredQueueHandler(record_queue))
+    REQUEST_LOGGER.setLevel(level)
+
+    listener = QueueListener(record_queue, output, respect_handler_level=False)
+    listener.start()
+    return listener
@@ -0,0 +1,201 @@
+"""
+Write-ahead log of keys added to and removed from a data file at runtime.
+
+Each mutation is one line, ``+key`` or ``-key``, appended and flushed
+before the in-memory structures change, so a crash loses nothing that was
+acknowledged. Loading the data file replays the log over it; folding
+rewrites the data file with the current keys and empties the log.
+
+Replay is by final state per key rather than step by step, which makes it
+idempotent: replaying a log over a data file it was already folded into
+gives the same keys again.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REGISTRY.describe(
+    "wal_entries", "Mutations in the write-ahead log not yet folded."
+)
+
+ADD = "+"
+REMOVE = "-"
+
+# Suffix of the log next to its data file
+WAL_SUFFIX = ".wal"
+
+
+def check_key(key: str) -> None:
+    """
+    Raises:
+        ValueError: If ``key`` could not be stored as one line of a data
+        file.
+    """
+    if not isinstance(key, str) or not key:
+        raise ValueError("Key must be a non-empty string")
+    if key.splitlines() != [key]:
+        raise ValueError("Key must not contain line breaks")
+
+
+def apply_entries(
+    lines: List[str],
+    entries: List[Tuple[str, str]]
+) -> List[str]:
+    """
+    Applies logged mutations to the lines of a data file.
+
+    Args:
+        lines (List[str]): The keys read from the file, in order.
+        entries (List[Tuple[str, str]]): (operation, key) pairs, oldest
+            first.
+
+    Returns:
+        List[str]: ``lines`` without every key whose last operation was a
+        removal, followed by the keys whose last operation was an addition
+        and that are not already present.
+    """
+    final: Dict[str, str] = {}
+    for op, key in entries:
+        final[key] = op
+    if not final:
+        return lines
+    removed = {key for key, op in final.items() if op == REMOVE}
+    if removed:
+        lines = [line for line in lines if line not in removed]
+    added = [key for key, op in final.items() if op == ADD]
+    if added:
+        present = set(lines)
+        lines = lines + [key for key in added if key not in present]
+    return lines
+
+
+class WriteAheadLog:
+    """Append-only log file of key mutations. Thread-safe."""
+
+    def __init__(self, path: str, fsync: bool = True) -> None:
+        """
+        Args:
+            path (str): The log file; created if missing.
+            fsync (bool): Sync every entry to disk before returning.
+                Without it a power loss can drop the latest entries.
+        """
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        self._drop_unfinished()
+        self._count = len(self.entries())
+        REGISTRY.set_gauge("wal_entries", float(self._count))
+
+    def _drop_unfinished(self) -> None:
+        """
+        Truncates the log after its last complete record. A record cut
+        short by a crash would otherwise run into the next one appended.
+        """
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        end = raw.rfind(b"\n") + 1
+        if end == len(raw):
+            return
+        logger.warning(
+            f"Dropping unfinished entry at the end of {self.path}: "
+            f"{raw[end:]!r}"
+        )
+        self._file.truncate(end)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def __len__(self) -> int:
+        """Entries written since the log was last emptied."""
+        return self._count
+
+    def append(self, op: str, key: str) -> None:
+        """
+        Durably records one mutation.
+
+        Args:
+            op (str): ``ADD`` or ``REMOVE``.
+            key (str): The key.
+
+        Raises:
+            ValueError: If ``op`` or ``key`` is invalid.
+        """
+        if op not in (ADD, REMOVE):
+            raise ValueError(f"Unknown operation: {op}")
+        check_key(key)
+        record = f"{op}{key}\n".encode("utf-8")
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._count += 1
+            count = self._count
+        REGISTRY.set_gauge("wal_entries", float(count))
+
+    def entries(self) -> List[Tuple[str, str]]:
+        """
+        Returns:
+            List[Tuple[str, str]]: (operation, key) pairs, oldest first.
+            A last line cut short by a crash is ignored.
+        """
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        records = raw.split(b"\n")
+        records.pop()  # Empty, or an unfinished record
+        entries: List[Tuple[str, str]] = []
+        for record in records:
+            text = record.decode("utf-8", errors="replace")
+            if len(text) > 1 and text[0] in (ADD, REMOVE):
+                entries.append((text[0], text[1:]))
+            else:
+                logger.warning(f"Skipping bad entry in {self.path}: {text!r}")
+        return entries
+
+    def reset(self) -> None:
+        """Empties the log once its entries are in the data file."""
+        with self._lock:
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._count = 0
+        REGISTRY.set_gauge("wal_entries", 0.0)
+
+    def close(self) -> None:
+        """Closes the log file."""
+        with self._lock:
+            self._file.close()
+
+
+def create_write_ahead_log(
+    server_config: Dict[str, Any],
+    data_path: str
+) -> Optional[WriteAheadLog]:
+    """
+    Opens the log for ``data_path`` (``<data_path>.wal``) when the
+    optional ``key_mutation`` section of ``server_config`` enables it.
+
+    Args:
+        server_config (Dict[str, Any]): The ``server_config`` section.
+        data_path (str): The data file the log belongs to.
+
+    Returns:
+        Optional[WriteAheadLog]: The log, or None when key mutation is
+        disabled or the log cannot be opened.
+    """
+    settings = server_config.get("key_mutation") or {}
+    if not settings.get("enabled", False) or not data_path:
+        return None
+    try:
+        return WriteAheadLog(
+            data_path + WAL_SUFFIX, fsync=bool(settings.get("fsync", True))
+        )
+    except OSError as e:
+        logger.error(f"Cannot open write-ahead log for {data_path}: {e}")
+        return None
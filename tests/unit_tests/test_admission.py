@@ -0,0 +1,126 @@
+import threading
+import time
+import unittest
+
+from admission import (
+    SHED_OVERLOADED, SHED_RATE_LIMITED, AdmissionController,
+    create_admission_controller
+)
+
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_sheds_when_all_slots_are_taken(self):
+        admission = AdmissionController(max_in_flight=2, queue_timeout=0)
+
+        self.assertIsNone(admission.admit('10.0.0.1'))
+        self.assertIsNone(admission.admit('10.0.0.2'))
+        self.assertEqual(admission.admit('10.0.0.3'), SHED_OVERLOADED)
+        self.assertEqual(admission.stats()['shed'], {SHED_OVERLOADED: 1})
+
+    def test_release_frees_a_slot(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+        admission.admit('10.0.0.1')
+
+        admission.release()
+
+        self.assertIsNone(admission.admit('10.0.0.1'))
+        self.assertEqual(admission.stats()['in_flight'], 1)
+
+    def test_waiting_request_is_admitted_when_a_slot_frees(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=5)
+        admission.admit('10.0.0.1')
+        timer = threading.Timer(0.05, admission.release)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        started = time.perf_counter()
+        self.assertIsNone(admission.admit('10.0.0.2'))
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_token_bucket_limits_each_ip(self):
+        admission = AdmissionController(
+            max_in_flight=100, per_ip_rate=0.001, per_ip_burst=2
+        )
+
+        self.assertIsNone(admission.admit('10.0.0.1'))
+        self.assertIsNone(admission.admit('10.0.0.1'))
+        self.assertEqual(admission.admit('10.0.0.1'), SHED_RATE_LIMITED)
+        # Other clients have their own bucket
+        self.assertIsNone(admission.admit('10.0.0.2'))
+
+    def test_configure_raises_the_limit(self):
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+        admission.admit('10.0.0.1')
+
+        admission.apply_config({}, {'admission': {'max_in_flight': 2}})
+
+        self.assertIsNone(admission.admit('10.0.0.1'))
+
+    def test_config_change_keeps_spent_tokens(self):
+        settings = {'max_in_flight': 100, 'per_ip_rate': 0.001,
+                    'per_ip_burst': 2}
+        admission = AdmissionController(**settings)
+        admission.admit('10.0.0.1')
+        admission.admit('10.0.0.1')
+
+        admission.apply_config({}, {'admission': settings})
+
+        self.assertEqual(admission.admit('10.0.0.1'), SHED_RATE_LIMITED)
+
+    def test_lower_burst_caps_saved_tokens(self):
+        admission = AdmissionController(
+            max_in_flight=100, per_ip_rate=0.001, per_ip_burst=5
+        )
+        admission.admit('10.0.0.1')
+
+        admission.configure(100, per_ip_rate=0.001, per_ip_burst=1)
+
+        self.assertIsNone(admission.admit('10.0.0.1'))
+        self.assertEqual(admission.admit('10.0.0.1'), SHED_RATE_LIMITED)
+
+    def test_connections_over_the_limit_are_shed(self):
+        admission = AdmissionController(max_connections=1)
+
+        self.assertIsNone(admission.open_connection('10.0.0.1'))
+        self.assertEqual(
+            admission.open_connection('10.0.0.2'), SHED_OVERLOADED
+        )
+        admission.close_connection()
+        self.assertIsNone(admission.open_connection('10.0.0.2'))
+        self.assertEqual(admission.stats()['connections'], 1)
+
+    def test_connection_from_ip_without_tokens_is_shed(self):
+        admission = AdmissionController(
+            max_in_flight=100, per_ip_rate=0.001, per_ip_burst=1
+        )
+        self.assertIsNone(admission.open_connection('10.0.0.1'))
+        admission.admit('10.0.0.1')
+
+        self.assertEqual(
+            admission.open_connection('10.0.0.1'), SHED_RATE_LIMITED
+        )
+        # Checking a connection spends nothing
+        self.assertIsNone(admission.open_connection('10.0.0.2'))
+        self.assertIsNone(admission.admit('10.0.0.2'))
+
+    def test_invalid_settings_are_ignored(self):
+        admission = AdmissionController(max_in_flight=3)
+
+        admission.apply_config({}, {'admission': {'max_in_flight': 0}})
+
+        self.assertEqual(admission.max_in_flight, 3)
+
+    def test_create_admission_controller_requires_enabled(self):
+        self.assertIsNone(create_admission_controller({}))
+
+        admission = create_admission_controller({'admission': {
+            'enabled': True, 'max_in_flight': 4, 'per_ip_rate': 10
+        }})
+
+        self.assertEqual(admission.max_in_flight, 4)
+        self.assertEqual(admission.per_ip_rate, 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
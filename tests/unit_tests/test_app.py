@@ -1,7 +1,13 @@
+import os
+import tempfile
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 from datetime import datetime
 from app import AppService
+from columns import ColumnExtractor
+from metrics import REGISTRY
+from repositories import IndexSnapshot, StorageRepository
 
 
 class TestAppService(unittest.TestCase):
@@ -9,6 +15,9 @@ class TestAppService(unittest.TestCase):
         # Mock dependencies
         self.mock_log_repo = MagicMock()
         self.mock_storage_repo = MagicMock()
+        # Whole lines are indexed unless a test sets up columns
+        self.mock_storage_repo.columns = None
+        self.mock_storage_repo.row_offsets = None
         self.mock_config = MagicMock()
 
         self.mock_config.get_file_config.return_value = {
@@ -34,7 +43,9 @@ class TestAppService(unittest.TestCase):
         # Setup mocks
         self.mock_storage_repo.data = "some_data"
         self.mock_storage_repo.load_file.return_value = True
-        self.mock_storage_repo.prepare.return_value = None
+        self.mock_storage_repo.prepare.return_value = IndexSnapshot(
+            ["some_data"], "naive", ["some_data"]
+        )
         self.mock_storage_repo.search.return_value = (True, 0.123)
 
         # Prepare a Log mock that will be returned after create_log
@@ -70,6 +81,21 @@ class TestAppService(unittest.TestCase):
             self.assertEqual(result["status"], "STRING_EXISTS")
             self.assertIsNotNone(result["timestamp"])
 
+    def test_create_log_records_phase_breakdown(self):
+        self.mock_storage_repo.data = "some_data"
+        self.mock_storage_repo.load_file.return_value = True
+        self.mock_storage_repo.search.return_value = (False, 0.001)
+        phases = {"recv": 10, "decode": 20}
+
+        result = self.service.create_log("127.0.0.1", "q", "set", phases)
+
+        self.assertIs(result["phases"], phases)
+        for phase in ("recv", "decode", "prepare", "search", "persist"):
+            self.assertIn(phase, result["phases"])
+        persisted = self.mock_log_repo.create_log.call_args[0][0]
+        self.assertIn("search", persisted.phases)
+        self.assertNotIn("persist", persisted.phases)
+
     def test_create_log_load_file_failure(self):
         self.mock_storage_repo.data = None
         self.mock_storage_repo.load_file.return_value = False
@@ -101,7 +127,9 @@ class TestAppService(unittest.TestCase):
     def test_create_log_search_raises_exception(self):
         self.mock_storage_repo.data = "some_data"
         self.mock_storage_repo.load_file.return_value = True
-        self.mock_storage_repo.prepare.return_value = None
+        self.mock_storage_repo.prepare.return_value = IndexSnapshot(
+            ["some_data"], "naive", ["some_data"]
+        )
         self.mock_storage_repo.search.side_effect = Exception("search failed")
 
         result = self.service.create_log("127.0.0.1", "query", "naive")
@@ -119,10 +147,37 @@ class TestAppService(unittest.TestCase):
         result = self.service.read_logs()
         self.assertEqual(result, [])
 
+    def test_read_logs_page_clamps_limit_and_builds_filter(self):
+        self.mock_log_repo.query_logs.return_value = ([{"id": "1"}], 42)
+
+        result = self.service.read_logs_page(
+            cursor=10, limit=10_000, filters={"ip": "127.0.0.1"}
+        )
+
+        self.assertEqual(result, {"logs": [{"id": "1"}], "next_cursor": 42})
+        kwargs = self.mock_log_repo.query_logs.call_args.kwargs
+        self.assertEqual(kwargs["cursor"], 10)
+        self.assertEqual(kwargs["limit"], 1000)
+        self.assertEqual(kwargs["log_filter"].ip, "127.0.0.1")
+
+    def test_read_logs_page_rejects_unknown_filter(self):
+        result = self.service.read_logs_page(filters={"colour": "red"})
+
+        self.assertEqual(result["logs"], [])
+        self.assertIn("Unknown filter", result["error"])
+        self.mock_log_repo.query_logs.assert_not_called()
+
+    def test_read_logs_page_rejects_bad_cursor(self):
+        result = self.service.read_logs_page(cursor="abc")
+
+        self.assertIn("Invalid cursor", result["error"])
+
     def test_create_logs_parallel_mixed_results(self):
         self.mock_storage_repo.data = "some_data"
         self.mock_storage_repo.load_file.return_value = True
-        self.mock_storage_repo.prepare.return_value = None
+        self.mock_storage_repo.prepare.return_value = IndexSnapshot(
+            ["some_data"], "naive", ["some_data"]
+        )
 
         # First call returns success, second call throws exception
         self.mock_storage_repo.search.side_effect = [
@@ -211,6 +266,314 @@ class TestAppService(unittest.TestCase):
                 self.assertEqual(len(success_results), 1)
                 self.assertEqual(len(error_results), 1)
 
+    def test_create_logs_batch_prepares_once_and_keeps_order(self):
+        self.mock_storage_repo.data = ["a", "b"]
+        snapshot = IndexSnapshot(["a", "b"], "set", {"a", "b"})
+        self.mock_storage_repo.prepare.return_value = snapshot
+        self.service.batch_pool = MagicMock()
+        self.service.batch_pool.search.return_value = [
+            (True, 0.001), (False, 0.002), (True, 0.003)
+        ]
+
+        results = self.service.create_logs_batch(
+            "127.0.0.1", ["a", "z", "b"], "set"
+        )
+
+        self.mock_storage_repo.prepare.assert_called_once_with(mode="set")
+        self.service.batch_pool.search.assert_called_once_with(
+            snapshot, ["a", "z", "b"]
+        )
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["STRING_EXISTS", "STRING_NOT_FOUND", "STRING_EXISTS"]
+        )
+        self.assertEqual([r["query"] for r in results], ["a", "z", "b"])
+        logs = self.mock_log_repo.create_logs.call_args[0][0]
+        self.assertEqual([log.query for log in logs], ["a", "z", "b"])
+        self.assertTrue(all(log.mode == "set" for log in logs))
+
+    def test_create_logs_batch_reports_prepare_failure_per_query(self):
+        self.mock_storage_repo.data = ["a"]
+        self.mock_storage_repo.prepare.side_effect = ValueError("too big")
+
+        results = self.service.create_logs_batch("ip", ["a", "b"], "trie")
+
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(r["status"] == "error" for r in results))
+        self.assertIn("too big", results[0]["error"])
+        self.mock_log_repo.create_logs.assert_not_called()
+
+    def test_apply_config_updates_settings(self):
+        self.service.apply_config(
+            {'linuxpath': self.service.file_path},
+            {'search_mode': 'trie', 'reread_on_query': True}
+        )
+
+        self.assertEqual(self.service.search_mode, 'trie')
+        self.assertTrue(self.service.reread_on_query)
+        self.assertIs(self.service.storage_repo, self.mock_storage_repo)
+
+    def test_switch_dataset_swaps_prepared_repo(self):
+        self.mock_exists.stop()
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.txt', delete=False
+        ) as f:
+            f.write("alpha\nbeta\n")
+        self.addCleanup(os.unlink, f.name)
+        self.service.search_mode = 'set'
+
+        self.service.switch_dataset(f.name).join()
+
+        self.assertEqual(self.service.file_path, f.name)
+        self.assertEqual(self.service.storage_repo.mode, 'set')
+        self.assertEqual(self.service.storage_repo.search("beta")[0], True)
+
+    def test_switch_dataset_builds_modes_of_outgoing_repo(self):
+        self.mock_exists.stop()
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.txt', delete=False
+        ) as f:
+            f.write("alpha\nbeta\n")
+        self.addCleanup(os.unlink, f.name)
+        self.service.search_mode = 'set'
+        self.mock_storage_repo.prepared_modes.return_value = [
+            'binary', 'set', 'trie'
+        ]
+
+        self.service.switch_dataset(f.name).join()
+
+        repo = self.service.storage_repo
+        self.assertEqual(repo.prepared_modes(), ['binary', 'set', 'trie'])
+        self.assertEqual(repo.mode, 'set')
+
+    def test_failed_switch_keeps_current_dataset(self):
+        self.mock_exists.stop()
+        old_path = self.service.file_path
+
+        self.service.switch_dataset('/nonexistent/data.txt').join()
+
+        self.assertIs(self.service.storage_repo, self.mock_storage_repo)
+        self.assertEqual(self.service.file_path, old_path)
+
+    def test_prewarm_loads_and_prepares_before_ready(self):
+        self.mock_storage_repo.data = None
+        self.mock_storage_repo.load_file.return_value = True
+        self.assertEqual(self.service.health()['status'], 'starting')
+
+        self.service.prewarm(time.perf_counter(), modes=['naive', 'trie'])
+
+        self.mock_storage_repo.load_file.assert_called_once_with(
+            self.service.file_path
+        )
+        # The default mode is built last so it stays active
+        self.assertEqual(
+            [c.kwargs['mode'] for c in
+             self.mock_storage_repo.prepare.call_args_list],
+            ['trie', 'naive']
+        )
+        health = self.service.health()
+        self.assertTrue(health['ready'])
+        self.assertEqual(health['status'], 'ready')
+        self.assertGreaterEqual(health['time_to_ready'], 0)
+
+    def test_prewarm_failure_still_marks_ready(self):
+        self.mock_storage_repo.data = None
+        self.mock_storage_repo.load_file.return_value = False
+
+        self.service.prewarm(time.perf_counter())
+
+        self.mock_storage_repo.prepare.assert_not_called()
+        self.assertTrue(self.service.ready)
+
+    def test_index_memory_is_collected_without_metrics_port(self):
+        self.mock_storage_repo.memory_usage.return_value = {
+            'trie-test': 2048
+        }
+
+        gauges = REGISTRY.snapshot()['gauges']
+
+        self.assertEqual(
+            gauges['index_memory_bytes']['{mode="trie-test"}'], 2048.0
+        )
+
+    def test_create_log_uses_named_dataset(self):
+        dataset_repo = MagicMock()
+        dataset_repo.search.return_value = (True, 0.001)
+        dataset_repo.mode = 'set'
+        self.service.datasets = MagicMock()
+        self.service.datasets.get.return_value = dataset_repo
+
+        result = self.service.create_log(
+            '127.0.0.1', 'apple', 'set', dataset='250k'
+        )
+
+        self.assertEqual(result['status'], 'STRING_EXISTS')
+        self.service.datasets.get.assert_called_once_with('250k', 'set')
+        self.mock_storage_repo.load_file.assert_not_called()
+        self.mock_storage_repo.search.assert_not_called()
+
+    def test_create_log_reports_exact_and_normalized_match(self):
+        repo = StorageRepository()
+        repo.data = ["Apple", "banana"]
+        self.service.storage_repo = repo
+
+        result = self.service.create_log(
+            '127.0.0.1', ' apple', 'set', normalized=True
+        )
+
+        self.assertEqual(result['status'], 'STRING_NOT_FOUND')
+        self.assertEqual(result['normalized_status'], 'STRING_EXISTS')
+        self.assertIn('search_normalized', result['phases'])
+
+    def test_normalized_status_only_when_requested(self):
+        repo = StorageRepository()
+        repo.data = ["Apple"]
+        self.service.storage_repo = repo
+
+        result = self.service.create_log('127.0.0.1', 'APPLE', 'normalized')
+
+        self.assertEqual(result['status'], 'STRING_EXISTS')
+        self.assertNotIn('normalized_status', result)
+
+    def test_create_log_returns_row_of_column_match(self):
+        self.mock_exists.stop()
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False
+        ) as f:
+            f.write("k1,first\nk2,second\n")
+        self.addCleanup(os.unlink, f.name)
+        repo = StorageRepository(columns=ColumnExtractor(column=0))
+        repo.load_file(f.name)
+        self.service.storage_repo = repo
+
+        found = self.service.create_log('127.0.0.1', 'k2', 'dict')
+        missing = self.service.create_log('127.0.0.1', 'second', 'dict')
+
+        self.assertEqual(found['status'], 'STRING_EXISTS')
+        self.assertEqual(found['row'], 'k2,second')
+        self.assertEqual(missing['status'], 'STRING_NOT_FOUND')
+        self.assertNotIn('row', missing)
+
+    def test_locate_counts_and_limits_matches(self):
+        self.mock_exists.stop()
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.txt', delete=False
+        ) as f:
+            f.write("k\nx\nk\nk\n")
+        self.addCleanup(os.unlink, f.name)
+        repo = StorageRepository()
+        repo.load_file(f.name)
+        self.service.storage_repo = repo
+
+        result = self.service.locate('k', limit=2)
+
+        self.assertEqual(result['status'], 'STRING_EXISTS')
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['lines'], [1, 3])
+        self.assertEqual(result['offsets'], [0, 4])
+        self.assertEqual(result['context'], ['k', 'k'])
+        self.assertTrue(result['truncated'])
+
+    def test_locate_reports_unloadable_file(self):
+        self.mock_storage_repo.data = None
+        self.mock_storage_repo.load_file.return_value = False
+
+        result = self.service.locate('k')
+
+        self.assertEqual(result['status'], 'error')
+
+    def test_add_and_remove_key(self):
+        self.mock_storage_repo.data = ["apple", "cherry"]
+        self.mock_storage_repo.add_key.return_value = True
+        self.mock_storage_repo.remove_key.return_value = False
+
+        added = self.service.add_key('cherry')
+        removed = self.service.remove_key('plum')
+
+        self.mock_storage_repo.add_key.assert_called_once_with('cherry')
+        self.assertEqual(added, {'key': 'cherry', 'status': 'added',
+                                 'keys': 2})
+        self.assertEqual(removed['status'], 'absent')
+
+    def test_add_key_reports_disabled_mutation(self):
+        self.mock_storage_repo.data = ["apple"]
+        self.mock_storage_repo.add_key.side_effect = ValueError(
+            "Key mutation is disabled"
+        )
+
+        result = self.service.add_key('cherry')
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['error'], 'Key mutation is disabled')
+
+    def test_key_mutation_raises_the_row_limit(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_path = os.path.join(tmpdir, 'data.txt')
+            self.mock_config.get_file_config.return_value = {
+                'linuxpath': data_path
+            }
+            self.mock_config.get_server_config.return_value = {
+                'key_mutation': {'enabled': True, 'max_rows': 400_000}
+            }
+            service = AppService(
+                log_repo=self.mock_log_repo,
+                storage_repo=self.mock_storage_repo,
+                config=self.mock_config
+            )
+            self.mock_storage_repo.key_log.close()
+
+        self.assertEqual(service.max_rows, 400_000)
+        self.assertEqual(self.mock_storage_repo.max_rows, 400_000)
+
+    def test_fold_if_due(self):
+        self.service.fold_entries = 3
+        self.service.fold_interval = 60.0
+        key_log = MagicMock()
+        key_log.__len__.return_value = 1
+        self.mock_storage_repo.key_log = key_log
+        self.mock_storage_repo.fold_key_log.return_value = True
+        self.service._last_fold = 100.0
+
+        self.assertFalse(self.service.fold_if_due(now=130.0))
+        self.assertTrue(self.service.fold_if_due(now=161.0))
+        key_log.__len__.return_value = 3
+        self.assertTrue(self.service.fold_if_due(now=162.0))
+        self.assertEqual(
+            self.mock_storage_repo.fold_key_log.call_count, 2
+        )
+
+    def test_create_log_unknown_dataset(self):
+        self.service.datasets = MagicMock()
+        self.service.datasets.get.side_effect = KeyError(
+            "Unknown dataset: nope"
+        )
+
+        result = self.service.create_log(
+            '127.0.0.1', 'apple', 'set', dataset='nope'
+        )
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['error'], 'Unknown dataset: nope')
+
+    def test_create_log_dataset_without_registry(self):
+        result = self.service.create_log(
+            '127.0.0.1', 'apple', 'set', dataset='250k'
+        )
+
+        self.assertEqual(result['status'], 'error')
+
+    def test_auto_mode_choice_is_reported(self):
+        self.mock_storage_repo.data = ["apple"] * 1000
+        self.mock_storage_repo.memory_reports = {}
+        self.mock_storage_repo.prepare.return_value.mode = 'set'
+        self.mock_storage_repo.search.return_value = (True, 0.0001)
+
+        result = self.service.create_log('127.0.0.1', 'apple', 'auto')
+
+        self.mock_storage_repo.prepare.assert_called_once_with(mode='set')
+        self.assertEqual(result['mode'], 'set')
+        self.assertIn('auto', result['mode_reason'])
+
     def test_validate_file_path_relative_converted(self):
         # Patch os.getcwd and os.path.isabs
         with patch("os.getcwd", return_value="/home/user/project"), \
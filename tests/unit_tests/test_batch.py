@@ -0,0 +1,109 @@
+import multiprocessing
+import unittest
+
+from batch import BatchSearchPool, create_batch_pool, search_chunk
+from repositories import StorageRepository
+
+HAS_FORK = "fork" in multiprocessing.get_all_start_methods()
+
+
+def _prepared(mode, lines):
+    repo = StorageRepository()
+    repo.data = list(lines)
+    return repo.prepare(mode=mode)
+
+
+class TestBatchSearchPool(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = [f"word{i}" for i in range(1000)]
+
+    def test_search_chunk_matches_repository_search(self):
+        snapshot = _prepared("trie", self.lines)
+
+        results = search_chunk(snapshot, ["word5", "missing", ""])
+
+        self.assertEqual([found for found, _ in results], [True, False, False])
+        self.assertEqual(results[2][1], 0.0)
+
+    def test_small_batches_run_inline(self):
+        pool = BatchSearchPool(processes=2, min_parallel=100)
+        self.addCleanup(pool.close)
+
+        results = pool.search(_prepared("set", self.lines), ["word1", "x"])
+
+        self.assertEqual([found for found, _ in results], [True, False])
+        self.assertFalse(pool.stats()["running"])
+
+    @unittest.skipUnless(HAS_FORK, "fork start method not available")
+    def test_workers_return_results_in_input_order(self):
+        pool = BatchSearchPool(processes=2, min_parallel=1)
+        self.addCleanup(pool.close)
+        snapshot = _prepared("set", self.lines)
+        queries = [
+            f"word{i}" if i % 3 else f"absent{i}" for i in range(500)
+        ]
+
+        results = pool.search(snapshot, queries)
+
+        self.assertEqual(
+            [found for found, _ in results],
+            [bool(i % 3) for i in range(500)]
+        )
+
+    @unittest.skipUnless(HAS_FORK, "fork start method not available")
+    def test_pool_is_reused_until_snapshot_changes(self):
+        pool = BatchSearchPool(processes=2, min_parallel=1)
+        self.addCleanup(pool.close)
+        first = _prepared("set", self.lines)
+
+        pool.search(first, ["word1", "word2"])
+        pool.search(first, ["word3", "word4"])
+        self.assertEqual(pool.stats()["forks"], 1)
+
+        second = _prepared("binary", self.lines + ["extra"])
+        results = pool.search(second, ["extra", "nope"])
+
+        self.assertEqual([found for found, _ in results], [True, False])
+        self.assertEqual(pool.stats()["forks"], 2)
+        self.assertEqual(pool.stats()["mode"], "binary")
+
+    @unittest.skipUnless(HAS_FORK, "fork start method not available")
+    def test_pool_is_reforked_after_in_place_changes(self):
+        pool = BatchSearchPool(processes=2, min_parallel=1)
+        self.addCleanup(pool.close)
+        repo = StorageRepository()
+        repo.data = list(self.lines)
+        snapshot = repo.prepare("set")
+        pool.search(snapshot, ["word1"])
+
+        repo.append_lines(["new1"])
+        self.assertIs(repo.prepare("set"), snapshot)
+        results = pool.search(snapshot, ["new1", "word1"])
+
+        self.assertEqual([found for found, _ in results], [True, True])
+        self.assertEqual(pool.stats()["forks"], 2)
+
+        repo.remove_lines({"word1"})
+        results = pool.search(snapshot, ["new1", "word1"])
+        self.assertEqual([found for found, _ in results], [True, False])
+
+    def test_single_process_never_forks(self):
+        pool = BatchSearchPool(processes=1, min_parallel=1)
+
+        pool.search(_prepared("dict", self.lines), ["word1"] * 10)
+
+        self.assertFalse(pool.parallel)
+        self.assertEqual(pool.stats()["forks"], 0)
+
+    def test_create_batch_pool_reads_settings(self):
+        pool = create_batch_pool(
+            {"batch_search": {"processes": 3, "min_parallel": 10}}
+        )
+
+        self.assertEqual(pool.processes, 3)
+        self.assertEqual(pool.min_parallel, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
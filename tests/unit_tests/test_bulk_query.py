@@ -0,0 +1,85 @@
+import io
+import os
+import tempfile
+import unittest
+from bulk_query import main, merge_join, read_chunks, run_bulk_query, set_join
+from repositories import StorageRepository
+
+
+class TestJoins(unittest.TestCase):
+    def setUp(self):
+        self.keys = ["apple", "banana", "cherry", "kiwi"]
+        self.queries = ["kiwi", "zebra", "apple", "", "banana", "aardvark",
+                        "kiwi"]
+        self.expected = [True, False, True, False, True, False, True]
+
+    def test_set_join(self):
+        self.assertEqual(set_join(set(self.keys), self.queries),
+                         self.expected)
+
+    def test_merge_join_keeps_query_order(self):
+        self.assertEqual(merge_join(sorted(self.keys), self.queries),
+                         self.expected)
+
+    def test_merge_join_on_empty_data(self):
+        self.assertEqual(merge_join([], ["a", "b"]), [False, False])
+
+    def test_read_chunks(self):
+        stream = io.StringIO("a\r\nb\nc\nd\ne")
+        self.assertEqual(list(read_chunks(stream, 2)),
+                         [["a", "b"], ["c", "d"], ["e"]])
+
+
+class TestRunBulkQuery(unittest.TestCase):
+    def setUp(self):
+        self.repo = StorageRepository()
+        self.repo.data = ["apple", "banana", "cherry"]
+
+    def test_tsv_output_and_stats(self):
+        for join in ("set", "merge"):
+            output = io.StringIO()
+            stats = run_bulk_query(
+                self.repo, io.StringIO("cherry\nplum\napple\n"), output,
+                join=join, chunk_size=2
+            )
+            self.assertEqual(output.getvalue(),
+                             "1\tcherry\n0\tplum\n1\tapple\n")
+            self.assertEqual(stats["queries"], 3)
+            self.assertEqual(stats["found"], 2)
+
+    def test_found_output(self):
+        output = io.StringIO()
+        run_bulk_query(self.repo, io.StringIO("plum\nbanana\n"), output,
+                       output_format="found")
+        self.assertEqual(output.getvalue(), "banana\n")
+
+    def test_unknown_join(self):
+        with self.assertRaises(ValueError):
+            run_bulk_query(self.repo, io.StringIO(""), io.StringIO(),
+                           join="hash")
+
+
+class TestMain(unittest.TestCase):
+    def test_writes_results_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data = os.path.join(tmpdir, "data.csv")
+            queries = os.path.join(tmpdir, "queries.txt")
+            output = os.path.join(tmpdir, "out.tsv")
+            with open(data, "w") as f:
+                f.write("id,name\n7,a\n9,b\n")
+            with open(queries, "w") as f:
+                f.write("9\n8\n")
+
+            status = main([data, queries, "-o", output, "--column", "0",
+                           "--header", "--join", "merge"])
+
+            self.assertEqual(status, 0)
+            with open(output) as f:
+                self.assertEqual(f.read(), "1\t9\n0\t8\n")
+
+    def test_missing_data_file(self):
+        self.assertEqual(main(["no_such_file", "no_such_queries"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
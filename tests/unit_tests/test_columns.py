@@ -0,0 +1,43 @@
+import unittest
+
+from columns import (
+    ColumnExtractor, column_extractor_from, create_column_extractor
+)
+
+
+class TestColumnExtractor(unittest.TestCase):
+
+    def test_extracts_field_from_plain_row(self):
+        extractor = ColumnExtractor(column=1)
+
+        self.assertEqual(extractor.extract("a,b,c"), "b")
+        self.assertEqual(extractor.extract("a"), "")
+
+    def test_honours_quoted_delimiters(self):
+        extractor = ColumnExtractor(column=1)
+
+        self.assertEqual(extractor.extract('"x, y",key,z'), "key")
+        self.assertEqual(extractor.extract('a,"k,1",z'), "k,1")
+
+    def test_rejects_bad_settings(self):
+        with self.assertRaises(ValueError):
+            ColumnExtractor(column=-1)
+        with self.assertRaises(ValueError):
+            ColumnExtractor(delimiter="::")
+
+    def test_settings_accept_delimiter_names(self):
+        extractor = column_extractor_from(
+            {"column": 2, "delimiter": "tab", "header": True}
+        )
+
+        self.assertEqual(extractor.delimiter, "\t")
+        self.assertTrue(extractor.header)
+        self.assertEqual(extractor.extract("a\tb\tc\td"), "c")
+
+    def test_no_column_indexes_whole_lines(self):
+        self.assertIsNone(create_column_extractor({}))
+        self.assertIsNone(column_extractor_from({"delimiter": ","}))
+
+
+if __name__ == "__main__":
+    unittest.main()
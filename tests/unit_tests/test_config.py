@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+
+from config import Config
+
+
+class TestConfigReload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "config.json")
+        self._write("data10k.txt")
+        self.config = Config(self.path)
+
+    def tearDown(self):
+        self.config.stop_watching()
+        self.tmpdir.cleanup()
+
+    def _write(self, linuxpath, search_mode="set"):
+        with open(self.path, "w") as f:
+            json.dump({
+                "file_config": {"linuxpath": linuxpath},
+                "server_config": {"port": 8441, "search_mode": search_mode},
+            }, f)
+        # Make sure the change is visible even on coarse mtime clocks
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_check_for_changes_applies_and_notifies(self):
+        calls = []
+        self.config.add_listener(
+            lambda file_conf, server_conf: calls.append(
+                (file_conf["linuxpath"], server_conf["search_mode"])
+            )
+        )
+        self._write("data250k.txt", "trie")
+
+        self.assertTrue(self.config.check_for_changes())
+        self.assertEqual(calls, [("data250k.txt", "trie")])
+        self.assertEqual(
+            self.config.get_file_config()["linuxpath"], "data250k.txt"
+        )
+        self.assertFalse(self.config.check_for_changes())
+
+    def test_invalid_change_keeps_previous_config(self):
+        calls = []
+        self.config.add_listener(lambda *args: calls.append(args))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+
+        self.assertFalse(self.config.reload())
+        self.assertEqual(
+            self.config.get_file_config()["linuxpath"], "data10k.txt"
+        )
+        self.assertEqual(calls, [])
+
+    def test_wrong_type_rejected(self):
+        with open(self.path, "w") as f:
+            json.dump({
+                "file_config": {"linuxpath": 5},
+                "server_config": {"port": 8441},
+            }, f)
+
+        self.assertFalse(self.config.reload())
+
+    def test_unchanged_file_does_not_notify(self):
+        calls = []
+        self.config.add_listener(lambda *args: calls.append(args))
+        self._write("data10k.txt")
+
+        self.assertFalse(self.config.check_for_changes())
+        self.assertEqual(calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
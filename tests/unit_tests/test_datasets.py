@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from datasets import DatasetRegistry, create_dataset_registry
+from metrics import REGISTRY
+
+
+class TestDatasetRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = {}
+        for name, words in (
+            ("small", ["apple", "banana"]),
+            ("large", [f"word{i}" for i in range(2000)]),
+        ):
+            path = os.path.join(self.tmpdir.name, f"{name}.txt")
+            with open(path, "w") as f:
+                f.write("\n".join(words) + "\n")
+            self.paths[name] = path
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_builds_once_per_dataset_and_mode(self):
+        registry = DatasetRegistry(self.paths)
+
+        repo = registry.get("small", "set")
+
+        self.assertIs(registry.get("small", "set"), repo)
+        self.assertEqual(repo.search("banana")[0], True)
+        trie = registry.get("small", "trie")
+        self.assertEqual(trie.mode, "trie")
+        self.assertIs(trie.data, repo.data)
+        self.assertEqual(repo.mode, "set")
+
+    def test_unknown_modes_share_the_naive_entry(self):
+        registry = DatasetRegistry(self.paths)
+
+        repo = registry.get("small", "bogus1")
+
+        self.assertIs(registry.get("small", "bogus2"), repo)
+        self.assertIs(registry.get("small", "naive"), repo)
+        self.assertEqual(repo.mode, "naive")
+
+    def test_column_dataset_shares_rows_across_modes(self):
+        path = os.path.join(self.tmpdir.name, "rows.tsv")
+        with open(path, "w") as f:
+            f.write("a\t1\nb\t2\n")
+        registry = DatasetRegistry(
+            {"rows": {"path": path, "column": 1, "delimiter": "tab"}}
+        )
+
+        set_repo = registry.get("rows", "set")
+        trie_repo = registry.get("rows", "trie")
+
+        self.assertEqual(set_repo.data, ["1", "2"])
+        self.assertTrue(trie_repo.search("2")[0])
+        self.assertEqual(trie_repo.row_for("2"), "b\t2")
+
+    def test_unknown_dataset(self):
+        with self.assertRaises(KeyError):
+            DatasetRegistry(self.paths).get("missing", "set")
+
+    def test_unloadable_dataset(self):
+        registry = DatasetRegistry({"gone": "/nonexistent/data.txt"})
+
+        with self.assertRaises(ValueError):
+            registry.get("gone", "set")
+
+    def test_lru_eviction_under_budget(self):
+        registry = DatasetRegistry(self.paths)
+        registry.get("large", "set")
+        registry.get("small", "set")
+        registry.get("large", "dict")
+        registry.memory_budget = registry.usage()["used"] - 1
+        before = REGISTRY.snapshot()["counters"].get(
+            "dataset_evictions_total", {}
+        )
+
+        registry.get("small", "dict")
+
+        usage = registry.usage()
+        self.assertNotIn("set", usage["datasets"]["large"]["modes"])
+        self.assertIn("dict", usage["datasets"]["large"]["modes"])
+        self.assertEqual(usage["datasets"]["large"]["evictions"], 1)
+        self.assertLessEqual(usage["used"], registry.memory_budget)
+        after = REGISTRY.snapshot()["counters"]["dataset_evictions_total"]
+        self.assertNotEqual(after, before)
+
+    def test_evicting_last_mode_drops_lines(self):
+        registry = DatasetRegistry(self.paths, memory_budget=1)
+        registry.get("large", "set")
+
+        registry.get("small", "set")
+
+        usage = registry.usage()
+        self.assertEqual(usage["datasets"]["large"]["modes"], {})
+        self.assertEqual(usage["datasets"]["large"]["data_bytes"], 0)
+        # Rebuilt on demand
+        self.assertTrue(registry.get("large", "set").search("word7")[0])
+
+    def test_create_from_server_config(self):
+        self.assertIsNone(create_dataset_registry({}))
+        registry = create_dataset_registry({
+            "datasets": {"small": {"path": self.paths["small"],
+                                   "max_rows": 10}},
+            "dataset_memory_budget_mb": 1,
+        })
+        self.assertEqual(registry.names(), ["small"])
+        self.assertEqual(registry.memory_budget, 1024 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import signal
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from handoff import (
+    LISTEN_FD_ENV, METRICS_FD_ENV, PARENT_PID_ENV, RequestTracker,
+    complete_takeover, inherited_socket, sd_notify, spawn_successor,
+    watch_successor
+)
+
+
+class TestRequestTracker(unittest.TestCase):
+
+    def test_drain_waits_for_requests_in_progress(self):
+        tracker = RequestTracker()
+        tracker.begin()
+        timer = threading.Timer(0.05, tracker.end)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertTrue(tracker.drain(timeout=5))
+        self.assertTrue(tracker.draining)
+        self.assertEqual(tracker.active, 0)
+
+    def test_drain_times_out(self):
+        tracker = RequestTracker()
+        tracker.begin()
+
+        self.assertFalse(tracker.drain(timeout=0.01))
+        self.assertEqual(tracker.active, 1)
+
+
+class TestHandoff(unittest.TestCase):
+
+    def test_inherited_socket_reads_the_handed_over_fd(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        fd = os.dup(listener.fileno())
+        listener.close()
+
+        with patch.dict(os.environ, {LISTEN_FD_ENV: str(fd)}):
+            sock = inherited_socket()
+            self.assertNotIn(LISTEN_FD_ENV, os.environ)
+        self.addCleanup(sock.close)
+
+        client = socket.create_connection(sock.getsockname())
+        self.addCleanup(client.close)
+        conn, _ = sock.accept()
+        conn.close()
+
+    def test_no_inherited_socket_without_env(self):
+        with patch.dict(os.environ, clear=False):
+            os.environ.pop(LISTEN_FD_ENV, None)
+            self.assertIsNone(inherited_socket())
+
+    @patch('handoff.subprocess.Popen')
+    def test_successor_inherits_the_metrics_socket(self, mock_popen):
+        listener, metrics = socket.socket(), socket.socket()
+        self.addCleanup(listener.close)
+        self.addCleanup(metrics.close)
+
+        spawn_successor(listener, metrics)
+
+        kwargs = mock_popen.call_args.kwargs
+        self.assertEqual(
+            kwargs['pass_fds'], [listener.fileno(), metrics.fileno()]
+        )
+        self.assertEqual(kwargs['env'][LISTEN_FD_ENV], str(listener.fileno()))
+        self.assertEqual(
+            kwargs['env'][METRICS_FD_ENV], str(metrics.fileno())
+        )
+
+    @patch('handoff.sd_notify')
+    def test_failed_successor_reports_ready_again(self, mock_notify):
+        process = MagicMock()
+        process.wait.return_value = 1
+
+        watch_successor(process, RequestTracker()).join(timeout=5)
+
+        mock_notify.assert_called_once_with('READY=1')
+
+    @patch('handoff.sd_notify')
+    def test_successor_exit_while_draining_is_ignored(self, mock_notify):
+        process = MagicMock()
+        tracker = RequestTracker()
+        tracker.draining = True
+
+        watch_successor(process, tracker).join(timeout=5)
+
+        mock_notify.assert_not_called()
+
+    @patch('handoff.os.kill')
+    def test_takeover_stops_previous_process(self, mock_kill):
+        with patch.dict(os.environ, {PARENT_PID_ENV: '4242'}):
+            complete_takeover()
+
+        mock_kill.assert_called_once_with(4242, signal.SIGTERM)
+
+    @patch('handoff.os.kill')
+    def test_fresh_start_stops_nothing(self, mock_kill):
+        with patch.dict(os.environ, clear=False):
+            os.environ.pop(PARENT_PID_ENV, None)
+            complete_takeover()
+
+        mock_kill.assert_not_called()
+
+    def test_sd_notify_sends_to_notify_socket(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'notify')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(path)
+        self.addCleanup(receiver.close)
+
+        with patch.dict(os.environ, {'NOTIFY_SOCKET': path}):
+            self.assertTrue(sd_notify('READY=1'))
+
+        self.assertEqual(receiver.recv(64), b'READY=1')
+
+    def test_sd_notify_without_systemd(self):
+        with patch.dict(os.environ, clear=False):
+            os.environ.pop('NOTIFY_SOCKET', None)
+            self.assertFalse(sd_notify('READY=1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
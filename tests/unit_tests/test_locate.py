@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+from columns import ColumnExtractor
+from locate import LineIndex
+from repositories import StorageRepository
+
+
+class TestLineIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_rows_offsets_and_context(self):
+        path = self._write('data.txt', "a\nbä\na\n\nc\na")
+        repo = StorageRepository()
+        repo.load_file(path)
+
+        index = repo.line_index()
+        rows = index.rows('a')
+
+        self.assertEqual(rows.typecode, 'I')
+        self.assertEqual(list(rows), [0, 2, 5])
+        self.assertEqual([index.line_number(r) for r in rows], [1, 3, 6])
+        self.assertEqual([index.offset(r) for r in rows], [0, 6, 11])
+        self.assertEqual(index.line(1), 'bä')
+        self.assertEqual(index.line(5), 'a')
+        self.assertEqual(len(index.rows('missing')), 0)
+
+    def test_index_is_rebuilt_when_data_changes(self):
+        repo = StorageRepository()
+        repo.load_file(self._write('one.txt', "x\n"))
+        first = repo.line_index()
+
+        self.assertIs(repo.line_index(), first)
+        repo.load_file(self._write('two.txt', "y\ny\n"))
+        second = repo.line_index()
+
+        self.assertIsNot(second, first)
+        self.assertEqual(len(second.rows('y')), 2)
+
+    def test_appended_lines_extend_the_index(self):
+        path = self._write('data.txt', "a\nb\n")
+        repo = StorageRepository()
+        repo.load_file(path)
+        index = repo.line_index()
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("a\nc\n")
+        repo.load_file(path)
+
+        self.assertIs(repo.line_index(), index)
+        self.assertEqual(list(index.rows('a')), [0, 2])
+        self.assertEqual(index.offset(3), 6)
+        self.assertEqual(index.line(3), 'c')
+
+    def test_column_rows_use_stored_offsets_and_header(self):
+        path = self._write('rows.csv', "key,value\nk1,a\nk2,b\nk1,c\n")
+        repo = StorageRepository(
+            columns=ColumnExtractor(column=0, header=True)
+        )
+        repo.load_file(path)
+
+        index = repo.line_index()
+        rows = index.rows('k1')
+
+        self.assertEqual([index.line_number(r) for r in rows], [2, 4])
+        self.assertEqual([index.line(r) for r in rows], ['k1,a', 'k1,c'])
+
+    def test_context_after_the_file_shrinks(self):
+        path = self._write('data.txt', "a\nb\nc\n")
+        repo = StorageRepository()
+        repo.load_file(path)
+        index = repo.line_index()
+
+        with open(path, 'r+b') as f:
+            f.truncate(2)
+
+        self.assertEqual(index.line(0), 'a')
+        self.assertIsNone(index.line(1))
+        self.assertIsNone(index.line(2))
+
+    def test_without_file_only_counts_are_known(self):
+        index = LineIndex(['a', 'a'], None)
+
+        self.assertEqual(len(index.rows('a')), 2)
+        self.assertIsNone(index.offset(0))
+        self.assertIsNone(index.line(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
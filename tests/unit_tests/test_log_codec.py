@@ -0,0 +1,106 @@
+import json
+import unittest
+import uuid
+from datetime import datetime
+
+from log_codec import (
+    MAGIC,
+    LogDecoder,
+    LogEncoder,
+    from_binary,
+    to_binary,
+)
+from models import Log
+
+
+def _entry(i, query="apple", ip="127.0.0.1"):
+    log = Log(id=str(uuid.uuid4()), query=query, requesting_ip=ip)
+    log.create(found=i % 2 == 0, exec_time=0.000123 * (i + 1))
+    log.timestamp = datetime(2024, 1, 1, 12, i // 60, i % 60, 503844)
+    log.mode = "set"
+    log.phases = {"prepare": 1200, "search": 340 + i}
+    return log.to_dict()
+
+
+class TestLogCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        entries = [_entry(i) for i in range(5)]
+
+        self.assertEqual(from_binary(to_binary(entries)), entries)
+
+    def test_repeated_strings_are_stored_once(self):
+        data = to_binary([_entry(i) for i in range(50)])
+
+        self.assertEqual(data.count(b"apple"), 1)
+        self.assertEqual(data.count(b"127.0.0.1"), 1)
+
+    def test_much_smaller_than_pretty_json(self):
+        entries = [_entry(i) for i in range(200)]
+
+        self.assertLess(
+            len(to_binary(entries)) * 3, len(json.dumps(entries, indent=4))
+        )
+
+    def test_legacy_entries(self):
+        legacy = {
+            "id": "not-a-uuid",
+            "query": "banana",
+            "requesting_ip": "10.0.0.1",
+            "execution_time": 0.5,
+            "timestamp": "2025-05-04 09:25:04.503844",
+            "status": None,
+            "_lock": "<unlocked _thread.lock object at 0x7fbe3e620f00>",
+            "source": "import",
+        }
+
+        (decoded,) = from_binary(to_binary([legacy]))
+
+        self.assertEqual(decoded["id"], "not-a-uuid")
+        self.assertEqual(decoded["timestamp"], "2025-05-04T09:25:04.503844")
+        self.assertIsNone(decoded["status"])
+        self.assertEqual(decoded["source"], "import")
+        self.assertNotIn("_lock", decoded)
+
+    def test_tombstones(self):
+        records = [
+            {"_op": "delete", "id": "abc"},
+            {"_op": "update", "id": str(uuid.uuid4()),
+             "updates": {"query": "x"}},
+        ]
+
+        self.assertEqual(from_binary(to_binary(records)), records)
+
+    def test_appending_with_existing_string_table(self):
+        first = to_binary([_entry(0)])
+        decoder = LogDecoder()
+        list(decoder.iter_records(first))
+        appended = first + LogEncoder(decoder.strings).encode(_entry(1))
+
+        decoded = from_binary(appended)
+
+        self.assertEqual(len(decoded), 2)
+        self.assertLess(len(appended) - len(first), 60)
+
+    def test_truncated_tail_is_ignored(self):
+        data = to_binary([_entry(0), _entry(1)])
+
+        decoded = from_binary(data[:-3])
+
+        self.assertEqual(len(decoded), 1)
+
+    def test_iter_records_from_offset(self):
+        data = to_binary([_entry(i) for i in range(3)])
+        (first_end, _), = list(LogDecoder().iter_records(data))[:1]
+
+        rest = list(LogDecoder().iter_records(data, first_end))
+
+        self.assertEqual(len(rest), 2)
+
+    def test_rejects_unknown_header(self):
+        with self.assertRaises(ValueError):
+            from_binary(b"JSON" + MAGIC)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 import json
+import signal
 import socket
+import threading
+import uuid
 import datetime
+from admission import AdmissionController
 from main import client_handler, format_tcp_response
+from protocol import (
+    STATUS_BUSY, STATUS_NOT_FOUND, decode_result, encode_frame, encode_query,
+    read_frame
+)
 
 
 class TestClientHandler(unittest.TestCase):
@@ -46,7 +54,8 @@ class TestClientHandler(unittest.TestCase):
         self.app_service.create_log.assert_called_once_with(
             requesting_ip='127.0.0.1',
             query_string='search this',
-            algo_name='naive'
+            algo_name='naive',
+            phases=ANY
         )
 
         # Verify formatted response was sent
@@ -105,12 +114,61 @@ class TestClientHandler(unittest.TestCase):
                 'status': 'STRING_NOT_FOUND'
             }
         ]
-        self.app_service.read_logs.return_value = logs
+        page = {'logs': logs, 'next_cursor': 512}
+        self.app_service.read_logs_page.return_value = page
 
         client_handler(self.conn, self.addr, self.app_service, self.config)
 
-        # For read_logs, the response should be the JSON-encoded logs
-        self.conn.sendall.assert_called_once_with(json.dumps(logs).encode())
+        # For read_logs, the response is one length-prefixed JSON page
+        self.app_service.read_logs_page.assert_called_once_with(
+            cursor=None, limit=None, filters=None
+        )
+        self.conn.sendall.assert_called_once_with(
+            encode_frame(json.dumps(page))
+        )
+
+    @patch('main.protect_buffer')
+    def test_read_logs_passes_pagination_fields(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'read_logs',
+            'cursor': 128,
+            'limit': 10,
+            'filters': {'ip': '127.0.0.1'}
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.read_logs_page.return_value = {
+            'logs': [], 'next_cursor': None
+        }
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.app_service.read_logs_page.assert_called_once_with(
+            cursor=128, limit=10, filters={'ip': '127.0.0.1'}
+        )
+
+    @patch('main.protect_buffer')
+    def test_stats_returns_metrics_snapshot(self, mock_protect):
+        request_data = json.dumps({'action': 'stats'}).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.log_summary.return_value = {
+            'set': {'count': 2, 'hit_ratio': 0.5}
+        }
+        self.app_service.memory_report.return_value = {
+            'default': {'modes': {'set': {'bytes': 2048}}}
+        }
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        payload = json.loads(self.conn.sendall.call_args[0][0].decode())
+        self.assertIn('counters', payload)
+        self.assertIn('gauges', payload)
+        self.assertIn('histograms', payload)
+        self.assertEqual(payload['log_aggregates']['set']['count'], 2)
+        self.assertEqual(
+            payload['index_memory']['default']['modes']['set']['bytes'], 2048
+        )
 
     @patch('main.protect_buffer')
     def test_invalid_action(self, mock_protect):
@@ -154,7 +212,7 @@ class TestClientHandler(unittest.TestCase):
         mock_protect.return_value = request_data
         self.conn.recv.return_value = request_data
 
-        self.app_service.read_logs.side_effect = Exception(
+        self.app_service.read_logs_page.side_effect = Exception(
             "Something went wrong"
         )
 
@@ -221,6 +279,313 @@ class TestClientHandler(unittest.TestCase):
 
         self.assertEqual(response, expected)
 
+    def test_format_tcp_response_includes_phases(self):
+        result = {
+            'status': 'STRING_EXISTS',
+            'query': 'q',
+            'requesting_ip': '127.0.0.1',
+            'execution_time': 0.001,
+            'timestamp': '2024-01-01T12:00:00',
+            'id': 'abc',
+            'phases': {'recv': 12_000, 'reload': 85_000_000, 'search': 1_500}
+        }
+
+        response = format_tcp_response(result).decode()
+
+        self.assertTrue(response.endswith(
+            "  Phases: recv=0.012ms reload=85.000ms search=0.002ms\n"
+        ))
+
+    @patch('main.protect_buffer')
+    def test_create_log_records_handler_phases(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'create_log', 'query': 'q', 'algo': 'set'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.create_log.return_value = {'status': 'STRING_EXISTS'}
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        phases = self.app_service.create_log.call_args.kwargs['phases']
+        for phase in ('recv', 'decode', 'format', 'send'):
+            self.assertIn(phase, phases)
+            self.assertGreaterEqual(phases[phase], 0)
+
+    @patch('main.protect_buffer')
+    def test_create_log_forwards_dataset(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'create_log', 'query': 'q', 'algo': 'set',
+            'dataset': '250k'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.create_log.return_value = {'status': 'STRING_EXISTS'}
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.assertEqual(
+            self.app_service.create_log.call_args.kwargs['dataset'], '250k'
+        )
+
+    @patch('main.protect_buffer')
+    def test_batch_returns_framed_results_in_order(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'batch', 'queries': ['a', 'b'], 'algo': 'set'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        results = [
+            {'query': 'a', 'status': 'STRING_EXISTS'},
+            {'query': 'b', 'status': 'STRING_NOT_FOUND'},
+        ]
+        self.app_service.create_logs_batch.return_value = results
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.app_service.create_logs_batch.assert_called_once_with(
+            requesting_ip='127.0.0.1',
+            queries=['a', 'b'],
+            algo_name='set',
+            phases=ANY
+        )
+        self.conn.sendall.assert_called_once_with(
+            encode_frame(json.dumps({'results': results}))
+        )
+
+    @patch('main.protect_buffer')
+    def test_batch_rejects_non_list_queries(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'batch', 'queries': 'a', 'algo': 'set'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.app_service.create_logs_batch.assert_not_called()
+        self.assertIn(b"ERROR", self.conn.sendall.call_args[0][0])
+
+    def test_keep_alive_serves_framed_requests_until_close(self):
+        server, client = socket.socketpair()
+        self.addCleanup(client.close)
+        self.app_service.create_log.return_value = {
+            'status': 'STRING_EXISTS', 'query': 'q'
+        }
+        handler = threading.Thread(
+            target=client_handler,
+            args=(server, self.addr, self.app_service, self.config),
+        )
+        handler.start()
+
+        client.sendall(json.dumps({
+            'action': 'create_log', 'query': 'q', 'algo': 'set',
+            'keep_alive': True
+        }).encode())
+        first = read_frame(client)
+        client.sendall(encode_frame(json.dumps({
+            'action': 'create_log', 'query': 'q', 'algo': 'set'
+        })))
+        second = read_frame(client)
+        client.close()
+        handler.join(timeout=5)
+
+        self.assertFalse(handler.is_alive())
+        self.assertTrue(first.startswith(b"STRING EXISTS"))
+        self.assertEqual(first, second)
+        self.assertEqual(self.app_service.create_log.call_count, 2)
+
+    def test_upgrade_switches_connection_to_binary(self):
+        server, client = socket.socketpair()
+        self.addCleanup(client.close)
+        log_id = str(uuid.uuid4())
+        self.app_service.create_log.return_value = {
+            'status': 'STRING_NOT_FOUND', 'execution_time': 0.002,
+            'id': log_id
+        }
+        handler = threading.Thread(
+            target=client_handler,
+            args=(server, self.addr, self.app_service, self.config),
+        )
+        handler.start()
+
+        client.sendall(json.dumps({
+            'action': 'upgrade', 'protocol': 'binary'
+        }).encode())
+        ack = json.loads(read_frame(client))
+        client.sendall(encode_frame(encode_query('q', 'trie', '10k')))
+        result = decode_result(read_frame(client))
+        client.close()
+        handler.join(timeout=5)
+
+        self.assertEqual(ack['protocol'], 'binary')
+        self.assertEqual(result.status, STATUS_NOT_FOUND)
+        self.assertEqual(result.execution_ns, 2_000_000)
+        self.assertEqual(result.log_id, log_id)
+        self.app_service.create_log.assert_called_once_with(
+            requesting_ip='127.0.0.1', query_string='q', algo_name='trie',
+            phases=ANY, dataset='10k'
+        )
+
+    @patch('main.protect_buffer')
+    def test_shed_request_gets_busy_without_running(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'create_log', 'query': 'q', 'algo': 'set'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+        admission.admit('10.0.0.9')
+
+        client_handler(
+            self.conn, self.addr, self.app_service, self.config, admission
+        )
+
+        self.app_service.create_log.assert_not_called()
+        self.conn.sendall.assert_called_once_with(b"BUSY: overloaded\n")
+        self.assertEqual(admission.stats()['in_flight'], 1)
+
+    @patch('main.protect_buffer')
+    def test_admitted_request_releases_its_slot(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'create_log', 'query': 'q', 'algo': 'set'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.create_log.return_value = {'status': 'STRING_EXISTS'}
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+
+        client_handler(
+            self.conn, self.addr, self.app_service, self.config, admission
+        )
+
+        self.app_service.create_log.assert_called_once()
+        self.assertEqual(admission.stats()['in_flight'], 0)
+
+    def test_binary_request_shed_with_busy_status(self):
+        server, client = socket.socketpair()
+        self.addCleanup(client.close)
+        admission = AdmissionController(
+            max_in_flight=8, per_ip_rate=1, per_ip_burst=1
+        )
+        handler = threading.Thread(
+            target=client_handler,
+            args=(server, self.addr, self.app_service, self.config,
+                  admission),
+        )
+        handler.start()
+
+        # The upgrade itself is never shed, but it spends no token either
+        client.sendall(json.dumps({
+            'action': 'upgrade', 'protocol': 'binary'
+        }).encode())
+        read_frame(client)
+        self.app_service.create_log.return_value = {
+            'status': 'STRING_EXISTS', 'execution_time': 0.001, 'id': None
+        }
+        client.sendall(encode_frame(encode_query('q', 'set')))
+        first = decode_result(read_frame(client))
+        client.sendall(encode_frame(encode_query('q', 'set')))
+        second = decode_result(read_frame(client))
+        client.close()
+        handler.join(timeout=5)
+
+        self.assertNotEqual(first.status, STATUS_BUSY)
+        self.assertEqual(second.status, STATUS_BUSY)
+        self.assertEqual(second.error, 'rate_limited')
+        self.assertEqual(self.app_service.create_log.call_count, 1)
+
+    @patch('main.protect_buffer')
+    def test_health_reports_readiness(self, mock_protect):
+        request_data = json.dumps({'action': 'health'}).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.health.return_value = {
+            'status': 'starting', 'ready': False, 'time_to_ready': None
+        }
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.assertEqual(
+            json.loads(self.conn.sendall.call_args[0][0]),
+            {'status': 'starting', 'ready': False, 'time_to_ready': None}
+        )
+
+    @patch('main.protect_buffer')
+    def test_create_log_passes_normalized_option(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'create_log', 'query': 'Q', 'algo': 'set',
+            'normalized': True
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        self.app_service.create_log.return_value = {
+            'status': 'STRING_NOT_FOUND',
+            'normalized_status': 'STRING_EXISTS'
+        }
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.assertTrue(
+            self.app_service.create_log.call_args.kwargs['normalized']
+        )
+        response = self.conn.sendall.call_args[0][0]
+        self.assertTrue(response.startswith(b"STRING NOT_FOUND\n"))
+        self.assertIn(b"  Normalized: STRING EXISTS\n", response)
+
+    def test_format_tcp_response_includes_row(self):
+        response = format_tcp_response({
+            'status': 'STRING_EXISTS', 'row': 'k2,second'
+        })
+
+        self.assertIn(b"  Row: k2,second\n", response)
+
+    @patch('main.protect_buffer')
+    def test_locate_returns_framed_json(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'locate', 'query': 'k', 'limit': 5
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        result = {
+            'query': 'k', 'status': 'STRING_EXISTS', 'count': 1,
+            'lines': [3], 'offsets': [8], 'context': ['k'],
+            'truncated': False
+        }
+        self.app_service.locate.return_value = result
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.app_service.locate.assert_called_once_with('k', limit=5)
+        self.conn.sendall.assert_called_once_with(
+            encode_frame(json.dumps(result))
+        )
+
+    @patch('main.protect_buffer')
+    def test_add_key_returns_framed_json(self, mock_protect):
+        request_data = json.dumps({
+            'action': 'add_key', 'key': 'k'
+        }).encode()
+        mock_protect.return_value = request_data
+        self.conn.recv.return_value = request_data
+        result = {'key': 'k', 'status': 'added', 'keys': 4}
+        self.app_service.add_key.return_value = result
+
+        client_handler(self.conn, self.addr, self.app_service, self.config)
+
+        self.app_service.add_key.assert_called_once_with('k')
+        self.app_service.remove_key.assert_not_called()
+        self.conn.sendall.assert_called_once_with(
+            encode_frame(json.dumps(result))
+        )
+
+    def test_format_tcp_response_busy(self):
+        response = format_tcp_response(
+            {'status': 'busy', 'error': 'rate_limited'}
+        )
+
+        self.assertEqual(response, b"BUSY: rate_limited\n")
+
     def test_format_tcp_response_error(self):
         # Test error response
         result = {
@@ -250,15 +615,16 @@ class TestClientHandler(unittest.TestCase):
 
 class TestMainServer(unittest.TestCase):
 
-    @patch('main.secure_socket')
+    @patch('main.signal.signal')
+    @patch('main.create_server_context')
     @patch('main.socket.socket')
     @patch('main.Config')
     @patch('main.AppService')
-    @patch('main.LogRepository')
+    @patch('main.create_log_repository')
     @patch('main.StorageRepository')
     def test_main_server_ssl_setup(
         self, mock_storage_repo, mock_log_repo, mock_app_service,
-        mock_config, mock_socket_class, mock_secure_socket
+        mock_config, mock_socket_class, mock_create_context, mock_signal
     ):
         from main import main  # Re-import to patch __main__
 
@@ -273,7 +639,6 @@ class TestMainServer(unittest.TestCase):
             'ssl_key': 'key.pem'
         }
         mock_config.return_value = mock_conf_instance
-        mock_secure_socket.return_value = mock_sock
 
         # stop after first loop
         mock_sock.accept.side_effect = KeyboardInterrupt
@@ -282,11 +647,165 @@ class TestMainServer(unittest.TestCase):
             main()
 
         mock_socket_class.assert_called_once()
-        mock_secure_socket.assert_called_once_with(
-            mock_sock, 'cert.pem', 'key.pem'
-        )
+        # The listening socket stays plain; handshakes run per connection
+        mock_create_context.assert_called_once_with('cert.pem', 'key.pem')
+        mock_create_context.return_value.wrap_socket.assert_not_called()
         mock_sock.bind.assert_called_with(('0.0.0.0', 9999))
         mock_sock.listen.assert_called_once()
+        mock_app_service.return_value.mark_ready.assert_called_once()
+
+    @patch('main.signal.signal')
+    @patch('main.socket.socket')
+    @patch('main.Config')
+    @patch('main.AppService')
+    @patch('main.create_log_repository')
+    @patch('main.StorageRepository')
+    def test_main_prewarms_before_listening(
+        self, mock_storage_repo, mock_log_repo, mock_app_service,
+        mock_config, mock_socket_class, mock_signal
+    ):
+        from main import main
+
+        mock_sock = MagicMock()
+        mock_socket_class.return_value = mock_sock
+        mock_config.return_value.get_server_config.return_value = {
+            'port': 9999,
+            'ssl_enabled': False,
+            'prewarm': {'enabled': True, 'modes': ['trie']},
+        }
+        order = []
+        mock_app_service.return_value.prewarm.side_effect = (
+            lambda *args: order.append('prewarm')
+        )
+        mock_sock.listen.side_effect = lambda *args: order.append('listen')
+        mock_sock.accept.side_effect = KeyboardInterrupt
+
+        with self.assertRaises(SystemExit):
+            main()
+
+        self.assertEqual(order, ['prewarm', 'listen'])
+        mock_app_service.return_value.prewarm.assert_called_once_with(
+            ANY, ['trie'], None
+        )
+
+    @patch('main.signal.signal')
+    @patch('main.threading.Thread')
+    @patch('main.create_admission_controller')
+    @patch('main.socket.socket')
+    @patch('main.Config')
+    @patch('main.AppService')
+    @patch('main.create_log_repository')
+    @patch('main.StorageRepository')
+    def test_main_sheds_connections_before_starting_a_thread(
+        self, mock_storage_repo, mock_log_repo, mock_app_service,
+        mock_config, mock_socket_class, mock_create_admission,
+        mock_thread, mock_signal
+    ):
+        from main import main
+
+        mock_sock = MagicMock()
+        mock_socket_class.return_value = mock_sock
+        conn = MagicMock()
+        mock_sock.accept.side_effect = [
+            (conn, ('10.0.0.1', 40000)), KeyboardInterrupt
+        ]
+        mock_config.return_value.get_server_config.return_value = {
+            'port': 9999, 'ssl_enabled': False
+        }
+        admission = mock_create_admission.return_value
+        admission.open_connection.return_value = 'overloaded'
+
+        with self.assertRaises(SystemExit):
+            main()
+
+        admission.open_connection.assert_called_once_with('10.0.0.1')
+        conn.close.assert_called_once()
+        from main import serve_connection
+        self.assertNotIn(
+            serve_connection,
+            [c.kwargs.get('target') for c in mock_thread.call_args_list]
+        )
+
+    @patch('main.signal.signal')
+    @patch('main.inherited_socket')
+    @patch('main.socket.socket')
+    @patch('main.Config')
+    @patch('main.AppService')
+    @patch('main.create_log_repository')
+    @patch('main.StorageRepository')
+    def test_main_drains_and_exits_on_sigterm(
+        self, mock_storage_repo, mock_log_repo, mock_app_service,
+        mock_config, mock_socket_class, mock_inherited, mock_signal
+    ):
+        from handoff import LISTEN_FD_ENV, Draining
+        from main import main
+
+        inherited = MagicMock()
+        mock_inherited.side_effect = (
+            lambda variable=LISTEN_FD_ENV:
+            inherited if variable == LISTEN_FD_ENV else None
+        )
+        inherited.accept.side_effect = Draining
+        mock_config.return_value.get_server_config.return_value = {
+            'port': 9999, 'ssl_enabled': False, 'drain_timeout': 1
+        }
+
+        with self.assertRaises(SystemExit) as exit_info:
+            main()
+
+        self.assertEqual(exit_info.exception.code, 0)
+        # The handed-over socket is used as is, never re-bound
+        mock_socket_class.assert_not_called()
+        inherited.close.assert_called_once()
+
+    @patch('main.signal.signal')
+    @patch('main.watch_successor')
+    @patch('main.spawn_successor')
+    @patch('main.start_metrics_server')
+    @patch('main.inherited_socket')
+    @patch('main.socket.socket')
+    @patch('main.Config')
+    @patch('main.AppService')
+    @patch('main.create_log_repository')
+    @patch('main.StorageRepository')
+    def test_reload_hands_over_the_metrics_socket(
+        self, mock_storage_repo, mock_log_repo, mock_app_service,
+        mock_config, mock_socket_class, mock_inherited, mock_start_metrics,
+        mock_spawn, mock_watch, mock_signal
+    ):
+        from handoff import LISTEN_FD_ENV, METRICS_FD_ENV, Draining
+        from main import main
+
+        listener = MagicMock()
+        metrics_sock = MagicMock()
+        metrics_sock.getsockname.return_value = ('0.0.0.0', 9100)
+        sockets = {LISTEN_FD_ENV: listener, METRICS_FD_ENV: metrics_sock}
+        mock_inherited.side_effect = (
+            lambda variable=LISTEN_FD_ENV: sockets[variable]
+        )
+        mock_config.return_value.get_server_config.return_value = {
+            'port': 9999, 'ssl_enabled': False, 'drain_timeout': 1,
+            'metrics_enabled': True, 'metrics_port': 9100,
+        }
+        handlers = {}
+        mock_signal.side_effect = handlers.__setitem__
+
+        def reload_then_stop():
+            handlers[signal.SIGHUP](signal.SIGHUP, None)
+            raise Draining()
+
+        listener.accept.side_effect = reload_then_stop
+
+        with self.assertRaises(SystemExit):
+            main()
+
+        # Serves on the socket the previous process bound, binding nothing
+        self.assertIs(mock_start_metrics.call_args.kwargs['sock'],
+                      metrics_sock)
+        metrics_server = mock_start_metrics.return_value
+        mock_spawn.assert_called_once_with(listener, metrics_server.socket)
+        mock_watch.assert_called_once_with(mock_spawn.return_value)
+        metrics_server.shutdown.assert_called_once()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+import sys
+import unittest
+
+from memory import (
+    deep_sizeof, project_build_bytes, project_data_bytes, shared_ids, traced
+)
+
+
+class TestDeepSizeof(unittest.TestCase):
+
+    def test_counts_nested_objects_once(self):
+        leaf = {"#": True}
+        tree = {"a": leaf, "b": leaf}
+
+        size = deep_sizeof(tree)
+
+        self.assertLess(size, sys.getsizeof(tree) + 2 * sys.getsizeof(leaf)
+                        + 200)
+        self.assertGreater(size, sys.getsizeof(tree) + sys.getsizeof(leaf))
+
+    def test_excluded_objects_are_skipped(self):
+        words = [f"word{i}" for i in range(100)]
+        index = set(words)
+
+        self.assertEqual(
+            deep_sizeof(index, exclude=shared_ids(words)),
+            sys.getsizeof(index),
+        )
+
+
+class TestTraced(unittest.TestCase):
+
+    def test_reports_retained_and_peak(self):
+        result, retained, peak = traced(lambda: [str(i) for i in range(5000)])
+
+        self.assertEqual(len(result), 5000)
+        self.assertGreater(retained, 0)
+        self.assertGreaterEqual(peak, retained)
+
+
+class TestProjection(unittest.TestCase):
+
+    def test_projection_close_to_actual(self):
+        data = [f"word{i:06d}" for i in range(20_000)]
+
+        projected = project_build_bytes(sorted, data, sample_size=1_000)
+
+        self.assertAlmostEqual(
+            projected / sys.getsizeof(sorted(data)), 1.0, delta=0.1
+        )
+
+    def test_empty_data(self):
+        self.assertEqual(project_build_bytes(set, []), 0)
+
+    def test_data_projection_close_to_actual(self):
+        data = [f"word{i:06d}" for i in range(20_000)]
+
+        projected = project_data_bytes(data, sample_size=500)
+
+        self.assertAlmostEqual(projected / deep_sizeof(data), 1.0, delta=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import socket
+import unittest
+import urllib.request
+import urllib.error
+
+from metrics import MetricsRegistry, start_metrics_server
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry(prefix="test_")
+
+    def test_counter_render(self):
+        self.registry.describe("hits_total", "Number of hits.")
+        self.registry.inc("hits_total", labels={"mode": "set"})
+        self.registry.inc("hits_total", 2, labels={"mode": "set"})
+
+        text = self.registry.render()
+
+        self.assertIn("# HELP test_hits_total Number of hits.", text)
+        self.assertIn("# TYPE test_hits_total counter", text)
+        self.assertIn('test_hits_total{mode="set"} 3', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        self.registry.describe("latency", "Latency.", buckets=(0.1, 1.0))
+        self.registry.observe("latency", 0.05)
+        self.registry.observe("latency", 0.5)
+        self.registry.observe("latency", 5.0)
+
+        text = self.registry.render()
+
+        self.assertIn('test_latency_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_bucket{le="1"} 2', text)
+        self.assertIn('test_latency_bucket{le="+Inf"} 3', text)
+        self.assertIn("test_latency_count 3", text)
+
+    def test_collector_samples_exported_as_gauges(self):
+        self.registry.register_collector(
+            lambda: [("index_memory_bytes", {"mode": "trie"}, 2048.0)]
+        )
+
+        text = self.registry.render()
+
+        self.assertIn("# TYPE test_index_memory_bytes gauge", text)
+        self.assertIn('test_index_memory_bytes{mode="trie"} 2048', text)
+
+    def test_failing_collector_does_not_break_render(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        self.registry.register_collector(broken)
+        self.registry.inc("ok_total")
+
+        self.assertIn("test_ok_total 1", self.registry.render())
+
+    def test_disabled_registry_records_nothing(self):
+        self.registry.enabled = False
+        self.registry.inc("hits_total")
+        self.registry.observe("latency", 1.0)
+
+        snapshot = self.registry.snapshot()
+
+        self.assertEqual(snapshot["counters"], {})
+        self.assertEqual(snapshot["histograms"], {})
+
+    def test_snapshot_contains_histogram_summary(self):
+        self.registry.observe("latency", 0.2, labels={"action": "x"})
+        self.registry.observe("latency", 0.4, labels={"action": "x"})
+
+        summary = self.registry.snapshot()["histograms"]["latency"]
+        entry = summary['{action="x"}']
+
+        self.assertEqual(entry["count"], 2)
+        self.assertAlmostEqual(entry["mean"], 0.3)
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry(prefix="test_")
+        self.registry.inc("requests_total")
+        self.server = start_metrics_server("127.0.0.1", 0, self.registry)
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_metrics_endpoint(self):
+        url = f"http://127.0.0.1:{self.port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode()
+            content_type = response.headers["Content-Type"]
+
+        self.assertIn("test_requests_total 1", body)
+        self.assertTrue(content_type.startswith("text/plain"))
+
+    def test_unknown_path_returns_404(self):
+        url = f"http://127.0.0.1:{self.port}/other"
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(url, timeout=5)
+        self.assertEqual(ctx.exception.code, 404)
+
+
+class TestMetricsServerHandoff(unittest.TestCase):
+
+    def test_serves_on_a_handed_over_socket(self):
+        # Still bound, as by the previous process during a reload
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        registry = MetricsRegistry(prefix="test_")
+        registry.inc("handoffs_total")
+
+        server = start_metrics_server(
+            "127.0.0.1", port, registry, sock=listener
+        )
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        self.assertEqual(server.server_address[1], port)
+        url = f"http://127.0.0.1:{port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.assertIn("test_handoffs_total 1", response.read().decode())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from mode_policy import ModePolicy, create_mode_policy
+
+
+class TestModePolicy(unittest.TestCase):
+
+    def test_explicit_mode_is_kept(self):
+        policy = ModePolicy()
+
+        self.assertEqual(policy.choose("trie", 250_000)[0], "trie")
+        self.assertEqual(policy.choose("naive", 250_000)[0], "naive")
+
+    def test_auto_prefers_hash_index_for_reused_data(self):
+        mode, reason = ModePolicy().choose("auto", 250_000)
+
+        self.assertEqual(mode, "set")
+        self.assertIn("auto", reason)
+
+    def test_auto_scans_when_data_is_reloaded_every_query(self):
+        mode, _ = ModePolicy().choose(
+            "auto", 250_000, rebuild_per_query=True
+        )
+
+        self.assertEqual(mode, "naive")
+
+    def test_memory_limit_excludes_large_structures(self):
+        policy = ModePolicy(memory_limit=3_000_000)
+
+        self.assertEqual(policy.choose("auto", 250_000)[0], "binary")
+
+    def test_slow_modes_upgraded_only_when_allowed(self):
+        self.assertEqual(
+            ModePolicy().choose("index_map", 250_000)[0], "index_map"
+        )
+        mode, reason = ModePolicy(upgrade_slow_modes=True).choose(
+            "index_map", 250_000
+        )
+        self.assertEqual(mode, "set")
+        self.assertIn("upgraded index_map", reason)
+
+    def test_measured_build_cost_is_used(self):
+        reports = {"set": {"items": 1000, "build_seconds": 10.0,
+                           "bytes": 34_000}}
+
+        mode, _ = ModePolicy().choose("auto", 1000, reports)
+
+        self.assertNotEqual(mode, "set")
+
+    def test_learns_queries_per_build(self):
+        policy = ModePolicy(queries_per_build=100)
+        for version in range(50):
+            policy.observe("naive", 0.001, False, 250_000, version)
+
+        self.assertEqual(policy.choose("auto", 250_000)[0], "naive")
+
+    def test_unloaded_dataset_defaults_to_set(self):
+        self.assertEqual(ModePolicy().choose("auto", None)[0], "set")
+
+    def test_create_from_server_config(self):
+        policy = create_mode_policy(
+            {"mode_policy": {"upgrade_slow_modes": True}}, 1024
+        )
+
+        self.assertTrue(policy.upgrade_slow_modes)
+        self.assertEqual(policy.memory_limit, 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
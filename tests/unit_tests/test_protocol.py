@@ -0,0 +1,87 @@
+import socket
+import unittest
+
+import uuid
+
+from protocol import (
+    OP_QUERY, STATUS_ERROR, STATUS_EXISTS, decode_query, decode_result,
+    encode_frame, encode_query, encode_result, read_frame
+)
+
+
+class TestFraming(unittest.TestCase):
+
+    def setUp(self):
+        self.left, self.right = socket.socketpair()
+
+    def tearDown(self):
+        self.left.close()
+        self.right.close()
+
+    def test_round_trip(self):
+        self.left.sendall(encode_frame("héllo") + encode_frame(b"world"))
+
+        self.assertEqual(read_frame(self.right), "héllo".encode("utf-8"))
+        self.assertEqual(read_frame(self.right), b"world")
+
+    def test_empty_payload(self):
+        self.left.sendall(encode_frame(b""))
+        self.assertEqual(read_frame(self.right), b"")
+
+    def test_oversized_frame_rejected(self):
+        self.left.sendall(encode_frame(b"x" * 100))
+        with self.assertRaises(BufferError):
+            read_frame(self.right, max_size=10)
+
+    def test_truncated_frame_raises(self):
+        self.left.sendall(encode_frame(b"abcdef")[:-2])
+        self.left.close()
+        with self.assertRaises(ConnectionError):
+            read_frame(self.right)
+
+
+class TestBinaryMessages(unittest.TestCase):
+
+    def test_query_round_trip(self):
+        request = decode_query(encode_query("6;0;1;26;0;7;3;0;", "set", "10k"))
+
+        self.assertEqual(request.opcode, OP_QUERY)
+        self.assertEqual(request.algo, "set")
+        self.assertEqual(request.dataset, "10k")
+        self.assertEqual(request.query, "6;0;1;26;0;7;3;0;")
+
+    def test_query_without_dataset(self):
+        request = decode_query(encode_query("héllo", "auto"))
+
+        self.assertIsNone(request.dataset)
+        self.assertEqual(request.query, "héllo")
+
+    def test_truncated_query_rejected(self):
+        with self.assertRaises(ValueError):
+            decode_query(encode_query("q", "trie")[:3])
+
+    def test_result_round_trip(self):
+        log_id = str(uuid.uuid4())
+
+        result = decode_result(encode_result(STATUS_EXISTS, 1234, log_id))
+
+        self.assertEqual(result.status, STATUS_EXISTS)
+        self.assertEqual(result.execution_ns, 1234)
+        self.assertEqual(result.log_id, log_id)
+        self.assertIsNone(result.error)
+
+    def test_error_result_carries_message(self):
+        result = decode_result(encode_result(STATUS_ERROR, error="no data"))
+
+        self.assertEqual(result.status, STATUS_ERROR)
+        self.assertIsNone(result.log_id)
+        self.assertEqual(result.error, "no data")
+
+    def test_result_is_compact(self):
+        payload = encode_result(STATUS_EXISTS, 10**9, str(uuid.uuid4()))
+
+        self.assertEqual(len(payload), 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
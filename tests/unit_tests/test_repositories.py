@@ -1,8 +1,21 @@
+import sys
+import threading
 import unittest
 import os
 import tempfile
+from columns import ColumnExtractor
 from models import Log
-from repositories import LogRepository, StorageRepository
+from repositories import (
+    LogFilter,
+    LogRepository,
+    SegmentedLogRepository,
+    SortedDelta,
+    SQLiteLogRepository,
+    StorageRepository,
+    create_log_repository,
+    normalize_key,
+)
+from wal import WriteAheadLog
 
 
 class TestLogRepository(unittest.TestCase):
@@ -23,6 +36,15 @@ class TestLogRepository(unittest.TestCase):
         self.assertEqual(len(logs), 1)
         self.assertEqual(logs[0]['id'], "1")
 
+    def test_create_logs_appends_in_order(self):
+        self.repo.create_log(self.log)
+        self.repo.create_logs([
+            Log(id="2", query="a", requesting_ip="127.0.0.1"),
+            Log(id="3", query="b", requesting_ip="127.0.0.1"),
+        ])
+        logs = self.repo.read_logs()
+        self.assertEqual([log['id'] for log in logs], ["1", "2", "3"])
+
     def test_update_log_success(self):
         self.repo.create_log(self.log)
         success = self.repo.update_log("1", {"query": "updated"})
@@ -46,6 +68,394 @@ class TestLogRepository(unittest.TestCase):
         self.assertFalse(success)
 
 
+class TestLogRepositoryPaging(unittest.TestCase):
+    def setUp(self):
+        self.temp_file = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_file.close()
+        self.repo = LogRepository(filepath=self.temp_file.name)
+        for i in range(25):
+            log = Log(
+                id=str(i),
+                query=f"fruit{i}" if i % 2 else f"veg{i}",
+                requesting_ip="10.0.0.1" if i < 10 else "10.0.0.2",
+            )
+            log.create(found=bool(i % 3), exec_time=0.001)
+            log.timestamp = log.timestamp.replace(
+                year=2024, month=1, day=1, hour=0, minute=i
+            )
+            self.repo.create_log(log)
+
+    def tearDown(self):
+        os.unlink(self.temp_file.name)
+
+    def test_iter_logs_small_chunks(self):
+        entries = [e for _, e in self.repo.iter_logs(chunk_size=7)]
+        self.assertEqual([e['id'] for e in entries],
+                         [str(i) for i in range(25)])
+
+    def test_iter_logs_resumes_from_offset(self):
+        offsets = [offset for offset, _ in self.repo.iter_logs()]
+        resumed = [e['id'] for _, e in self.repo.iter_logs(offsets[9])]
+        self.assertEqual(resumed, [str(i) for i in range(10, 25)])
+
+    def test_query_logs_pages_through_everything(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.repo.query_logs(cursor=cursor, limit=10)
+            seen.extend(e['id'] for e in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [str(i) for i in range(25)])
+
+    def test_query_logs_filters(self):
+        log_filter = LogFilter(
+            ip="10.0.0.2",
+            status="STRING_EXISTS",
+            query_prefix="fruit",
+            since="2024-01-01T00:11:00",
+            until="2024-01-01T00:20:00",
+        )
+        page, cursor = self.repo.query_logs(limit=100, log_filter=log_filter)
+        self.assertIsNone(cursor)
+        self.assertEqual([e['id'] for e in page], ['11', '13', '17', '19'])
+
+    def test_query_logs_empty_file(self):
+        empty = tempfile.NamedTemporaryFile(delete=False)
+        empty.close()
+        try:
+            repo = LogRepository(filepath=empty.name)
+            self.assertEqual(repo.query_logs(), ([], None))
+        finally:
+            os.unlink(empty.name)
+
+    def test_log_filter_rejects_unknown_keys(self):
+        with self.assertRaises(ValueError):
+            LogFilter.from_dict({"colour": "red"})
+
+
+def _make_log(i, mode="set"):
+    log = Log(id=str(i), query=f"q{i:02d}", requesting_ip=f"10.0.0.{i % 3}")
+    log.create(found=i % 2 == 0, exec_time=(i + 1) / 1000)
+    log.timestamp = log.timestamp.replace(
+        year=2024, month=1, day=1, hour=0, minute=i
+    )
+    log.mode = mode
+    return log
+
+
+class TestSQLiteLogRepository(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "logs.db")
+        self.repo = SQLiteLogRepository(
+            filepath=self.path, batch_size=5, flush_interval=0
+        )
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def test_wal_mode_and_indexes(self):
+        conn = self.repo._connection()
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        indexes = {
+            row[1] for row in conn.execute("PRAGMA index_list(logs)")
+        }
+        self.assertEqual(mode, "wal")
+        self.assertTrue({
+            "idx_logs_timestamp", "idx_logs_ip", "idx_logs_query"
+        } <= indexes)
+
+    def test_create_read_and_get(self):
+        log = _make_log(1)
+        log.phases = {"search": 10}
+        self.repo.create_log(log)
+
+        logs = self.repo.read_logs()
+        self.assertEqual(len(logs), 1)
+        self.assertEqual(logs[0]["query"], "q01")
+        self.assertFalse(logs[0]["status"])
+        self.assertEqual(logs[0]["phases"], {"search": 10})
+        self.assertEqual(self.repo.get_log("1")["mode"], "set")
+        self.assertIsNone(self.repo.get_log("missing"))
+
+    def test_inserts_are_batched(self):
+        for i in range(4):
+            self.repo.create_log(_make_log(i))
+        conn = self.repo._connection()
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0], 0
+        )
+        self.repo.create_log(_make_log(4))
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0], 5
+        )
+
+    def test_update_and_delete(self):
+        self.repo.create_log(_make_log(1))
+        self.assertTrue(self.repo.update_log("1", {"query": "updated"}))
+        self.assertEqual(self.repo.get_log("1")["query"], "updated")
+        self.assertFalse(self.repo.update_log("nope", {"query": "x"}))
+        self.assertTrue(self.repo.delete_log("1"))
+        self.assertFalse(self.repo.delete_log("1"))
+        self.assertEqual(self.repo.read_logs(), [])
+
+    def test_query_logs_filters_and_pages(self):
+        self.repo.create_logs([_make_log(i) for i in range(20)])
+        log_filter = LogFilter(
+            ip="10.0.0.0",
+            since="2024-01-01T00:03:00",
+            until="2024-01-01T00:18:00",
+        )
+
+        page, cursor = self.repo.query_logs(limit=2, log_filter=log_filter)
+        rest, end = self.repo.query_logs(
+            cursor=cursor, limit=10, log_filter=log_filter
+        )
+
+        self.assertEqual([e["id"] for e in page], ["3", "6"])
+        self.assertEqual([e["id"] for e in rest], ["9", "12", "15"])
+        self.assertIsNone(end)
+
+    def test_query_prefix_filter(self):
+        self.repo.create_logs([_make_log(i) for i in range(12)])
+        page, _ = self.repo.query_logs(log_filter=LogFilter(query_prefix="q1"))
+        self.assertEqual([e["id"] for e in page], ["10", "11"])
+
+    def test_aggregate_by_mode(self):
+        self.repo.create_logs(
+            [_make_log(i, "set") for i in range(10)]
+            + [_make_log(i, "trie") for i in range(10, 14)]
+        )
+
+        summary = self.repo.aggregate_by_mode()
+
+        self.assertEqual(summary["set"]["count"], 10)
+        self.assertAlmostEqual(summary["set"]["hit_ratio"], 0.5)
+        self.assertAlmostEqual(summary["set"]["p50"], 0.005)
+        self.assertAlmostEqual(summary["set"]["p90"], 0.009)
+        self.assertAlmostEqual(summary["set"]["p99"], 0.010)
+        self.assertAlmostEqual(summary["trie"]["p50"], 0.012)
+
+    def test_aggregates_match_json_backend(self):
+        tmp = tempfile.NamedTemporaryFile(delete=False)
+        tmp.close()
+        try:
+            json_repo = LogRepository(filepath=tmp.name)
+            for i in range(7):
+                log = _make_log(i, "dict" if i % 2 else "binary")
+                json_repo.create_log(log)
+                self.repo.create_log(log)
+            self.assertEqual(
+                json_repo.aggregate_by_mode(), self.repo.aggregate_by_mode()
+            )
+        finally:
+            os.unlink(tmp.name)
+
+
+class TestSegmentedLogRepository(unittest.TestCase):
+    SEGMENT_BYTES = 600
+    RECORD_FORMAT = "json"
+    SUFFIX = ".jsonl"
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = self._open()
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def _open(self, **kwargs):
+        options = {
+            "max_segment_bytes": self.SEGMENT_BYTES,
+            "retention_seconds": None,
+            "maintenance_interval": 0,
+            "record_format": self.RECORD_FORMAT,
+        }
+        options.update(kwargs)
+        return SegmentedLogRepository(self.tmpdir.name, **options)
+
+    def _segment_files(self):
+        return sorted(
+            name for name in os.listdir(self.tmpdir.name)
+            if name.endswith(self.SUFFIX)
+        )
+
+    def test_rolls_segments_by_size(self):
+        for i in range(12):
+            self.repo.create_log(_make_log(i))
+
+        self.assertGreater(len(self._segment_files()), 2)
+        self.assertEqual(
+            [e["id"] for e in self.repo.read_logs()],
+            [str(i) for i in range(12)],
+        )
+
+    def test_rolls_segments_by_age(self):
+        self.repo.close()
+        self.repo = self._open(max_segment_age=0)
+        self.repo.create_log(_make_log(0))
+        self.repo.create_log(_make_log(1))
+        self.assertEqual(len(self._segment_files()), 2)
+
+    def test_cursor_pages_across_segments(self):
+        for i in range(12):
+            self.repo.create_log(_make_log(i))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.repo.query_logs(cursor=cursor, limit=5)
+            seen.extend(e["id"] for e in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [str(i) for i in range(12)])
+
+    def test_tombstones_applied_on_read_and_survive_restart(self):
+        for i in range(6):
+            self.repo.create_log(_make_log(i))
+        self.assertTrue(self.repo.update_log("1", {"query": "changed"}))
+        self.assertTrue(self.repo.delete_log("2"))
+        self.assertFalse(self.repo.delete_log("2"))
+        self.assertFalse(self.repo.update_log("missing", {"query": "x"}))
+
+        for repo in (self.repo, self._open()):
+            logs = {e["id"]: e for e in repo.read_logs()}
+            self.assertNotIn("2", logs)
+            self.assertEqual(logs["1"]["query"], "changed")
+            self.assertEqual(repo.get_log("1")["query"], "changed")
+            self.assertIsNone(repo.get_log("2"))
+            if repo is not self.repo:
+                repo.close()
+
+    def test_compaction_folds_tombstones_into_sealed_segments(self):
+        for i in range(12):
+            self.repo.create_log(_make_log(i))
+        self.repo.update_log("0", {"query": "changed"})
+        self.repo.delete_log("1")
+        self.repo._roll()
+
+        self.assertGreater(self.repo.compact(), 0)
+
+        self.assertEqual(self.repo._tombstones, {})
+        stored = [
+            record for seq in self.repo._segments()
+            for _, record in self.repo._read_segment(seq)
+        ]
+        self.assertFalse(any("_op" in record for record in stored))
+        logs = self.repo.read_logs()
+        self.assertEqual(logs[0]["query"], "changed")
+        self.assertNotIn("1", [e["id"] for e in logs])
+
+    def test_retention_deletes_old_sealed_segments(self):
+        for i in range(12):
+            self.repo.create_log(_make_log(i))
+        self.repo.retention_seconds = 60
+        oldest = os.path.join(self.tmpdir.name, self._segment_files()[0])
+        os.utime(oldest, (0, 0))
+
+        removed = self.repo.enforce_retention()
+
+        self.assertEqual(len(removed), 1)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertNotIn("0", [e["id"] for e in self.repo.read_logs()])
+
+    def test_retention_can_archive(self):
+        for i in range(12):
+            self.repo.create_log(_make_log(i))
+        self.repo.retention_seconds = 60
+        self.repo.archive = True
+        oldest = self._segment_files()[0]
+        os.utime(os.path.join(self.tmpdir.name, oldest), (0, 0))
+
+        self.repo.enforce_retention()
+
+        self.assertTrue(os.path.exists(
+            os.path.join(self.tmpdir.name, "archive", oldest + ".gz")
+        ))
+
+    def test_active_segment_never_expires(self):
+        self.repo.create_log(_make_log(0))
+        self.repo.retention_seconds = 0
+        active = os.path.join(self.tmpdir.name, self._segment_files()[-1])
+        os.utime(active, (0, 0))
+
+        self.assertEqual(self.repo.enforce_retention(), [])
+
+
+class TestBinarySegmentedLogRepository(TestSegmentedLogRepository):
+    SEGMENT_BYTES = 150
+    RECORD_FORMAT = "binary"
+    SUFFIX = ".logb"
+
+    def test_reopen_continues_string_table(self):
+        self.repo.create_log(_make_log(0))
+        self.repo.close()
+        self.repo = self._open()
+        self.repo.create_log(_make_log(3))
+
+        logs = self.repo.read_logs()
+
+        self.assertEqual([e["id"] for e in logs], ["0", "3"])
+        self.assertEqual(logs[1]["requesting_ip"], "10.0.0.0")
+
+    def test_reopen_drops_partial_tail(self):
+        self.repo.create_log(_make_log(0))
+        self.repo.close()
+        path = os.path.join(self.tmpdir.name, self._segment_files()[-1])
+        with open(path, "ab") as f:
+            f.write(b"\x01\x05ab")
+        self.repo = self._open()
+        self.repo.create_log(_make_log(1))
+
+        self.assertEqual(
+            [e["id"] for e in self.repo.read_logs()], ["0", "1"]
+        )
+
+    def test_unknown_record_format(self):
+        with self.assertRaises(ValueError):
+            self._open(record_format="xml")
+
+
+class TestCreateLogRepository(unittest.TestCase):
+    def test_default_is_json(self):
+        tmp = tempfile.NamedTemporaryFile(delete=False)
+        tmp.close()
+        try:
+            repo = create_log_repository({"path": tmp.name})
+            self.assertIsInstance(repo, LogRepository)
+        finally:
+            os.unlink(tmp.name)
+
+    def test_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = create_log_repository({
+                "backend": "sqlite",
+                "path": os.path.join(tmpdir, "logs.db"),
+                "flush_interval": 0,
+            })
+            try:
+                self.assertIsInstance(repo, SQLiteLogRepository)
+            finally:
+                repo.close()
+
+    def test_segmented_backend(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo = create_log_repository({
+                "backend": "segmented",
+                "path": tmpdir,
+                "maintenance_interval": 0,
+            })
+            try:
+                self.assertIsInstance(repo, SegmentedLogRepository)
+            finally:
+                repo.close()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_log_repository({"backend": "mongo"})
+
+
 class TestStorageRepository(unittest.TestCase):
     def setUp(self):
         self.repo = StorageRepository()
@@ -107,6 +517,47 @@ class TestStorageRepository(unittest.TestCase):
         self.assertIn("a", trie)
         self.assertIn("#", trie["a"]["p"]["p"]["l"]["e"])
 
+    def test_normalize_key(self):
+        self.assertEqual(normalize_key("  Apple \t"), "apple")
+        # Decomposed e + combining acute, and a German sharp s
+        self.assertEqual(normalize_key("Cafe\u0301"), "caf\u00e9")
+        self.assertEqual(normalize_key("STRASSE"), normalize_key("straße"))
+
+    def test_normalized_mode_ignores_case_space_and_form(self):
+        self.repo.data = ["Apple", " caf\u00e9 ", "   "]
+        snapshot = self.repo.prepare("normalized")
+
+        self.assertEqual(snapshot.structure, {"apple", "caf\u00e9"})
+        self.assertTrue(self.repo.search("  APPLE", snapshot)[0])
+        self.assertTrue(self.repo.search("CAFE\u0301", snapshot)[0])
+        self.assertFalse(self.repo.search("apples", snapshot)[0])
+        # The exact index is unaffected and kept next to it
+        exact = self.repo.prepare("set")
+        self.assertFalse(self.repo.search("  APPLE", exact)[0])
+
+    def test_column_index_keeps_only_the_field_and_returns_rows(self):
+        with open(self.temp_file.name, 'w', encoding='utf-8') as f:
+            f.write("id\tname\n3\tcarrot\n1\tapple\n2\tb\u00e4r\n1\tdup\n")
+        repo = StorageRepository(
+            columns=ColumnExtractor(column=0, delimiter='\t', header=True)
+        )
+
+        self.assertTrue(repo.load_file(self.temp_file.name))
+        snapshot = repo.prepare("set")
+
+        self.assertEqual(repo.data, ["3", "1", "2", "1"])
+        self.assertTrue(repo.search("2", snapshot)[0])
+        self.assertFalse(repo.search("apple", snapshot)[0])
+        self.assertEqual(repo.row_for("2"), "2\tb\u00e4r")
+        # Duplicate keys resolve to the first row in the file
+        self.assertEqual(repo.row_for("1"), "1\tapple")
+        self.assertIsNone(repo.row_for("9"))
+
+    def test_row_for_without_columns(self):
+        self.repo.load_file(self.temp_file.name)
+
+        self.assertIsNone(self.repo.row_for("apple"))
+
     def test_search_naive(self):
         self.repo.load_file(self.temp_file.name)
         self.repo.prepare("naive")
@@ -119,6 +570,375 @@ class TestStorageRepository(unittest.TestCase):
         result, _ = self.repo.search("not_in_list")
         self.assertFalse(result)
 
+    def test_prepare_reuses_index_for_same_data(self):
+        self.repo.data = ["apple", "banana"]
+        self.repo.prepare("set")
+        index = self.repo.search_data
+
+        self.repo.prepare("set")
+        self.assertIs(self.repo.search_data, index)
+
+        self.repo.data = ["cherry"]
+        self.repo.prepare("set")
+        self.assertEqual(self.repo.search_data, {"cherry"})
+
+    def test_memory_report_measures_structure_not_data(self):
+        self.repo.data = [f"word{i}" for i in range(500)]
+        self.repo.prepare("naive")
+        self.repo.prepare("set")
+
+        report = self.repo.memory_report()
+
+        self.assertEqual(report["active"], "set")
+        self.assertEqual(report["modes"]["naive"]["bytes"], 0)
+        set_bytes = report["modes"]["set"]["bytes"]
+        self.assertEqual(set_bytes, sys.getsizeof(self.repo.search_data))
+        self.assertIsNone(report["modes"]["set"]["traced_peak_bytes"])
+
+    def test_builds_project_and_reports_measure(self):
+        self.repo.data = [f"word{i}" for i in range(5000)]
+        self.repo.prepare("set")
+        projected = self.repo.memory_usage()["set"]
+
+        measured = self.repo.memory_report()["modes"]["set"]["bytes"]
+
+        self.assertEqual(measured, sys.getsizeof(self.repo.search_data))
+        self.assertEqual(self.repo.memory_usage()["set"], measured)
+        self.assertEqual(
+            self.repo.memory_reports["set"]["projected_bytes"], projected
+        )
+
+    def test_trie_memory_counts_nodes(self):
+        self.repo.data = ["apple", "apply"]
+        self.repo.prepare("trie")
+
+        self.assertGreater(
+            self.repo.memory_usage()["trie"],
+            sys.getsizeof(self.repo.search_data) * 5,
+        )
+
+    def test_traced_build_reports_allocations(self):
+        repo = StorageRepository(trace_allocations=True)
+        repo.data = [f"word{i}" for i in range(1000)]
+
+        repo.prepare("dict")
+
+        report = repo.memory_report()["modes"]["dict"]
+        self.assertGreater(report["traced_peak_bytes"], 0)
+
+    def test_prepare_refuses_build_over_limit(self):
+        repo = StorageRepository(memory_limit=60_000)
+        repo.data = [f"word{i}" for i in range(5000)]
+        repo.prepare("binary")
+
+        with self.assertRaises(ValueError):
+            repo.prepare("trie")
+
+        # The previous structure is left in place
+        self.assertEqual(repo.mode, "binary")
+        self.assertTrue(repo.search("word42")[0])
+
+    def test_limit_applies_to_all_resident_modes(self):
+        repo = StorageRepository()
+        repo.data = [f"word{i}" for i in range(5000)]
+        held = repo.prepare("set")
+        repo.prepare("dict")
+        sizes = repo.memory_usage()
+        repo.memory_limit = sizes["set"] + sizes["dict"] + 1000
+
+        # set was used least recently, so it makes room for binary
+        repo.prepare("binary")
+        self.assertEqual(repo.prepared_modes(), ["binary", "dict"])
+        self.assertTrue(repo.search("word7", held)[0])
+
+        repo.memory_limit = sizes["set"] // 2
+        with self.assertRaises(ValueError):
+            repo.prepare("set")
+
+    def test_snapshot_survives_other_preparations(self):
+        self.repo.data = ["apple", "banana"]
+        trie = self.repo.prepare("trie")
+        self.repo.prepare("binary")
+        self.repo.data = ["cherry"]
+        self.repo.prepare("set")
+
+        self.assertEqual(trie.mode, "trie")
+        self.assertTrue(self.repo.search("banana", trie)[0])
+        self.assertFalse(self.repo.search("banana")[0])
+
+    def test_concurrent_modes_never_mix_structures(self):
+        self.repo.data = [f"word{i}" for i in range(2000)]
+        modes = ["set", "dict", "binary", "trie", "index_map", "naive"]
+        errors = []
+
+        def worker(mode):
+            try:
+                for i in range(50):
+                    snapshot = self.repo.prepare(mode)
+                    found, _ = self.repo.search(f"word{i * 7}", snapshot)
+                    if snapshot.mode != mode or not found:
+                        errors.append((mode, i))
+            except Exception as e:
+                errors.append((mode, e))
+
+        threads = [
+            threading.Thread(target=worker, args=(mode,)) for mode in modes
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def _write(self, text, mode='w'):
+        with open(self.temp_file.name, mode, encoding='utf-8') as f:
+            f.write(text)
+
+    def test_reload_of_unchanged_file_keeps_data(self):
+        self._write("apple\nbanana\n")
+        self.repo.load_file(self.temp_file.name)
+        data = self.repo.data
+
+        self.assertTrue(self.repo.load_file(self.temp_file.name))
+        self.assertIs(self.repo.data, data)
+
+    def test_append_extends_every_prepared_structure(self):
+        self._write("apple\nbanana\n")
+        self.repo.load_file(self.temp_file.name)
+        modes = ["set", "dict", "index_map", "binary", "trie", "naive",
+                 "normalized"]
+        for mode in modes:
+            self.repo.prepare(mode)
+
+        # The unfinished last line is left for the next reload
+        self._write("cherry\nAvocado\ndat", mode='a')
+        self.assertTrue(self.repo.load_file(self.temp_file.name))
+
+        self.assertEqual(
+            self.repo.data, ["apple", "banana", "cherry", "Avocado"]
+        )
+        for mode in modes:
+            snapshot = self.repo.prepare(mode)
+            self.assertIs(snapshot.data, self.repo.data)
+            self.assertTrue(self.repo.search("cherry", snapshot)[0], mode)
+            self.assertTrue(self.repo.search("apple", snapshot)[0], mode)
+            self.assertFalse(self.repo.search("dat", snapshot)[0], mode)
+        self.assertEqual(self.repo.prepare("index_map").structure[3],
+                         "Avocado")
+
+        self._write("e\n", mode='a')
+        self.assertTrue(self.repo.load_file(self.temp_file.name))
+        self.assertEqual(self.repo.data[-1], "date")
+
+    def test_rewritten_file_is_reloaded_in_full(self):
+        self._write("apple\nbanana\n")
+        self.repo.load_file(self.temp_file.name)
+        snapshot = self.repo.prepare("set")
+
+        self._write("apricot\nbanana\ncherry\n")
+        self.assertTrue(self.repo.load_file(self.temp_file.name))
+
+        self.assertEqual(self.repo.data, ["apricot", "banana", "cherry"])
+        self.assertTrue(self.repo.search("apple", snapshot)[0])
+        current = self.repo.prepare("set")
+        self.assertFalse(self.repo.search("apple", current)[0])
+
+    def test_append_to_column_index_tracks_row_offsets(self):
+        self._write("id,name\n2,b\n")
+        repo = StorageRepository(
+            columns=ColumnExtractor(column=0, header=True)
+        )
+        repo.load_file(self.temp_file.name)
+        repo.prepare("set")
+        self.assertEqual(repo.row_for("2"), "2,b")
+
+        self._write("1,a\n0,z\n1,c\n", mode='a')
+        self.assertTrue(repo.load_file(self.temp_file.name))
+
+        self.assertEqual(repo.data, ["2", "1", "0", "1"])
+        self.assertEqual(list(repo.row_offsets), [8, 12, 16, 20])
+        self.assertEqual(repo.row_for("1"), "1,a")
+        self.assertEqual(repo.row_for("0"), "0,z")
+        self.assertEqual(repo.row_for("2"), "2,b")
+        self.assertIsNone(repo.row_for("3"))
+
+    def test_row_for_waits_for_in_place_changes(self):
+        self._write("id,name\n2,b\n")
+        repo = StorageRepository(columns=ColumnExtractor(column=0))
+        repo.load_file(self.temp_file.name)
+        rows = []
+        reader = threading.Thread(target=lambda: rows.append(
+            (repo.row_for("1"), len(repo.line_index().rows("1")))
+        ))
+
+        with repo._mutation_lock:
+            reader.start()
+            reader.join(0.2)
+            self.assertTrue(reader.is_alive())
+            self._write("1,a\n", mode='a')
+            repo._load_file(self.temp_file.name)
+        reader.join()
+
+        self.assertEqual(rows, [("1,a", 1)])
+
+    def test_append_extends_current_snapshots_in_place(self):
+        self.repo.data = ["b", "a"]
+        data = self.repo.data
+        held = self.repo.prepare("set")
+        self.repo.prepare("binary")
+
+        self.repo.append_lines(["c"])
+
+        self.assertIs(self.repo.data, data)
+        self.assertEqual(data, ["b", "a", "c"])
+        self.assertIs(self.repo.prepare("set"), held)
+        self.assertTrue(self.repo.search("c", held)[0])
+        binary = self.repo.prepare("binary")
+        self.assertEqual(binary.structure, SortedDelta(["a", "b"], ["c"]))
+
+    def test_binary_delta_is_searched_then_merged(self):
+        self.repo.data = ["b", "d"]
+        self.repo.prepare("binary")
+        self.repo.append_lines(["c", "a"])
+
+        snapshot = self.repo.prepare("binary")
+        self.assertEqual(snapshot.structure,
+                         SortedDelta(["b", "d"], ["a", "c"]))
+        self.assertTrue(self.repo.search("a", snapshot)[0])
+        self.assertTrue(self.repo.search("d", snapshot)[0])
+
+        self.assertTrue(self.repo.merge_delta())
+        merged = self.repo.prepare("binary")
+        self.assertEqual(merged.structure, ["a", "b", "c", "d"])
+        self.assertIs(merged.data, snapshot.data)
+        self.assertFalse(self.repo.merge_delta())
+
+    def _mutable_repo(self):
+        self._write("apple\nbanana\napple\n")
+        self.repo.key_log = WriteAheadLog(self.temp_file.name + ".wal")
+        self.addCleanup(os.unlink, self.temp_file.name + ".wal")
+        self.addCleanup(self.repo.key_log.close)
+        self.repo.load_file(self.temp_file.name)
+        return self.repo
+
+    def test_add_and_remove_keys_update_every_structure(self):
+        repo = self._mutable_repo()
+        modes = ["set", "dict", "index_map", "binary", "trie", "naive",
+                 "normalized"]
+        held = [repo.prepare(mode) for mode in modes]
+
+        self.assertTrue(repo.add_key("Cherry"))
+        self.assertFalse(repo.add_key("Cherry"))
+        self.assertTrue(repo.remove_key("apple"))
+        self.assertFalse(repo.remove_key("apple"))
+
+        self.assertEqual(repo.data, ["banana", "Cherry"])
+        for mode in modes:
+            snapshot = repo.prepare(mode)
+            self.assertTrue(repo.search("Cherry", snapshot)[0], mode)
+            self.assertTrue(repo.search("banana", snapshot)[0], mode)
+            self.assertFalse(repo.search("apple", snapshot)[0], mode)
+        # Snapshots taken before the removal still answer
+        self.assertTrue(repo.search("banana", held[3])[0])
+        self.assertEqual(repo.key_log.entries(),
+                         [("+", "Cherry"), ("-", "apple")])
+
+    def test_removal_updates_structures_in_place(self):
+        self.repo.data = ["Apple", "b", " apple", "c", "b"]
+        data = self.repo.data
+        index_map = self.repo.prepare("index_map")
+        normalized = self.repo.prepare("normalized")
+
+        self.assertEqual(self.repo.remove_lines({"Apple", "b"}), 3)
+
+        self.assertIs(self.repo.data, data)
+        self.assertEqual(data, [" apple", "c"])
+        self.assertIs(self.repo.prepare("index_map"), index_map)
+        self.assertEqual(index_map.structure, {2: " apple", 3: "c"})
+        # Another line still normalizes to "apple"
+        self.assertTrue(self.repo.search("APPLE", normalized)[0])
+        self.assertFalse(self.repo.search("b", normalized)[0])
+
+        self.repo.remove_lines({" apple"})
+        self.repo.append_lines(["d", "e"])
+        self.repo.remove_lines({"d"})
+        self.assertFalse(self.repo.search("apple", normalized)[0])
+        self.assertEqual(index_map.structure, {3: "c", 6: "e"})
+        self.assertEqual(index_map.structure.row_at(1), 6)
+        self.assertEqual(index_map.structure.holes, [0, 1, 2, 4, 5])
+
+    def test_binary_removal_marks_keys_until_merged(self):
+        self.repo.data = ["a", "b", "c", "b"]
+        held = self.repo.prepare("binary")
+        self.repo.remove_lines({"b", "x"})
+        self.repo.append_lines(["b"])
+
+        snapshot = self.repo.prepare("binary")
+        self.assertEqual(snapshot.structure,
+                         SortedDelta(["a", "b", "b", "c"], ["b"],
+                                     frozenset({"b"})))
+        self.assertTrue(self.repo.search("b", snapshot)[0])
+        self.repo.remove_lines({"b"})
+        self.assertFalse(self.repo.search("b", self.repo.prepare("binary"))[0])
+        # The snapshot held from before is unchanged
+        self.assertTrue(self.repo.search("b", held)[0])
+
+        self.assertTrue(self.repo.merge_delta())
+        self.assertEqual(self.repo.prepare("binary").structure, ["a", "c"])
+
+    def test_mutations_are_replayed_on_load(self):
+        repo = self._mutable_repo()
+        repo.add_key("cherry")
+        repo.remove_key("banana")
+
+        reloaded = StorageRepository()
+        reloaded.key_log = repo.key_log
+        reloaded.load_file(self.temp_file.name)
+
+        self.assertEqual(reloaded.data, ["apple", "apple", "cherry"])
+
+    def test_fold_rewrites_file_and_empties_log(self):
+        repo = self._mutable_repo()
+        repo.prepare("binary")
+        repo.add_key("cherry")
+        repo.remove_key("banana")
+
+        self.assertTrue(repo.fold_key_log())
+        self.assertFalse(repo.fold_key_log())
+
+        self.assertEqual(len(repo.key_log), 0)
+        with open(self.temp_file.name, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "apple\napple\ncherry\n")
+        self.assertEqual(repo.prepare("binary").structure,
+                         ["apple", "apple", "cherry"])
+        # The rewritten file is recognised as already loaded
+        data = repo.data
+        repo.load_file(self.temp_file.name)
+        self.assertIs(repo.data, data)
+
+    def test_fold_keeps_lines_written_to_the_file_meanwhile(self):
+        repo = self._mutable_repo()
+        repo.add_key("x")
+
+        self._write("d\n", mode='a')
+        self.assertTrue(repo.fold_key_log())
+        with open(self.temp_file.name, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "apple\nbanana\napple\nx\nd\n")
+
+        # A rewrite rather than an append is read in full, log replayed
+        repo.remove_key("banana")
+        self._write("banana\nz\n")
+        self.assertTrue(repo.fold_key_log())
+        with open(self.temp_file.name, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "z\n")
+        self.assertEqual(repo.data, ["z"])
+
+    def test_mutation_needs_a_key_log(self):
+        self.repo.load_file(self.temp_file.name)
+        with self.assertRaises(ValueError):
+            self.repo.add_key("cherry")
+
     def test_search_without_prepare_raises(self):
         self.repo.load_file(self.temp_file.name)
         with self.assertRaises(ValueError):
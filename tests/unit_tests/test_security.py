@@ -1,9 +1,18 @@
+import os
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 import ssl
 import socket
 
-from security import secure_socket, protect_buffer
+from metrics import REGISTRY
+from security import (
+    create_server_context, secure_socket, protect_buffer, tls_handshake
+)
+
+CERTS = os.path.join(os.path.dirname(__file__), "..", "..", "certs")
+CERTFILE = os.path.join(CERTS, "cert.pem")
+KEYFILE = os.path.join(CERTS, "key.pem")
 
 
 class TestSecureSocket(unittest.TestCase):
@@ -78,6 +87,72 @@ class TestSecureSocket(unittest.TestCase):
             secure_socket(mock_socket, 'cert.pem', 'key.pem')
 
 
+@unittest.skipUnless(
+    os.path.exists(CERTFILE) and os.path.exists(KEYFILE),
+    "test certificate not available"
+)
+class TestTlsHandshake(unittest.TestCase):
+
+    def setUp(self):
+        self.context = create_server_context(CERTFILE, KEYFILE)
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.addCleanup(self.listener.close)
+        self.client_context = ssl.create_default_context()
+        self.client_context.check_hostname = False
+        self.client_context.verify_mode = ssl.CERT_NONE
+
+    def _serve(self, count, results):
+        for _ in range(count):
+            conn, _ = self.listener.accept()
+            try:
+                tls_conn = tls_handshake(self.context, conn, timeout=2)
+            except OSError as e:
+                results.append(e)
+                conn.close()
+                continue
+            tls_conn.recv(1)
+            tls_conn.sendall(b"x")
+            results.append(tls_conn.session_reused)
+            tls_conn.close()
+
+    def test_second_connection_resumes_session(self):
+        results = []
+        server = threading.Thread(target=self._serve, args=(2, results))
+        server.start()
+
+        session = None
+        for _ in range(2):
+            conn = self.client_context.wrap_socket(
+                socket.create_connection(self.listener.getsockname()),
+                server_hostname="localhost",
+                session=session,
+            )
+            conn.sendall(b"a")
+            conn.recv(1)
+            session = conn.session
+            conn.close()
+        server.join(timeout=5)
+
+        self.assertEqual(results, [False, True])
+        ratio = REGISTRY.snapshot()["gauges"]["tls_resumption_ratio"][""]
+        self.assertGreater(ratio, 0)
+
+    def test_stalled_handshake_times_out(self):
+        results = []
+        server = threading.Thread(target=self._serve, args=(1, results))
+        server.start()
+
+        # Connects but never sends a ClientHello
+        idle = socket.create_connection(self.listener.getsockname())
+        self.addCleanup(idle.close)
+        server.join(timeout=5)
+
+        self.assertFalse(server.is_alive())
+        self.assertIsInstance(results[0], socket.timeout)
+
+
 class TestProtectBuffer(unittest.TestCase):
 
     def test_protect_buffer_success(self):
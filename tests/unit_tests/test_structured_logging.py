@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+import structured_logging
+from structured_logging import (
+    REQUEST_LOGGER,
+    JsonLinesFormatter,
+    KeyValueFormatter,
+    configure_logging,
+    log_event,
+)
+
+
+class _CountingValue:
+    """Value that records how often it has been rendered."""
+
+    def __init__(self):
+        self.renders = 0
+
+    def __str__(self):
+        self.renders += 1
+        return "value"
+
+
+class TestFormatters(unittest.TestCase):
+
+    def _record(self, fields):
+        record = logging.LogRecord(
+            "server.requests", logging.INFO, __file__, 1,
+            "create_log", None, None
+        )
+        record.fields = fields
+        return record
+
+    def test_json_lines_formatter(self):
+        line = JsonLinesFormatter().format(
+            self._record({"query": "apple", "status": "STRING_EXISTS"})
+        )
+        entry = json.loads(line)
+        self.assertEqual(entry["event"], "create_log")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["query"], "apple")
+
+    def test_key_value_formatter_quotes_spaces(self):
+        line = KeyValueFormatter().format(
+            self._record({"query": "two words", "count": 3})
+        )
+        self.assertIn('query="two words"', line)
+        self.assertIn("count=3", line)
+
+
+class TestConfigureLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(delete=False)
+        self.tmp.close()
+        self.listener = None
+
+    def tearDown(self):
+        self._stop()
+        for handler in list(REQUEST_LOGGER.handlers):
+            REQUEST_LOGGER.removeHandler(handler)
+        REQUEST_LOGGER.addHandler(logging.NullHandler())
+        REQUEST_LOGGER.setLevel(logging.NOTSET)
+        structured_logging._sample_rate = 1.0
+        os.unlink(self.tmp.name)
+
+    def _stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+    def _read_lines(self):
+        self._stop()
+        with open(self.tmp.name, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_records_written_as_json_lines(self):
+        self.listener = configure_logging(
+            {"file": self.tmp.name, "json_lines": True}
+        )
+        log_event("create_log", {"query": "apple"})
+
+        lines = self._read_lines()
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["query"], "apple")
+
+    def test_quiet_mode_skips_formatting(self):
+        self.listener = configure_logging(
+            {"file": self.tmp.name, "quiet": True}
+        )
+        value = _CountingValue()
+        log_event("create_log", {"query": value})
+        log_event("request_error", {"error": "bad"}, logging.WARNING)
+
+        lines = self._read_lines()
+
+        self.assertEqual(value.renders, 0)
+        self.assertEqual(len(lines), 1)
+        self.assertIn("request_error", lines[0])
+
+    def test_sampling_zero_drops_info_keeps_warnings(self):
+        self.listener = configure_logging(
+            {"file": self.tmp.name, "sample_rate": 0.0}
+        )
+        for _ in range(20):
+            log_event("create_log", {"query": "x"})
+        log_event("request_error", {"error": "bad"}, logging.WARNING)
+
+        lines = self._read_lines()
+
+        self.assertEqual(len(lines), 1)
+
+    def test_invalid_level_rejected(self):
+        with self.assertRaises(ValueError):
+            configure_logging({"level": "LOUD"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from wal import (
+    ADD, REMOVE, WriteAheadLog, apply_entries, check_key,
+    create_write_ahead_log
+)
+
+
+class TestApplyEntries(unittest.TestCase):
+    def test_last_operation_per_key_wins(self):
+        entries = [(ADD, "d"), (REMOVE, "a"), (ADD, "a"), (REMOVE, "b"),
+                   (ADD, "e"), (REMOVE, "e")]
+
+        self.assertEqual(apply_entries(["a", "b", "c", "b"], entries),
+                         ["a", "c", "d"])
+
+    def test_replay_is_idempotent(self):
+        entries = [(ADD, "x"), (REMOVE, "a"), (ADD, "a")]
+        once = apply_entries(["a", "b"], entries)
+
+        self.assertEqual(apply_entries(once, entries), once)
+
+    def test_no_entries_returns_lines(self):
+        lines = ["a"]
+        self.assertIs(apply_entries(lines, []), lines)
+
+    def test_check_key(self):
+        check_key("fine key")
+        for key in ("", "two\nlines", "cr\r", None):
+            with self.assertRaises(ValueError):
+                check_key(key)
+
+
+class TestWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "data.txt.wal")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_append_and_reopen(self):
+        wal = WriteAheadLog(self.path, fsync=False)
+        wal.append(ADD, "kä")
+        wal.append(REMOVE, "x")
+        wal.close()
+
+        reopened = WriteAheadLog(self.path)
+        self.assertEqual(reopened.entries(), [(ADD, "kä"), (REMOVE, "x")])
+        self.assertEqual(len(reopened), 2)
+        reopened.close()
+
+    def test_unfinished_last_entry_is_ignored(self):
+        with open(self.path, "wb") as f:
+            f.write(b"+a\n-b")
+        wal = WriteAheadLog(self.path)
+
+        self.assertEqual(wal.entries(), [(ADD, "a")])
+        wal.close()
+
+    def test_unfinished_last_entry_is_dropped_on_open(self):
+        with open(self.path, "wb") as f:
+            f.write(b"+a\n-bro")
+        wal = WriteAheadLog(self.path, fsync=False)
+        wal.append(ADD, "c")
+
+        self.assertEqual(wal.entries(), [(ADD, "a"), (ADD, "c")])
+        self.assertEqual(len(wal), 2)
+        wal.close()
+
+    def test_reset_empties_the_log(self):
+        wal = WriteAheadLog(self.path)
+        wal.append(ADD, "a")
+        wal.reset()
+        wal.append(ADD, "b")
+
+        self.assertEqual(wal.entries(), [(ADD, "b")])
+        self.assertEqual(len(wal), 1)
+        wal.close()
+
+    def test_rejects_bad_operation(self):
+        wal = WriteAheadLog(self.path)
+        with self.assertRaises(ValueError):
+            wal.append("*", "a")
+        wal.close()
+
+    def test_create_write_ahead_log(self):
+        data = os.path.join(self.tmpdir.name, "data.txt")
+        self.assertIsNone(create_write_ahead_log({}, data))
+
+        wal = create_write_ahead_log(
+            {"key_mutation": {"enabled": True}}, data
+        )
+        self.assertEqual(wal.path, data + ".wal")
+        wal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()